@@ -0,0 +1,62 @@
+import { NextRequest, NextResponse } from "next/server"
+import { requireInternalApiKey } from "@/lib/internal-api-auth"
+import { batchUpsertUserSignals, buildSignalPayload, type StoredSignal } from "@/lib/user-data/signals-store"
+
+export const runtime = "nodejs"
+
+const MAX_ITEMS = 1000
+
+/**
+ * POST /api/internal/user-data/signals/batch
+ *
+ * Upsert many signals (any mix of users) in one request using Firestore batched writes.
+ *
+ * Body:
+ *   - items (required): Array of { user_id, signal_key, signal } (same shape as POST /signals), max 1000
+ *
+ * Invalid items are skipped and reported in `rejected` by index; valid ones are still written.
+ * A failed Firestore commit returns 500 so the caller retries the whole batch (upserts are idempotent).
+ */
+export async function POST(request: NextRequest) {
+  const auth = requireInternalApiKey(request)
+  if (!auth.ok) return NextResponse.json({ ok: false, message: auth.message }, { status: auth.status })
+
+  const body = await request.json().catch(() => null)
+  const items = body?.items
+
+  if (!Array.isArray(items)) {
+    return NextResponse.json({ ok: false, message: "Invalid payload: items array required" }, { status: 400 })
+  }
+  if (items.length > MAX_ITEMS) {
+    return NextResponse.json(
+      { ok: false, message: `Too many items: ${items.length} (max ${MAX_ITEMS})` },
+      { status: 413 },
+    )
+  }
+
+  const valid: { userId: string; signalKey: string; payload: StoredSignal }[] = []
+  const rejected: { index: number; message: string }[] = []
+
+  items.forEach((item: any, index: number) => {
+    const userId = String(item?.user_id || "").trim()
+    const signalKey = String(item?.signal_key || "").trim()
+    const signal = item?.signal
+
+    if (!userId || !signalKey || !signal || typeof signal !== "object") {
+      rejected.push({ index, message: "user_id, signal_key, signal required" })
+      return
+    }
+    valid.push({ userId, signalKey, payload: buildSignalPayload(userId, signalKey, signal) })
+  })
+
+  try {
+    const written = await batchUpsertUserSignals(valid)
+    return NextResponse.json({ ok: true, written, rejected })
+  } catch (err: unknown) {
+    console.error("[internal signals batch] failed", err)
+    return NextResponse.json(
+      { ok: false, message: `Failed to write signals: ${err instanceof Error ? err.message : String(err)}` },
+      { status: 500 },
+    )
+  }
+}
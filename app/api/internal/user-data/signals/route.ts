@@ -1,6 +1,6 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireInternalApiKey } from "@/lib/internal-api-auth"
-import { upsertUserSignal, listUserSignals, deleteUserSignal } from "@/lib/user-data/signals-store"
+import { upsertUserSignal, listUserSignals, deleteUserSignal, buildSignalPayload } from "@/lib/user-data/signals-store"
 
 export const runtime = "nodejs"
 
@@ -76,70 +76,9 @@ export async function POST(request: NextRequest) {
     )
   }
 
-  // Build payload with only non-empty values to avoid overwriting existing data
-  const payload: Record<string, unknown> = {
-    signal_key: signalKey,
-    user_id: userId,
-  }
-
-  // Only add fields that have actual values
-  if ((signal as any).symbol || (signal as any).pair) {
-    payload.symbol = String((signal as any).symbol || (signal as any).pair)
-  }
-  if ((signal as any).direction) {
-    payload.direction = String((signal as any).direction)
-  }
-  if ((signal as any).timeframe) {
-    payload.timeframe = String((signal as any).timeframe)
-  }
-  if ((signal as any).entry) {
-    payload.entry = Number((signal as any).entry)
-  }
-  if ((signal as any).sl) {
-    payload.sl = Number((signal as any).sl)
-  }
-  if ((signal as any).tp) {
-    payload.tp = Number((signal as any).tp)
-  }
-  if ((signal as any).rr) {
-    payload.rr = Number((signal as any).rr)
-  }
-  if ((signal as any).strategy_name) {
-    payload.strategy_name = String((signal as any).strategy_name)
-  }
-  if ((signal as any).generated_at) {
-    payload.generated_at = String((signal as any).generated_at)
-  }
-  if ((signal as any).status) {
-    const status = String((signal as any).status)
-    payload.status = status
-
-    // Map status to outcome for History page compatibility
-    // VPS sends status (hit_tp/hit_sl/expired), History reads outcome (win/loss/pending)
-    if (!payload.outcome) {
-      if (status === "hit_tp") {
-        payload.outcome = "win"
-      } else if (status === "hit_sl") {
-        payload.outcome = "loss"
-      } else if (status === "expired") {
-        payload.outcome = "expired"
-      }
-    }
-  }
-  if ((signal as any).outcome) {
-    payload.outcome = String((signal as any).outcome)
-  }
-  if ((signal as any).entry_taken !== undefined) {
-    payload.entry_taken = Boolean((signal as any).entry_taken)
-  }
-  if ((signal as any).evidence) {
-    payload.evidence = (signal as any).evidence
-  }
-  if ((signal as any).meta) {
-    payload.meta = (signal as any).meta
-  }
+  const payload = buildSignalPayload(userId, signalKey, signal)
 
-  await upsertUserSignal(userId, signalKey, payload as any)
+  await upsertUserSignal(userId, signalKey, payload)
 
   return NextResponse.json({ ok: true })
 }
@@ -4,6 +4,19 @@ import { NextRequest } from "next/server"
 
 export const runtime = "nodejs"
 
+const BACKEND_ORIGIN = process.env.BACKEND_ORIGIN || "https://api.jkmcopilot.com"
+
+// Headers relayed from the backend for columnar responses (ETag revalidation + f64 layout)
+const RELAY_HEADERS = [
+  "content-type",
+  "etag",
+  "cache-control",
+  "x-candle-count",
+  "x-candle-columns",
+  "x-candle-symbol",
+  "x-candle-tf",
+]
+
 export async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ symbol: string }> }
@@ -18,9 +31,51 @@ export async function GET(
   const { searchParams } = new URL(request.url)
   const tf = searchParams.get("tf") || "M5"
   const limit = searchParams.get("limit") || "200"
+  const format = searchParams.get("format")
+  const since = searchParams.get("since")
+  const strict = searchParams.get("strict")
+
+  if (!format && !since) {
+    return forwardInternalRequest(request, {
+      method: "GET",
+      path: `/api/markets/${symbol}/candles?tf=${tf}&limit=${limit}`,
+    })
+  }
+
+  // Columnar / incremental: relay body bytes and ETag as-is (f64 is binary)
+  const key = process.env.INTERNAL_API_KEY || process.env.BACKEND_INTERNAL_API_KEY
+  if (!key) return json(500, { ok: false, message: "Backend not configured" })
+
+  const qs = new URLSearchParams({ tf, limit })
+  if (format) qs.set("format", format)
+  if (since) qs.set("since", since)
+  if (strict) qs.set("strict", strict)
+
+  const headers: Record<string, string> = { "x-internal-api-key": key }
+  const ifNoneMatch = request.headers.get("if-none-match")
+  if (ifNoneMatch) headers["if-none-match"] = ifNoneMatch
+
+  try {
+    const response = await fetch(
+      `${BACKEND_ORIGIN}/api/markets/${encodeURIComponent(symbol)}/candles?${qs}`,
+      { method: "GET", headers, cache: "no-store" },
+    )
+
+    const responseHeaders = new Headers()
+    for (const name of RELAY_HEADERS) {
+      const value = response.headers.get(name)
+      if (value) responseHeaders.set(name, value)
+    }
+
+    if (response.status === 304) {
+      return new Response(null, { status: 304, headers: responseHeaders })
+    }
 
-  return forwardInternalRequest(request, {
-    method: "GET",
-    path: `/api/markets/${symbol}/candles?tf=${tf}&limit=${limit}`,
-  })
+    return new Response(await response.arrayBuffer(), {
+      status: response.status,
+      headers: responseHeaders,
+    })
+  } catch (err: any) {
+    return json(502, { ok: false, message: "Failed to reach backend" })
+  }
 }
@@ -5,9 +5,45 @@ export const runtime = "nodejs"
 // Backend URL for prices (Python backend)
 const BACKEND_URL = process.env.JKM_BOT_API || "https://api.jkmcopilot.com"
 
+const SSE_HEADERS = {
+  "Content-Type": "text/event-stream",
+  "Cache-Control": "no-cache",
+  "Connection": "keep-alive",
+  "X-Accel-Buffering": "no",
+}
+
 export async function GET(request: NextRequest) {
-  // Create a readable stream
-  const stream = new ReadableStream({
+  const symbols = request.nextUrl.searchParams.get("symbols") || ""
+
+  // Preferred: relay the backend push stream (one producer for all viewers).
+  // Messages are {ok, type: "snapshot" | "delta", timestamp, prices}.
+  try {
+    const qs = symbols ? `?symbols=${encodeURIComponent(symbols)}` : ""
+    const response = await fetch(`${BACKEND_URL}/api/prices/stream${qs}`, {
+      method: "GET",
+      headers: { "Accept": "text/event-stream" },
+      // Aborting with the client closes the backend subscription
+      signal: request.signal,
+    })
+
+    const contentType = response.headers.get("content-type") || ""
+    if (response.ok && response.body && contentType.includes("text/event-stream")) {
+      return new Response(response.body, { headers: SSE_HEADERS })
+    }
+    // Older backend (404) or stream limit reached (JSON) -> poll below
+    await response.body?.cancel()
+  } catch (err: any) {
+    if (request.signal.aborted) {
+      return new Response(null, { status: 499 })
+    }
+  }
+
+  return new Response(pollingStream(request), { headers: SSE_HEADERS })
+}
+
+// Fallback: poll /api/prices once a second and emit full snapshots
+function pollingStream(request: NextRequest) {
+  return new ReadableStream({
     async start(controller) {
       const encoder = new TextEncoder()
       let isActive = true
@@ -17,43 +53,28 @@ export async function GET(request: NextRequest) {
         isActive = false
       })
 
-      // Fetch prices every second and stream them
-      const fetchAndStream = async () => {
-        while (isActive) {
-          try {
-            const response = await fetch(`${BACKEND_URL}/api/prices`, {
-              method: "GET",
-              headers: { "Accept": "application/json" },
-              signal: AbortSignal.timeout(3000),
-            })
-
-            if (response.ok) {
-              const data = await response.json()
-              // Send as SSE format
-              const message = `data: ${JSON.stringify(data)}\n\n`
-              controller.enqueue(encoder.encode(message))
-            }
-          } catch (err: any) {
-            // Send error event
-            const errorMsg = `event: error\ndata: ${JSON.stringify({ message: err.message })}\n\n`
-            controller.enqueue(encoder.encode(errorMsg))
-          }
+      while (isActive) {
+        try {
+          const response = await fetch(`${BACKEND_URL}/api/prices`, {
+            method: "GET",
+            headers: { "Accept": "application/json" },
+            signal: AbortSignal.timeout(3000),
+          })
 
-          // Wait 1 second before next fetch
-          await new Promise(resolve => setTimeout(resolve, 1000))
+          if (response.ok) {
+            const data = await response.json()
+            const message = `data: ${JSON.stringify({ ...data, type: "snapshot" })}\n\n`
+            controller.enqueue(encoder.encode(message))
+          }
+        } catch (err: any) {
+          const errorMsg = `event: error\ndata: ${JSON.stringify({ message: err.message })}\n\n`
+          controller.enqueue(encoder.encode(errorMsg))
         }
-        controller.close()
-      }
 
-      fetchAndStream()
-    },
-  })
-
-  return new Response(stream, {
-    headers: {
-      "Content-Type": "text/event-stream",
-      "Cache-Control": "no-cache",
-      "Connection": "keep-alive",
+        // Wait 1 second before next fetch
+        await new Promise(resolve => setTimeout(resolve, 1000))
+      }
+      controller.close()
     },
   })
 }
@@ -0,0 +1,19 @@
+import { forwardInternalRequest } from "@/lib/backend-proxy"
+import { requireSession, json } from "@/lib/proxy-auth"
+import { isOwnerEmail } from "@/lib/owner"
+
+export const runtime = "nodejs"
+
+// POST /api/proxy/strategy-tester/sweep - Run a parameter sweep (admin only:
+// one sweep of up to SWEEP_MAX_CONFIGS configs holds the single sweep worker)
+export async function POST(request: Request) {
+  const session = await requireSession()
+  if (!session) return json(401, { ok: false, message: "Unauthorized" })
+
+  if (!isOwnerEmail((session.user as any)?.email)) return json(403, { ok: false, message: "Admin only" })
+
+  return forwardInternalRequest(request, {
+    method: "POST",
+    path: "/api/strategy-tester/sweep",
+  })
+}
@@ -0,0 +1,69 @@
+/**
+ * GET /api/simulator/job/[jobId]/events
+ *
+ * Server-sent events for a simulation job (progress, symbol, trades, done),
+ * relayed from the backend so the internal API key stays server-side.
+ */
+import { NextRequest, NextResponse } from "next/server"
+import { getServerSession } from "next-auth"
+import { authOptions } from "@/lib/auth-options"
+
+export const runtime = "nodejs"
+
+const BACKEND_ORIGIN = process.env.BACKEND_ORIGIN || "https://api.jkmcopilot.com"
+const INTERNAL_API_KEY = process.env.INTERNAL_API_KEY || process.env.BACKEND_INTERNAL_API_KEY
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ jobId: string }> }
+) {
+  // Authentication
+  const session = await getServerSession(authOptions)
+  if (!session?.user) {
+    return NextResponse.json({ ok: false, error: "Unauthorized" }, { status: 401 })
+  }
+
+  const { jobId } = await params
+
+  if (!jobId) {
+    return NextResponse.json({ ok: false, error: "Job ID required" }, { status: 400 })
+  }
+
+  if (!INTERNAL_API_KEY) {
+    return NextResponse.json({ ok: false, error: "Backend not configured" }, { status: 500 })
+  }
+
+  try {
+    // Aborting with the client closes the backend stream (and its subscription)
+    const response = await fetch(`${BACKEND_ORIGIN}/api/strategy-sim/jobs/${jobId}/events`, {
+      method: "GET",
+      headers: {
+        "x-internal-api-key": INTERNAL_API_KEY,
+        Accept: "text/event-stream",
+      },
+      signal: request.signal,
+    })
+
+    const contentType = response.headers.get("content-type") || ""
+    if (!response.ok || !response.body || !contentType.includes("text/event-stream")) {
+      // Unknown job / stream limit come back as JSON
+      const data = await response.json().catch(() => ({ ok: false, error: "Backend error" }))
+      return NextResponse.json(data, { status: response.ok ? 404 : response.status })
+    }
+
+    return new Response(response.body, {
+      headers: {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",
+      },
+    })
+  } catch (error: any) {
+    if (request.signal.aborted) {
+      return new Response(null, { status: 499 })
+    }
+    console.error("[simulator/job/events] Error:", error)
+    return NextResponse.json({ ok: false, error: "Failed to open job stream" }, { status: 500 })
+  }
+}
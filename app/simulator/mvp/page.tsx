@@ -1,7 +1,7 @@
 "use client"
 
 import { useState, useEffect, useMemo } from "react"
-import { api } from "@/lib/api"
+import { api, partialSimResult } from "@/lib/api"
 import { Button } from "@/components/ui/button"
 import {
   Select,
@@ -76,6 +76,7 @@ interface Strategy {
 
 interface SimulatorResult {
   ok: boolean
+  partial?: boolean  // some symbols failed; error lists them
   summary?: {
     entries: number
     tp: number
@@ -358,7 +359,16 @@ export default function SimulatorMVPPage() {
             break
           }
 
-          if (jobRes.job?.status === "failed") {
+          if (jobRes.job?.status === "partial" && jobRes.job?.result) {
+            res = partialSimResult(jobRes.job.result)
+            break
+          }
+
+          if (jobRes.job?.status === "cancelled") {
+            throw new Error(jobRes.job?.error || "Job cancelled")
+          }
+
+          if (jobRes.job?.status === "failed" || jobRes.job?.status === "partial") {
             throw new Error(jobRes.job?.error || "Job failed")
           }
 
@@ -620,7 +630,7 @@ export default function SimulatorMVPPage() {
         )}
 
         {/* Results */}
-        {result?.ok && result.summary && (
+        {(result?.ok || result?.partial) && result.summary && (
           <>
             {/* Warnings Banner */}
             {result.meta?.warnings && result.meta.warnings.length > 0 && (
@@ -1,7 +1,7 @@
 "use client"
 // Force recompile v2 - 2026-01-31
-import { useState, useEffect, useMemo } from "react"
-import { api } from "@/lib/api"
+import { useState, useEffect, useMemo, useRef } from "react"
+import { api, partialSimResult } from "@/lib/api"
 import { AccessGate } from "@/components/access-gate"
 import { Button } from "@/components/ui/button"
 import {
@@ -162,6 +162,7 @@ function formatDuration(bars: number, tf?: string): string {
 
 interface MultiTFResult {
   ok: boolean
+  partial?: boolean  // some symbols failed; error lists them
   summary?: TFSummary  // Top-level summary (single-TF or fallback)
   trades?: TradeDetail[]  // Per-trade details from mode="detailed"
   combined?: {
@@ -528,6 +529,9 @@ export default function SimulatorPage() {
     detector: string
     status: "entering" | "waiting" | "resolved"
   }>>([])
+  // Pushed job progress (SSE); null while the stream is not connected
+  const [jobProgress, setJobProgress] = useState<{ stage: string; percent: number; message: string } | null>(null)
+  const streamedTradeCount = useRef(0)
 
   // Computed
   const selectedStrategy = strategies.find((s) => s.id === strategyId)
@@ -752,6 +756,82 @@ export default function SimulatorPage() {
     }
   }
 
+  // Append trades pushed by the job stream (already resolved on the backend)
+  function appendStreamedTrades(trades: any[]) {
+    const sanitized = trades
+      .map(sanitizeTrade)
+      .filter((t): t is TradeDetail => t !== null)
+    if (sanitized.length === 0) return
+    const offset = streamedTradeCount.current
+    streamedTradeCount.current += sanitized.length
+    setStreamingTrades(prev => [
+      ...prev,
+      ...sanitized.map((trade, i) => ({
+        id: `trade-${offset + i}`,
+        entry_ts: trade.entry_ts ?? 0,
+        exit_ts: trade.exit_ts ?? undefined,
+        direction: (trade.direction ?? "BUY") as "BUY" | "SELL",
+        entry: trade.entry,
+        sl: trade.sl,
+        tp: trade.tp,
+        r: trade.r,
+        duration_bars: trade.duration_bars,
+        detector: trade.detector ?? "",
+        symbol: trade.symbol,
+        tf: trade.tf,
+        outcome: trade.outcome as "TP" | "SL" | "PENDING",
+        status: "resolved" as const,
+      })),
+    ])
+  }
+
+  // Follow job over SSE (progress + trades as each symbol resolves); polling is the fallback
+  function streamJobUntilComplete(jid: string): Promise<any> {
+    if (typeof EventSource === "undefined") return pollJobUntilComplete(jid)
+
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`/api/simulator/job/${jid}/events`)
+      let settled = false
+
+      const settle = (fn: () => Promise<any>) => {
+        if (settled) return
+        settled = true
+        source.close()
+        fn().then(resolve, reject)
+      }
+
+      source.addEventListener("progress", (e) => {
+        const data = JSON.parse((e as MessageEvent).data)
+        setJobProgress({ stage: data.stage, percent: data.percent, message: data.message })
+      })
+
+      source.addEventListener("trades", (e) => {
+        appendStreamedTrades(JSON.parse((e as MessageEvent).data).trades || [])
+      })
+
+      source.addEventListener("done", (e) => {
+        const data = JSON.parse((e as MessageEvent).data)
+        settle(async () => {
+          if (data.status === "cancelled") throw new Error(data.error || "Job cancelled")
+          if (data.status !== "completed" && data.status !== "partial") throw new Error(data.error || "Job failed")
+          // Full result (detailed trades, perSymbol) comes from the job route once
+          const jobRes = await api.simulatorV2.jobStatus(jid)
+          if (!jobRes.job?.result) throw new Error("Job result missing")
+          // Partial: keep the symbols that finished, report the ones that failed
+          return data.status === "partial" ? partialSimResult(jobRes.job.result) : jobRes.job.result
+        })
+      })
+
+      // Stream unavailable or dropped: finish by polling
+      source.onerror = () => {
+        settle(() => {
+          setJobProgress(null)
+          return pollJobUntilComplete(jid)
+        })
+      }
+    })
+  }
+
   // Poll for job completion
   async function pollJobUntilComplete(jid: string): Promise<any> {
     const maxAttempts = 300 // 5 minutes max
@@ -766,7 +846,15 @@ export default function SimulatorPage() {
           return jobRes.job.result
         }
 
-        if (jobRes.job?.status === "failed") {
+        if (jobRes.job?.status === "partial" && jobRes.job?.result) {
+          return partialSimResult(jobRes.job.result)
+        }
+
+        if (jobRes.job?.status === "cancelled") {
+          throw new Error(jobRes.job?.error || "Job cancelled")
+        }
+
+        if (jobRes.job?.status === "failed" || jobRes.job?.status === "partial") {
           throw new Error(jobRes.job?.error || "Job failed")
         }
 
@@ -830,7 +918,9 @@ export default function SimulatorPage() {
     setError(null)
     setResult(null)
     setJobId(null)
+    setJobProgress(null)
     setStreamingTrades([])
+    streamedTradeCount.current = 0
     setActiveTab("combined")
 
     try {
@@ -854,8 +944,8 @@ export default function SimulatorPage() {
         console.log("[simulator] Async job started:", res.jobId)
         setJobId(res.jobId)
 
-        // Poll for completion
-        res = await pollJobUntilComplete(res.jobId)
+        // Follow progress and trades until completion
+        res = await streamJobUntilComplete(res.jobId)
       }
 
       // Debug: Log full response with trades info
@@ -928,8 +1018,8 @@ export default function SimulatorPage() {
         saveSimulation(normalizedRes, strategy)
       }
 
-      // Animate trades if available
-      if (trades.length > 0) {
+      // Animate trades if available (skipped when they already arrived over the job stream)
+      if (trades.length > 0 && streamedTradeCount.current === 0) {
         animateTradesStream(trades)
       }
 
@@ -1395,7 +1485,7 @@ export default function SimulatorPage() {
                 <h3 className="text-lg font-semibold mb-4 text-center">
                   {t("Simulation running", "Симуляци ажиллаж байна")}
                 </h3>
-                <SimulatorProgress isRunning={running} jobId={jobId} />
+                <SimulatorProgress isRunning={running} jobId={jobId} progress={jobProgress} />
                 <p className="text-xs text-muted-foreground text-center mt-4">
                   {symbol} • 5 timeframe
                 </p>
@@ -1410,7 +1500,7 @@ export default function SimulatorPage() {
         )}
 
         {/* Results */}
-        {result?.ok && combinedResult && !running && (
+        {(result?.ok || result?.partial) && combinedResult && !running && (
           <div className="space-y-6 animate-in fade-in duration-300">
             {/* Combined Summary Cards - Use summary as source of truth (trades is just a sample) */}
             {(() => {
@@ -13,7 +13,12 @@ import {
 import { Loader2 } from "lucide-react"
 import { api } from "@/lib/api"
 import type { Candle } from "@/lib/types"
-import { useCandleResampler, getM5CandlesNeeded } from "@/hooks/use-candle-resampler"
+import {
+  useCandleResampler,
+  getM5CandlesNeeded,
+  candlesFromColumns,
+  mergeCandles,
+} from "@/hooks/use-candle-resampler"
 import { useChartContext } from "./ChartContext"
 import type { ChartDrawingDoc, DrawingCreateInput } from "./types"
 import { DEFAULT_COLORS, DEFAULT_FIB_LEVELS } from "./types"
@@ -30,6 +35,73 @@ interface DrawingStartPoint {
   price: number
 }
 
+// Candles per chart load (target timeframe)
+const CHART_CANDLES = 200
+
+/** Normalize raw candle objects, drop invalid bars and abnormal jumps; oldest first. */
+function normalizeCandles(candleArray: any[]): Candle[] {
+  const rawCandles: Candle[] = candleArray
+    .map((c: any) => {
+      let time: number
+      if (typeof c.time === "number") {
+        time = c.time
+      } else if (typeof c.ts === "number") {
+        time = c.ts
+      } else if (c.timestamp) {
+        time = typeof c.timestamp === "number"
+          ? c.timestamp
+          : Math.floor(new Date(c.timestamp).getTime() / 1000)
+      } else {
+        return null
+      }
+
+      const open = Number(c.open || c.o)
+      const high = Number(c.high || c.h)
+      const low = Number(c.low || c.l)
+      const close = Number(c.close || c.c)
+
+      // Skip invalid candles
+      if (isNaN(open) || isNaN(high) || isNaN(low) || isNaN(close)) return null
+      if (open <= 0 || high <= 0 || low <= 0 || close <= 0) return null
+      if (high < low || high < open || high < close) return null
+      if (low > open || low > close) return null
+
+      return {
+        time,
+        open,
+        high,
+        low,
+        close,
+        volume: Number(c.volume || c.v || 0),
+      }
+    })
+    .filter((c: Candle | null): c is Candle => c !== null)
+    .sort((a: Candle, b: Candle) => a.time - b.time)
+
+  // Filter out abnormal price jumps (>30% from previous candle)
+  const validated: Candle[] = []
+  for (let i = 0; i < rawCandles.length; i++) {
+    const candle = rawCandles[i]
+    if (i === 0) {
+      validated.push(candle)
+      continue
+    }
+
+    const prev = validated[validated.length - 1]
+    const priceDiff = Math.abs(candle.close - prev.close) / prev.close
+
+    // Skip if price jumped more than 30% (likely data error)
+    if (priceDiff > 0.30) {
+      console.warn(`[ChartCanvas] Skipping candle with abnormal jump: ${prev.close} -> ${candle.close}`)
+      continue
+    }
+
+    validated.push(candle)
+  }
+
+  return validated
+}
+
 export function ChartCanvas({
   className = "",
   height = 500,
@@ -38,7 +110,9 @@ export function ChartCanvas({
   const containerRef = useRef<HTMLDivElement>(null)
   const { chartRef, seriesRef, state, entrySignals, setActiveTool, setIsDrawing } = useChartContext()
 
-  const [m5Candles, setM5Candles] = useState<Candle[]>([])
+  // Candles as fetched: already at the chart TF (columnar backend) or M5 for client resampling
+  const [sourceCandles, setSourceCandles] = useState<Candle[]>([])
+  const [sourceTf, setSourceTf] = useState("M5")
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
 
@@ -46,8 +120,11 @@ export function ChartCanvas({
   const [drawingStartPoint, setDrawingStartPoint] = useState<DrawingStartPoint | null>(null)
   const previewLineRef = useRef<any>(null)
 
-  // Resample M5 candles to target timeframe
-  const candles = useCandleResampler(m5Candles, state.timeframe)
+  // Last full load, so a refresh of the same symbol/TF only fetches bars since the last one
+  const loadedRef = useRef<{ key: string; candles: Candle[] } | null>(null)
+
+  // Resample on the client only when the backend returned M5
+  const candles = useCandleResampler(sourceCandles, sourceTf === state.timeframe ? "M5" : state.timeframe)
 
   // Fetch candles when symbol changes
   const fetchCandles = useCallback(async () => {
@@ -56,78 +133,39 @@ export function ChartCanvas({
     setLoading(true)
     setError(null)
 
-    try {
-      // Calculate how many M5 candles we need for 200 candles of target TF
-      const m5Count = getM5CandlesNeeded(state.timeframe, 200)
-      const response = await api.candles(state.symbol, "M5", Math.min(m5Count, 2000))
-
-      // Handle both array and {candles:[]} response shapes
-      const candleArray = Array.isArray(response)
-        ? response
-        : response?.candles ?? []
-
-      // Normalize and validate candle data
-      const rawCandles: Candle[] = candleArray
-        .map((c: any) => {
-          let time: number
-          if (typeof c.time === "number") {
-            time = c.time
-          } else if (typeof c.ts === "number") {
-            time = c.ts
-          } else if (c.timestamp) {
-            time = typeof c.timestamp === "number"
-              ? c.timestamp
-              : Math.floor(new Date(c.timestamp).getTime() / 1000)
-          } else {
-            return null
-          }
+    const key = `${state.symbol}:${state.timeframe}`
+    const previous = loadedRef.current?.key === key ? loadedRef.current.candles : null
 
-          const open = Number(c.open || c.o)
-          const high = Number(c.high || c.h)
-          const low = Number(c.low || c.l)
-          const close = Number(c.close || c.c)
-
-          // Skip invalid candles
-          if (isNaN(open) || isNaN(high) || isNaN(low) || isNaN(close)) return null
-          if (open <= 0 || high <= 0 || low <= 0 || close <= 0) return null
-          if (high < low || high < open || high < close) return null
-          if (low > open || low > close) return null
-
-          return {
-            time,
-            open,
-            high,
-            low,
-            close,
-            volume: Number(c.volume || c.v || 0),
-          }
-        })
-        .filter((c: Candle | null): c is Candle => c !== null)
-        .sort((a: Candle, b: Candle) => a.time - b.time)
-
-      // Filter out abnormal price jumps (>30% from previous candle)
-      const validated: Candle[] = []
-      for (let i = 0; i < rawCandles.length; i++) {
-        const candle = rawCandles[i]
-        if (i === 0) {
-          validated.push(candle)
-          continue
-        }
-
-        const prev = validated[validated.length - 1]
-        const priceDiff = Math.abs(candle.close - prev.close) / prev.close
-
-        // Skip if price jumped more than 30% (likely data error)
-        if (priceDiff > 0.30) {
-          console.warn(`[ChartCanvas] Skipping candle with abnormal jump: ${prev.close} -> ${candle.close}`)
-          continue
-        }
-
-        validated.push(candle)
+    try {
+      let candleArray: any[] = []
+      let tf = state.timeframe
+
+      try {
+        // Server-side resampled columns; incremental when refreshing the same chart
+        const since = previous?.length ? previous[previous.length - 1].time : undefined
+        const response = await api.candleColumns(state.symbol, state.timeframe, CHART_CANDLES, since)
+        if (!response?.columns) throw new Error("columnar candles unavailable")
+        candleArray = candlesFromColumns(response.columns)
+      } catch (columnsErr) {
+        // Older backend: fetch M5 and resample here
+        console.warn("[ChartCanvas] Columnar candles failed, falling back to M5:", columnsErr)
+        const m5Count = getM5CandlesNeeded(state.timeframe, CHART_CANDLES)
+        const response = await api.candles(state.symbol, "M5", Math.min(m5Count, 2000))
+
+        // Handle both array and {candles:[]} response shapes
+        candleArray = Array.isArray(response)
+          ? response
+          : response?.candles ?? []
+        tf = "M5"
       }
 
-      console.log(`[ChartCanvas] Loaded ${rawCandles.length} candles, validated ${validated.length}`)
-      setM5Candles(validated)
+      const validated = normalizeCandles(candleArray)
+      const merged = previous && tf === state.timeframe ? mergeCandles(previous, validated) : validated
+
+      console.log(`[ChartCanvas] Loaded ${candleArray.length} ${tf} candles, validated ${validated.length}`)
+      loadedRef.current = tf === state.timeframe ? { key, candles: merged } : null
+      setSourceTf(tf)
+      setSourceCandles(merged)
     } catch (err: any) {
       console.error("[ChartCanvas] Failed to fetch candles:", err)
       setError(err?.message || "Failed to load chart data")
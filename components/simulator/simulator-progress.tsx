@@ -4,6 +4,7 @@ import { useEffect, useState, useCallback } from "react"
 import { CheckCircle, Loader2 } from "lucide-react"
 import { cn } from "@/lib/utils"
 import { Progress } from "@/components/ui/progress"
+import type { SimJobStatus } from "@/lib/api"
 
 interface ProgressData {
   stage: string
@@ -14,16 +15,18 @@ interface ProgressData {
 interface SimulatorProgressProps {
   isRunning: boolean
   jobId?: string | null
+  // Progress pushed by the job stream; when set, polling is skipped
+  progress?: ProgressData | null
   onComplete?: () => void
 }
 
-export function SimulatorProgress({ isRunning, jobId, onComplete }: SimulatorProgressProps) {
+export function SimulatorProgress({ isRunning, jobId, progress: pushed, onComplete }: SimulatorProgressProps) {
   const [progress, setProgress] = useState<ProgressData>({
     stage: "starting",
     percent: 0,
     message: "Эхлүүлж байна...",
   })
-  const [status, setStatus] = useState<"queued" | "running" | "completed" | "failed">("queued")
+  const [status, setStatus] = useState<SimJobStatus>("queued")
 
   // Poll for progress when jobId is provided
   const pollProgress = useCallback(async () => {
@@ -51,8 +54,18 @@ export function SimulatorProgress({ isRunning, jobId, onComplete }: SimulatorPro
           return true // Stop polling
         }
 
-        if (job.status === "failed") {
-          setProgress({ stage: "error", percent: 0, message: "Алдаа гарлаа" })
+        if (job.status === "partial") {
+          setProgress({ stage: "done", percent: 100, message: "Хэсэгчлэн дууссан" })
+          onComplete?.()
+          return true // Stop polling
+        }
+
+        if (job.status === "failed" || job.status === "cancelled") {
+          setProgress({
+            stage: "error",
+            percent: 0,
+            message: job.status === "cancelled" ? "Цуцлагдсан" : "Алдаа гарлаа",
+          })
           return true // Stop polling
         }
       }
@@ -62,6 +75,22 @@ export function SimulatorProgress({ isRunning, jobId, onComplete }: SimulatorPro
     return false // Continue polling
   }, [jobId, onComplete])
 
+  const streaming = !!pushed
+
+  // Pushed progress from the job stream
+  useEffect(() => {
+    if (!pushed) return
+    setProgress(pushed)
+    if (pushed.stage === "done") {
+      setStatus("completed")
+      onComplete?.()
+    } else if (pushed.stage === "error") {
+      setStatus("failed")
+    } else {
+      setStatus("running")
+    }
+  }, [pushed, onComplete])
+
   useEffect(() => {
     if (!isRunning) {
       setProgress({ stage: "starting", percent: 0, message: "Эхлүүлж байна..." })
@@ -95,6 +124,9 @@ export function SimulatorProgress({ isRunning, jobId, onComplete }: SimulatorPro
       return () => clearInterval(interval)
     }
 
+    // Job stream is delivering progress - no polling
+    if (streaming) return
+
     // Real progress polling with jobId
     const pollInterval = setInterval(async () => {
       const shouldStop = await pollProgress()
@@ -107,12 +139,12 @@ export function SimulatorProgress({ isRunning, jobId, onComplete }: SimulatorPro
     pollProgress()
 
     return () => clearInterval(pollInterval)
-  }, [isRunning, jobId, pollProgress])
+  }, [isRunning, jobId, pollProgress, streaming])
 
   if (!isRunning) return null
 
-  const isDone = progress.stage === "done" || status === "completed"
-  const isError = progress.stage === "error" || status === "failed"
+  const isDone = progress.stage === "done" || status === "completed" || status === "partial"
+  const isError = progress.stage === "error" || status === "failed" || status === "cancelled"
 
   return (
     <div className="space-y-4 p-4 bg-muted/50 rounded-lg">
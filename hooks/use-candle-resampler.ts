@@ -1,5 +1,5 @@
 import { useMemo } from "react"
-import type { Candle } from "@/lib/types"
+import type { Candle, CandleColumns } from "@/lib/types"
 
 /**
  * Timeframe configurations
@@ -149,3 +149,35 @@ export function getM5CandlesNeeded(
   const barsPerCandle = targetMinutes / 5
   return Math.ceil(candleCount * barsPerCandle)
 }
+
+/**
+ * Convert a columnar candle response (format=columns) to Candle objects.
+ * The backend already resampled to the requested timeframe.
+ */
+export function candlesFromColumns(columns: CandleColumns): Candle[] {
+  const { time, open, high, low, close, volume } = columns
+  const candles: Candle[] = new Array(time.length)
+  for (let i = 0; i < time.length; i++) {
+    candles[i] = {
+      time: time[i],
+      open: open[i],
+      high: high[i],
+      low: low[i],
+      close: close[i],
+      volume: volume[i] || 0,
+    }
+  }
+  return candles
+}
+
+/**
+ * Merge an incremental (since=) fetch into existing candles.
+ * Bars at or after the first update replace the old ones (the last bar may still be forming).
+ */
+export function mergeCandles(existing: Candle[], update: Candle[]): Candle[] {
+  if (update.length === 0) return existing
+  const from = update[0].time
+  let keep = existing.length
+  while (keep > 0 && existing[keep - 1].time >= from) keep--
+  return existing.slice(0, keep).concat(update)
+}
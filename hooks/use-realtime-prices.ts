@@ -12,6 +12,8 @@ interface PriceData {
 interface PricesResponse {
   ok: boolean
   timestamp?: number
+  /** Stream messages: snapshot replaces, delta carries changed symbols only */
+  type?: "snapshot" | "delta"
   prices: Record<string, PriceData>
 }
 
@@ -20,10 +22,14 @@ interface UseRealtimePricesOptions {
   enabled?: boolean
   /** Fallback polling interval in ms if SSE fails (default: 2000) */
   fallbackInterval?: number
+  /** Only stream these symbols (default: all) */
+  symbols?: string[]
 }
 
 export function useRealtimePrices(options: UseRealtimePricesOptions = {}) {
-  const { enabled = true, fallbackInterval = 2000 } = options
+  const { enabled = true, fallbackInterval = 2000, symbols } = options
+  // Stable key so a new array with the same symbols doesn't reconnect
+  const symbolsKey = symbols?.length ? [...symbols].map((s) => s.toUpperCase()).sort().join(",") : ""
 
   const [prices, setPrices] = useState<Record<string, PriceData>>({})
   const [lastUpdate, setLastUpdate] = useState<number>(0)
@@ -58,7 +64,10 @@ export function useRealtimePrices(options: UseRealtimePricesOptions = {}) {
     }
 
     try {
-      const eventSource = new EventSource("/api/proxy/prices-stream")
+      const url = symbolsKey
+        ? `/api/proxy/prices-stream?symbols=${encodeURIComponent(symbolsKey)}`
+        : "/api/proxy/prices-stream"
+      const eventSource = new EventSource(url)
       eventSourceRef.current = eventSource
 
       eventSource.onopen = () => {
@@ -78,7 +87,11 @@ export function useRealtimePrices(options: UseRealtimePricesOptions = {}) {
         try {
           const data: PricesResponse = JSON.parse(event.data)
           if (data.ok && data.prices) {
-            setPrices(data.prices)
+            if (data.type === "delta") {
+              setPrices((prev) => ({ ...prev, ...data.prices }))
+            } else {
+              setPrices(data.prices)
+            }
             setLastUpdate(Date.now())
           }
         } catch (err) {
@@ -109,7 +122,7 @@ export function useRealtimePrices(options: UseRealtimePricesOptions = {}) {
       fetchPrices()
       fallbackIntervalRef.current = setInterval(fetchPrices, fallbackInterval)
     }
-  }, [fetchPrices, fallbackInterval])
+  }, [fetchPrices, fallbackInterval, symbolsKey])
 
   // Cleanup function
   const cleanup = useCallback(() => {
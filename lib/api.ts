@@ -8,6 +8,7 @@
  */
 
 import { normalizeLocalApiPath } from "./urls"
+import type { CandleColumnsResponse } from "./types"
 
 export interface ApiError {
   message: string
@@ -48,6 +49,25 @@ function sanitizeSimulatorV2Response(res: any) {
   return res
 }
 
+// Runner job states; "partial" = some symbols failed, result holds the others
+export type SimJobStatus = "queued" | "running" | "completed" | "partial" | "failed" | "cancelled"
+
+// Partial job result with its per-symbol errors folded into error.message
+export function partialSimResult(result: any) {
+  const errors = Object.entries(result?.errors || {}).map(([symbol, err]) => `${symbol}: ${normalizeNotice(err)}`)
+  const base = typeof result?.error === "string" ? result.error : result?.error?.message || "Some symbols failed"
+  return sanitizeSimulatorV2Response({
+    ...result,
+    ok: false,
+    partial: true,
+    error: {
+      code: "PARTIAL",
+      message: errors.length ? `${base} (${errors.join("; ")})` : base,
+      details: result?.errors,
+    },
+  })
+}
+
 function normalizeSignalArray(input: any[]): any[] {
   if (!Array.isArray(input)) return []
   return input
@@ -363,6 +383,8 @@ export const api = {
       method: "POST",
       body: JSON.stringify(payload),
     }),
+  backfillStatus: () => apiFetch<any>("/api/proxy/admin/backfill/status"),
+  cancelBackfill: () => apiFetch<any>("/api/proxy/admin/backfill/cancel", { method: "POST" }),
 
   // Signal detail
   signalDetail: (id: string) => apiFetch<any>(`/api/proxy/signals/${id}`),
@@ -389,6 +411,13 @@ export const api = {
   candles: (symbol: string, tf: string = "M5", limit: number = 200) =>
     apiFetch<any>(`/api/proxy/markets/${encodeURIComponent(symbol)}/candles?tf=${tf}&limit=${limit}`),
 
+  // Columnar candles resampled server-side; since= returns bars with time >= since
+  candleColumns: (symbol: string, tf: string = "M5", limit: number = 200, since?: number) =>
+    apiFetch<CandleColumnsResponse>(
+      `/api/proxy/markets/${encodeURIComponent(symbol)}/candles?tf=${tf}&limit=${limit}&format=columns` +
+        (since !== undefined ? `&since=${since}` : ""),
+    ),
+
   // Detectors list - use local /api/detectors endpoint (source of truth with Cyrillic labels)
   detectors: () => apiFetch<{
     ok: boolean
@@ -496,6 +525,45 @@ export const api = {
       apiFetch<any>(`/api/proxy/strategy-tester/runs/${runId}`, {
         method: "DELETE",
       }),
+
+    // Parameter sweep: top_k configs are stored as regular runs
+    sweep: (params: {
+      symbol: string
+      space: {
+        entry_tf?: string[]
+        detectors?: string[][] | { pool: string[]; required?: string[]; min_size?: number; max_size?: number }
+        min_rr?: number[]
+        min_score?: number[]
+      }
+      mode?: "grid" | "random"
+      samples?: number
+      seed?: number
+      objective?: "total_r" | "win_rate" | "profit_factor" | "expectancy"
+      top_k?: number
+      min_trades?: number
+      start_date?: string
+      end_date?: string
+      spread_pips?: number
+      slippage_pips?: number
+      commission_per_trade?: number
+      initial_capital?: number
+      risk_per_trade_pct?: number
+      intrabar_policy?: "sl_first" | "tp_first"
+      max_bars_in_trade?: number
+      async?: boolean
+    }) =>
+      apiFetch<any>("/api/proxy/strategy-tester/sweep", {
+        method: "POST",
+        body: JSON.stringify(params),
+      }),
+
+    getSweep: (sweepId: string) =>
+      apiFetch<any>(`/api/proxy/strategy-tester/sweeps/${sweepId}`),
+
+    cancelSweep: (sweepId: string) =>
+      apiFetch<any>(`/api/proxy/strategy-tester/sweeps/${sweepId}/cancel`, {
+        method: "POST",
+      }),
   },
 
   // Strategy Simulator API (supports both single-TF and multi-TF modes)
@@ -550,7 +618,8 @@ export const api = {
         ok: boolean
         // Async job response (when async=true)
         jobId?: string
-        status?: "queued" | "running" | "completed" | "failed"
+        status?: SimJobStatus
+        partial?: boolean
         summary?: {
           entries: number
           tp: number
@@ -731,7 +800,7 @@ export const api = {
         ok: boolean
         job?: {
           id: string
-          status: "queued" | "running" | "completed" | "failed"
+          status: SimJobStatus
           progress?: {
             stage: string
             percent: number
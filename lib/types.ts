@@ -290,3 +290,24 @@ export interface CandlesResponse {
   candles: Candle[]
   count: number
 }
+
+/** format=columns: one array per field, oldest bar first */
+export interface CandleColumns {
+  time: number[]
+  open: number[]
+  high: number[]
+  low: number[]
+  close: number[]
+  volume: number[]
+}
+
+export interface CandleColumnsResponse {
+  ok: boolean
+  symbol: string
+  tf: string
+  format: "columns"
+  columns: CandleColumns
+  count: number
+  last_ts: number | null
+  since?: number
+}
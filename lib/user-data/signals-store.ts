@@ -21,9 +21,111 @@ export type StoredSignal = {
   // Entry tracking
   entry_taken?: boolean | null
   outcome?: "win" | "loss" | "pending" | null
+  resolved_at?: string
+  resolved_price?: number
 }
 
 const USERS_COLLECTION = "users"
+const BATCH_WRITE_SIZE = 400
+
+/**
+ * Map an incoming backend signal object onto a StoredSignal payload.
+ * Only fields with actual values are included to avoid overwriting existing data.
+ */
+export function buildSignalPayload(userId: string, signalKey: string, signal: Record<string, any>): StoredSignal {
+  const payload: Record<string, unknown> = {
+    signal_key: signalKey,
+    user_id: userId,
+  }
+
+  if (signal.symbol || signal.pair) {
+    payload.symbol = String(signal.symbol || signal.pair)
+  }
+  if (signal.direction) {
+    payload.direction = String(signal.direction)
+  }
+  if (signal.timeframe) {
+    payload.timeframe = String(signal.timeframe)
+  }
+  if (signal.entry) {
+    payload.entry = Number(signal.entry)
+  }
+  if (signal.sl) {
+    payload.sl = Number(signal.sl)
+  }
+  if (signal.tp) {
+    payload.tp = Number(signal.tp)
+  }
+  if (signal.rr) {
+    payload.rr = Number(signal.rr)
+  }
+  if (signal.strategy_name) {
+    payload.strategy_name = String(signal.strategy_name)
+  }
+  if (signal.generated_at) {
+    payload.generated_at = String(signal.generated_at)
+  }
+  if (signal.status) {
+    const status = String(signal.status)
+    payload.status = status
+
+    // Map status to outcome for History page compatibility
+    // VPS sends status (hit_tp/hit_sl/expired), History reads outcome (win/loss/pending)
+    if (status === "hit_tp") {
+      payload.outcome = "win"
+    } else if (status === "hit_sl") {
+      payload.outcome = "loss"
+    } else if (status === "expired") {
+      payload.outcome = "expired"
+    }
+  }
+  if (signal.outcome) {
+    payload.outcome = String(signal.outcome)
+  }
+  if (signal.resolved_at) {
+    payload.resolved_at = String(signal.resolved_at)
+  }
+  if (signal.resolved_price !== undefined && signal.resolved_price !== null) {
+    payload.resolved_price = Number(signal.resolved_price)
+  }
+  if (signal.entry_taken !== undefined) {
+    payload.entry_taken = Boolean(signal.entry_taken)
+  }
+  if (signal.evidence) {
+    payload.evidence = signal.evidence
+  }
+  if (signal.meta) {
+    payload.meta = signal.meta
+  }
+
+  return payload as StoredSignal
+}
+
+/**
+ * Document fields written for users/{userId}/signals/{signalKey}.
+ * Adds both ISO and epoch timestamps for query compatibility.
+ */
+function toSignalDoc(userId: string, signalKey: string, payload: StoredSignal): Record<string, unknown> {
+  const createdAtISO = payload.generated_at || new Date().toISOString()
+  let createdAtEpoch: number
+  try {
+    createdAtEpoch = Math.floor(new Date(createdAtISO).getTime() / 1000)
+  } catch {
+    createdAtEpoch = Math.floor(Date.now() / 1000)
+  }
+
+  return {
+    ...payload,
+    user_id: userId,
+    signal_key: signalKey,
+    signal_id: signalKey, // Alias for signals-firestore-store compatibility
+    generated_at: createdAtISO, // Ensure generated_at is always saved
+    updatedAt: new Date().toISOString(),
+    updated_at: Math.floor(Date.now() / 1000), // Epoch for query compatibility
+    createdAt: createdAtISO,
+    created_at: createdAtEpoch, // Epoch for query compatibility
+  }
+}
 
 /**
  * Upsert a signal for a user in Firestore.
@@ -38,29 +140,40 @@ export async function upsertUserSignal(userId: string, signalKey: string, payloa
     .collection("signals")
     .doc(signalKey)
 
-  // Parse createdAt for both ISO and epoch formats (for query compatibility)
-  const createdAtISO = payload.generated_at || new Date().toISOString()
-  let createdAtEpoch: number
-  try {
-    createdAtEpoch = Math.floor(new Date(createdAtISO).getTime() / 1000)
-  } catch {
-    createdAtEpoch = Math.floor(Date.now() / 1000)
+  await ref.set(toSignalDoc(userId, signalKey, payload), { merge: true })
+}
+
+/**
+ * Upsert many signals (any mix of users) with Firestore batched writes.
+ * Same document shape as upsertUserSignal; one commit per BATCH_WRITE_SIZE docs.
+ *
+ * @returns Number of documents written
+ */
+export async function batchUpsertUserSignals(
+  items: { userId: string; signalKey: string; payload: StoredSignal }[]
+): Promise<number> {
+  const db = getFirebaseAdminDb()
+  let written = 0
+
+  // Firestore batch limit is 500
+  for (let i = 0; i < items.length; i += BATCH_WRITE_SIZE) {
+    const batch = db.batch()
+    const chunk = items.slice(i, i + BATCH_WRITE_SIZE)
+
+    for (const { userId, signalKey, payload } of chunk) {
+      const ref = db
+        .collection(USERS_COLLECTION)
+        .doc(userId)
+        .collection("signals")
+        .doc(signalKey)
+      batch.set(ref, toSignalDoc(userId, signalKey, payload), { merge: true })
+    }
+
+    await batch.commit()
+    written += chunk.length
   }
 
-  await ref.set(
-    {
-      ...payload,
-      user_id: userId,
-      signal_key: signalKey,
-      signal_id: signalKey, // Alias for signals-firestore-store compatibility
-      generated_at: createdAtISO, // Ensure generated_at is always saved
-      updatedAt: new Date().toISOString(),
-      updated_at: Math.floor(Date.now() / 1000), // Epoch for query compatibility
-      createdAt: createdAtISO,
-      created_at: createdAtEpoch, // Epoch for query compatibility
-    },
-    { merge: true },
-  )
+  return written
 }
 
 /**
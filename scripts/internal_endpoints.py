@@ -50,6 +50,15 @@ def require_internal_key(
 
 # ======== INTERNAL USER-DATA ENDPOINTS ========
 
+def _invalidate_strategy_snapshot(uid: str) -> None:
+    """Scanner resolves strategies from a cached snapshot; drop it after a change."""
+    try:
+        from core.strategy_snapshot import invalidate_strategy_snapshot  # type: ignore
+        invalidate_strategy_snapshot(uid)
+    except Exception:
+        pass
+
+
 @app.get("/api/internal/user-data/strategies/{uid}", dependencies=[Depends(require_internal_key)])
 async def get_user_data_strategies(uid: str):
     from core.user_strategies_store import ensure_starter_strategies, load_active_strategy_map  # type: ignore
@@ -69,6 +78,7 @@ async def set_active_strategy(uid: str, payload: dict = Body(...)):
     if strategy_id not in valid_ids:
         raise HTTPException(status_code=404, detail="Strategy not found")
     save_active_strategy_id(uid, strategy_id)
+    _invalidate_strategy_snapshot(uid)
     return {"ok": True, "uid": uid, "activeStrategyId": strategy_id}
 
 
@@ -89,25 +99,40 @@ async def set_active_strategy_map(uid: str, payload: dict = Body(...)):
         if strat_id and strat_id not in valid_ids:
             raise HTTPException(status_code=400, detail=f"Strategy {strat_id} not found")
     save_active_strategy_map(uid, strategy_map)
+    _invalidate_strategy_snapshot(uid)
     return {"ok": True, "uid": uid, "activeStrategyMap": strategy_map}
 
 
 @app.get("/api/internal/engine/strategy-map-status/{uid}", dependencies=[Depends(require_internal_key)])
 async def get_engine_strategy_map_status(uid: str):
-    from core.user_strategies_store import ensure_starter_strategies, load_active_strategy_id, load_active_strategy_map, get_strategy_id_for_symbol, get_strategy_by_id  # type: ignore
+    from core.user_strategies_store import load_active_strategy_id, load_active_strategy_map  # type: ignore
+    from core.strategy_snapshot import get_strategy_snapshot  # type: ignore
     from core.scan_engine_v2 import DEFAULT_15_SYMBOLS, load_status  # type: ignore
     scanner_status = load_status().dict()
-    strategies, _ = ensure_starter_strategies(uid)
+    snapshot = get_strategy_snapshot(uid, DEFAULT_15_SYMBOLS)
     active_id = load_active_strategy_id(uid)
     strategy_map = load_active_strategy_map(uid)
+    try:
+        from core.symbol_head_index import get_symbol_head_index  # type: ignore
+        head_index = get_symbol_head_index()
+    except Exception:
+        head_index = None
     effective_symbols = []
     for symbol in DEFAULT_15_SYMBOLS:
-        strat_id = get_strategy_id_for_symbol(uid, symbol)
-        strat = get_strategy_by_id(uid, strat_id) if strat_id else {}
+        strat_id = snapshot.strategy_id_for(symbol)
+        strat = snapshot.strategy_for(symbol) or {}
         strat_name = strat.get("name", "Unknown")
+        bar_count = None
+        last_close = None
         try:
-            from core.marketdata_store import get_last_candle_ts_from_file  # type: ignore
-            last_candle_ts = get_last_candle_ts_from_file(symbol, "m5")
+            if head_index is not None:
+                head = head_index.get(symbol, "m5")
+                last_candle_ts = head.last_dt
+                bar_count = head.bar_count
+                last_close = head.last_close
+            else:
+                from core.marketdata_store import get_last_candle_ts_from_file  # type: ignore
+                last_candle_ts = get_last_candle_ts_from_file(symbol, "m5")
             if last_candle_ts:
                 from datetime import datetime, timezone
                 now = datetime.now(timezone.utc)
@@ -137,6 +162,8 @@ async def get_engine_strategy_map_status(uid: str):
             "strategyIdUsed": strat_id,
             "strategyNameUsed": strat_name,
             "lastCandleTs": last_candle_ts.isoformat() if last_candle_ts else None,
+            "barCount": bar_count,
+            "lastClose": last_close,
             "lagSec": round(lag_sec, 1),
             "delayReason": delay_reason,
             "lastScanTs": per_sym.get("lastScanTs"),
@@ -151,4 +178,22 @@ async def get_engine_strategy_map_status(uid: str):
         "lastCycleTs": scanner_status.get("lastCycleAt"),
         "lastOutcome": scanner_status.get("lastOutcome", {}),
         "effectiveSymbols": effective_symbols,
+        "strategyVersion": snapshot.version,
     }
+
+
+@app.get("/api/internal/marketdata/coverage/{symbol}", dependencies=[Depends(require_internal_key)])
+async def get_marketdata_coverage(symbol: str, days: int = 30, maxGaps: int = 50):
+    import time
+    from core.coverage_bitmap import get_coverage_index  # type: ignore
+    to_ts = int(time.time())
+    report = get_coverage_index().report(symbol, to_ts - days * 86400, to_ts, max_gaps=maxGaps)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No M5 data for {symbol}")
+    return {"ok": True, **report}
+
+
+@app.get("/api/internal/signal-sync/stats", dependencies=[Depends(require_internal_key)])
+async def get_signal_sync_stats():
+    from core.signal_sync import get_signal_sync  # type: ignore
+    return {"ok": True, **get_signal_sync().stats()}
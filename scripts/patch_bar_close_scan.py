@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Bar-close driven scanning
+
+1. Create core/bar_close_trigger.py: tracks the last closed bucket per
+   symbol/TF (from M5 append events, else the symbol head index) and which
+   bucket each pair was last scanned at
+2. ScanConfig.triggerMode = "interval" (default) | "bar_close"
+   (SCAN_TRIGGER_MODE env). In bar_close mode:
+   - _scan_symbol_tf skips pairs with no newly closed bar (unchanged) or
+     no recent data (stale); skipped pairs are not prefetched either, and
+     the cycle loop does not count them as scanned
+   - an in-process append that closes a bucket starts a cycle right away
+     (debounced); the intervalSec job keeps running as a safety net
+3. /scan/status reports triggerMode and barCloseSkips
+
+Requires patch_m5_binary_store.py, patch_symbol_head_index.py,
+patch_parallel_scan.py and patch_cycle_candles.py.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+TRIGGER = ROOT / "core" / "bar_close_trigger.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "marketdata_events.py").exists():
+    die("Missing core/marketdata_events.py - run patch_m5_binary_store.py first")
+if not SCAN.exists():
+    die(f"Missing {SCAN}")
+
+# ============================================================
+# 1. Create bar_close_trigger.py
+# ============================================================
+
+trigger_code = '''"""
+bar_close_trigger.py
+--------------------
+Bar-close gating and triggering for the scanner.
+
+A (symbol, tf) pair only needs a rescan once a new TF bucket has closed.
+Re-sent or corrected bars (the ingestor's overlapping fetch window) do not
+make a pair due on their own. The last M5 bar per symbol
+comes from M5 append events when the ingestor runs in this process, and
+from the symbol head index otherwise, so gating also works when the
+ingestor appends from another process.
+
+A bucket [B, B + tf) is closed once the M5 bar starting at B + tf - 300
+is stored.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+M5_SEC = 300
+DEBOUNCE_SEC = float(os.getenv("SCAN_BAR_CLOSE_DEBOUNCE_SEC", "5"))
+# No new M5 bar for this long (or 2 TF periods, whichever is longer): pair is "stale"
+STALE_MIN_SEC = int(os.getenv("SCAN_BAR_CLOSE_STALE_SEC", "3600"))
+
+
+def _tf_sec(tf: str) -> int:
+    from core.market_data_bridge import tf_to_seconds, _normalize_timeframe
+    return tf_to_seconds(_normalize_timeframe(tf))
+
+
+def closed_bucket(last_m5_ts: Optional[int], tf_sec: int) -> Optional[int]:
+    """Start of the latest closed TF bucket given the last stored M5 bar."""
+    if last_m5_ts is None:
+        return None
+    if tf_sec <= M5_SEC:
+        return last_m5_ts
+    return ((last_m5_ts + M5_SEC) // tf_sec) * tf_sec - tf_sec
+
+
+class SkippedPair:
+    """
+    _scan_symbol_tf result for a pair the gate skipped. Falsy like "no setup",
+    so callers that only test the result still work; the cycle loop checks
+    bar_close_skip and moves on without counting the pair as scanned.
+    """
+
+    bar_close_skip = True
+    __slots__ = ("symbol", "tf", "reason")
+
+    def __init__(self, symbol: str, tf: str, reason: str):
+        self.symbol, self.tf, self.reason = symbol, tf, reason
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return f"SkippedPair({self.symbol}/{self.tf}: {self.reason})"
+
+
+class BarCloseTracker:
+    def __init__(self):
+        self._last_m5: Dict[str, int] = {}
+        self._scanned: Dict[Tuple[str, str], int] = {}
+        self._tfs: Set[str] = set()
+        self._lock = threading.Lock()
+        self._callback: Optional[Callable[[], Any]] = None
+        self._timer: Optional[threading.Timer] = None
+        self._listening = False
+        self._stats = {"appends": 0, "bucketCloses": 0, "triggers": 0}
+
+    # --------------------------------------------------------
+    # Event path
+    # --------------------------------------------------------
+    def listen(self, timeframes, callback: Optional[Callable[[], Any]] = None) -> None:
+        """Track timeframes and (once) subscribe to M5 appends; callback starts a cycle."""
+        with self._lock:
+            self._tfs = {tf for tf in timeframes}
+            if callback is not None:
+                self._callback = callback
+        if not self._listening:
+            from core.marketdata_events import subscribe_m5_append
+            subscribe_m5_append("bar_close_trigger", self.on_append)
+            self._listening = True
+
+    def on_append(self, symbol: str, tf: str, frame) -> None:
+        if tf.lower() not in ("m5", "5m") or frame is None or not len(frame):
+            return
+        symbol = symbol.upper()
+        self._stats["appends"] += 1
+        last = int(frame.ts[-1])
+        closed_any = False
+        with self._lock:
+            prev = self._last_m5.get(symbol)
+            new_last = max(prev or last, last)
+            self._last_m5[symbol] = new_last
+            for t in self._tfs:
+                sec = _tf_sec(t)
+                if prev is None or closed_bucket(new_last, sec) != closed_bucket(prev, sec):
+                    closed_any = True
+        if closed_any:
+            self._stats["bucketCloses"] += 1
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """Debounce: the ingestor appends symbols one by one; scan once after the burst."""
+        if self._callback is None:
+            return
+        with self._lock:
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._timer = threading.Timer(DEBOUNCE_SEC, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self) -> None:
+        self._stats["triggers"] += 1
+        try:
+            out = self._callback()
+            if asyncio.iscoroutine(out):
+                asyncio.run(out)
+        except Exception as e:
+            logger.warning(f"bar_close_trigger: triggered cycle failed: {e}")
+
+    # --------------------------------------------------------
+    # Gate
+    # --------------------------------------------------------
+    def _last_ts(self, symbol: str) -> Optional[int]:
+        last = self._last_m5.get(symbol)
+        try:
+            from core.symbol_head_index import get_symbol_head_index
+            head_ts = get_symbol_head_index().get(symbol, "m5").last_ts
+            if head_ts is not None and (last is None or head_ts > last):
+                last = head_ts
+        except Exception:
+            pass
+        return last
+
+    def due(self, symbol: str, tf: str) -> Tuple[bool, str, Optional[int]]:
+        """
+        (due, reason, mark). reason: "first" | "closed" | "unchanged" | "stale".
+        Pass mark to mark_scanned() once the scan succeeded.
+        """
+        symbol = symbol.upper()
+        tf_sec = _tf_sec(tf)
+        last = self._last_ts(symbol)
+        mark = closed_bucket(last, tf_sec) if last is not None else -1
+        prev = self._scanned.get((symbol, tf))
+        if prev is None:
+            return True, "first", mark
+        if mark > prev:
+            return True, "closed", mark
+        stale_after = max(2 * tf_sec, STALE_MIN_SEC)
+        if last is None or time.time() - (last + M5_SEC) > stale_after:
+            return False, "stale", mark
+        return False, "unchanged", mark
+
+    def mark_scanned(self, symbol: str, tf: str, mark: Optional[int]) -> None:
+        if mark is not None:
+            self._scanned[(symbol.upper(), tf)] = mark
+
+    def reset(self) -> None:
+        """Forget scan marks (config change, restart): every pair is due once."""
+        self._scanned.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "listening": self._listening, "trackedPairs": len(self._scanned)}
+
+
+_tracker: Optional[BarCloseTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_bar_close_tracker() -> BarCloseTracker:
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = BarCloseTracker()
+    return _tracker
+'''
+
+TRIGGER.write_text(trigger_code, encoding="utf-8")
+print(f"Created: {TRIGGER}")
+
+# ============================================================
+# 2. scan_engine_v2.py
+# ============================================================
+
+scan_txt = SCAN.read_text(encoding="utf-8")
+
+if "get_bar_close_tracker" in scan_txt:
+    print("SKIP: bar-close scanning already installed")
+else:
+    # Config fields (ScanConfig + StartScanRequest)
+    anchor = '    maxWorkers: int = int(os.getenv("SCAN_MAX_WORKERS", "4"))\n'
+    if anchor not in scan_txt:
+        die("ScanConfig.maxWorkers not found - run patch_parallel_scan.py first")
+    scan_txt = scan_txt.replace(
+        anchor,
+        anchor + '    triggerMode: str = os.getenv("SCAN_TRIGGER_MODE", "interval")  # interval | bar_close\n',
+    )
+
+    # Status fields
+    anchor = "    candleIO: Dict[str, Any] = {}  # last cycle: M5 loads, bars read/saved\n"
+    if anchor not in scan_txt:
+        die("ScanStatus.candleIO not found - run patch_cycle_candles.py first")
+    scan_txt = scan_txt.replace(
+        anchor,
+        anchor
+        + '    triggerMode: str = "interval"\n'
+        + "    barCloseSkips: Dict[str, Any] = {}  # {scanned, unchanged, stale, byTf, lastCycle}\n",
+        1,
+    )
+
+    # _run_cycle: overlap guard + gate setup
+    old = '''        t0 = time.perf_counter()
+        self._prefetched = {}
+        candle_ctx = None
+'''
+    new = '''        guard = self.__dict__.setdefault("_cycle_guard", threading.Lock())
+        if not guard.acquire(blocking=False):
+            logger.info("Scan cycle already running - skipped")
+            return
+        try:
+            self._gate = self._bar_close_gate()
+            self._cycle_skips = {"scanned": 0, "unchanged": 0, "stale": 0}
+            self._run_cycle_guarded(mode)
+        finally:
+            self._gate = None
+            guard.release()
+
+    def _run_cycle_guarded(self, mode: str) -> None:
+        t0 = time.perf_counter()
+        self._prefetched = {}
+        candle_ctx = None
+'''
+    if old not in scan_txt:
+        die("_run_cycle wrapper not found - run patch_parallel_scan.py and patch_cycle_candles.py first")
+    if "async def _run_cycle(self)" in scan_txt:
+        die("async _run_cycle is not supported by this patch")
+    scan_txt = scan_txt.replace(old, new, 1)
+
+    old = '''            self._record_cycle_wall_time(mode, (time.perf_counter() - t0) * 1000)
+'''
+    new = '''            self._record_cycle_wall_time(mode, (time.perf_counter() - t0) * 1000)
+            if self._gate is not None:
+                self._record_bar_close_skips()
+
+    def _bar_close_gate(self):
+        """BarCloseTracker when triggerMode == "bar_close", else None."""
+        self._status.triggerMode = (getattr(self._config, "triggerMode", "interval") or "interval").lower()
+        if self._status.triggerMode != "bar_close":
+            return None
+        try:
+            from core.bar_close_trigger import get_bar_close_tracker
+            tracker = get_bar_close_tracker()
+            tracker.listen(self._config.timeframes, callback=self._on_bar_close)
+            return tracker
+        except Exception as e:
+            logger.warning(f"bar_close trigger unavailable, scanning every pair: {e}")
+            return None
+
+    def _on_bar_close(self) -> None:
+        if self._status.running and self._config is not None:
+            logger.info("Bar close: starting scan cycle")
+            self._run_cycle()
+
+    def _record_bar_close_skips(self) -> None:
+        skips = self._status.barCloseSkips or {"scanned": 0, "unchanged": 0, "stale": 0, "byTf": {}}
+        for k, v in self._cycle_skips.items():
+            if k in ("scanned", "unchanged", "stale"):
+                skips[k] = skips.get(k, 0) + v
+        by_tf = skips.setdefault("byTf", {})
+        for k, v in self._cycle_skips.items():
+            if "/" in k:
+                tf, reason = k.split("/", 1)
+                by_tf.setdefault(tf, {"unchanged": 0, "stale": 0})[reason] += v
+        skips["lastCycle"] = {k: v for k, v in self._cycle_skips.items() if "/" not in k}
+        self._status.barCloseSkips = skips
+'''
+    if old not in scan_txt:
+        die("_record_cycle_wall_time call not found")
+    scan_txt = scan_txt.replace(old, new, 1)
+
+    # Prefetch only due pairs
+    old = '''        tasks = [(s, tf) for s in symbols for tf in self._config.timeframes]
+'''
+    new = '''        tasks = [(s, tf) for s in symbols for tf in self._config.timeframes]
+        gate = getattr(self, "_gate", None)
+        if gate is not None:
+            tasks = [(s, tf) for s, tf in tasks if gate.due(s, tf)[0]]
+'''
+    if old in scan_txt:
+        scan_txt = scan_txt.replace(old, new, 1)
+    else:
+        die("_prefetch_cycle task list not found")
+
+    # _scan_symbol_tf: gate + mark
+    old = '''    def _scan_symbol_tf(self, symbol: str, tf: str):
+        """Serial: scan now. Parallel modes: merge the prefetched task's counters and return its result."""
+        entry = getattr(self, "_prefetched", {}).pop((symbol, tf), None)
+        if entry is None:
+            return self._scan_symbol_tf_impl(symbol, tf)
+        result, error, base, task_status = entry
+        _merge_status_delta(self._status, base, task_status)
+        if error is not None:
+            raise error
+        return result
+'''
+    new = '''    def _scan_symbol_tf(self, symbol: str, tf: str):
+        """
+        Serial: scan now. Parallel modes: merge the prefetched task's counters and return its result.
+        In bar_close mode pairs without a newly closed bar are skipped (SkippedPair, no counters touched).
+        """
+        gate = getattr(self, "_gate", None)
+        mark = None
+        if gate is not None:
+            due, reason, mark = gate.due(symbol, tf)
+            if not due:
+                self._cycle_skips[reason] += 1
+                self._cycle_skips[f"{tf}/{reason}"] = self._cycle_skips.get(f"{tf}/{reason}", 0) + 1
+                from core.bar_close_trigger import SkippedPair
+                return SkippedPair(symbol, tf, reason)
+            self._cycle_skips["scanned"] += 1
+
+        entry = getattr(self, "_prefetched", {}).pop((symbol, tf), None)
+        if entry is None:
+            result = self._scan_symbol_tf_impl(symbol, tf)
+        else:
+            result, error, base, task_status = entry
+            _merge_status_delta(self._status, base, task_status)
+            if error is not None:
+                raise error
+        if gate is not None:
+            gate.mark_scanned(symbol, tf, mark)
+        return result
+'''
+    if old in scan_txt:
+        scan_txt = scan_txt.replace(old, new, 1)
+    else:
+        die("_scan_symbol_tf wrapper not found - run patch_parallel_scan.py first")
+
+    # Cycle loop: a skipped pair is neither scanned nor a "no setup"
+    loop = re.search(r"\n(\s+)result = self\._scan_symbol_tf\(symbol, tf\)\n", scan_txt)
+    if loop is not None:
+        ind = loop.group(1)
+        scan_txt = (scan_txt[:loop.end()] + f'{ind}if getattr(result, "bar_close_skip", False):\n{ind}    continue\n'
+                    + scan_txt[loop.end():])
+    else:
+        print("WARNING: cycle loop call of _scan_symbol_tf not found - skipped pairs count as scanned")
+
+    # Shadow copies / process workers must not gate again: both _task_state
+    # and _picklable_state skip the gate
+    skip = '''            if k in ("_status", "_prefetched"):'''
+    if scan_txt.count(skip) != 2:
+        die("_task_state/_picklable_state attribute filter not found - run patch_parallel_scan.py first")
+    scan_txt = scan_txt.replace(skip, '''            if k in ("_status", "_prefetched", "_gate", "_cycle_skips"):''')
+    scan_txt = scan_txt.replace(
+        '''        shadow._prefetched = {}
+''',
+        '''        shadow._prefetched = {}
+        shadow._gate = None
+''',
+        1,
+    )
+
+    # /scan/status
+    old_resp = '''        "candleIO": status.candleIO,
+'''
+    if old_resp in scan_txt:
+        scan_txt = scan_txt.replace(old_resp, old_resp + '''        "triggerMode": status.triggerMode,
+        "barCloseSkips": status.barCloseSkips,
+''', 1)
+        print("/scan/status: added triggerMode, barCloseSkips")
+    else:
+        print("WARNING: /scan/status candleIO anchor not found")
+
+    scan_txt = scan_txt.rstrip("\n") + '''
+
+
+# Bar-close gating: every scan task sees the one cycle guard (patch_bar_close_scan.py)
+register_scan_task_shared("_cycle_guard")
+'''
+
+    SCAN.write_text(scan_txt, encoding="utf-8")
+    print("Installed bar-close gating in ScanEngine")
+
+print()
+print("=" * 60)
+print("BAR CLOSE SCAN PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {TRIGGER} (new)")
+print(f"  - {SCAN}")
+print()
+print("Next: Set SCAN_TRIGGER_MODE=bar_close (or triggerMode in /scan/start), rebuild container,")
+print("      check barCloseSkips in GET /scan/status")
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Columnar candle responses for /api/markets/{symbol}/candles
+
+1. Create core/candle_columns.py: candles straight from get_candle_frame()
+   (M5 binary store / HTF bar cache) as columns instead of per-bar objects:
+   - format=columns: JSON {columns: {time: [...], open: [...], ...}}
+   - format=f64: packed little-endian float64 columns (application/octet-stream)
+   - tf=H1/H4/D1 resampled server-side; strict=1 drops incomplete history buckets
+   - since=<epoch s>: only bars with time >= since (the last bar may have changed)
+   - ETag from the stored M5 file signature, checked before loading -> 304
+2. Wrap GET /api/markets/{symbol}/candles: format/since requests go to the
+   columnar path, plain requests keep the legacy handler.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+COLUMNS = ROOT / "core" / "candle_columns.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "candle_frame.py").exists():
+    die("core/candle_frame.py missing - run patch_candle_frame.py first")
+
+# ============================================================
+# 1. Create candle_columns.py
+# ============================================================
+
+columns_code = '''"""
+candle_columns.py
+-----------------
+Columnar candle payloads for the chart.
+
+/api/markets/{symbol}/candles used to return one JSON object per bar, and the
+dashboard fetched M5 and resampled every higher TF in the browser. Here the
+CandleFrame from get_candle_frame() is serialized column by column:
+
+- "columns": JSON arrays per column (time, open, high, low, close, volume)
+- "f64":     the same columns packed as little-endian float64, column-major
+             (count and column order in X-Candle-Count / X-Candle-Columns)
+- "rows":    the legacy per-bar objects
+
+Higher TFs are resampled on the server with the vectorized resample_frame();
+strict=True is served from the HTF bar cache and drops incomplete historical
+buckets (the live bucket is kept), strict=False keeps every bucket like the
+old client-side resampler did.
+
+since= returns bars with time >= since only, so a chart can refresh its last
+(still forming) bar plus whatever closed after it.
+
+The ETag is derived from the request shape, the current TF bucket and the
+signature (mtime, size) of the M5 file the bars are read from, so a 304 is
+answered before anything is loaded or resampled, and any write - including
+a correction in the middle of the window - changes it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from core.candle_frame import CandleFrame
+from core.market_data_bridge import get_candle_frame, tf_to_seconds
+
+logger = logging.getLogger(__name__)
+
+CANDLES_MAX_LIMIT = int(os.getenv("CANDLES_MAX_LIMIT", "50000"))
+# Lookback slack for closed sessions (FX weekends, holidays)
+CANDLES_LOOKBACK_FACTOR = float(os.getenv("CANDLES_LOOKBACK_FACTOR", "1.5"))
+CANDLES_LOOKBACK_PAD_DAYS = int(os.getenv("CANDLES_LOOKBACK_PAD_DAYS", "3"))
+
+FORMATS = ("columns", "f64", "rows")
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+
+def load_frame(
+    symbol: str,
+    tf: str,
+    limit: int,
+    since: Optional[int] = None,
+    strict: bool = False,
+    now: Optional[datetime] = None,
+) -> CandleFrame:
+    """Last `limit` bars of `tf` (or bars with time >= since), oldest first."""
+    tf_sec = tf_to_seconds(tf)
+    limit = max(1, min(int(limit), CANDLES_MAX_LIMIT))
+    to_dt = now or datetime.now(timezone.utc)
+
+    if since is not None:
+        # Align down so the first bucket is aggregated from its first M5 bar
+        from_dt = datetime.fromtimestamp((int(since) // tf_sec) * tf_sec, tz=timezone.utc)
+        frame = get_candle_frame(symbol, from_dt, to_dt, tf, strict=strict)
+        return frame.slice_ts(int(since), None).tail(limit)
+
+    lookback = timedelta(seconds=limit * tf_sec * CANDLES_LOOKBACK_FACTOR) + timedelta(days=CANDLES_LOOKBACK_PAD_DAYS)
+    frame = get_candle_frame(symbol, to_dt - lookback, to_dt, tf, strict=strict)
+    if 0 < len(frame) < limit:
+        # Sparse history (long closures): one wider retry
+        frame = get_candle_frame(symbol, to_dt - lookback * 3, to_dt, tf, strict=strict)
+    return frame.tail(limit)
+
+
+def source_signature(symbol: str) -> Optional[Tuple[str, int, int]]:
+    """(path, mtime_ns, size) of the file symbol's M5 bars are read from; None if unknown."""
+    try:
+        from core.m5_binary_store import bin_path, csv_path, is_authoritative
+        path = bin_path(symbol) if is_authoritative(symbol) else csv_path(symbol)
+    except Exception as e:
+        logger.debug(f"candle etag: no source signature for {symbol}: {e}")
+        return None
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None  # bars come from elsewhere (or nowhere): hash the loaded frame
+    return str(path), st.st_mtime_ns, st.st_size
+
+
+def request_etag(symbol: str, tf: str, *key: Any) -> Optional[str]:
+    """
+    Weak ETag without loading: request shape + current TF bucket (the live
+    bucket rolls over, strict drops it once incomplete) + stored file signature.
+    """
+    sig = source_signature(symbol)
+    if sig is None:
+        return None
+    bucket = int(time.time()) // tf_to_seconds(tf)
+    h = hashlib.blake2b(digest_size=12)
+    h.update(repr((symbol, tf, bucket, sig) + key).encode())
+    return f\'W/"{h.hexdigest()}"\'
+
+
+def frame_etag(frame: CandleFrame, *key: Any) -> str:
+    """Weak ETag over the loaded bars (fallback when the source file is unknown)."""
+    h = hashlib.blake2b(digest_size=12)
+    h.update(repr(key).encode())
+    for col in (frame.ts, frame.open, frame.high, frame.low, frame.close, frame.volume):
+        h.update(np.ascontiguousarray(col).tobytes())
+    return f\'W/"{h.hexdigest()}"\'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+
+def _float_columns(frame: CandleFrame):
+    return (
+        frame.ts.astype(np.float64),
+        frame.open, frame.high, frame.low, frame.close, frame.volume,
+    )
+
+
+def to_columns(frame: CandleFrame) -> Dict[str, list]:
+    cols = {"time": frame.ts.astype(np.int64).tolist()}
+    for name in COLUMNS[1:]:
+        cols[name] = np.asarray(getattr(frame, name), dtype=np.float64).tolist()
+    return cols
+
+
+def to_rows(frame: CandleFrame) -> list:
+    cols = to_columns(frame)
+    return [dict(zip(COLUMNS, bar)) for bar in zip(*(cols[c] for c in COLUMNS))]
+
+
+def to_f64(frame: CandleFrame) -> bytes:
+    """Column-major little-endian float64: n times, n opens, ..., n volumes."""
+    return b"".join(np.ascontiguousarray(c, dtype="<f8").tobytes() for c in _float_columns(frame))
+
+
+def candle_payload(
+    symbol: str,
+    tf: str = "M5",
+    limit: int = 200,
+    fmt: str = "columns",
+    since: Optional[int] = None,
+    strict: bool = False,
+    if_none_match: Optional[str] = None,
+) -> Tuple[int, Dict[str, str], Any]:
+    """
+    (status, headers, body). body is a dict for JSON formats, bytes for f64,
+    None for 304. Raises ValueError on bad tf/format.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt} (expected one of {', '.join(FORMATS)})")
+    symbol = symbol.upper()
+    tf = tf.upper()
+    key = (int(limit), since, bool(strict), fmt)
+    etag = request_etag(symbol, tf, *key)
+    if etag is not None and etag_matches(if_none_match, etag):
+        return 304, {"ETag": etag, "Cache-Control": "private, no-cache"}, None
+
+    frame = load_frame(symbol, tf, limit, since=since, strict=strict)
+    if etag is None:
+        etag = frame_etag(frame, symbol, tf, *key)
+        if etag_matches(if_none_match, etag):
+            return 304, {"ETag": etag, "Cache-Control": "private, no-cache"}, None
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    n = len(frame)
+    last_ts = int(frame.ts[-1]) if n else None
+    if fmt == "f64":
+        headers.update({
+            "X-Candle-Count": str(n),
+            "X-Candle-Columns": ",".join(COLUMNS),
+            "X-Candle-Symbol": symbol,
+            "X-Candle-Tf": tf,
+        })
+        return 200, headers, to_f64(frame)
+
+    body: Dict[str, Any] = {"ok": True, "symbol": symbol, "tf": tf, "count": n, "last_ts": last_ts}
+    if since is not None:
+        body["since"] = int(since)
+    if fmt == "columns":
+        body["format"] = "columns"
+        body["columns"] = to_columns(frame)
+    else:
+        body["candles"] = to_rows(frame)
+    return 200, headers, body
+'''
+
+# ============================================================
+# 2. Route dispatch
+# ============================================================
+
+ROUTE_PATH = "/api/markets/{symbol}/candles"
+
+def find_route(txt, method, path):
+    """Match of '@obj.method("path")' + handler def: groups (decorator, obj, def, name, params)."""
+    return re.compile(
+        r'(@(\w+)\.' + method + r'\(\s*"' + re.escape(path) + r'"[^\n]*\)\n)'
+        r'((?:async\s+)?def\s+(\w+)\(([^)]*)\))'
+    ).search(txt)
+
+def detach(txt, m):
+    """Drop the route decorator (handler stays as a plain function); returns (txt, end of handler)."""
+    txt = txt[:m.start()] + m.group(3) + txt[m.end():]
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.start() + len(m.group(3)))
+    return txt, (nxt.end() if nxt else len(txt))
+
+def param_names(params):
+    return [p.split(":")[0].split("=")[0].strip() for p in params.split(",") if p.strip()]
+
+ROUTE_FILE, m = None, None
+for p in [ROOT / "api_server.py"] + sorted(ROOT.glob("*.py")) + sorted(ROOT.glob("*/*.py")):
+    if not p.exists() or "venv" in p.parts:
+        continue
+    t = p.read_text(encoding="utf-8")
+    m = find_route(t, "get", ROUTE_PATH)
+    if m is not None:
+        ROUTE_FILE = p
+        break
+if ROUTE_FILE is None:
+    ROUTE_FILE = ROOT / "api_server.py"
+    print(f"WARNING: GET {ROUTE_PATH} not found - adding it to {ROUTE_FILE.name}")
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+
+COLUMNAR_HANDLER = '''async def market_candles_columns(
+    symbol: str,
+    request: Request,
+    tf: str = "M5",
+    limit: int = 200,
+    format: str = "",
+    since: Optional[int] = None,
+    strict: bool = False,
+):
+    """
+    Candles for charts. format=columns (JSON column arrays) | f64 (packed
+    float64 columns) | rows; tf is resampled server-side; since=<epoch s>
+    returns bars with time >= since; ETag / If-None-Match -> 304.
+    """
+    from fastapi.responses import JSONResponse, Response
+    from core.candle_columns import candle_payload
+    __LEGACY__try:
+        status, headers, body = candle_payload(
+            symbol, tf, limit, fmt=format or "rows", since=since, strict=strict,
+            if_none_match=request.headers.get("if-none-match"),
+        )
+    except ValueError as e:
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=400)
+    if status == 304:
+        return Response(status_code=304, headers=headers)
+    if isinstance(body, bytes):
+        return Response(body, media_type="application/octet-stream", headers=headers)
+    return JSONResponse(body, headers=headers)
+'''
+
+if "candle_columns" in txt:
+    print("SKIP: candles route already serves columnar formats")
+else:
+    # Request / Optional at module level (FastAPI resolves handler annotations there)
+    imports = []
+    if not re.search(r"^from fastapi import[^\n]*\bRequest\b", txt, re.M):
+        imports.append("from fastapi import Request")
+    if not re.search(r"^from typing import[^\n]*\bOptional\b", txt, re.M):
+        imports.append("from typing import Optional")
+    if imports:
+        first = re.search(r"^(?:from \S+ import [^\n(]+|import [^\n]+)\n", txt, re.M)
+        at = first.end() if first else 0
+        txt = txt[:at] + "\n".join(imports) + "\n" + txt[at:]
+
+    m = find_route(txt, "get", ROUTE_PATH)
+    if m is not None:
+        dec, legacy = m.group(1), m.group(4)
+        names = param_names(m.group(5))
+        known = {"symbol", "tf", "limit", "request"}
+        if set(names) <= known:
+            call = ", ".join(f"{n}={n}" for n in names)
+            legacy_block = f'''if not format and since is None:
+        import inspect
+        res = {legacy}({call})
+        return await res if inspect.isawaitable(res) else res
+    '''
+            txt, end = detach(txt, m)
+            txt = txt[:end] + dec + COLUMNAR_HANDLER.replace("__LEGACY__", legacy_block) + "\n\n" + txt[end:]
+            print(f"GET {ROUTE_PATH} -> format/since to candle_columns, plain requests to {legacy}()")
+        else:
+            # Unknown legacy parameters: leave it alone, serve columns on a sibling path
+            route = dec.replace(f'"{ROUTE_PATH}"', f'"{ROUTE_PATH}/columns"')
+            nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.end())
+            end = nxt.end() if nxt else len(txt)
+            txt = txt[:end] + route + COLUMNAR_HANDLER.replace("__LEGACY__", "") + "\n\n" + txt[end:]
+            print(f"WARNING: {legacy}() takes {names} - columnar candles served at {ROUTE_PATH}/columns")
+    else:
+        app = re.search(r"^(\w+)\s*=\s*FastAPI\(", txt, re.M)
+        obj = app.group(1) if app else "app"
+        txt = txt.rstrip("\n") + f'\n\n\n@{obj}.get("{ROUTE_PATH}")\n' + COLUMNAR_HANDLER.replace("__LEGACY__", "")
+
+    COLUMNS.write_text(columns_code, encoding="utf-8")
+    print(f"Created: {COLUMNS}")
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE}")
+
+print()
+print("=" * 60)
+print("CANDLE COLUMNS PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {COLUMNS} (new)")
+print(f"  - {ROUTE_FILE}")
+print()
+print("Next: Rebuild container; compare sizes of")
+print("      /api/markets/XAUUSD/candles?tf=H1&limit=2000 vs ...&format=columns / &format=f64")
@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+"""
+Columnar candle frame + vectorized M5 -> TF resample
+
+1. Create core/candle_frame.py (CandleFrame: int64 epoch + float64 OHLCV arrays)
+2. aggregate_ohlc() delegates to the vectorized reduceat path
+3. get_candles(..., as_frame=True) returns a CandleFrame (no per-bucket dicts)
+4. scan_engine_v2.py gets bridge_get_candle_frame() for frame-aware consumers
+"""
+from pathlib import Path
+import re
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+FRAME = ROOT / "core" / "candle_frame.py"
+BRIDGE = ROOT / "core" / "market_data_bridge.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not BRIDGE.exists():
+    die(f"Missing {BRIDGE}")
+
+# ============================================================
+# 1. Create candle_frame.py
+# ============================================================
+
+frame_code = '''"""
+candle_frame.py
+---------------
+Columnar OHLCV container for the market data hot path.
+
+A CandleFrame holds one int64 epoch-seconds array plus float64 open/high/low/
+close/volume arrays. Resampling M5 -> higher TF is done with floor_divide
+bucket ids and ufunc.reduceat, so no per-candle or per-bucket dicts are built.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TS_KEYS = ("time", "ts", "t", "timestamp")
+_FIELD_KEYS = {
+    "open": ("open", "o"),
+    "high": ("high", "h"),
+    "low": ("low", "l"),
+    "close": ("close", "c"),
+    "volume": ("volume", "v"),
+}
+_PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _ts_value_to_int(x: Any) -> int:
+    """Convert a single candle timestamp (epoch, datetime or ISO str) to epoch seconds."""
+    if isinstance(x, (int, float, np.integer, np.floating)):
+        v = int(x)
+        return v // 1000 if v > 10_000_000_000 else v  # tolerate epoch ms
+    if isinstance(x, datetime):
+        if x.tzinfo is None:
+            x = x.replace(tzinfo=timezone.utc)
+        return int(x.timestamp())
+    dt = datetime.fromisoformat(str(x).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _ts_column_to_int64(values: Sequence[Any]) -> np.ndarray:
+    """
+    Convert a column of timestamps to int64 epoch seconds.
+
+    UTC ISO strings ("...+00:00" / "...Z" / naive) are parsed in one numpy call;
+    anything else falls back to per-value parsing.
+    """
+    if not values:
+        return np.empty(0, dtype=np.int64)
+
+    first = values[0]
+    if isinstance(first, str):
+        try:
+            stripped = [
+                v[:-6] if v.endswith("+00:00") else (v[:-1] if v.endswith("Z") else v)
+                for v in values
+            ]
+            if "+" in stripped[0][10:] or "-" in stripped[0][10:]:
+                raise ValueError("non-UTC offset")
+            return np.array(stripped, dtype="datetime64[s]").astype(np.int64)
+        except (ValueError, TypeError):
+            pass
+    elif isinstance(first, (int, float, np.integer, np.floating)):
+        arr = np.asarray(values, dtype=np.int64)
+        if arr.size and arr.max() > 10_000_000_000:
+            arr = arr // 1000
+        return arr
+
+    return np.fromiter((_ts_value_to_int(v) for v in values), dtype=np.int64, count=len(values))
+
+
+def _pick_key(sample: Dict[str, Any], keys: Sequence[str]) -> Optional[str]:
+    for k in keys:
+        if sample.get(k) is not None:
+            return k
+    return None
+
+
+def ts_to_iso(ts: int) -> str:
+    """Convert epoch seconds to the ISO string used in candle dicts."""
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc).isoformat()
+
+
+class CandleFrame:
+    """
+    Columnar candle container.
+
+    Attributes:
+        ts: int64 epoch seconds (bucket start for aggregated frames), ascending
+        open, high, low, close, volume: float64 arrays
+        count: int64 source candles per bucket (aggregated frames only)
+        expected: source candles per complete bucket (aggregated frames only)
+        complete: bool mask of complete buckets (aggregated frames only)
+    """
+
+    __slots__ = ("ts", "open", "high", "low", "close", "volume", "count", "expected", "complete")
+
+    def __init__(
+        self,
+        ts: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        count: Optional[np.ndarray] = None,
+        expected: Optional[int] = None,
+        complete: Optional[np.ndarray] = None,
+    ):
+        self.ts = ts
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.count = count
+        self.expected = expected
+        self.complete = complete
+
+    # --------------------------------------------------------
+    # Construction
+    # --------------------------------------------------------
+    @classmethod
+    def empty(cls) -> "CandleFrame":
+        f = np.empty(0, dtype=np.float64)
+        return cls(np.empty(0, dtype=np.int64), f, f.copy(), f.copy(), f.copy(), f.copy())
+
+    @classmethod
+    def from_dicts(cls, candles: List[Dict[str, Any]]) -> "CandleFrame":
+        """
+        Build a frame from a list of candle dicts.
+
+        Key aliases ("time"/"ts"/"t"/"timestamp", "open"/"o", ...) are resolved
+        once from the first candle instead of per candle.
+        """
+        if not candles:
+            return cls.empty()
+
+        sample = candles[0]
+        ts_key = _pick_key(sample, _TS_KEYS)
+        if ts_key is None:
+            raise ValueError("candle has no time/ts/t/timestamp field")
+
+        ts = _ts_column_to_int64([c.get(ts_key) for c in candles])
+
+        cols = {}
+        for name, keys in _FIELD_KEYS.items():
+            key = _pick_key(sample, keys)
+            if key is None:
+                cols[name] = np.zeros(len(candles), dtype=np.float64)
+                continue
+            col = np.array([c.get(key) for c in candles], dtype=object)
+            # Match legacy `float(c.get(x) or 0)` semantics for None/missing values
+            col[col == None] = 0.0  # noqa: E711
+            cols[name] = col.astype(np.float64)
+
+        frame = cls(ts, cols["open"], cols["high"], cols["low"], cols["close"], cols["volume"])
+        return frame.sorted()
+
+    @classmethod
+    def concat(cls, frames: Sequence["CandleFrame"]) -> "CandleFrame":
+        frames = [f for f in frames if f is not None and len(f)]
+        if not frames:
+            return cls.empty()
+        if len(frames) == 1:
+            return frames[0]
+        aggregated = all(f.count is not None for f in frames)
+        return cls(
+            np.concatenate([f.ts for f in frames]),
+            np.concatenate([f.open for f in frames]),
+            np.concatenate([f.high for f in frames]),
+            np.concatenate([f.low for f in frames]),
+            np.concatenate([f.close for f in frames]),
+            np.concatenate([f.volume for f in frames]),
+            count=np.concatenate([f.count for f in frames]) if aggregated else None,
+            expected=frames[-1].expected if aggregated else None,
+            complete=np.concatenate([f.complete for f in frames]) if aggregated else None,
+        )
+
+    # --------------------------------------------------------
+    # Views
+    # --------------------------------------------------------
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return "CandleFrame(empty)"
+        return f"CandleFrame(n={len(self)}, {ts_to_iso(self.ts[0])} .. {ts_to_iso(self.ts[-1])})"
+
+    def take(self, index) -> "CandleFrame":
+        """Row selection by slice (zero-copy view) or index array (copy)."""
+        return CandleFrame(
+            self.ts[index],
+            self.open[index],
+            self.high[index],
+            self.low[index],
+            self.close[index],
+            self.volume[index],
+            count=self.count[index] if self.count is not None else None,
+            expected=self.expected,
+            complete=self.complete[index] if self.complete is not None else None,
+        )
+
+    def sorted(self) -> "CandleFrame":
+        """Return self if ts is ascending, otherwise a stably sorted copy."""
+        if len(self) < 2 or bool(np.all(self.ts[1:] >= self.ts[:-1])):
+            return self
+        return self.take(np.argsort(self.ts, kind="stable"))
+
+    def slice_ts(self, from_ts: Optional[int] = None, to_ts: Optional[int] = None) -> "CandleFrame":
+        """Zero-copy view of rows with from_ts <= ts <= to_ts (binary search)."""
+        lo = 0 if from_ts is None else int(np.searchsorted(self.ts, from_ts, side="left"))
+        hi = len(self) if to_ts is None else int(np.searchsorted(self.ts, to_ts, side="right"))
+        return self.take(slice(lo, hi))
+
+    def tail(self, n: int) -> "CandleFrame":
+        return self.take(slice(max(0, len(self) - n), len(self)))
+
+    def readonly(self) -> "CandleFrame":
+        """Return a view whose arrays cannot be written to (safe to share with detectors)."""
+        view = self.take(slice(None))
+        for name in self.__slots__:
+            arr = getattr(view, name)
+            if isinstance(arr, np.ndarray):
+                arr.flags.writeable = False
+        return view
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return int(self.ts[-1]) if len(self) else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, n).nbytes for n in ("ts",) + _PRICE_FIELDS)
+
+    # --------------------------------------------------------
+    # Export
+    # --------------------------------------------------------
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Export to the legacy candle dict shape (time ISO + OHLCV [+ _complete])."""
+        n = len(self)
+        if not n:
+            return []
+        times = [ts_to_iso(t) for t in self.ts.tolist()]
+        o, h, l, c, v = (getattr(self, f).tolist() for f in _PRICE_FIELDS)
+        if self.count is None:
+            return [
+                {"time": times[i], "open": o[i], "high": h[i], "low": l[i], "close": c[i], "volume": v[i]}
+                for i in range(n)
+            ]
+        cnt = self.count.tolist()
+        comp = self.complete.tolist()
+        exp = self.expected
+        return [
+            {
+                "time": times[i],
+                "open": o[i],
+                "high": h[i],
+                "low": l[i],
+                "close": c[i],
+                "volume": v[i],
+                "_complete": comp[i],
+                "_candle_count": cnt[i],
+                "_expected_count": exp,
+            }
+            for i in range(n)
+        ]
+
+
+def resample_frame(
+    frame: CandleFrame,
+    from_sec: int,
+    to_sec: int,
+    strict: bool = True,
+    now_ts: Optional[int] = None,
+) -> CandleFrame:
+    """
+    Vectorized UTC-aligned resample (same policy as aggregate_ohlc).
+
+    Bucket ids come from np.floor_divide(ts, to_sec); run boundaries are found
+    with one comparison and OHLCV is reduced with maximum/minimum/add.reduceat.
+    Under strict policy, incomplete buckets are dropped unless the bucket is
+    still the live (current) window.
+    """
+    if to_sec <= from_sec:
+        return frame
+    n = len(frame)
+    if not n:
+        out = CandleFrame.empty()
+        out.count = np.empty(0, dtype=np.int64)
+        out.complete = np.empty(0, dtype=bool)
+        out.expected = to_sec // from_sec
+        return out
+
+    if now_ts is None:
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+
+    frame = frame.sorted()
+    bucket = np.floor_divide(frame.ts, to_sec) * to_sec
+
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.concatenate((starts[1:], [n])) - 1
+
+    counts = (ends - starts + 1).astype(np.int64)
+    per_window = to_sec // from_sec
+    bucket_ts = bucket[starts]
+    complete = counts >= per_window
+
+    out = CandleFrame(
+        bucket_ts,
+        frame.open[starts],
+        np.maximum.reduceat(frame.high, starts),
+        np.minimum.reduceat(frame.low, starts),
+        frame.close[ends],
+        np.add.reduceat(frame.volume, starts),
+        count=counts,
+        expected=per_window,
+        complete=complete,
+    )
+
+    if strict:
+        is_current = (bucket_ts + to_sec) > now_ts
+        keep = complete | is_current
+        if not bool(keep.all()):
+            logger.debug(f"Skipping {int((~keep).sum())} incomplete buckets (strict)")
+            out = out.take(keep)
+
+    return out
+'''
+
+FRAME.write_text(frame_code, encoding="utf-8")
+print(f"Created: {FRAME}")
+
+# ============================================================
+# 2. market_data_bridge.py: frame import + vectorized aggregate_ohlc
+# ============================================================
+
+bridge_txt = BRIDGE.read_text(encoding="utf-8")
+original_bridge = bridge_txt
+
+if "from core.candle_frame import" not in bridge_txt:
+    anchor = "logger = logging.getLogger(__name__)"
+    if anchor in bridge_txt:
+        bridge_txt = bridge_txt.replace(
+            anchor,
+            anchor + """
+
+# Columnar candle frame (vectorized resample); legacy dict path is kept as fallback
+try:
+    from core.candle_frame import CandleFrame, resample_frame
+except ImportError:
+    CandleFrame = None
+    resample_frame = None
+""",
+            1,
+        )
+        print("Added candle_frame import")
+    else:
+        print("WARNING: logger anchor not found - candle_frame import not added")
+
+OLD_AGG_SIG = '''def aggregate_ohlc(
+    candles: List[Dict[str, Any]],
+    from_tf: str,
+    to_tf: str,
+    strict: bool = True,
+    now_ts: Optional[int] = None
+) -> List[Dict[str, Any]]:'''
+
+NEW_AGG_WRAPPER = '''def aggregate_ohlc(
+    candles: List[Dict[str, Any]],
+    from_tf: str,
+    to_tf: str,
+    strict: bool = True,
+    now_ts: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Aggregate candles from smaller to larger timeframe with UTC bucket alignment.
+
+    Uses the vectorized CandleFrame path; output shape is unchanged
+    (time, open, high, low, close, volume, _complete, _candle_count, _expected_count).
+    """
+    if not candles:
+        return []
+    if CandleFrame is None:
+        return _aggregate_ohlc_dicts(candles, from_tf, to_tf, strict=strict, now_ts=now_ts)
+
+    from_sec = tf_to_seconds(from_tf)
+    to_sec = tf_to_seconds(to_tf)
+    if to_sec <= from_sec:
+        return candles  # No aggregation needed
+
+    frame = CandleFrame.from_dicts(candles)
+    out = resample_frame(frame, from_sec, to_sec, strict=strict, now_ts=now_ts)
+    logger.debug(f"Aggregated {len(candles)} {from_tf} candles -> {len(out)} {to_tf} candles (strict={strict}, vectorized)")
+    return out.to_dicts()
+
+
+def _aggregate_ohlc_dicts(
+    candles: List[Dict[str, Any]],
+    from_tf: str,
+    to_tf: str,
+    strict: bool = True,
+    now_ts: Optional[int] = None
+) -> List[Dict[str, Any]]:'''
+
+if "def _aggregate_ohlc_dicts(" in bridge_txt:
+    print("SKIP: aggregate_ohlc already vectorized")
+elif OLD_AGG_SIG in bridge_txt:
+    bridge_txt = bridge_txt.replace(OLD_AGG_SIG, NEW_AGG_WRAPPER, 1)
+    print("aggregate_ohlc now delegates to resample_frame (legacy kept as _aggregate_ohlc_dicts)")
+else:
+    print("WARNING: aggregate_ohlc (strict) signature not found - run patch_mega1_marketdata.py first")
+
+# ============================================================
+# 3. get_candles(..., as_frame=True) + get_candle_frame()
+# ============================================================
+
+OLD_GET_SIG = '''def get_candles(
+    symbol: str,
+    from_dt: datetime,
+    to_dt: datetime,
+    timeframe: str = "m5",
+) -> List[Dict[str, Any]]:'''
+
+NEW_GET_SIG = '''def get_candles(
+    symbol: str,
+    from_dt: datetime,
+    to_dt: datetime,
+    timeframe: str = "m5",
+    as_frame: bool = False,
+) -> List[Dict[str, Any]]:'''
+
+# Tolerate trailing whitespace on the blank line (patch_get_candles3.py output)
+OLD_GET_TF_RE = re.compile(r"    tf = _normalize_timeframe\(timeframe\)\n[ \t]*\n    # For M5, fetch directly")
+
+NEW_GET_TF = '''    tf = _normalize_timeframe(timeframe)
+
+    # Columnar path: caller consumes CandleFrame directly (no per-bucket dicts)
+    if as_frame:
+        return get_candle_frame(symbol, from_dt, to_dt, tf)
+
+    # For M5, fetch directly'''
+
+GET_FRAME_FUNC = '''
+
+def _load_m5_frame(symbol: str, from_dt: datetime, to_dt: datetime) -> "CandleFrame":
+    """Load M5 candles from the active source as a CandleFrame."""
+    if _is_v2_enabled():
+        m5_candles = _get_candles_v2(symbol, from_dt, to_dt, "m5")
+    else:
+        m5_candles = _get_candles_v1(symbol, from_dt, to_dt, "m5")
+    return CandleFrame.from_dicts(m5_candles or [])
+
+
+def get_candle_frame(
+    symbol: str,
+    from_dt: datetime,
+    to_dt: datetime,
+    timeframe: str = "m5",
+    strict: bool = True,
+) -> "CandleFrame":
+    """
+    Get candles as a columnar CandleFrame.
+
+    For timeframes > M5, the M5 frame is resampled with resample_frame().
+    """
+    if CandleFrame is None:
+        raise RuntimeError("candle_frame unavailable (numpy not installed)")
+
+    if from_dt.tzinfo is None:
+        from_dt = from_dt.replace(tzinfo=timezone.utc)
+    if to_dt.tzinfo is None:
+        to_dt = to_dt.replace(tzinfo=timezone.utc)
+
+    tf = _normalize_timeframe(timeframe)
+    m5 = _load_m5_frame(symbol, from_dt, to_dt)
+    if tf in ("m5", "5m") or not len(m5):
+        return m5
+
+    return resample_frame(m5, tf_to_seconds("m5"), tf_to_seconds(tf), strict=strict)
+'''
+
+if "def get_candle_frame(" in bridge_txt:
+    print("SKIP: get_candle_frame already exists")
+elif OLD_GET_SIG in bridge_txt and OLD_GET_TF_RE.search(bridge_txt):
+    bridge_txt = bridge_txt.replace(OLD_GET_SIG, NEW_GET_SIG, 1)
+    bridge_txt = OLD_GET_TF_RE.sub(lambda m: NEW_GET_TF, bridge_txt, count=1)
+    marker = "\ndef _get_candles_v2("
+    idx = bridge_txt.find(marker)
+    if idx != -1:
+        bridge_txt = bridge_txt[:idx + 1] + GET_FRAME_FUNC.lstrip("\n") + "\n\n" + bridge_txt[idx + 1:]
+        print("Added get_candle_frame() and get_candles(as_frame=True)")
+    else:
+        bridge_txt = bridge_txt.rstrip("\n") + "\n" + GET_FRAME_FUNC
+        print("Added get_candle_frame() at end of module")
+else:
+    print("WARNING: get_candles pattern not found - run patch_get_candles3.py first")
+
+if bridge_txt != original_bridge:
+    BRIDGE.write_text(bridge_txt, encoding="utf-8")
+    print(f"Updated: {BRIDGE}")
+
+# ============================================================
+# 4. scan_engine_v2.py: bridge_get_candle_frame()
+# ============================================================
+
+if SCAN.exists():
+    scan_txt = SCAN.read_text(encoding="utf-8")
+    if "def bridge_get_candle_frame(" in scan_txt:
+        print("SKIP: bridge_get_candle_frame already exists")
+    else:
+        anchor = "def bridge_get_candles("
+        idx = scan_txt.find(anchor)
+        if idx != -1:
+            frame_bridge = '''def bridge_get_candle_frame(symbol: str, from_dt: datetime, to_dt: datetime, tf: str = "5m"):
+    """Get candles as a columnar CandleFrame through market_data_bridge (None on failure)."""
+    try:
+        from core.market_data_bridge import get_candle_frame
+        frame = get_candle_frame(symbol, from_dt, to_dt, tf)
+        logger.debug(f"bridge_get_candle_frame: {symbol}/{tf} returned {len(frame)} candles")
+        return frame
+    except Exception as e:
+        logger.error(f"bridge_get_candle_frame error: {e}")
+        return None
+
+
+'''
+            scan_txt = scan_txt[:idx] + frame_bridge + scan_txt[idx:]
+            SCAN.write_text(scan_txt, encoding="utf-8")
+            print("Added bridge_get_candle_frame to scan_engine_v2.py")
+        else:
+            print("WARNING: bridge_get_candles not found in scan_engine_v2.py")
+else:
+    print(f"NOTE: {SCAN} not found - scanner helper skipped")
+
+print()
+print("=" * 60)
+print("CANDLE FRAME PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {FRAME} (new)")
+print(f"  - {BRIDGE}")
+print(f"  - {SCAN}")
+print()
+print("Next: Rebuild container and compare /api/marketdata/verify before/after")
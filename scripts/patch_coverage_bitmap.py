@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Slot-bitmap M5 coverage index
+
+1. Create core/coverage_bitmap.py: one bit per 5-minute slot per symbol,
+   updated from M5 append events; coverage %, first/last bar and gap runs
+   come from popcounts / bit scans instead of reading rows.
+2. marketdata_store.py: subscribe the index and serve check_coverage /
+   has_coverage (tf 5m) from it - bridge_get_coverage() hits this every cycle.
+
+Gap repair: POST /api/admin/backfill {"mode": "gaps"} (patch_async_backfill.py)
+fetches only the missing runs the index reports.
+Requires patch_m5_binary_store.py and patch_symbol_head_index.py.
+"""
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+COVERAGE = ROOT / "core" / "coverage_bitmap.py"
+STORE = ROOT / "core" / "marketdata_store.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "marketdata_events.py").exists():
+    die("Missing core/marketdata_events.py - run patch_m5_binary_store.py first")
+
+# ============================================================
+# 1. Create coverage_bitmap.py
+# ============================================================
+
+coverage_code = '''"""
+coverage_bitmap.py
+------------------
+Per-symbol bitmap of M5 slots (slot = ts // 300, one bit each, packed).
+
+check_coverage()/has_coverage() used to read every row in range for every
+symbol and TF on every scan cycle. The bitmap is seeded once per symbol from
+m5.bin (or the CSV), then kept current by marketdata_events; if another process
+writes the file (ingestor), a changed mtime/size triggers a reseed. Queries:
+
+- counts(): present slots (popcount), first/last present slot
+- report(): plus expected slots (per-asset weekly session: FX/metals close
+  Friday 17:00 New York and reopen Sunday evening, crypto 24/7), gap runs,
+  first/last gap
+- gap_ranges(): missing runs up to the last closed slot for targeted backfill;
+  mark_checked() records slots the provider had no bar for (holidays) so they
+  are not asked again - persisted to state/coverage/checked.json
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+M5_SEC = 300
+SLOTS_PER_DAY = 288
+# Re-check the source file if no append was seen in this process for this long
+RESEED_AFTER_SEC = 60
+# Empty slots younger than this are never recorded as "no bar at provider"
+CHECKED_GRACE_SEC = 3600
+ALWAYS_OPEN = {
+    s.strip().upper()
+    for s in os.getenv("COVERAGE_24X7_SYMBOLS", "BTCUSD,ETHUSD,XRPUSD,LTCUSD").split(",")
+    if s.strip()
+}
+METALS_PREFIXES = ("XAU", "XAG", "XPT", "XPD")
+# Weekly session in SESSION_TZ local time: (weekday, hour) of the Friday close
+# and the Sunday reopen. New York time tracks the FX week across DST
+# (21:00/22:00 UTC close, 21:00/22:00 UTC reopen).
+SESSION_TZ = os.getenv("COVERAGE_SESSION_TZ", "America/New_York")
+SCHEDULES: Dict[str, Optional[Tuple[Tuple[int, int], Tuple[int, int]]]] = {
+    "crypto": None,
+    "fx": ((4, 17), (6, 17)),
+    "metals": ((4, 17), (6, 18)),
+}
+STATE_DIR = Path(os.getenv("STATE_DIR", "state"))
+CHECKED_FILE = STATE_DIR / "coverage" / "checked.json"
+
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint32)
+
+
+def _iso(ts: Optional[int]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts is not None else None
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start indices and exclusive end indices of True runs."""
+    d = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(d == 1), np.flatnonzero(d == -1)
+
+
+class SlotBitmap:
+    """Packed slot bits, growable in both directions (base is a multiple of 8)."""
+
+    __slots__ = ("base", "bits")
+
+    def __init__(self):
+        self.base = 0
+        self.bits = np.zeros(0, dtype=np.uint8)
+
+    @property
+    def end(self) -> int:
+        return self.base + 8 * len(self.bits)
+
+    def _ensure(self, lo: int, hi: int) -> None:
+        lo8, hi8 = (lo // 8) * 8, -(-hi // 8) * 8
+        if not len(self.bits):
+            self.base = lo8
+            self.bits = np.zeros((hi8 - lo8) // 8, dtype=np.uint8)
+            return
+        if lo8 < self.base:
+            pad = (self.base - lo8) // 8
+            self.bits = np.concatenate([np.zeros(pad, dtype=np.uint8), self.bits])
+            self.base = lo8
+        if hi8 > self.end:
+            # Grow a week ahead so live appends do not reallocate every bar
+            extra = max((hi8 - self.end) // 8, 7 * SLOTS_PER_DAY // 8)
+            self.bits = np.concatenate([self.bits, np.zeros(extra, dtype=np.uint8)])
+
+    def set(self, slots: np.ndarray) -> None:
+        if not len(slots):
+            return
+        slots = np.asarray(slots, dtype=np.int64)
+        lo, hi = int(slots.min()), int(slots.max()) + 1
+        self._ensure(lo, hi)
+        b0, b1 = (lo - self.base) >> 3, ((hi - 1 - self.base) >> 3) + 1
+        span = np.unpackbits(self.bits[b0:b1])
+        span[slots - (self.base + 8 * b0)] = 1
+        self.bits[b0:b1] = np.packbits(span)
+
+    def mask(self, lo: int, hi: int) -> np.ndarray:
+        """Bool per slot in [lo, hi); slots outside the bitmap are False."""
+        out = np.zeros(max(0, hi - lo), dtype=bool)
+        a, b = max(lo, self.base), min(hi, self.end)
+        if a < b:
+            b0, b1 = (a - self.base) >> 3, ((b - 1 - self.base) >> 3) + 1
+            off = a - (self.base + 8 * b0)
+            out[a - lo:b - lo] = np.unpackbits(self.bits[b0:b1])[off:off + (b - a)].astype(bool)
+        return out
+
+    def count(self, lo: int, hi: int) -> int:
+        """Set bits in [lo, hi): byte popcounts for the body, bit scan for the ragged edges."""
+        a, b = max(lo, self.base), min(hi, self.end)
+        if a >= b:
+            return 0
+        fa, fb = -(-(a - self.base) // 8), (b - self.base) // 8
+        if fa >= fb:
+            return int(self.mask(a, b).sum())
+        n = int(_POPCOUNT[self.bits[fa:fb]].sum())
+        return n + int(self.mask(a, self.base + 8 * fa).sum()) + int(self.mask(self.base + 8 * fb, b).sum())
+
+    def first(self, lo: int, hi: int) -> Optional[int]:
+        idx = np.flatnonzero(self.mask(lo, hi))
+        return lo + int(idx[0]) if len(idx) else None
+
+    def last(self, lo: int, hi: int) -> Optional[int]:
+        idx = np.flatnonzero(self.mask(lo, hi))
+        return lo + int(idx[-1]) if len(idx) else None
+
+
+def asset_class(symbol: str) -> str:
+    s = symbol.upper()
+    if s in ALWAYS_OPEN:
+        return "crypto"
+    return "metals" if s.startswith(METALS_PREFIXES) else "fx"
+
+
+@functools.lru_cache(maxsize=1)
+def _session_tz():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(SESSION_TZ)
+    except Exception as e:
+        logger.warning(f"coverage: no tz data for {SESSION_TZ} ({e}), using UTC-5 without DST")
+        return timezone(timedelta(hours=-5))
+
+
+def closed_windows(symbol: str, from_ts: int, to_ts: int) -> List[Tuple[int, int]]:
+    """Weekly market-closed windows [close_ts, reopen_ts) overlapping [from_ts, to_ts]."""
+    schedule = SCHEDULES.get(asset_class(symbol))
+    if schedule is None:
+        return []
+    (close_wd, close_h), (open_wd, open_h) = schedule
+    tz = _session_tz()
+    day = datetime.fromtimestamp(from_ts, tz).date() - timedelta(days=7)
+    day += timedelta(days=(close_wd - day.weekday()) % 7)
+    last = datetime.fromtimestamp(to_ts, tz).date()
+    out: List[Tuple[int, int]] = []
+    while day <= last:
+        reopen = day + timedelta(days=(open_wd - close_wd) % 7)
+        a = int(datetime(day.year, day.month, day.day, close_h, tzinfo=tz).timestamp())
+        b = int(datetime(reopen.year, reopen.month, reopen.day, open_h, tzinfo=tz).timestamp())
+        if b > from_ts and a <= to_ts:
+            out.append((a, b))
+        day += timedelta(days=7)
+    return out
+
+
+def expected_mask(symbol: str, lo: int, hi: int) -> np.ndarray:
+    """Slots a bar is expected in: all, minus the symbol's weekly closed windows."""
+    out = np.ones(max(0, hi - lo), dtype=bool)
+    if not len(out):
+        return out
+    for a, b in closed_windows(symbol, lo * M5_SEC, hi * M5_SEC):
+        s, e = max(lo, -(-a // M5_SEC)), min(hi, -(-b // M5_SEC))
+        if s < e:
+            out[s - lo:e - lo] = False
+    return out
+
+
+def _source(symbol: str):
+    """(reader, path) for the file that holds symbol's M5 rows, or None."""
+    from core.m5_binary_store import csv_path, get_m5_binary_store, is_authoritative
+    store = get_m5_binary_store()
+    if is_authoritative(symbol):
+        return "bin", store.path(symbol)
+    p = csv_path(symbol)
+    return ("csv", p) if p.exists() else None
+
+
+def _signature(symbol: str) -> Optional[Tuple[str, int, int]]:
+    src = _source(symbol)
+    if src is None:
+        return None
+    try:
+        st = src[1].stat()
+    except FileNotFoundError:
+        return None
+    return str(src[1]), st.st_mtime_ns, st.st_size
+
+
+def _load_ts(symbol: str) -> Optional[np.ndarray]:
+    src = _source(symbol)
+    if src is None:
+        return None
+    from core.m5_binary_store import get_m5_binary_store, read_csv_gz
+    if src[0] == "bin":
+        return np.asarray(get_m5_binary_store().records(symbol)["ts"], dtype=np.int64)
+    return np.asarray(read_csv_gz(src[1]).ts, dtype=np.int64)
+
+
+class CoverageIndex:
+    def __init__(self, checked_path: Path = CHECKED_FILE):
+        self._maps: Dict[str, SlotBitmap] = {}
+        self._checked: Dict[str, SlotBitmap] = {}
+        self._checked_path = checked_path
+        self._checked_sig: Optional[Tuple[int, int]] = None
+        self._sig: Dict[str, Optional[Tuple[str, int, int]]] = {}
+        self._last_append: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"appends": 0, "seeds": 0, "queries": 0}
+
+    def on_append(self, symbol: str, tf: str, frame) -> None:
+        symbol = symbol.upper()
+        with self._lock:
+            bm = self._maps.get(symbol)
+            if bm is None:
+                return  # seeded from disk (including these rows) on first query
+            if frame is None:
+                self._maps.pop(symbol, None)
+                return
+            if len(frame):
+                bm.set(np.asarray(frame.ts, dtype=np.int64) // M5_SEC)
+            self._sig[symbol] = _signature(symbol)
+            self._last_append[symbol] = time.time()
+            self._stats["appends"] += 1
+
+    def _bitmap(self, symbol: str) -> Optional[SlotBitmap]:
+        symbol = symbol.upper()
+        bm = self._maps.get(symbol)
+        if bm is not None and time.time() - self._last_append.get(symbol, 0.0) < RESEED_AFTER_SEC:
+            return bm
+        sig = _signature(symbol)
+        if bm is not None and sig == self._sig.get(symbol):
+            return bm
+        ts = _load_ts(symbol)
+        if ts is None:
+            return None
+        fresh = SlotBitmap()
+        fresh.set(np.unique(ts // M5_SEC))
+        with self._lock:
+            self._maps[symbol] = fresh
+            self._sig[symbol] = sig
+            self._last_append[symbol] = 0.0
+            self._stats["seeds"] += 1
+        return fresh
+
+    @staticmethod
+    def _slots(from_ts: int, to_ts: int) -> Tuple[int, int]:
+        return -(-int(from_ts) // M5_SEC), int(to_ts) // M5_SEC + 1
+
+    def counts(self, symbol: str, from_ts: int, to_ts: int) -> Optional[Dict[str, Any]]:
+        """Hot path for check_coverage: present slots and first/last present ts in [from_ts, to_ts]."""
+        bm = self._bitmap(symbol)
+        if bm is None:
+            return None
+        self._stats["queries"] += 1
+        lo, hi = self._slots(from_ts, to_ts)
+        first, last = bm.first(lo, hi), bm.last(lo, hi)
+        return {
+            "slots": max(0, hi - lo),
+            "present": bm.count(lo, hi),
+            "firstTs": first * M5_SEC if first is not None else None,
+            "lastTs": last * M5_SEC if last is not None else None,
+        }
+
+    def _load_checked(self) -> None:
+        """(Re)read the checked slots if the file changed (restart, or another process marked some)."""
+        try:
+            st = self._checked_path.stat()
+        except FileNotFoundError:
+            return
+        sig = (st.st_mtime_ns, st.st_size)
+        if sig == self._checked_sig:
+            return
+        try:
+            data = json.loads(self._checked_path.read_text())
+        except Exception as e:
+            logger.warning(f"coverage checked slots unreadable, ignoring: {e}")
+            return
+        checked: Dict[str, SlotBitmap] = {}
+        for symbol, runs in data.items():
+            bm = checked[symbol] = SlotBitmap()
+            for s, e in runs:
+                bm.set(np.arange(s, e, dtype=np.int64))
+        with self._lock:
+            self._checked, self._checked_sig = checked, sig
+
+    def _save_checked(self) -> None:
+        """Atomic rewrite as {symbol: [[first_slot, end_slot), ...]}; caller holds the lock."""
+        data = {}
+        for symbol, bm in self._checked.items():
+            starts, ends = _runs(bm.mask(bm.base, bm.end))
+            data[symbol] = [[bm.base + int(s), bm.base + int(e)] for s, e in zip(starts, ends)]
+        self._checked_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._checked_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self._checked_path)
+        st = self._checked_path.stat()
+        self._checked_sig = (st.st_mtime_ns, st.st_size)
+
+    def _missing(self, symbol: str, bm: SlotBitmap, lo: int, hi: int) -> np.ndarray:
+        missing = expected_mask(symbol, lo, hi) & ~bm.mask(lo, hi)
+        # The slot containing now is still forming; it is not a gap yet
+        missing[max(0, int(time.time()) // M5_SEC - lo):] = False
+        self._load_checked()
+        checked = self._checked.get(symbol.upper())
+        if checked is not None:
+            missing &= ~checked.mask(lo, hi)
+        return missing
+
+    def report(self, symbol: str, from_ts: int, to_ts: int, max_gaps: int = 50) -> Optional[Dict[str, Any]]:
+        bm = self._bitmap(symbol)
+        if bm is None:
+            return None
+        lo, hi = self._slots(from_ts, to_ts)
+        have = bm.mask(lo, hi)
+        expected = expected_mask(symbol, lo, hi)
+        missing = self._missing(symbol, bm, lo, hi)
+        starts, ends = _runs(missing)
+        gaps = [
+            {"from": _iso((lo + int(s)) * M5_SEC), "to": _iso((lo + int(e) - 1) * M5_SEC), "slots": int(e - s)}
+            for s, e in zip(starts, ends)
+        ]
+        n_expected = int(expected.sum())
+        idx = np.flatnonzero(have)
+        return {
+            "symbol": symbol.upper(),
+            "from": _iso(lo * M5_SEC),
+            "to": _iso((hi - 1) * M5_SEC),
+            "slots": int(hi - lo),
+            "present": int(len(idx)),
+            "coveragePct": round(100.0 * len(idx) / max(1, hi - lo), 2),
+            "expected": n_expected,
+            "expectedPresent": int((have & expected).sum()),
+            "expectedCoveragePct": round(100.0 * int((have & expected).sum()) / max(1, n_expected), 2),
+            "firstTs": _iso((lo + int(idx[0])) * M5_SEC) if len(idx) else None,
+            "lastTs": _iso((lo + int(idx[-1])) * M5_SEC) if len(idx) else None,
+            "gapCount": len(gaps),
+            "gapSlots": int(missing.sum()),
+            "firstGap": gaps[0] if gaps else None,
+            "lastGap": gaps[-1] if gaps else None,
+            "gaps": gaps[-max_gaps:] if max_gaps else [],
+        }
+
+    def gap_ranges(self, symbol: str, from_ts: int, to_ts: int, merge_slots: int = 0) -> Optional[List[Tuple[int, int]]]:
+        """
+        Missing runs as (first_missing_ts, last_missing_ts), ending at the last
+        closed slot; runs separated by at most merge_slots present slots are
+        merged into one request.
+        """
+        bm = self._bitmap(symbol)
+        if bm is None:
+            return None
+        lo, hi = self._slots(from_ts, to_ts)
+        starts, ends = _runs(self._missing(symbol, bm, lo, hi))
+        ranges: List[Tuple[int, int]] = []
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            if ranges and s - ranges[-1][1] <= merge_slots:
+                ranges[-1] = (ranges[-1][0], e)
+            else:
+                ranges.append((s, e))
+        return [((lo + s) * M5_SEC, (lo + e - 1) * M5_SEC) for s, e in ranges]
+
+    def mark_checked(self, symbol: str, from_ts: int, to_ts: int) -> int:
+        """After a repair fetch: slots still missing in range had no bar at the provider."""
+        bm = self._bitmap(symbol)
+        if bm is None:
+            return 0
+        # Recent slots may just be provider lag, not a closed market
+        lo, hi = self._slots(from_ts, min(int(to_ts), int(time.time()) - CHECKED_GRACE_SEC))
+        if lo >= hi:
+            return 0
+        idx = np.flatnonzero(self._missing(symbol, bm, lo, hi))
+        if len(idx):
+            with self._lock:
+                self._checked.setdefault(symbol.upper(), SlotBitmap()).set(lo + idx)
+                try:
+                    self._save_checked()
+                except OSError as e:
+                    logger.warning(f"coverage checked slots not persisted: {e}")
+        return int(len(idx))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "symbols": len(self._maps),
+                "bytes": int(sum(bm.bits.nbytes for bm in self._maps.values())),
+                "checkedSlots": {s: bm.count(bm.base, bm.end) for s, bm in self._checked.items()},
+            }
+
+
+_index: Optional[CoverageIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_coverage_index() -> CoverageIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CoverageIndex()
+    return _index
+
+
+# ============================================================
+# MarketDataStore.check_coverage / has_coverage
+# ============================================================
+
+def _to_ts(value: Any) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+
+def _make_info(info_cls: type, **values: Any) -> Any:
+    """Build the store's CoverageInfo with whichever of these fields it declares."""
+    if dataclasses.is_dataclass(info_cls):
+        names = {f.name for f in dataclasses.fields(info_cls)}
+    elif hasattr(info_cls, "model_fields"):
+        names = set(info_cls.model_fields)
+    elif hasattr(info_cls, "__fields__"):
+        names = set(info_cls.__fields__)
+    else:
+        names = set(inspect.signature(info_cls).parameters)
+    return info_cls(**{k: v for k, v in values.items() if k in names})
+
+
+def _wrap_coverage(original, info_cls: Optional[type]):
+    param = inspect.signature(original).parameters.get("min_coverage_pct")
+    default_min = param.default if param is not None and param.default is not inspect.Parameter.empty else 50.0
+    learned: Dict[str, type] = {}
+
+    @functools.wraps(original)
+    def wrapped(self, symbol, from_dt, to_dt, tf="5m", *args, **kwargs):
+        if (args or set(kwargs) - {"min_coverage_pct"} or str(tf).lower() not in ("5m", "m5")
+                or os.getenv("COVERAGE_BITMAP", "1") == "0"):
+            return original(self, symbol, from_dt, to_dt, tf, *args, **kwargs)
+        try:
+            c = get_coverage_index().counts(symbol, _to_ts(from_dt), _to_ts(to_dt))
+        except Exception as e:
+            logger.debug(f"coverage bitmap unavailable for {symbol}: {e}")
+            c = None
+        if c is None:
+            return original(self, symbol, from_dt, to_dt, tf, *args, **kwargs)
+        cls = info_cls or learned.get("cls")
+        if cls is None:
+            result = original(self, symbol, from_dt, to_dt, tf, *args, **kwargs)
+            learned["cls"] = type(result)
+            return result
+        pct = 100.0 * c["present"] / max(1, c["slots"])
+        return _make_info(
+            cls,
+            has_data=c["present"] > 0 and pct >= float(kwargs.get("min_coverage_pct", default_min)),
+            coverage_pct=pct,
+            rows_count=c["present"],
+            first_ts=datetime.fromtimestamp(c["firstTs"], tz=timezone.utc) if c["firstTs"] is not None else None,
+            last_ts=datetime.fromtimestamp(c["lastTs"], tz=timezone.utc) if c["lastTs"] is not None else None,
+        )
+
+    wrapped._coverage_bitmap = True
+    return wrapped
+
+
+def enable_coverage_bitmap(store_cls: Optional[type] = None, info_cls: Optional[type] = None) -> None:
+    """Subscribe the index to M5 appends and serve store_cls coverage checks from it."""
+    from core.marketdata_events import subscribe_m5_append
+    index = get_coverage_index()
+    subscribe_m5_append("coverage_bitmap", index.on_append)
+    if store_cls is None:
+        return
+    for name in ("check_coverage", "has_coverage"):
+        original = getattr(store_cls, name, None)
+        if original is None or getattr(original, "_coverage_bitmap", False):
+            continue
+        setattr(store_cls, name, _wrap_coverage(original, info_cls))
+'''
+
+COVERAGE.write_text(coverage_code, encoding="utf-8")
+print(f"Created: {COVERAGE}")
+
+# ============================================================
+# 2. marketdata_store.py: subscribe index, serve coverage checks
+# ============================================================
+
+if STORE.exists():
+    store_txt = STORE.read_text(encoding="utf-8")
+    if "enable_coverage_bitmap" in store_txt:
+        print("SKIP: coverage bitmap already enabled")
+    else:
+        anchor = "    enable_symbol_heads()\n"
+        if anchor in store_txt:
+            store_txt = store_txt.replace(
+                anchor,
+                anchor + "    from core.coverage_bitmap import enable_coverage_bitmap\n"
+                "    enable_coverage_bitmap(MarketDataStore, globals().get(\"CoverageInfo\"))\n",
+                1,
+            )
+            STORE.write_text(store_txt, encoding="utf-8")
+            print("check_coverage/has_coverage now served from the slot bitmap")
+        else:
+            print("WARNING: symbol head hook block not found - run patch_symbol_head_index.py first")
+else:
+    print(f"WARNING: {STORE} not found")
+
+print()
+print("=" * 60)
+print("COVERAGE BITMAP PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {COVERAGE} (new)")
+print(f"  - {STORE}")
+print()
+print("Next: Redeploy scripts/internal_endpoints.py (marketdata/coverage), rebuild container,")
+print("      then POST /api/admin/backfill {\"mode\": \"gaps\"} to repair holes")
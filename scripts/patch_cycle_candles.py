@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Cycle-scoped candle context for the scanner
+
+1. Create core/cycle_candles.py: during a scan cycle M5 is loaded once per
+   symbol and every requested TF is derived from that frame (through the HTF
+   bar cache when enabled), handed out as read-only views
+2. scan_engine_v2.py: bridge_get_candles / bridge_get_candle_frame read from
+   the active context; _run_cycle opens and closes it and logs the I/O saved
+3. /scan/status reports candleIO (last cycle's context stats)
+
+Requires patch_candle_frame.py and patch_parallel_scan.py.
+"""
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+CTX = ROOT / "core" / "cycle_candles.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "candle_frame.py").exists():
+    die("Missing core/candle_frame.py - run patch_candle_frame.py first")
+if not SCAN.exists():
+    die(f"Missing {SCAN}")
+
+# ============================================================
+# 1. Create cycle_candles.py
+# ============================================================
+
+ctx_code = '''"""
+cycle_candles.py
+----------------
+Cycle-scoped candle context for the scanner.
+
+Without it every (symbol, tf) pair of a cycle goes through get_candles() and
+reads the same M5 range again. While a context is active the first request
+for a symbol loads its M5 window once and derives all the cycle's timeframes
+from it; later requests are served from memory. Frames are read-only views,
+so no detector can alter what another detector sees.
+
+The context snapshots the data at first access: bars that arrive mid-cycle
+are picked up by the next cycle.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.candle_frame import CandleFrame, resample_frame
+
+logger = logging.getLogger(__name__)
+
+M5_SEC = 300
+
+
+def _tf_sec(tf: str) -> int:
+    from core.market_data_bridge import tf_to_seconds, _normalize_timeframe
+    return tf_to_seconds(_normalize_timeframe(tf))
+
+
+class _SymbolEntry:
+    __slots__ = ("lock", "m5", "from_ts", "to_ts", "derived")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.m5: Optional[CandleFrame] = None
+        self.from_ts = 0
+        self.to_ts = 0
+        self.derived: Dict[int, CandleFrame] = {}
+
+
+class CycleCandleContext:
+    def __init__(self, timeframes: Optional[List[str]] = None):
+        self.timeframes = list(timeframes or [])
+        self._symbols: Dict[str, _SymbolEntry] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._started = time.perf_counter()
+        self._stats = {
+            "requests": 0,
+            "served": 0,
+            "fallbacks": 0,
+            "m5Loads": 0,
+            "m5BarsRead": 0,
+            "m5BarsSaved": 0,
+            "tfDerived": 0,
+            "loadMs": 0.0,
+        }
+
+    def _entry(self, symbol: str) -> _SymbolEntry:
+        with self._lock:
+            e = self._symbols.get(symbol)
+            if e is None:
+                e = self._symbols[symbol] = _SymbolEntry()
+            return e
+
+    # --------------------------------------------------------
+    # Read path
+    # --------------------------------------------------------
+    def frame(self, symbol: str, from_dt: datetime, to_dt: datetime, tf: str) -> Optional[CandleFrame]:
+        """Read-only frame for symbol/tf, or None when this window is not covered (caller falls back)."""
+        symbol = symbol.upper()
+        from_ts = int(from_dt.timestamp())
+        to_ts = int(to_dt.timestamp())
+        to_sec = _tf_sec(tf)
+        self._stats["requests"] += 1
+
+        e = self._entry(symbol)
+        with e.lock:
+            if e.m5 is None:
+                self._load(symbol, e, from_dt, to_dt)
+                first = True
+            else:
+                first = False
+            if from_ts < e.from_ts:
+                # Wider window than this cycle loaded (different lookback)
+                self._stats["fallbacks"] += 1
+                return None
+            if to_sec not in e.derived:
+                self._derive(symbol, e, to_sec)
+            out = e.derived[to_sec]
+
+        if not first:
+            # Bars a direct get_candles() call would have read again
+            self._stats["m5BarsSaved"] += len(e.m5.slice_ts(from_ts, to_ts))
+        self._stats["served"] += 1
+        if to_sec <= M5_SEC:
+            return out.slice_ts(from_ts, to_ts)
+        first_bucket = -(-from_ts // to_sec) * to_sec
+        return out.slice_ts(first_bucket, to_ts)
+
+    def candles(self, symbol: str, from_dt: datetime, to_dt: datetime, tf: str) -> Optional[List[Dict[str, Any]]]:
+        """Legacy dict candles (same shape as market_data_bridge.get_candles), or None on fallback."""
+        frame = self.frame(symbol, from_dt, to_dt, tf)
+        return None if frame is None else frame.to_dicts()
+
+    # --------------------------------------------------------
+    # Load / derive
+    # --------------------------------------------------------
+    def _load(self, symbol: str, e: _SymbolEntry, from_dt: datetime, to_dt: datetime) -> None:
+        from core.market_data_bridge import get_candle_frame
+
+        t0 = time.perf_counter()
+        e.m5 = get_candle_frame(symbol, from_dt, to_dt, "m5").readonly()
+        e.from_ts = int(from_dt.timestamp())
+        e.to_ts = int(to_dt.timestamp())
+        e.derived = {M5_SEC: e.m5}
+        self._stats["m5Loads"] += 1
+        self._stats["m5BarsRead"] += len(e.m5)
+        self._stats["loadMs"] += (time.perf_counter() - t0) * 1000
+
+        # Derive every timeframe of the cycle from the one load
+        for tf in self.timeframes:
+            try:
+                to_sec = _tf_sec(tf)
+            except Exception:
+                continue
+            if to_sec not in e.derived:
+                self._derive(symbol, e, to_sec)
+
+    def _derive(self, symbol: str, e: _SymbolEntry, to_sec: int) -> None:
+        from core import market_data_bridge as bridge
+
+        from_dt = datetime.fromtimestamp(e.from_ts, tz=timezone.utc)
+        to_dt = datetime.fromtimestamp(e.to_ts, tz=timezone.utc)
+
+        def load_m5(f: datetime, t: datetime) -> CandleFrame:
+            f_ts = int(f.timestamp())
+            if f_ts < e.from_ts:
+                return bridge._load_m5_frame(symbol, f, t)
+            return e.m5.slice_ts(f_ts, int(t.timestamp()))
+
+        if getattr(bridge, "USE_HTF_CACHE", False):
+            from core.htf_bar_cache import get_htf_cache
+            frame = get_htf_cache().get(symbol, to_sec, from_dt, to_dt, load_m5)
+        else:
+            frame = resample_frame(e.m5, M5_SEC, to_sec, strict=True) if len(e.m5) else e.m5
+        e.derived[to_sec] = frame.readonly()
+        self._stats["tfDerived"] += 1
+
+    # --------------------------------------------------------
+    # Stats
+    # --------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        s["symbols"] = len(self._symbols)
+        s["loadMs"] = round(s["loadMs"], 1)
+        total = s["m5BarsRead"] + s["m5BarsSaved"]
+        s["savedPct"] = round(100.0 * s["m5BarsSaved"] / total, 1) if total else 0.0
+        s["cycleMs"] = round((time.perf_counter() - self._started) * 1000, 1)
+        return s
+
+    def log_summary(self) -> Dict[str, Any]:
+        s = self.stats()
+        logger.info(
+            f"Cycle candles: {s['symbols']} symbols, {s['requests']} requests, "
+            f"{s['m5Loads']} M5 loads ({s['m5BarsRead']} bars), "
+            f"saved {s['m5BarsSaved']} M5 bar reads ({s['savedPct']}%), {s['fallbacks']} fallbacks"
+        )
+        return s
+
+
+_active: Optional[CycleCandleContext] = None
+
+
+def start_cycle_context(timeframes: Optional[List[str]] = None) -> CycleCandleContext:
+    global _active
+    _active = CycleCandleContext(timeframes)
+    return _active
+
+
+def end_cycle_context(ctx: Optional[CycleCandleContext]) -> Dict[str, Any]:
+    """Deactivate ctx, log and return its stats."""
+    global _active
+    if ctx is None:
+        return {}
+    if _active is ctx:
+        _active = None
+    return ctx.log_summary()
+
+
+def get_active_cycle_context() -> Optional[CycleCandleContext]:
+    ctx = _active
+    # Forked pool workers inherit the module global; their copy is stale
+    if ctx is None or ctx._pid != os.getpid():
+        return None
+    return ctx
+'''
+
+CTX.write_text(ctx_code, encoding="utf-8")
+print(f"Created: {CTX}")
+
+# ============================================================
+# 2. scan_engine_v2.py
+# ============================================================
+
+scan_txt = SCAN.read_text(encoding="utf-8")
+
+if "get_active_cycle_context" in scan_txt:
+    print("SKIP: scan engine already uses cycle candle context")
+else:
+    # bridge_get_candles
+    old = '''    try:
+        from core.market_data_bridge import get_candles as bridge_get
+        candles = bridge_get(symbol, from_dt, to_dt, tf)'''
+    new = '''    try:
+        from core.cycle_candles import get_active_cycle_context
+        ctx = get_active_cycle_context()
+        if ctx is not None:
+            candles = ctx.candles(symbol, from_dt, to_dt, tf)
+            if candles is not None:
+                return candles
+    except Exception as e:
+        logger.debug(f"cycle candle context unavailable for {symbol}/{tf}: {e}")
+    try:
+        from core.market_data_bridge import get_candles as bridge_get
+        candles = bridge_get(symbol, from_dt, to_dt, tf)'''
+    if old in scan_txt:
+        scan_txt = scan_txt.replace(old, new, 1)
+        print("bridge_get_candles: reads active cycle context")
+    else:
+        die("bridge_get_candles body not found")
+
+    # bridge_get_candle_frame
+    old = '''    try:
+        from core.market_data_bridge import get_candle_frame
+        frame = get_candle_frame(symbol, from_dt, to_dt, tf)'''
+    new = '''    try:
+        from core.cycle_candles import get_active_cycle_context
+        ctx = get_active_cycle_context()
+        frame = ctx.frame(symbol, from_dt, to_dt, tf) if ctx is not None else None
+        if frame is not None:
+            return frame
+        from core.market_data_bridge import get_candle_frame
+        frame = get_candle_frame(symbol, from_dt, to_dt, tf).readonly()'''
+    if old in scan_txt:
+        scan_txt = scan_txt.replace(old, new, 1)
+        print("bridge_get_candle_frame: reads active cycle context")
+    else:
+        print("WARNING: bridge_get_candle_frame not found - run patch_candle_frame.py first")
+
+    # _run_cycle: open/close the context around the cycle
+    old_open = '''        t0 = time.perf_counter()
+        self._prefetched = {}
+        try:
+'''
+    new_open = '''        t0 = time.perf_counter()
+        self._prefetched = {}
+        candle_ctx = None
+        try:
+            from core.cycle_candles import start_cycle_context
+            candle_ctx = start_cycle_context(self._config.timeframes)
+        except Exception as e:
+            logger.debug(f"cycle candle context disabled: {e}")
+        try:
+'''
+    old_close = '''        finally:
+            self._prefetched = {}
+'''
+    new_close = '''        finally:
+            self._prefetched = {}
+            if candle_ctx is not None:
+                from core.cycle_candles import end_cycle_context
+                self._status.candleIO = end_cycle_context(candle_ctx)
+'''
+    if old_open in scan_txt and old_close in scan_txt:
+        scan_txt = scan_txt.replace(old_open, new_open, 1).replace(old_close, new_close, 1)
+        print("_run_cycle: opens/closes cycle candle context")
+    else:
+        die("_run_cycle wrapper not found - run patch_parallel_scan.py first")
+
+    # ScanStatus + /scan/status
+    anchor = "    cycleWallTimeMs: Dict[str, Dict[str, Any]] = {}  # per mode: {last, avg, max, cycles}\n"
+    if anchor in scan_txt:
+        scan_txt = scan_txt.replace(
+            anchor,
+            anchor + "    candleIO: Dict[str, Any] = {}  # last cycle: M5 loads, bars read/saved\n",
+            1,
+        )
+    else:
+        die("ScanStatus.cycleWallTimeMs not found - run patch_parallel_scan.py first")
+
+    old_resp = '''        "cycleWallTimeMs": status.cycleWallTimeMs,
+'''
+    if old_resp in scan_txt:
+        scan_txt = scan_txt.replace(old_resp, old_resp + '''        "candleIO": status.candleIO,
+''', 1)
+        print("/scan/status: added candleIO")
+    else:
+        print("WARNING: /scan/status cycleWallTimeMs anchor not found")
+
+    SCAN.write_text(scan_txt, encoding="utf-8")
+
+print()
+print("=" * 60)
+print("CYCLE CANDLE CONTEXT PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {CTX} (new)")
+print(f"  - {SCAN}")
+print()
+print("Next: Rebuild container and check candleIO in GET /scan/status (and 'Cycle candles:' log lines)")
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Incremental higher-timeframe bar cache for market_data_bridge.get_candles
+
+1. Create core/htf_bar_cache.py (per-(symbol, tf) cache of settled aggregated bars)
+2. get_candle_frame() serves strict H1/H4/D1 requests from the cache:
+   only M5 bars newer than the last settled bucket are loaded and resampled
+3. get_candles() higher-TF dict path goes through get_candle_frame()
+4. Add /api/marketdata/htf-cache endpoint (stats + manual invalidation)
+
+Requires patch_candle_frame.py.
+"""
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+CACHE = ROOT / "core" / "htf_bar_cache.py"
+BRIDGE = ROOT / "core" / "market_data_bridge.py"
+API = ROOT / "api_server.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "candle_frame.py").exists():
+    die("Missing core/candle_frame.py - run patch_candle_frame.py first")
+
+# ============================================================
+# 1. Create htf_bar_cache.py
+# ============================================================
+
+cache_code = '''"""
+htf_bar_cache.py
+----------------
+Incremental cache of aggregated higher-TF bars (H1/H4/D1 derived from M5).
+
+A bucket is "settled" once its window ended more than SETTLE_GRACE_SEC ago
+(late M5 bars from provider lag are still picked up before that). Settled
+buckets never change, so each request only loads M5 from the first unsettled
+bucket onward and re-aggregates that tail (the "live" bucket plus grace).
+
+Cost per scanner cycle is O(new M5 bars) instead of O(lookback).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.candle_frame import CandleFrame, resample_frame
+
+logger = logging.getLogger(__name__)
+
+M5_SEC = 300
+
+# Buckets whose window ended less than this long ago are re-aggregated each time
+SETTLE_GRACE_SEC = int(os.getenv("HTF_CACHE_SETTLE_GRACE_SEC", "900"))
+# Full rebuild interval (picks up backfilled gaps inside settled buckets)
+FULL_REFRESH_SEC = int(os.getenv("HTF_CACHE_FULL_REFRESH_SEC", "21600"))
+# Upper bound on settled bars kept per (symbol, tf)
+MAX_BARS = int(os.getenv("HTF_CACHE_MAX_BARS", "20000"))
+
+LoadM5 = Callable[[datetime, datetime], CandleFrame]
+
+
+class _Entry:
+    __slots__ = ("settled", "settled_until", "start_ts", "built_at", "lock")
+
+    def __init__(self):
+        self.settled: CandleFrame = CandleFrame.empty()
+        self.settled_until: int = 0   # first bucket start that is NOT settled
+        self.start_ts: int = 0        # earliest M5 ts covered by the cache
+        self.built_at: float = 0.0
+        self.lock = threading.Lock()
+
+
+class HTFBarCache:
+    """Per-(symbol, tf) cache of settled aggregated bars."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, int], _Entry] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "rebuilds": 0, "bypass": 0, "m5BarsLoaded": 0, "invalidations": 0}
+
+    def _entry(self, symbol: str, to_sec: int) -> _Entry:
+        key = (symbol.upper(), to_sec)
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:
+                e = _Entry()
+                self._entries[key] = e
+            return e
+
+    def get(
+        self,
+        symbol: str,
+        to_sec: int,
+        from_dt: datetime,
+        to_dt: datetime,
+        load_m5: LoadM5,
+        now_ts: Optional[int] = None,
+    ) -> CandleFrame:
+        """
+        Return strict aggregated bars for [from_dt, to_dt].
+
+        Only near-now requests use the cache; historical ranges (to_dt older
+        than the settle boundary) are aggregated from scratch.
+        """
+        if now_ts is None:
+            now_ts = int(time.time())
+        from_ts = int(from_dt.timestamp())
+        to_ts = int(to_dt.timestamp())
+        settle_boundary = ((now_ts - SETTLE_GRACE_SEC) // to_sec) * to_sec
+
+        if to_ts < settle_boundary:
+            self._stats["bypass"] += 1
+            m5 = load_m5(from_dt, to_dt)
+            self._stats["m5BarsLoaded"] += len(m5)
+            return resample_frame(m5, M5_SEC, to_sec, strict=True, now_ts=now_ts)
+
+        e = self._entry(symbol, to_sec)
+        with e.lock:
+            stale = (time.time() - e.built_at) > FULL_REFRESH_SEC
+            if e.built_at == 0 or from_ts < e.start_ts or stale:
+                self._stats["rebuilds"] += 1
+                e.settled = CandleFrame.empty()
+                e.settled_until = (from_ts // to_sec) * to_sec
+                e.start_ts = from_ts
+                e.built_at = time.time()
+                load_from = from_dt
+            else:
+                self._stats["hits"] += 1
+                # 1s earlier so sources with an exclusive lower bound still return the first bar
+                load_from = datetime.fromtimestamp(e.settled_until - 1, tz=timezone.utc)
+
+            m5 = load_m5(load_from, to_dt).slice_ts(e.settled_until, None)
+            self._stats["m5BarsLoaded"] += len(m5)
+            tail = resample_frame(m5, M5_SEC, to_sec, strict=True, now_ts=now_ts)
+
+            # Settle only buckets the loaded M5 reaches the end of: an empty or
+            # lagging load must not freeze buckets whose bars have not arrived
+            loaded_until = ((int(m5.ts[-1]) + M5_SEC) // to_sec) * to_sec if len(m5) else e.settled_until
+            settle_to = min(settle_boundary, loaded_until)
+            if settle_to > e.settled_until:
+                newly_settled = tail.slice_ts(None, settle_to - 1)
+                e.settled = CandleFrame.concat([e.settled, newly_settled])
+                if len(e.settled) > MAX_BARS:
+                    e.settled = e.settled.tail(MAX_BARS)
+                    e.start_ts = int(e.settled.ts[0])
+                e.settled_until = settle_to
+
+            live = tail.slice_ts(e.settled_until, None)
+            out = CandleFrame.concat([e.settled, live])
+
+        # First bucket must start inside the requested range (matches strict from-scratch output)
+        first_bucket = -(-from_ts // to_sec) * to_sec
+        return out.slice_ts(first_bucket, to_ts)
+
+    def invalidate(self, symbol: Optional[str] = None, before_ts: Optional[int] = None) -> int:
+        """
+        Drop cached bars (e.g. after a backfill). With before_ts, only entries
+        whose settled range reaches past that timestamp are dropped.
+        """
+        dropped = 0
+        with self._lock:
+            for key in list(self._entries.keys()):
+                if symbol and key[0] != symbol.upper():
+                    continue
+                e = self._entries[key]
+                if before_ts is not None and before_ts >= e.settled_until:
+                    continue
+                del self._entries[key]
+                dropped += 1
+        self._stats["invalidations"] += dropped
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = [
+                {
+                    "symbol": sym,
+                    "tfSec": tf_sec,
+                    "settledBars": len(e.settled),
+                    "settledUntil": datetime.fromtimestamp(e.settled_until, tz=timezone.utc).isoformat() if e.settled_until else None,
+                    "ageSec": int(time.time() - e.built_at) if e.built_at else None,
+                }
+                for (sym, tf_sec), e in sorted(self._entries.items())
+            ]
+        return {
+            **self._stats,
+            "settleGraceSec": SETTLE_GRACE_SEC,
+            "fullRefreshSec": FULL_REFRESH_SEC,
+            "entries": entries,
+        }
+
+
+_cache: Optional[HTFBarCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_htf_cache() -> HTFBarCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HTFBarCache()
+    return _cache
+'''
+
+CACHE.write_text(cache_code, encoding="utf-8")
+print(f"Created: {CACHE}")
+
+# ============================================================
+# 2. market_data_bridge.py: route HTF frames through the cache
+# ============================================================
+
+bridge_txt = BRIDGE.read_text(encoding="utf-8")
+original_bridge = bridge_txt
+
+OLD_FRAME_TAIL = '''    tf = _normalize_timeframe(timeframe)
+    m5 = _load_m5_frame(symbol, from_dt, to_dt)
+    if tf in ("m5", "5m") or not len(m5):
+        return m5
+
+    return resample_frame(m5, tf_to_seconds("m5"), tf_to_seconds(tf), strict=strict)'''
+
+NEW_FRAME_TAIL = '''    tf = _normalize_timeframe(timeframe)
+    if tf in ("m5", "5m"):
+        return _load_m5_frame(symbol, from_dt, to_dt)
+
+    # Strict HTF requests: settled buckets come from the incremental cache
+    if strict and USE_HTF_CACHE:
+        from core.htf_bar_cache import get_htf_cache
+        return get_htf_cache().get(
+            symbol,
+            tf_to_seconds(tf),
+            from_dt,
+            to_dt,
+            lambda f, t: _load_m5_frame(symbol, f, t),
+        )
+
+    m5 = _load_m5_frame(symbol, from_dt, to_dt)
+    if not len(m5):
+        return m5
+    return resample_frame(m5, tf_to_seconds("m5"), tf_to_seconds(tf), strict=strict)'''
+
+if "get_htf_cache()" in bridge_txt:
+    print("SKIP: get_candle_frame already uses HTF cache")
+elif OLD_FRAME_TAIL in bridge_txt:
+    bridge_txt = bridge_txt.replace(OLD_FRAME_TAIL, NEW_FRAME_TAIL, 1)
+    print("get_candle_frame now serves HTF bars from htf_bar_cache")
+else:
+    print("WARNING: get_candle_frame body not found - run patch_candle_frame.py first")
+
+if "USE_HTF_CACHE" not in bridge_txt.split("def get_candle_frame(")[0]:
+    anchor = "STRICT_WINDOW_POLICY = True  # Only emit candles for complete windows"
+    if anchor in bridge_txt:
+        bridge_txt = bridge_txt.replace(
+            anchor,
+            anchor + '\nUSE_HTF_CACHE = os.getenv("HTF_BAR_CACHE", "1") != "0"  # Incremental H1/H4/D1 cache',
+            1,
+        )
+        if "\nimport os\n" not in bridge_txt:
+            bridge_txt = bridge_txt.replace("\nimport logging\n", "\nimport logging\nimport os\n", 1)
+        print("Added USE_HTF_CACHE flag")
+    else:
+        print("WARNING: STRICT_WINDOW_POLICY anchor not found - USE_HTF_CACHE not added")
+
+# Dict path for higher TFs: one frame-based path (cached) instead of re-aggregating dicts
+OLD_HTF_DICT = '''    # For higher TFs (H1, H4, D1), derive from M5 via aggregation
+    logger.debug(f"Fetching M5 candles to aggregate to {tf} for {symbol}")'''
+
+NEW_HTF_DICT = '''    # For higher TFs (H1, H4, D1), derive from M5 via the cached frame path
+    if CandleFrame is not None:
+        aggregated = get_candle_frame(symbol, from_dt, to_dt, tf).to_dicts()
+        logger.debug(f"Resolved {len(aggregated)} {tf} candles for {symbol} (frame path)")
+        return aggregated
+
+    logger.debug(f"Fetching M5 candles to aggregate to {tf} for {symbol}")'''
+
+if "(frame path)" in bridge_txt:
+    print("SKIP: get_candles HTF dict path already uses frames")
+elif OLD_HTF_DICT in bridge_txt:
+    bridge_txt = bridge_txt.replace(OLD_HTF_DICT, NEW_HTF_DICT, 1)
+    print("get_candles HTF path now goes through get_candle_frame")
+else:
+    print("WARNING: get_candles HTF aggregation block not found")
+
+if bridge_txt != original_bridge:
+    BRIDGE.write_text(bridge_txt, encoding="utf-8")
+    print(f"Updated: {BRIDGE}")
+
+# ============================================================
+# 3. /api/marketdata/htf-cache endpoint
+# ============================================================
+
+if API.exists():
+    api_txt = API.read_text(encoding="utf-8")
+    if "/api/marketdata/htf-cache" in api_txt:
+        print("NOTE: /api/marketdata/htf-cache endpoint already exists - skipping")
+    else:
+        insert_marker = '@app.get("/api/marketdata/verify")'
+        idx = api_txt.find(insert_marker)
+        if idx != -1:
+            endpoint_code = '''@app.get("/api/marketdata/htf-cache")
+def marketdata_htf_cache(invalidate: str = ""):
+    """
+    Incremental HTF bar cache stats.
+
+    Args:
+        invalidate: symbol to drop from the cache ("ALL" drops everything)
+    """
+    try:
+        from core.htf_bar_cache import get_htf_cache
+        cache = get_htf_cache()
+        dropped = 0
+        if invalidate:
+            dropped = cache.invalidate(None if invalidate.upper() == "ALL" else invalidate)
+        return {"ok": True, "dropped": dropped, **cache.stats()}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+'''
+            api_txt = api_txt[:idx] + endpoint_code + api_txt[idx:]
+            API.write_text(api_txt, encoding="utf-8")
+            print(f"Added /api/marketdata/htf-cache endpoint to: {API}")
+        else:
+            print("WARNING: /api/marketdata/verify not found - run patch_mega1_marketdata.py first")
+else:
+    print(f"NOTE: {API} not found - endpoint skipped")
+
+print()
+print("=" * 60)
+print("HTF BAR CACHE PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {CACHE} (new)")
+print(f"  - {BRIDGE}")
+print(f"  - {API}")
+print()
+print("Env: HTF_BAR_CACHE=0 disables, HTF_CACHE_SETTLE_GRACE_SEC / HTF_CACHE_FULL_REFRESH_SEC / HTF_CACHE_MAX_BARS tune it")
+print("Next: Rebuild container and check GET /api/marketdata/htf-cache after two scanner cycles")
@@ -0,0 +1,958 @@
+#!/usr/bin/env python3
+"""
+Event-driven batch outcome resolution
+
+1. Create core/outcome_engine.py: open signals grouped by symbol; every M5
+   append resolves all of that symbol's signals at once with a vectorized
+   first-touch search over the new highs/lows (TP / SL / EXPIRED).
+2. marketdata_store.py: subscribe the engine to M5 append events.
+3. scan_engine_v2.py: signals passed to append_result() are tracked.
+4. /api/outcomes (stats alias), /api/outcomes/stats, /api/outcomes/check
+   answer from the engine (?source=legacy keeps the old handlers);
+   GET /api/outcomes/list (open + latest resolutions), POST /api/outcomes/track.
+5. The hourly outcome_check job becomes an incremental reconcile (safety net
+   for missed appends / restarts). The legacy check keeps running in the same
+   job until it reports no pending signals, so signals it already holds (and
+   /api/outcomes/{signal_id}) still resolve.
+
+Requires patch_m5_binary_store.py (marketdata_events) and patch_vectorized_backtest.py.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+ENGINE = ROOT / "core" / "outcome_engine.py"
+STORE = ROOT / "core" / "marketdata_store.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "marketdata_events.py").exists():
+    die("Missing core/marketdata_events.py - run patch_m5_binary_store.py first")
+
+def py_files():
+    for pattern in ("*.py", "*/*.py"):
+        for p in sorted(ROOT.glob(pattern)):
+            if "venv" in p.parts or p == ENGINE:
+                continue
+            yield p
+
+# ============================================================
+# 1. Create outcome_engine.py
+# ============================================================
+
+engine_code = '''"""
+outcome_engine.py
+-----------------
+Batch, event-driven SL/TP outcome resolution for open signals.
+
+Signals were checked one at a time by the hourly outcome_check job, which
+re-read candle history for each. Here open signals are grouped by symbol and
+resolved when bars arrive:
+
+- on every M5 append (marketdata_events) the symbol's open signals are
+  checked against the new bars only, in one vectorized pass (signals x bars
+  first-touch, same intrabar policy as the vectorized backtest)
+- a per-symbol cursor records the last bar checked; track() of a signal older
+  than the cursor catches it up from stored candles immediately
+- no touch within OUTCOME_MAX_BARS bars of the signal TF -> EXPIRED
+- the last OUTCOME_RESOLVED_KEEP resolved ids are kept; track() skips them,
+  so a re-sent signal is not reopened and counted twice
+- reconcile() (outcome_check job, /api/outcomes/check) re-checks from the
+  cursor; it is the safety net for restarts, not the main path. Expiry only
+  follows stored bars, never the wall clock, so a lagging store cannot expire
+  a signal that may still have touched
+
+State: state/outcomes/open.json (open book, cursors, resolved ids; rewritten atomically
+under a file lock so the ingestor and API processes can share it) and
+state/outcomes/resolved.jsonl (append-only, read through results_log).
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX dev boxes: thread lock only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = Path(os.getenv("STATE_DIR", "state"))
+OUTCOMES_DIR = STATE_DIR / "outcomes"
+OPEN_FILE = OUTCOMES_DIR / "open.json"
+RESOLVED_FILE = OUTCOMES_DIR / "resolved.jsonl"
+LOCK_FILE = OUTCOMES_DIR / ".lock"
+
+OUTCOME_MAX_BARS = int(os.getenv("OUTCOME_MAX_BARS", os.getenv("BACKTEST_MAX_BARS_IN_TRADE", "200")))
+OUTCOME_INTRABAR_POLICY = os.getenv("OUTCOME_INTRABAR_POLICY", "sl_first")
+# Resolved ids remembered so a re-sent signal is not tracked (and resolved) again
+OUTCOME_RESOLVED_KEEP = int(os.getenv("OUTCOME_RESOLVED_KEEP", "50000"))
+BAR_BLOCK = 2048
+M5_SEC = 300
+
+TF_SECONDS = {"M1": 60, "M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400, "D1": 86400}
+STATUS_BY_OUTCOME = {"TP": "hit_tp", "SL": "hit_sl", "EXPIRED": "expired"}
+
+OutcomeListener = Callable[[List[Dict[str, Any]]], None]
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts is not None else None
+
+
+def _parse_ts(value: Any) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value / 1000 if value > 1e11 else value)
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _tf_seconds(tf: Any) -> int:
+    t = str(tf or "M5").upper().strip()
+    if t in TF_SECONDS:
+        return TF_SECONDS[t]
+    # "15m" / "1h" / "4H" style
+    num, unit = t[:-1], t[-1:]
+    if num.isdigit() and unit in ("M", "H", "D"):
+        return int(num) * {"M": 60, "H": 3600, "D": 86400}[unit]
+    if t[1:].isdigit() and t[0] in ("M", "H", "D"):
+        return int(t[1:]) * {"M": 60, "H": 3600, "D": 86400}[t[0]]
+    return M5_SEC
+
+
+def _first(d: Dict[str, Any], *keys: str) -> Any:
+    for k in keys:
+        if d.get(k) not in (None, ""):
+            return d[k]
+    return None
+
+
+def normalize_signal(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Scanner / dashboard signal dict -> tracked signal, or None if it has no levels."""
+    symbol = _first(raw, "symbol", "pair")
+    entry = _first(raw, "entry", "entry_price", "entryPrice")
+    sl = _first(raw, "sl", "stop_loss", "stopLoss")
+    tp = _first(raw, "tp", "take_profit", "takeProfit")
+    direction = str(_first(raw, "direction", "side", "dir") or "").upper()
+    if symbol is None or entry is None or sl is None or tp is None or not direction:
+        return None
+    try:
+        entry, sl, tp = float(entry), float(sl), float(tp)
+    except (TypeError, ValueError):
+        return None
+    is_long = direction in ("BUY", "LONG", "BULL", "BULLISH", "UP")
+    if (is_long and not sl < entry < tp) or (not is_long and not tp < entry < sl):
+        return None
+    ts = _parse_ts(_first(raw, "generated_at", "ts", "createdAt", "timestamp", "time"))
+    if ts is None:
+        ts = int(time.time())
+    tf = str(_first(raw, "timeframe", "tf") or "M5")
+    key = signal_key = _first(raw, "signal_key", "signal_id", "signalKey", "id", "key")
+    if key is None:
+        key = hashlib.blake2b(f"{symbol}|{tf}|{ts}|{direction}|{entry}".encode(), digest_size=10).hexdigest()
+    max_bars = int(raw.get("max_bars") or OUTCOME_MAX_BARS)
+    return {
+        "id": str(key),
+        "signalKey": None if signal_key is None else str(signal_key),
+        "symbol": str(symbol).upper(),
+        "tf": tf,
+        "direction": "BUY" if is_long else "SELL",
+        "entry": entry,
+        "sl": sl,
+        "tp": tp,
+        "rr": round(abs(tp - entry) / abs(entry - sl), 4),
+        "openedAt": ts,
+        "expiresAt": ts + max_bars * _tf_seconds(tf),
+        "userId": raw.get("user_id") or raw.get("userId"),
+        "strategyId": raw.get("strategy_id") or raw.get("strategyId"),
+    }
+
+
+def first_touch_bars(
+    ts: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    start: np.ndarray,
+    expires: np.ndarray,
+    sl: np.ndarray,
+    tp: np.ndarray,
+    is_long: np.ndarray,
+    tp_first: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    m signals x k bars: first bar with start <= ts < expires touching SL or TP.
+
+    Returns (bar_idx, outcome) with outcome 1 TP, -1 SL, 2 EXPIRED (a bar at or
+    past expires was seen without a touch), 0 still open; bar_idx -1 if open.
+    Bars are processed in BAR_BLOCK columns; resolved signals drop out.
+    """
+    m, k = len(start), len(ts)
+    bar_idx = np.full(m, -1, dtype=np.int64)
+    outcome = np.zeros(m, dtype=np.int8)
+    pending = np.arange(m)
+    for b0 in range(0, k, BAR_BLOCK):
+        if not pending.size:
+            break
+        t, h, l = ts[b0:b0 + BAR_BLOCK], high[b0:b0 + BAR_BLOCK], low[b0:b0 + BAR_BLOCK]
+        span = len(t)
+        win = (t[None, :] >= start[pending, None]) & (t[None, :] < expires[pending, None])
+        lng = is_long[pending, None]
+        s, g = sl[pending, None], tp[pending, None]
+        sl_hit = np.where(lng, l[None, :] <= s, h[None, :] >= s) & win
+        tp_hit = np.where(lng, h[None, :] >= g, l[None, :] <= g) & win
+        first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), span)
+        first_tp = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), span)
+        hit = (first_sl < span) | (first_tp < span)
+        sl_wins = (first_sl < first_tp) | ((first_sl == first_tp) & ~tp_first)
+        done = pending[hit]
+        bar_idx[done] = b0 + np.minimum(first_sl, first_tp)[hit]
+        outcome[done] = np.where(sl_wins[hit], -1, 1)
+        pending = pending[~hit]
+    if pending.size and k:
+        expired = pending[expires[pending] <= ts[-1]]
+        outcome[expired] = 2
+        bar_idx[expired] = np.minimum(np.searchsorted(ts, expires[expired], side="left"), k - 1)
+    return bar_idx, outcome
+
+
+def _load_bars(symbol: str, from_ts: int, to_ts: Optional[int] = None):
+    from core.market_data_bridge import get_candle_frame
+    from_dt = datetime.fromtimestamp((from_ts // M5_SEC) * M5_SEC, tz=timezone.utc)
+    to_dt = datetime.fromtimestamp(to_ts, tz=timezone.utc) if to_ts else datetime.now(timezone.utc)
+    return get_candle_frame(symbol, from_dt, to_dt, "m5")
+
+
+class OutcomeEngine:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._open: Dict[str, Dict[str, Dict[str, Any]]] = {}  # symbol -> id -> signal
+        self._cursor: Dict[str, int] = {}  # symbol -> last M5 bar ts checked
+        self._resolved: Dict[str, None] = {}  # resolved ids, oldest first (OUTCOME_RESOLVED_KEEP)
+        self._mtime_ns = -1
+        self._listeners: List[Tuple[str, OutcomeListener]] = []
+        self._stats = {"tracked": 0, "skipped": 0, "alreadyResolved": 0, "resolved": 0, "appendEvents": 0,
+                       "reconciles": 0, "lastResolveMs": 0.0}
+        self._latency: List[float] = []
+
+    # --------------------------------------------------------
+    # Persistence (shared between processes)
+    # --------------------------------------------------------
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            OUTCOMES_DIR.mkdir(parents=True, exist_ok=True)
+            with open(LOCK_FILE, "a+") as fh:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    self._reload()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _reload(self) -> None:
+        try:
+            mtime = OPEN_FILE.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime_ns:
+            return
+        try:
+            data = json.loads(OPEN_FILE.read_text())
+        except Exception as e:
+            logger.warning(f"outcome book unreadable: {e}")
+            return
+        self._open = {}
+        for sig in data.get("open", []):
+            self._open.setdefault(sig["symbol"], {})[sig["id"]] = sig
+        self._cursor = {k: int(v) for k, v in data.get("cursor", {}).items()}
+        self._resolved = dict.fromkeys(data["resolved"]) if "resolved" in data else self._seed_resolved()
+        self._mtime_ns = mtime
+
+    def _seed_resolved(self) -> Dict[str, None]:
+        """Resolved ids from resolved.jsonl, for a book saved before it kept them."""
+        if not RESOLVED_FILE.exists():
+            return {}
+        try:
+            try:
+                from core.results_log import get_results_log
+                records = get_results_log(RESOLVED_FILE).tail(OUTCOME_RESOLVED_KEEP)
+            except ImportError:
+                records = self._resolved_since(0)[-OUTCOME_RESOLVED_KEEP:]
+        except Exception as e:
+            logger.warning(f"resolved outcomes unreadable, re-tracked signals may resolve twice: {e}")
+            return {}
+        return dict.fromkeys(str(r["id"]) for r in records if r.get("id") is not None)
+
+    def _mark_resolved(self, records: List[Dict[str, Any]]) -> None:
+        for r in records:
+            self._resolved.pop(r["id"], None)
+            self._resolved[r["id"]] = None
+        excess = len(self._resolved) - OUTCOME_RESOLVED_KEEP
+        if excess > 0:
+            self._resolved = dict.fromkeys(list(self._resolved)[excess:])
+
+    def _save(self) -> None:
+        tmp = OPEN_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "open": [s for book in self._open.values() for s in book.values()],
+            "cursor": self._cursor,
+            "resolved": list(self._resolved),
+        }))
+        os.replace(tmp, OPEN_FILE)
+        self._mtime_ns = OPEN_FILE.stat().st_mtime_ns
+
+    def _has_open(self, symbol: str) -> bool:
+        try:
+            if OPEN_FILE.stat().st_mtime_ns != self._mtime_ns:
+                with self._locked():
+                    pass
+        except FileNotFoundError:
+            pass
+        return bool(self._open.get(symbol))
+
+    # --------------------------------------------------------
+    # Intake
+    # --------------------------------------------------------
+    def track(self, raw: Any) -> Dict[str, Any]:
+        """Register one signal or a list; signals already behind the cursor are caught up at once."""
+        items = raw if isinstance(raw, list) else [raw]
+        added: Dict[str, List[Dict[str, Any]]] = {}
+        already = 0
+        with self._locked():
+            for item in items:
+                sig = normalize_signal(item) if isinstance(item, dict) else None
+                if sig is None:
+                    self._stats["skipped"] += 1
+                    continue
+                if sig["id"] in self._resolved:
+                    already += 1
+                    continue
+                book = self._open.setdefault(sig["symbol"], {})
+                if sig["id"] in book:
+                    continue
+                book[sig["id"]] = sig
+                added.setdefault(sig["symbol"], []).append(sig)
+                self._stats["tracked"] += 1
+            self._stats["alreadyResolved"] += already
+            if added:
+                self._save()
+        resolved: List[Dict[str, Any]] = []
+        for symbol, sigs in added.items():
+            cursor = self._cursor.get(symbol)
+            oldest = min(s["openedAt"] for s in sigs)
+            if cursor is not None and oldest <= cursor:
+                resolved += self._resolve_from_store(symbol, oldest, ids={s["id"] for s in sigs}, upto=cursor)
+        return {"tracked": sum(len(v) for v in added.values()), "alreadyResolved": already,
+                "resolvedImmediately": len(resolved)}
+
+    # --------------------------------------------------------
+    # Resolution
+    # --------------------------------------------------------
+    def on_append(self, symbol: str, tf: str, frame) -> None:
+        """marketdata_events listener: resolve the symbol's open signals against the new bars."""
+        symbol = symbol.upper()
+        if not self._has_open(symbol):
+            return
+        self._stats["appendEvents"] += 1
+        if frame is not None and not len(frame):
+            return
+        cursor = self._cursor.get(symbol)
+        if frame is None or cursor is None or int(frame.ts[0]) > cursor + M5_SEC:
+            # Bars since the last check are not all in this event: read them from the store
+            self._resolve_from_store(symbol, cursor)
+            return
+        self._resolve(symbol, frame, advance_cursor=True)
+
+    def _resolve_from_store(self, symbol: str, from_ts: Optional[int], ids: Optional[set] = None,
+                            upto: Optional[int] = None) -> List[Dict[str, Any]]:
+        book = self._open.get(symbol) or {}
+        if from_ts is None:
+            if not book:
+                return []
+            from_ts = min(s["openedAt"] for s in book.values())
+        frame = _load_bars(symbol, from_ts, upto)
+        if not len(frame):
+            return []
+        return self._resolve(symbol, frame, ids=ids, advance_cursor=ids is None)
+
+    def _resolve(self, symbol: str, frame, ids: Optional[set] = None, advance_cursor: bool = False) -> List[Dict[str, Any]]:
+        t0 = time.perf_counter()
+        records: List[Dict[str, Any]] = []
+        with self._locked():
+            book = self._open.get(symbol) or {}
+            sigs = [s for s in book.values() if ids is None or s["id"] in ids]
+            cursor = self._cursor.get(symbol)
+            ts = np.asarray(frame.ts, dtype=np.int64)
+            if sigs:
+                # From the cursor bar on: it may have been re-appended with a new high/low
+                # (ids: catch-up of late signals up to the cursor)
+                start = np.array([s["openedAt"] if ids is not None or cursor is None else max(s["openedAt"], cursor)
+                                  for s in sigs], dtype=np.int64)
+                bar_idx, outcome = first_touch_bars(
+                    ts, np.asarray(frame.high, dtype=float), np.asarray(frame.low, dtype=float),
+                    start,
+                    np.array([s["expiresAt"] for s in sigs], dtype=np.int64),
+                    np.array([s["sl"] for s in sigs], dtype=float),
+                    np.array([s["tp"] for s in sigs], dtype=float),
+                    np.array([s["direction"] == "BUY" for s in sigs], dtype=bool),
+                    tp_first=OUTCOME_INTRABAR_POLICY.lower() == "tp_first",
+                )
+                now = time.time()
+                for i in np.flatnonzero(outcome):
+                    sig, b = sigs[i], int(bar_idx[i])
+                    name = {1: "TP", -1: "SL", 2: "EXPIRED"}[int(outcome[i])]
+                    bar_close = int(ts[b]) + M5_SEC
+                    records.append({
+                        **sig,
+                        "openedAt": _iso(sig["openedAt"]),
+                        "expiresAt": _iso(sig["expiresAt"]),
+                        "outcome": name,
+                        "status": STATUS_BY_OUTCOME[name],
+                        "resolvedAt": _iso(int(ts[b]) if name != "EXPIRED" else sig["expiresAt"]),
+                        "resolvedPrice": sig["tp"] if name == "TP" else sig["sl"] if name == "SL" else float(frame.close[b]),
+                        "r": sig["rr"] if name == "TP" else -1.0 if name == "SL" else 0.0,
+                        "latencySec": round(max(0.0, now - bar_close), 1),
+                        "ts": datetime.now(timezone.utc).isoformat(),
+                    })
+                    del book[sig["id"]]
+                self._mark_resolved(records)
+            if advance_cursor and len(ts):
+                self._cursor[symbol] = max(int(ts[-1]), cursor or 0)
+            if records or advance_cursor:
+                self._save()
+            if records:
+                with open(RESOLVED_FILE, "a", encoding="utf-8") as f:
+                    for r in records:
+                        f.write(json.dumps(r, default=str) + "\\n")
+                self._stats["resolved"] += len(records)
+                self._latency = (self._latency + [r["latencySec"] for r in records])[-500:]
+        self._stats["lastResolveMs"] = round((time.perf_counter() - t0) * 1000, 3)
+        if records:
+            logger.info(f"outcomes {symbol}: " + ", ".join(f"{r['id']}={r['outcome']}" for r in records))
+            self._notify(records)
+        return records
+
+    def reconcile(self) -> Dict[str, Any]:
+        """Re-check every symbol from its cursor bar (outcome_check job)."""
+        t0 = time.perf_counter()
+        with self._locked():
+            symbols = [s for s, book in self._open.items() if book]
+        resolved: List[Dict[str, Any]] = []
+        errors: Dict[str, str] = {}
+        for symbol in symbols:
+            try:
+                resolved += self._resolve_from_store(symbol, self._cursor.get(symbol))
+            except Exception as e:
+                errors[symbol] = str(e)
+                logger.warning(f"outcome reconcile {symbol} failed: {e}")
+        resolved += self._expire_covered(skip=errors)
+        self._stats["reconciles"] += 1
+        return {
+            "symbols": len(symbols),
+            "resolved": len(resolved),
+            "open": sum(len(b) for b in self._open.values()),
+            "errors": errors,
+            "elapsedMs": round((time.perf_counter() - t0) * 1000, 1),
+        }
+
+    def _expire_covered(self, skip: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Expire signals whose expiry the checked bars (cursor) have reached; symbols in `skip` failed to load."""
+        now = int(time.time())
+        records = []
+        with self._locked():
+            for symbol, book in self._open.items():
+                covered = self._cursor.get(symbol)
+                if symbol in skip or covered is None:
+                    continue
+                for sig in [s for s in book.values() if s["expiresAt"] <= covered]:
+                    records.append({
+                        **sig,
+                        "openedAt": _iso(sig["openedAt"]),
+                        "expiresAt": _iso(sig["expiresAt"]),
+                        "outcome": "EXPIRED",
+                        "status": "expired",
+                        "resolvedAt": _iso(sig["expiresAt"]),
+                        "resolvedPrice": None,
+                        "r": 0.0,
+                        "latencySec": round(max(0.0, now - sig["expiresAt"]), 1),
+                        "ts": datetime.now(timezone.utc).isoformat(),
+                    })
+                    del book[sig["id"]]
+            if records:
+                self._mark_resolved(records)
+                self._save()
+                with open(RESOLVED_FILE, "a", encoding="utf-8") as f:
+                    for r in records:
+                        f.write(json.dumps(r, default=str) + "\\n")
+                self._stats["resolved"] += len(records)
+        if records:
+            self._notify(records)
+        return records
+
+    # --------------------------------------------------------
+    # Listeners (dashboard sync, notifications)
+    # --------------------------------------------------------
+    def subscribe(self, name: str, fn: OutcomeListener) -> None:
+        """fn(records) after each batch of resolutions; same name replaces."""
+        with self._lock:
+            self._listeners = [(n, f) for n, f in self._listeners if n != name] + [(name, fn)]
+
+    def _notify(self, records: List[Dict[str, Any]]) -> None:
+        for name, fn in list(self._listeners):
+            try:
+                fn(records)
+            except Exception as e:
+                logger.warning(f"outcome listener {name} failed: {e}")
+
+    # --------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------
+    def _resolved_since(self, since_ts: float, limit: int = 100000) -> List[Dict[str, Any]]:
+        if not RESOLVED_FILE.exists():
+            return []
+        try:
+            from core.results_log import get_results_log
+            return get_results_log(RESOLVED_FILE).since(since_ts, limit=limit)
+        except ImportError:
+            out = []
+            with open(RESOLVED_FILE, encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
+                    if (_parse_ts(rec.get("ts")) or 0) >= since_ts:
+                        out.append(rec)
+            return out[:limit]
+
+    def list(self, limit: int = 100, symbol: Optional[str] = None, status: Optional[str] = None) -> Dict[str, Any]:
+        with self._locked():
+            open_sigs = [
+                {**s, "openedAt": _iso(s["openedAt"]), "expiresAt": _iso(s["expiresAt"]), "status": "pending"}
+                for book in self._open.values() for s in book.values()
+            ]
+        resolved: List[Dict[str, Any]] = []
+        if RESOLVED_FILE.exists():
+            try:
+                from core.results_log import get_results_log
+                resolved = get_results_log(RESOLVED_FILE).tail(max(limit, 1) * (4 if symbol or status else 1))
+            except ImportError:
+                resolved = self._resolved_since(0)[-limit:]
+        if symbol:
+            open_sigs = [s for s in open_sigs if s["symbol"] == symbol.upper()]
+            resolved = [r for r in resolved if r.get("symbol") == symbol.upper()]
+        if status:
+            resolved = [r for r in resolved if status in (r.get("status"), r.get("outcome"))]
+        resolved = resolved[-limit:][::-1]
+        return {"open": open_sigs, "outcomes": resolved, "count": len(resolved), "openCount": len(open_sigs)}
+
+    def stats(self, days: int = 30) -> Dict[str, Any]:
+        records = self._resolved_since(time.time() - days * 86400)
+        by_symbol: Dict[str, Dict[str, Any]] = {}
+        totals = {"TP": 0, "SL": 0, "EXPIRED": 0}
+        r_sum = 0.0
+        for rec in records:
+            name = rec.get("outcome")
+            if name not in totals:
+                continue
+            totals[name] += 1
+            r_sum += float(rec.get("r") or 0.0)
+            s = by_symbol.setdefault(rec.get("symbol", "?"), {"tp": 0, "sl": 0, "expired": 0, "r": 0.0})
+            s[name.lower()] += 1
+            s["r"] = round(s["r"] + float(rec.get("r") or 0.0), 4)
+        decided = totals["TP"] + totals["SL"]
+        for s in by_symbol.values():
+            d = s["tp"] + s["sl"]
+            s["winRate"] = round(100.0 * s["tp"] / d, 2) if d else None
+        lat = sorted(float(r.get("latencySec") or 0.0) for r in records if r.get("outcome") != "EXPIRED")
+        return {
+            "days": days,
+            "total": len(records),
+            "tp": totals["TP"],
+            "sl": totals["SL"],
+            "expired": totals["EXPIRED"],
+            "winRate": round(100.0 * totals["TP"] / decided, 2) if decided else None,
+            "totalR": round(r_sum, 4),
+            "avgR": round(r_sum / decided, 4) if decided else None,
+            "open": sum(len(b) for b in self._open.values()),
+            "bySymbol": by_symbol,
+            "latencySec": {
+                "p50": lat[len(lat) // 2] if lat else None,
+                "max": lat[-1] if lat else None,
+            },
+        }
+
+    def engine_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "open": sum(len(b) for b in self._open.values()),
+            "symbols": sorted(s for s, b in self._open.items() if b),
+            "cursor": {s: _iso(c) for s, c in self._cursor.items()},
+        }
+
+
+_engine: Optional[OutcomeEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_outcome_engine() -> OutcomeEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = OutcomeEngine()
+    return _engine
+
+
+def enable_outcome_engine() -> None:
+    """Resolve open signals on every M5 append in this process."""
+    if os.getenv("OUTCOME_ENGINE", "1") == "0":
+        return
+    from core.marketdata_events import subscribe_m5_append
+    subscribe_m5_append("outcome_engine", get_outcome_engine().on_append)
+
+
+def reconcile_job() -> Dict[str, Any]:
+    """APScheduler outcome_check: incremental reconcile (appends resolve in real time)."""
+    res = get_outcome_engine().reconcile()
+    logger.info(f"outcome reconcile: {res}")
+    return res
+
+
+def _legacy_drained(res: Any) -> bool:
+    """True when the legacy check reports nothing left to resolve."""
+    if isinstance(res, dict):
+        for key in ("pending", "remaining", "open", "checked"):
+            if key in res:
+                try:
+                    return int(res[key]) == 0
+                except (TypeError, ValueError):
+                    return False
+    return False
+
+
+def outcome_job(legacy_check: Optional[Callable] = None) -> Callable[[], Dict[str, Any]]:
+    """
+    outcome_check job: engine reconcile, plus the legacy check while it still holds pending signals.
+
+    Signals tracked by the legacy system before the engine existed are only in
+    its store (and /api/outcomes/{signal_id} reads that store), so its check
+    keeps running until it reports none pending. OUTCOME_LEGACY_JOB=1 always
+    runs it, 0 never.
+    """
+    mode = os.getenv("OUTCOME_LEGACY_JOB", "auto")
+    state = {"drained": legacy_check is None or mode == "0"}
+
+    def job() -> Dict[str, Any]:
+        res = reconcile_job()
+        if state["drained"]:
+            return res
+        try:
+            legacy = legacy_check()
+        except Exception as e:
+            logger.warning(f"legacy outcome check failed: {e}")
+            return res
+        if mode != "1" and _legacy_drained(legacy):
+            state["drained"] = True
+            logger.info("legacy outcome store has no pending signals - outcome_check runs the engine only")
+        return {**res, "legacy": legacy}
+
+    job.__name__ = job.__qualname__ = "outcome_check"
+    return job
+
+
+def attach_scan_engine(ns: Dict[str, Any]) -> None:
+    """Track every signal the scanner persists through append_result()."""
+    original = ns.get("append_result")
+    if original is None or getattr(original, "_outcome_tracked", False):
+        return
+
+    @functools.wraps(original)
+    def append_result(result, *args, **kwargs):
+        out = original(result, *args, **kwargs)
+        try:
+            if isinstance(result, dict) and normalize_signal(result) is not None:
+                get_outcome_engine().track(result)
+        except Exception as e:
+            logger.warning(f"outcome tracking failed: {e}")
+        return out
+
+    append_result._outcome_tracked = True
+    ns["append_result"] = append_result
+
+
+def _coerce(value: str, annotation: Any) -> Any:
+    kind = annotation if isinstance(annotation, str) else getattr(annotation, "__name__", "")
+    if kind.startswith("Optional["):
+        kind = kind[9:-1]
+    if kind == "int":
+        return int(value)
+    if kind == "float":
+        return float(value)
+    if kind == "bool":
+        return value.lower() in ("1", "true", "yes")
+    return value
+
+
+async def call_legacy(fn: Callable, request: Any) -> Any:
+    """Call a replaced route handler with the request's query params / JSON body (source=legacy)."""
+    kwargs: Dict[str, Any] = {}
+    for name, p in inspect.signature(fn).parameters.items():
+        if name == "request":
+            kwargs[name] = request
+        elif name in request.query_params:
+            kwargs[name] = _coerce(request.query_params[name], p.annotation)
+        elif name in ("payload", "body") or p.annotation in (dict, "dict"):
+            try:
+                kwargs[name] = await request.json()
+            except Exception:
+                kwargs[name] = {}
+    res = fn(**kwargs)
+    return await res if inspect.isawaitable(res) else res
+'''
+
+ENGINE.write_text(engine_code, encoding="utf-8")
+print(f"Created: {ENGINE}")
+
+# ============================================================
+# 2. marketdata_store.py: subscribe to M5 appends
+# ============================================================
+
+if STORE.exists():
+    store_txt = STORE.read_text(encoding="utf-8")
+    if "enable_outcome_engine" in store_txt:
+        print("SKIP: outcome engine already subscribed")
+    else:
+        anchor = "    enable_symbol_heads()\n"
+        if anchor in store_txt:
+            store_txt = store_txt.replace(
+                anchor,
+                anchor + "    from core.outcome_engine import enable_outcome_engine\n    enable_outcome_engine()\n",
+                1,
+            )
+            STORE.write_text(store_txt, encoding="utf-8")
+            print("Outcome engine subscribed to M5 appends")
+        else:
+            print("WARNING: symbol head hook block not found - run patch_symbol_head_index.py first")
+else:
+    print(f"WARNING: {STORE} not found")
+
+# ============================================================
+# 3. scan_engine_v2.py: track persisted signals
+# ============================================================
+
+if SCAN.exists():
+    scan_txt = SCAN.read_text(encoding="utf-8")
+    if "attach_scan_engine" in scan_txt:
+        print("SKIP: scan_engine_v2 signals already tracked")
+    elif "def append_result(" not in scan_txt:
+        print("WARNING: append_result() not found in scan_engine_v2 - use POST /api/outcomes/track")
+    else:
+        scan_txt = scan_txt.rstrip("\n") + '''
+
+
+# Outcome engine: track signals as they are persisted (patch_outcome_engine.py)
+try:
+    from core.outcome_engine import attach_scan_engine
+    attach_scan_engine(globals())
+except Exception as e:
+    logger.warning(f"outcome tracking disabled: {e}")
+'''
+        SCAN.write_text(scan_txt, encoding="utf-8")
+        print(f"Patched: {SCAN}")
+else:
+    print(f"WARNING: {SCAN} not found")
+
+# ============================================================
+# 4. Routes
+# ============================================================
+
+def find_route(txt, method, path):
+    """Match of '@obj.method("path")' + handler def: groups (decorator, obj, def, name, params)."""
+    return re.compile(
+        r'(@(\w+)\.' + method + r'\(\s*"' + re.escape(path) + r'"[^\n]*\)\n)'
+        r'((?:async\s+)?def\s+(\w+)\(([^)]*)\))'
+    ).search(txt)
+
+def detach(txt, m):
+    """Drop the route decorator (handler stays as a plain function); returns (txt, end of handler)."""
+    txt = txt[:m.start()] + m.group(3) + txt[m.end():]
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.start() + len(m.group(3)))
+    return txt, (nxt.end() if nxt else len(txt))
+
+HANDLERS = {
+    "/api/outcomes": '''async def outcomes_engine(request: Request, days: int = Query(30, ge=1, le=365), source: str = "engine"):
+    """Alias for /api/outcomes/stats (frontend default path)."""
+    from core.outcome_engine import get_outcome_engine
+__LEGACY__    return {"ok": True, **get_outcome_engine().stats(days)}
+''',
+    "/api/outcomes/stats": '''async def outcomes_stats_engine(request: Request, days: int = Query(30, ge=1, le=365),
+                                source: str = "engine"):
+    """TP/SL/expired counts, win rate, R and resolve latency over `days`."""
+    from core.outcome_engine import get_outcome_engine
+__LEGACY__    return {"ok": True, **get_outcome_engine().stats(days)}
+''',
+    "/api/outcomes/check": '''async def outcomes_check_engine(request: Request, source: str = "engine"):
+    """Incremental reconcile from each symbol's cursor (outcomes normally resolve on M5 append)."""
+    import asyncio
+    from core.outcome_engine import get_outcome_engine
+__LEGACY__    return {"ok": True, **(await asyncio.to_thread(get_outcome_engine().reconcile)), "engine": get_outcome_engine().engine_stats()}
+''',
+}
+
+LEGACY_BLOCK = '''    if source == "legacy":
+        from core.outcome_engine import call_legacy
+        return await call_legacy(__NAME__, request)
+'''
+
+ROUTE_FILE = ROOT / "api_server.py"
+found = {}
+for p in [ROUTE_FILE] + list(py_files()):
+    if not p.exists():
+        continue
+    t = p.read_text(encoding="utf-8")
+    for path in HANDLERS:
+        if path in found:
+            continue
+        for method in ("get", "post"):
+            if find_route(t, method, path):
+                found[path] = (p, method)
+                break
+if found:
+    ROUTE_FILE = next(iter(found.values()))[0]
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+if "outcomes_engine(" in txt:
+    print("SKIP: /api/outcomes routes already on the outcome engine")
+else:
+    imports = []
+    for name in ("Query", "Request"):
+        if not re.search(r"^from fastapi import [^\n]*\b" + name + r"\b", txt, re.M):
+            imports.append(f"from fastapi import {name}")
+    if not re.search(r"^from typing import [^\n]*\bOptional\b", txt, re.M):
+        imports.append("from typing import Optional")
+    if imports:
+        first = re.search(r"^(?:from \S+ import [^\n(]+|import [^\n]+)\n", txt, re.M)
+        at = first.end() if first else 0
+        txt = txt[:at] + "\n".join(imports) + "\n" + txt[at:]
+
+    app = re.search(r"^(\w+)\s*=\s*FastAPI\(", txt, re.M)
+    obj = app.group(1) if app else "app"
+    last_dec = None
+    for path, handler in HANDLERS.items():
+        method = found[path][1] if path in found and found[path][0] == ROUTE_FILE else "get"
+        m = find_route(txt, method, path)
+        if m is not None:
+            dec, legacy = m.group(1), m.group(4)
+            txt, end = detach(txt, m)
+            block = dec + handler.replace("__LEGACY__", LEGACY_BLOCK.replace("__NAME__", legacy))
+            txt = txt[:end] + block + "\n\n" + txt[end:]
+            last_dec = dec
+            print(f"{method.upper()} {path} -> outcome engine (source=legacy -> {legacy})")
+        else:
+            if path in found:
+                print(f"WARNING: {path} is defined in {found[path][0].name} - engine route added to {ROUTE_FILE.name} too")
+            else:
+                print(f"WARNING: {path} route not found - adding it")
+            txt = txt.rstrip("\n") + f'\n\n\n@{obj}.{method}("{path}")\n' + handler.replace("__LEGACY__", "")
+    def new_dec(method, path):
+        if last_dec is None:
+            return f'@{obj}.{method}("{path}")\n'
+        return re.sub(r"\.(get|post)\(\s*\"[^\"]+\"", f'.{method}("{path}"', last_dec, count=1)
+
+    list_route = new_dec("get", "/api/outcomes/list") + '''async def outcomes_list(limit: int = 100, symbol: Optional[str] = None, status: Optional[str] = None):
+    """Open signals and the latest resolutions (newest first)."""
+    from core.outcome_engine import get_outcome_engine
+    return {"ok": True, **get_outcome_engine().list(limit=limit, symbol=symbol, status=status)}
+'''
+    by_id = find_route(txt, "get", "/api/outcomes/{signal_id}")
+    if by_id is not None:
+        # Registered before the path parameter route, which would otherwise match "list"
+        txt = txt[:by_id.start()] + list_route + "\n\n" + txt[by_id.start():]
+    else:
+        txt = txt.rstrip("\n") + "\n\n\n" + list_route
+    print("GET /api/outcomes/list -> outcome engine")
+    txt = txt.rstrip("\n") + "\n\n\n" + new_dec("post", "/api/outcomes/track") + '''def outcomes_track(payload: dict):
+    """Register signals from other producers (dict or {"signals": [...]}) for outcome tracking."""
+    from core.outcome_engine import get_outcome_engine
+    signals = payload.get("signals", payload) if isinstance(payload, dict) else payload
+    return {"ok": True, **get_outcome_engine().track(signals)}
+'''
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE}")
+
+# ============================================================
+# 5. outcome_check job -> incremental reconcile
+# ============================================================
+
+JOB_RE = re.compile(
+    r'(\.add_job\(\s*)([A-Za-z_][\w\.]*)(\s*,(?:(?!add_job\()[\s\S]){0,400}?\bid\s*=\s*["\']outcome_check["\'])'
+)
+job_file = None
+for p in [ROOT / "api_server.py"] + list(py_files()):
+    if not p.exists():
+        continue
+    t = p.read_text(encoding="utf-8")
+    if "outcome_reconcile_job" in t:
+        job_file = p
+        print("SKIP: outcome_check job already runs the reconcile")
+        break
+    jm = JOB_RE.search(t)
+    if jm is None:
+        continue
+    job_file = p
+    # Legacy check stays in the job until its pending set is empty
+    t = t[:jm.start(2)] + f"outcome_reconcile_job({jm.group(2)})" + t[jm.end(2):]
+    first = re.search(r"^(?:from \S+ import [^\n(]+|import [^\n]+)\n", t, re.M)
+    at = first.end() if first else 0
+    t = t[:at] + "from core.outcome_engine import outcome_job as outcome_reconcile_job\n" + t[at:]
+    p.write_text(t, encoding="utf-8")
+    print(f"outcome_check job: engine reconcile + {jm.group(2)} until its pending set is empty ({p.name})")
+    break
+if job_file is None:
+    print("WARNING: add_job(..., id=\"outcome_check\") not found - schedule core.outcome_engine.outcome_job() yourself")
+
+print()
+print("=" * 60)
+print("OUTCOME ENGINE PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {ENGINE} (new)")
+print(f"  - {STORE}")
+print(f"  - {SCAN}")
+print(f"  - {ROUTE_FILE}")
+if job_file is not None and job_file != ROUTE_FILE:
+    print(f"  - {job_file}")
+print()
+print("Next: Rebuild container; GET /api/outcomes/check once to seed cursors, then")
+print("      watch /api/outcomes/stats latencySec drop to about one bar")
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Parallel per-symbol scanning for ScanEngine._run_cycle
+
+1. ScanConfig.executionMode: "serial" | "thread" | "process" (+ maxWorkers)
+   default from SCAN_EXECUTION_MODE / SCAN_MAX_WORKERS env
+2. Non-serial modes prefetch every (symbol, tf) the cycle will reach (symbols
+   in error backoff are left out) on a pool. Each task runs on its own deep
+   copy of the engine state and writes into its own ScanStatus copy; _run_cycle
+   consumes results in the usual symbol/tf order and merges the deltas there
+   (counters add, gauges last-write-wins), so cycle_outcome, hitsPerDetector,
+   noSetupReasons and per-symbol error/backoff handling behave as in serial mode
+3. /scan/status reports cycleWallTimeMs per execution mode
+
+Requires patch_mega2_scanner.py.
+"""
+from pathlib import Path
+import re
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not SCAN.exists():
+    die(f"Missing {SCAN}")
+
+scan_txt = SCAN.read_text(encoding="utf-8")
+
+if "def _scan_symbol_tf_impl(" in scan_txt:
+    print("SKIP: parallel scanning already installed")
+    raise SystemExit(0)
+
+# ============================================================
+# 1. Imports
+# ============================================================
+
+if "\nimport copy\n" not in scan_txt:
+    scan_txt = scan_txt.replace("\nimport json\n", "\nimport copy\nimport json\n", 1)
+if "\nimport time\n" not in scan_txt:
+    scan_txt = scan_txt.replace("\nimport threading\n", "\nimport threading\nimport time\n", 1)
+if "concurrent.futures" not in scan_txt:
+    scan_txt = scan_txt.replace(
+        "\nfrom datetime import ",
+        "\nfrom concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor\nfrom datetime import ",
+        1,
+    )
+
+# ============================================================
+# 2. ScanConfig / StartScanRequest / ScanStatus fields
+# ============================================================
+
+exec_fields = '''    executionMode: str = os.getenv("SCAN_EXECUTION_MODE", "serial")  # serial | thread | process
+    maxWorkers: int = int(os.getenv("SCAN_MAX_WORKERS", "4"))
+'''
+
+for cls in ("ScanConfig", "StartScanRequest"):
+    m = re.search(rf'class {cls}\(BaseModel\):\n(\s+"""[^\n]*"""\n)?', scan_txt)
+    if m:
+        scan_txt = scan_txt[:m.end()] + exec_fields + scan_txt[m.end():]
+        print(f"Added executionMode/maxWorkers to {cls}")
+    elif cls == "ScanConfig":
+        die("class ScanConfig not found")
+
+status_anchor = "    dataFreshness: Dict[str, Any] = {}  # {freshCount, staleCount, avgAgeSec}\n"
+if status_anchor in scan_txt:
+    scan_txt = scan_txt.replace(
+        status_anchor,
+        status_anchor
+        + "    executionMode: str = \"serial\"\n"
+        + "    cycleWallTimeMs: Dict[str, Dict[str, Any]] = {}  # per mode: {last, avg, max, cycles}\n",
+        1,
+    )
+    print("Added executionMode/cycleWallTimeMs to ScanStatus")
+else:
+    die("ScanStatus dataFreshness field not found - run patch_mega2_scanner.py first")
+
+# ============================================================
+# 3. ScanEngine: cycle wrapper + prefetch
+# ============================================================
+
+m_cycle = re.search(r"\n    (async )?def _run_cycle\(self\)([^:\n]*):\n", scan_txt)
+m_scan = re.search(r"\n    def _scan_symbol_tf\(self, ", scan_txt)
+if not m_cycle or not m_scan:
+    die("_run_cycle / _scan_symbol_tf not found in ScanEngine")
+is_async = bool(m_cycle.group(1))
+
+if is_async:
+    run_prefetch = "await asyncio.get_running_loop().run_in_executor(None, self._prefetch_cycle, mode)"
+    run_impl = "await self._run_cycle_impl()"
+else:
+    run_prefetch = "self._prefetch_cycle(mode)"
+    run_impl = "self._run_cycle_impl()"
+
+engine_methods = f'''
+    # --------------------------------------------------------
+    # Execution modes (serial / thread / process)
+    # --------------------------------------------------------
+    {"async " if is_async else ""}def _run_cycle(self){m_cycle.group(2)}:
+        mode = (getattr(self._config, "executionMode", "serial") or "serial").lower()
+        if mode not in ("serial", "thread", "process"):
+            mode = "serial"
+        t0 = time.perf_counter()
+        self._prefetched = {{}}
+        try:
+            if mode != "serial":
+                {run_prefetch}
+            {run_impl}
+        finally:
+            self._prefetched = {{}}
+            self._record_cycle_wall_time(mode, (time.perf_counter() - t0) * 1000)
+
+    def _record_cycle_wall_time(self, mode: str, elapsed_ms: float) -> None:
+        entry = self._status.cycleWallTimeMs.get(mode) or {{"last": 0.0, "avg": 0.0, "max": 0.0, "cycles": 0}}
+        n = entry["cycles"] + 1
+        entry = {{
+            "last": round(elapsed_ms, 1),
+            "avg": round(entry["avg"] + (elapsed_ms - entry["avg"]) / n, 1),
+            "max": round(max(entry["max"], elapsed_ms), 1),
+            "cycles": n,
+        }}
+        self._status.cycleWallTimeMs[mode] = entry
+        self._status.executionMode = mode
+        logger.info(f"Scan cycle ({{mode}}) took {{elapsed_ms:.0f}}ms")
+
+    def _prefetch_cycle(self, mode: str) -> None:
+        """Run the (symbol, tf) pairs the coming cycle will reach on a pool; results are consumed by _scan_symbol_tf."""
+        # The cycle loop skips symbols in error backoff; do not scan them ahead
+        backoff = getattr(self, "_backoff", None) or {{}}
+        symbols = [s for s in self._config.effectiveSymbols if backoff.get(s, 0) <= 0]
+        tasks = [(s, tf) for s in symbols for tf in self._config.timeframes]
+        if not tasks:
+            return
+        workers = max(1, min(int(getattr(self._config, "maxWorkers", 4) or 1), len(tasks)))
+        base = copy.deepcopy(self._status)
+
+        if mode == "process":
+            pool = _get_scan_process_pool(workers)
+            state = self._picklable_state(base)
+            futures = {{(s, tf): pool.submit(_scan_task_in_process, state, s, tf) for s, tf in tasks}}
+        else:
+            pool = _get_scan_thread_pool(workers)
+            state, shared = self._task_state()
+            futures = {{(s, tf): pool.submit(self._scan_task, base, state, shared, s, tf) for s, tf in tasks}}
+
+        for key, fut in futures.items():
+            try:
+                result, error, task_status, task_state = fut.result()
+            except Exception as e:
+                # Pool failure (e.g. broken process pool): fall back to an inline scan
+                logger.warning(f"Prefetch {{key[0]}}/{{key[1]}} failed in {{mode}} pool: {{e}}")
+                continue
+            self._prefetched[key] = (result, error, base, task_status)
+            _merge_engine_state(self, state, task_state)
+
+    def _task_state(self):
+        """
+        (private, shared) engine attributes for thread tasks: deep copies of the
+        mutable state (each task copies them again), and the objects that are
+        read-only for a cycle or cannot be copied (locks, pools).
+        """
+        private, shared = {{}}, {{}}
+        for k, v in self.__dict__.items():
+            if k in ("_status", "_prefetched"):
+                continue
+            if k in SCAN_TASK_SHARED:
+                shared[k] = v
+                continue
+            try:
+                private[k] = copy.deepcopy(v)
+            except Exception:
+                shared[k] = v
+        return private, shared
+
+    def _scan_task(self, base: "ScanStatus", state: Dict[str, Any], shared: Dict[str, Any], symbol: str, tf: str):
+        """Scan on an engine copy with private copies of the engine state and of base."""
+        shadow = type(self).__new__(type(self))
+        shadow.__dict__.update(shared)
+        shadow.__dict__.update(copy.deepcopy(state))
+        shadow._status = copy.deepcopy(base)
+        shadow._prefetched = {{}}
+        try:
+            result, error = shadow._scan_symbol_tf_impl(symbol, tf), None
+        except Exception as e:
+            result, error = None, e
+        return result, error, shadow._status, _engine_state(shadow, state)
+
+    def _picklable_state(self, base: "ScanStatus") -> Dict[str, Any]:
+        import pickle
+        state = {{}}
+        for k, v in self.__dict__.items():
+            if k in ("_status", "_prefetched"):
+                continue
+            try:
+                pickle.dumps(v)
+                state[k] = v
+            except Exception as e:
+                if k not in _unpicklable_warned and not isinstance(v, _SYNC_TYPES):
+                    _unpicklable_warned.add(k)
+                    logger.warning(f"process-mode scan: engine attribute {{k}} is not picklable ({{e}}) - workers run without it")
+        state["_status"] = base
+        return state
+
+    def _scan_symbol_tf(self, symbol: str, tf: str):
+        """Serial: scan now. Parallel modes: merge the prefetched task's counters and return its result."""
+        entry = getattr(self, "_prefetched", {{}}).pop((symbol, tf), None)
+        if entry is None:
+            return self._scan_symbol_tf_impl(symbol, tf)
+        result, error, base, task_status = entry
+        _merge_status_delta(self._status, base, task_status)
+        if error is not None:
+            raise error
+        return result
+'''
+
+# Rename originals, then add the wrappers in front of _scan_symbol_tf_impl
+scan_txt = re.sub(r"\n    (async )?def _run_cycle\(self\)", r"\n    \1def _run_cycle_impl(self)", scan_txt, count=1)
+scan_txt = scan_txt.replace("\n    def _scan_symbol_tf(self, ", "\n    def _scan_symbol_tf_impl(self, ", 1)
+idx = scan_txt.find("\n    def _scan_symbol_tf_impl(self, ")
+scan_txt = scan_txt[:idx] + "\n" + engine_methods.rstrip("\n") + "\n" + scan_txt[idx:]
+print(f"Wrapped _run_cycle / _scan_symbol_tf ({'async' if is_async else 'sync'} cycle)")
+
+if is_async and "\nimport asyncio\n" not in scan_txt:
+    scan_txt = scan_txt.replace("\nimport copy\n", "\nimport asyncio\nimport copy\n", 1)
+
+# ============================================================
+# 4. Module-level helpers (pools, process task, delta merge)
+# ============================================================
+
+helpers = '''
+
+# ============================================================
+# Parallel scan helpers
+# ============================================================
+
+_scan_thread_pool: Optional[ThreadPoolExecutor] = None
+_scan_process_pool: Optional[ProcessPoolExecutor] = None
+_scan_pool_lock = threading.Lock()
+
+
+def _get_scan_thread_pool(workers: int) -> ThreadPoolExecutor:
+    global _scan_thread_pool
+    with _scan_pool_lock:
+        if _scan_thread_pool is None or _scan_thread_pool._max_workers != workers:
+            if _scan_thread_pool is not None:
+                _scan_thread_pool.shutdown(wait=False)
+            _scan_thread_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan")
+        return _scan_thread_pool
+
+
+def _get_scan_process_pool(workers: int) -> ProcessPoolExecutor:
+    global _scan_process_pool
+    with _scan_pool_lock:
+        if _scan_process_pool is None or _scan_process_pool._max_workers != workers or getattr(_scan_process_pool, "_broken", False):
+            if _scan_process_pool is not None:
+                _scan_process_pool.shutdown(wait=False)
+            import multiprocessing
+            # Not fork: the API server is threaded and a forked worker can inherit
+            # a lock another thread holds. Forkserver workers start from a clean
+            # process that has imported this module once.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload([__name__])
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            _scan_process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+        return _scan_process_pool
+
+
+# Engine attributes that stay the same object in every task: read-only for the
+# duration of a cycle or process-local synchronization. Patches that add such
+# attributes register them with register_scan_task_shared().
+SCAN_TASK_SHARED: set = set()
+_SYNC_TYPES = (type(threading.Lock()), type(threading.RLock()), threading.Event, threading.Condition)
+_unpicklable_warned: set = set()
+
+# ScanStatus fields that count events: a task's delta is added to the live
+# value. Every other field is a gauge / latest value and the task's value
+# wins (last write in cycle order). Patches that add counting fields register
+# them with register_additive_status_field().
+ADDITIVE_STATUS_FIELDS = {"counters", "noSetupReasons", "hitsPerDetector", "barsScannedTotal", "gateBlocks"}
+
+
+def register_scan_task_shared(*names: str) -> None:
+    """Share these engine attributes with scan tasks instead of copying them."""
+    SCAN_TASK_SHARED.update(names)
+
+
+def register_additive_status_field(*names: str) -> None:
+    """Merge these ScanStatus fields from scan tasks as counters."""
+    ADDITIVE_STATUS_FIELDS.update(names)
+
+_PLAIN = (dict, list, set, tuple, str, int, float, bool, type(None))
+
+
+def _engine_state(engine: "ScanEngine", keys: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain-data engine attributes among keys (what a task may hand back)."""
+    return {k: engine.__dict__.get(k) for k in keys if isinstance(engine.__dict__.get(k), _PLAIN)}
+
+
+def _merge_engine_state(engine: "ScanEngine", before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    """Apply the engine attributes a task changed (dict keys last-write-wins; other objects stay private)."""
+    for k, a in after.items():
+        b = before.get(k)
+        if a == b:
+            continue
+        cur = engine.__dict__.get(k)
+        if isinstance(a, dict) and isinstance(b, dict) and isinstance(cur, dict):
+            for gone in b.keys() - a.keys():
+                cur.pop(gone, None)
+            for kk, v in a.items():
+                if kk not in b or b[kk] != v:
+                    cur[kk] = v
+        else:
+            engine.__dict__[k] = a
+
+
+def _scan_task_in_process(state: Dict[str, Any], symbol: str, tf: str):
+    """Process-pool entry point: rebuild a bare engine from picklable state and scan."""
+    engine = ScanEngine.__new__(ScanEngine)
+    engine.__dict__.update(state)
+    engine._prefetched = {}
+    try:
+        result, error = engine._scan_symbol_tf_impl(symbol, tf), None
+    except Exception as e:
+        import pickle
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(f"{type(e).__name__}: {e}")
+        result, error = None, e
+    return result, error, engine._status, _engine_state(engine, {k: v for k, v in state.items() if k != "_status"})
+
+
+def _merge_value(current: Any, before: Any, after: Any, additive: bool = True) -> Any:
+    """Apply the change before -> after onto current (counters add, gauges take after; dicts recurse, lists extend)."""
+    if after == before:
+        return current
+    if isinstance(after, bool) or not isinstance(after, (int, float, dict, list)):
+        return after
+    if isinstance(after, (int, float)):
+        if not additive:
+            return after
+        if before is None:
+            before = 0
+        if current is None:
+            current = 0
+        if isinstance(current, (int, float)) and isinstance(before, (int, float)):
+            return current + (after - before)
+        return after
+    if isinstance(after, dict):
+        merged = dict(current) if isinstance(current, dict) else {}
+        before = before if isinstance(before, dict) else {}
+        for k, v in after.items():
+            merged[k] = _merge_value(merged.get(k), before.get(k), v, additive)
+        return merged
+    # list: keep items appended by the task
+    before = before if isinstance(before, list) else []
+    if after[:len(before)] == before and isinstance(current, list):
+        return current + after[len(before):]
+    return after
+
+
+def _merge_status_delta(status: "ScanStatus", before: "ScanStatus", after: "ScanStatus") -> None:
+    """Merge what one scan task changed on its status copy into the live status."""
+    for field in after.__fields__:
+        b = getattr(before, field)
+        a = getattr(after, field)
+        if a != b:
+            setattr(status, field, _merge_value(getattr(status, field), b, a, field in ADDITIVE_STATUS_FIELDS))
+'''
+
+anchor = "\n_scanner: Optional[ScanEngine] = None"
+if anchor not in scan_txt:
+    m = re.search(r"\ndef get_scanner\(", scan_txt)
+    if not m:
+        die("get_scanner() not found")
+    anchor = scan_txt[m.start():m.start() + len("\ndef get_scanner(")]
+idx = scan_txt.find(anchor)
+scan_txt = scan_txt[:idx].rstrip("\n") + "\n" + helpers + "\n" + scan_txt[idx:]
+print("Added pool helpers and deterministic status merge")
+
+# ============================================================
+# 5. /scan/status
+# ============================================================
+
+old_resp = '''        "dataFreshness": status.dataFreshness,
+    }'''
+new_resp = '''        "dataFreshness": status.dataFreshness,
+        "executionMode": status.executionMode,
+        "cycleWallTimeMs": status.cycleWallTimeMs,
+    }'''
+if old_resp in scan_txt:
+    scan_txt = scan_txt.replace(old_resp, new_resp, 1)
+    print("/scan/status: added executionMode, cycleWallTimeMs")
+else:
+    print("WARNING: /scan/status response anchor not found")
+
+SCAN.write_text(scan_txt, encoding="utf-8")
+
+print()
+print("=" * 60)
+print("PARALLEL SCAN PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {SCAN}")
+print()
+print("Next: Set SCAN_EXECUTION_MODE=thread (or executionMode in /scan/start), rebuild container,")
+print("      compare cycleWallTimeMs in GET /scan/status")
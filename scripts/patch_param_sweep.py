@@ -0,0 +1,1023 @@
+#!/usr/bin/env python3
+"""
+Parameter sweep for strategy-tester runs
+
+1. Create core/param_sweep.py: one request searches a grid (or random sample)
+   over min_rr, min_score, detector subsets and entry timeframes. Candles,
+   features and detector hits are loaded once per timeframe, combinations are
+   evaluated in parallel against the shared hits, dominated configs are pruned
+   on a screening prefix, and the ranked top_k are written as tester runs.
+2. Add the sweep endpoints next to POST /api/strategy-tester/run:
+   - POST /api/strategy-tester/sweep                  async -> {sweepId}; sync waits
+   - GET  /api/strategy-tester/sweeps/{sweep_id}      status, counts, ranked runs so far
+   - POST /api/strategy-tester/sweeps/{sweep_id}/cancel
+3. Serve sweep runs through the existing run endpoints:
+   GET /runs (merged list), GET/DELETE /runs/{id}, GET /runs/{id}/trades, /equity
+
+Requires patch_feature_store.py, patch_strategy_planner.py and
+patch_vectorized_backtest.py.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+SWEEP = ROOT / "core" / "param_sweep.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+for dep, script in [("backtest_vectorized.py", "patch_vectorized_backtest.py"),
+                    ("strategy_planner.py", "patch_strategy_planner.py"),
+                    ("feature_store.py", "patch_feature_store.py")]:
+    if not (ROOT / "core" / dep).exists():
+        die(f"Missing core/{dep} - run {script} first")
+
+# Locate the module that serves /api/strategy-tester/*
+ROUTE_FILE = None
+for candidate in [ROOT / "api_server.py"] + sorted(ROOT.glob("*.py")) + sorted(ROOT.glob("*/*.py")):
+    try:
+        if re.search(r'@\w+\.post\(\s*"/api/strategy-tester/run"', candidate.read_text(encoding="utf-8")):
+            ROUTE_FILE = candidate
+            break
+    except (OSError, UnicodeDecodeError):
+        continue
+if ROUTE_FILE is None:
+    die("POST /api/strategy-tester/run handler not found")
+print(f"strategy-tester routes: {ROUTE_FILE}")
+
+# ============================================================
+# 1. Create param_sweep.py
+# ============================================================
+
+sweep_code = '''"""
+param_sweep.py
+--------------
+Parameter sweep for the strategy tester.
+
+Finding a good config used to mean one /api/strategy-tester/run per
+combination, each reloading candles and re-running every detector. A sweep
+loads candles and features once per entry timeframe, runs the union of all
+detectors in the space once, and evaluates every combination of min_rr,
+min_score, detector subset and timeframe against those shared hits:
+
+  - signals and SL/TP outcomes (vectorized first-touch) are computed once per
+    (timeframe, triggers, min_rr) group; gates and min_score only mask them
+  - screening runs on the first SWEEP_SCREEN_FRACTION of the bars; configs
+    Pareto-dominated on (win rate, total R) are pruned there, and groups with
+    no surviving config are never resolved on the full range
+  - survivors are ranked on the full range and the top_k are written one by
+    one as tester runs (metrics, trades, equity_curve), served by the
+    existing /api/strategy-tester/runs endpoints
+
+Detector roles follow the dashboard catalog: GATE_* are gates, TRIGGER_DETECTORS
+are triggers, everything else is confluence.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.backtest_vectorized import (
+    DEFAULT_MAX_BARS, OUTCOME_OPEN, OUTCOME_SL, OUTCOME_TIMEOUT, OUTCOME_TP,
+    _first, _one_at_a_time, _range, build_signals, first_touch, get_detector_runner, walk_forward_hits,
+)
+from core.candle_frame import CandleFrame
+from core.strategy_planner import normalize_detector
+
+logger = logging.getLogger(__name__)
+
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(min(4, os.cpu_count() or 2))))
+SWEEP_MAX_CONFIGS = int(os.getenv("SWEEP_MAX_CONFIGS", "5000"))
+SWEEP_SCREEN_FRACTION = float(os.getenv("SWEEP_SCREEN_FRACTION", "0.33"))
+SWEEP_CONFLUENCE_BARS = int(os.getenv("SWEEP_CONFLUENCE_BARS", "3"))
+SWEEP_KEEP = int(os.getenv("SWEEP_KEEP", "50"))
+SWEEP_DIR = Path(os.getenv("SWEEP_DIR", str(Path(os.getenv("STATE_DIR", "state")) / "strategy_tester" / "sweeps")))
+
+DEFAULT_TF = "1h"
+DEFAULT_TOP_K = 10
+DEFAULT_MIN_TRADES = 5
+OBJECTIVES = ("total_r", "win_rate", "profit_factor", "expectancy")
+FINISHED = ("completed", "failed", "cancelled")
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]{1,80}$")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ============================================================
+# Search space
+# ============================================================
+
+TRIGGER_DETECTORS = frozenset({
+    "BOS", "FVG", "OB", "CHOCH", "EQ_BREAK", "SWEEP", "IMBALANCE", "SFP",
+    "BREAK_RETEST", "COMPRESSION_EXPANSION", "MOMENTUM_CONTINUATION",
+    "MEAN_REVERSION_SNAPBACK", "SR_BOUNCE", "SR_BREAK_CLOSE", "TRIANGLE_BREAKOUT_CLOSE",
+})
+
+DEFAULT_MIN_SCORE = 1.0
+
+
+def _names(values: Any) -> List[str]:
+    return list(dict.fromkeys(normalize_detector(v) for v in values or [] if str(v).strip()))
+
+
+class SweepSpec:
+    """One sweep config's detector roles and thresholds."""
+
+    __slots__ = ("gates", "triggers", "confluence", "min_rr", "min_score")
+
+    def __init__(self, detectors: Any, min_rr: float, min_score: float):
+        detectors = _names(detectors)
+        gates = [d for d in detectors if d.startswith("GATE_")]
+        triggers = [d for d in detectors if d in TRIGGER_DETECTORS]
+        confluence = [d for d in detectors if d not in gates and d not in triggers]
+        if not triggers:
+            # Custom/unknown detector ids: every non-gate detector can trigger
+            triggers, confluence = confluence, []
+        self.gates = tuple(gates)
+        self.triggers = tuple(triggers)
+        self.confluence = tuple(confluence)
+        self.min_rr = float(min_rr or 0.0)
+        self.min_score = float(min_score or 0.0)
+
+
+def detector_subsets(spec: Any) -> List[Tuple[str, ...]]:
+    """
+    Detector subsets from a list of lists, a single list, or
+    {"pool": [...], "required": [...], "min_size": 1, "max_size": len(pool)}.
+    Subsets with gates only are dropped.
+    """
+    if isinstance(spec, dict):
+        required = _names(spec.get("required"))
+        pool = [d for d in _names(spec.get("pool")) if d not in required]
+        lo = max(0, int(spec.get("min_size", 1)))
+        hi = min(len(pool), int(spec.get("max_size", len(pool))))
+        count = sum(math.comb(len(pool), k) for k in range(lo, hi + 1))
+        if count > SWEEP_MAX_CONFIGS:
+            raise ValueError(f"detector pool yields {count} subsets (max {SWEEP_MAX_CONFIGS}); lower max_size")
+        subsets = [tuple(required) + c for k in range(lo, hi + 1) for c in combinations(pool, k)]
+    elif spec and all(isinstance(s, (list, tuple)) for s in spec):
+        subsets = [tuple(_names(s)) for s in spec]
+    else:
+        subsets = [tuple(_names(spec))]
+    return list(dict.fromkeys(s for s in subsets if any(not d.startswith("GATE_") for d in s)))
+
+
+def expand_space(payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Configs to evaluate and the size of the full space. payload "space" holds
+    the axes (entry_tf, detectors, min_rr, min_score); a missing axis falls back
+    to the top-level value. mode "random" samples `samples` configs (seeded).
+    """
+    space = payload.get("space") or {}
+
+    def axis(key: str, default: Any) -> List[Any]:
+        v = space.get(key, payload.get(key, default))
+        return list(v) if isinstance(v, (list, tuple)) else [v]
+
+    axes = [
+        list(dict.fromkeys(str(v).lower() for v in axis("entry_tf", DEFAULT_TF) if v)),
+        detector_subsets(space.get("detectors", payload.get("detectors"))),
+        sorted({float(v or 0.0) for v in axis("min_rr", 0.0)}),
+        sorted({float(v or 0.0) for v in axis("min_score", DEFAULT_MIN_SCORE)}),
+    ]
+    total = math.prod(len(a) for a in axes)
+    if not total:
+        raise ValueError("empty search space (need entry_tf, detectors, min_rr and min_score values)")
+
+    if str(payload.get("mode") or "grid").lower() == "random":
+        k = min(total, int(payload.get("samples") or 100), SWEEP_MAX_CONFIGS)
+        picks = sorted(random.Random(payload.get("seed")).sample(range(total), k))
+    elif total > SWEEP_MAX_CONFIGS:
+        raise ValueError(f"grid has {total} configs (max {SWEEP_MAX_CONFIGS}); use mode=random")
+    else:
+        picks = range(total)
+
+    configs = []
+    for p in picks:
+        pos = []
+        for a in reversed(axes):
+            p, r = divmod(p, len(a))
+            pos.append(r)
+        tf, dets, rr, score = (a[i] for a, i in zip(axes, reversed(pos)))
+        configs.append({"entry_tf": tf, "detectors": list(dets), "min_rr": rr, "min_score": score})
+    return configs, total
+
+
+# ============================================================
+# Shared per-timeframe data
+# ============================================================
+
+def _hit_idx(hit: Dict[str, Any]) -> Optional[int]:
+    v = _first(hit, ("confirm_idx", "idx", "index", "bar", "i"))
+    return None if v is None else int(v)
+
+
+class _TfData:
+    """Candles, ATR and detector-union hits of one entry timeframe, shared by all its configs."""
+
+    def __init__(self, frame: CandleFrame, hits: Dict[str, List[Dict[str, Any]]], atr: np.ndarray):
+        self.frame = frame
+        self.hits = hits
+        self.atr = atr
+        self.n = len(frame)
+        self._active: Dict[str, np.ndarray] = {}
+        self._gates: Dict[str, np.ndarray] = {}
+
+    def active(self, det: str) -> np.ndarray:
+        """Bars where det fired within the last SWEEP_CONFLUENCE_BARS bars."""
+        a = self._active.get(det)
+        if a is None:
+            idx = [_hit_idx(h) for h in self.hits.get(det) or []]
+            if any(i is None for i in idx):
+                # Detectors that do not report a bar count as fired everywhere
+                a = np.ones(self.n, dtype=bool)
+            else:
+                edges = np.zeros(self.n + 1, dtype=np.int64)
+                for i in idx:
+                    if 0 <= i < self.n:
+                        edges[i] += 1
+                        edges[min(self.n, i + SWEEP_CONFLUENCE_BARS + 1)] -= 1
+                a = np.cumsum(edges[:self.n]) > 0
+            self._active[det] = a
+        return a
+
+    def gate(self, det: str) -> np.ndarray:
+        """Bars where the latest verdict of gate det (at or before the bar) passed."""
+        g = self._gates.get(det)
+        if g is None:
+            marks = [(_hit_idx(h), bool(h.get("passed", True))) for h in self.hits.get(det) or []]
+            if any(i is None for i, _ in marks):
+                g = np.full(self.n, any(p for _, p in marks), dtype=bool)
+            else:
+                state = np.full(self.n, -1, dtype=np.int8)
+                for i, passed in sorted(marks):
+                    if 0 <= i < self.n:
+                        state[i] = passed
+                last = np.maximum.accumulate(np.where(state >= 0, np.arange(self.n), -1))
+                g = (last >= 0) & (state[np.maximum(last, 0)] == 1)
+            self._gates[det] = g
+        return g
+
+
+class _Group:
+    """Signals shared by configs with the same timeframe, triggers and min_rr; outcomes per range."""
+
+    def __init__(self, data: _TfData, triggers: Tuple[str, ...], min_rr: float):
+        self.sig, self.skipped = build_signals(
+            data.frame, {t: data.hits.get(t) or [] for t in triggers}, min_rr, data.atr,
+        )
+        self.screen: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self.full: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def resolve(self, data: _TfData, bars: int, opts: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(exit_idx, outcome, r_multiple net of costs) using only the first `bars` candles."""
+        sig = self.sig
+        m = len(sig["idx"])
+        exit_idx = np.full(m, bars, dtype=np.int64)
+        outcome = np.full(m, OUTCOME_OPEN, dtype=np.int8)
+        inside = sig["idx"] < bars - 1
+        if inside.any():
+            exit_idx[inside], outcome[inside] = first_touch(
+                data.frame.high[:bars], data.frame.low[:bars], sig["idx"][inside], sig["sl"][inside],
+                sig["tp"][inside], sig["is_long"][inside], opts["max_bars"], opts["intrabar_policy"],
+            )
+        risk = np.abs(sig["entry"] - sig["sl"])
+        close = data.frame.close[np.minimum(exit_idx, max(bars - 1, 0))] if m else np.empty(0)
+        exit_price = np.where(outcome == OUTCOME_TP, sig["tp"], np.where(outcome == OUTCOME_SL, sig["sl"], close))
+        sign = np.where(sig["is_long"], 1.0, -1.0)
+        r = (sign * (exit_price - sig["entry"]) - opts["cost_price"]) / risk
+        return exit_idx, outcome, r
+
+
+def _config_mask(data: _TfData, group: _Group, spec: SweepSpec, bars: int) -> np.ndarray:
+    """Signals of group that pass spec's gates and min_score, inside the first `bars` candles."""
+    idx = group.sig["idx"]
+    mask = idx < bars - 1
+    for g in spec.gates:
+        mask &= data.gate(g)[idx]
+    if spec.min_score > 0:
+        score = np.zeros(len(idx))
+        for d in spec.triggers + spec.confluence:
+            score += data.active(d)[idx]
+        mask &= score >= spec.min_score
+    return mask
+
+
+def _stats(group: _Group, outcomes: Tuple[np.ndarray, np.ndarray, np.ndarray], mask: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Closed trades (signal rows, one at a time) and their R summary."""
+    exit_idx, outcome, r = outcomes
+    cand = np.flatnonzero(mask)
+    taken = cand[_one_at_a_time(group.sig["idx"][cand], exit_idx[cand])]
+    closed = taken[outcome[taken] != OUTCOME_OPEN]
+    rr = r[closed]
+    wins = int((rr > 0).sum())
+    gross_win, gross_loss = float(rr[rr > 0].sum()), float(-rr[rr < 0].sum())
+    equity = np.cumsum(rr)
+    max_dd = float((np.maximum.accumulate(np.maximum(equity, 0.0)) - equity).max()) if len(rr) else 0.0
+    return closed, {
+        "trades": int(len(rr)),
+        "wins": wins,
+        "winRate": round(100.0 * wins / len(rr), 2) if len(rr) else 0.0,
+        "totalR": round(float(rr.sum()), 3),
+        "profitFactor": round(gross_win / gross_loss, 3) if gross_loss else None,
+        "expectancy": round(float(rr.mean()), 4) if len(rr) else 0.0,
+        "maxDrawdownR": round(max_dd, 3),
+    }
+
+
+def _objective(stats: Dict[str, Any], objective: str) -> float:
+    if objective == "win_rate":
+        return stats["winRate"]
+    if objective == "profit_factor":
+        pf = stats["profitFactor"]
+        return pf if pf is not None else (1e9 if stats["wins"] else 0.0)
+    if objective == "expectancy":
+        return stats["expectancy"]
+    return stats["totalR"]
+
+
+def prune_dominated(stats: List[Dict[str, Any]], min_trades: int, keep: int) -> List[int]:
+    """
+    Indices surviving the screen: configs with too few trades to judge, the
+    (winRate, totalR) Pareto front of the rest, and the best `keep` by totalR.
+    """
+    wr = np.array([s["winRate"] for s in stats], dtype=float)
+    tr = np.array([s["totalR"] for s in stats], dtype=float)
+    judged = np.array([s["trades"] >= min_trades for s in stats], dtype=bool)
+    survive = ~judged
+    for i in np.flatnonzero(judged):
+        dominated = judged & (wr >= wr[i]) & (tr >= tr[i]) & ((wr > wr[i]) | (tr > tr[i]))
+        survive[i] = not dominated.any()
+    survive[np.argsort(-tr, kind="stable")[:keep]] = True
+    return np.flatnonzero(survive).tolist()
+
+
+# ============================================================
+# Tester runs
+# ============================================================
+
+def _pip_size(symbol: str) -> float:
+    s = symbol.upper()
+    if s.startswith(("BTC", "ETH")):
+        return 1.0
+    if s.startswith(("XAU", "US30", "NAS", "SPX")):
+        return 0.1
+    if s.endswith("JPY") or s.startswith("XAG"):
+        return 0.01
+    return 0.0001
+
+
+def _config_hash(obj: Dict[str, Any]) -> str:
+    import hashlib
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _data_hash(frame: CandleFrame) -> str:
+    if not len(frame):
+        return _config_hash({"n": 0})
+    return _config_hash({"n": len(frame), "first": int(frame.ts[0]), "last": int(frame.ts[-1]),
+                         "close": float(frame.close[-1])})
+
+
+def _tester_run(run_id: str, symbol: str, cfg: Dict[str, Any], data: _TfData, group: _Group,
+                rows: np.ndarray, opts: Dict[str, Any]) -> Dict[str, Any]:
+    """Tester run record (metrics, trades, equity_curve) for closed signal rows of group."""
+    frame, sig = data.frame, group.sig
+    exit_idx, outcome, r = group.full
+    pip = _pip_size(symbol)
+    capital = equity = peak = opts["initial_capital"]
+    max_dd_usd = max_dd_pct = 0.0
+    costs = {"total_spread_cost": 0.0, "total_slippage_cost": 0.0, "total_commission": 0.0}
+    trades, curve, returns = [], [], []
+    for k, i in enumerate(rows, 1):
+        e, x = int(sig["idx"][i]), int(exit_idx[i])
+        entry, sl, tp = float(sig["entry"][i]), float(sig["sl"][i]), float(sig["tp"][i])
+        risk = abs(entry - sl)
+        out = int(outcome[i])
+        exit_price = tp if out == OUTCOME_TP else sl if out == OUTCOME_SL else float(frame.close[x])
+        risk_usd = equity * opts["risk_per_trade_pct"] / 100.0
+        pnl_usd = float(r[i]) * risk_usd - opts["commission_per_trade"]
+        costs["total_spread_cost"] += opts["spread_pips"] * pip / risk * risk_usd
+        costs["total_slippage_cost"] += opts["slippage_pips"] * pip / risk * risk_usd
+        costs["total_commission"] += opts["commission_per_trade"]
+        returns.append(pnl_usd / equity if equity else 0.0)
+        equity += pnl_usd
+        peak = max(peak, equity)
+        max_dd_usd = max(max_dd_usd, peak - equity)
+        dd_pct = 100.0 * (peak - equity) / peak if peak else 0.0
+        max_dd_pct = max(max_dd_pct, dd_pct)
+        trade_id = f"{run_id}-{k:04d}"
+        trades.append({
+            "trade_id": trade_id,
+            "entry_time": int(frame.ts[e]),
+            "entry_price": round(entry, 6),
+            "direction": "long" if sig["is_long"][i] else "short",
+            "detector": str(sig["detector"][i]),
+            "exit_time": int(frame.ts[x]),
+            "exit_price": round(exit_price, 6),
+            "stop_loss": round(sl, 6),
+            "take_profit": round(tp, 6),
+            "risk_pips": round(risk / pip, 2),
+            "reward_pips": round(abs(tp - entry) / pip, 2),
+            "rr_ratio": round(float(sig["rr"][i]), 3),
+            "outcome": "timeout" if out == OUTCOME_TIMEOUT else "win" if r[i] > 0 else "loss" if r[i] < 0 else "breakeven",
+            "pnl_pips": round(float(r[i]) * risk / pip, 2),
+            "pnl_usd": round(pnl_usd, 2),
+            "bars_in_trade": x - e,
+        })
+        curve.append({"timestamp": int(frame.ts[x]), "equity": round(equity, 2),
+                      "drawdown": round(dd_pct, 2), "trade_id": trade_id})
+
+    pips = np.array([t["pnl_pips"] for t in trades], dtype=float)
+    rets = np.array(returns, dtype=float)
+    wins, losses = pips[pips > 0], pips[pips < 0]
+    downside = math.sqrt(float((np.minimum(rets, 0.0) ** 2).mean())) if len(rets) else 0.0
+    detector_stats: Dict[str, Dict[str, Any]] = {}
+    for t in trades:
+        d = detector_stats.setdefault(t["detector"], {"total_trades": 0, "wins": 0, "win_rate": 0.0,
+                                                      "pnl_pips": 0.0, "pnl_usd": 0.0})
+        d["total_trades"] += 1
+        d["wins"] += t["pnl_pips"] > 0
+        d["pnl_pips"] = round(d["pnl_pips"] + t["pnl_pips"], 2)
+        d["pnl_usd"] = round(d["pnl_usd"] + t["pnl_usd"], 2)
+        d["win_rate"] = round(d["wins"] / d["total_trades"], 4)
+
+    metrics = {
+        "total_trades": len(trades),
+        "winning_trades": int(len(wins)),
+        "losing_trades": int(len(losses)),
+        "breakeven_trades": int((pips == 0).sum()),
+        "timeout_trades": sum(t["outcome"] == "timeout" for t in trades),
+        "win_rate": round(len(wins) / len(trades), 4) if trades else 0.0,
+        "total_pnl_pips": round(float(pips.sum()), 2),
+        "total_pnl_usd": round(equity - capital, 2),
+        "avg_win_pips": round(float(wins.mean()), 2) if len(wins) else 0.0,
+        "avg_loss_pips": round(float(losses.mean()), 2) if len(losses) else 0.0,
+        "profit_factor": round(float(wins.sum() / -losses.sum()), 3) if len(losses) else 0.0,
+        "max_drawdown_pct": round(max_dd_pct, 2),
+        "max_drawdown_usd": round(max_dd_usd, 2),
+        "sharpe_ratio": round(float(rets.mean() / rets.std() * math.sqrt(len(rets))), 3) if len(rets) > 1 and rets.std() else 0.0,
+        "sortino_ratio": round(float(rets.mean() / downside * math.sqrt(len(rets))), 3) if downside else 0.0,
+        **{k: round(v, 2) for k, v in costs.items()},
+        "avg_bars_in_trade": round(float(np.mean([t["bars_in_trade"] for t in trades])), 1) if trades else 0.0,
+        "avg_rr_achieved": round(float(r[rows].mean()), 3) if len(rows) else 0.0,
+        "best_trade_pips": round(float(pips.max()), 2) if len(pips) else 0.0,
+        "worst_trade_pips": round(float(pips.min()), 2) if len(pips) else 0.0,
+        "detector_stats": detector_stats,
+    }
+    config_details = {
+        "symbol": symbol,
+        "detectors": cfg["detectors"],
+        "entry_tf": cfg["entry_tf"],
+        "trend_tf": opts["trend_tf"] or cfg["entry_tf"],
+        "spread_pips": opts["spread_pips"],
+        "slippage_pips": opts["slippage_pips"],
+        "commission_per_trade": opts["commission_per_trade"],
+        "initial_capital": capital,
+        "risk_per_trade_pct": opts["risk_per_trade_pct"],
+        "intrabar_policy": opts["intrabar_policy"],
+        "min_rr": cfg["min_rr"],
+        "min_score": cfg["min_score"],
+        "max_bars_in_trade": opts["max_bars"],
+        "start_date": opts["start_date"],
+        "end_date": opts["end_date"],
+    }
+    return {
+        "run_id": run_id,
+        "status": "completed",
+        "trade_count": len(trades),
+        "config_hash": _config_hash(config_details),
+        "data_hash": _data_hash(frame),
+        "metrics": metrics,
+        "trades": trades,
+        "equity_curve": curve,
+        "config_details": config_details,
+    }
+
+
+# ============================================================
+# Storage
+# ============================================================
+
+def _write_json(path: Path, obj: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(obj, default=str), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _run_path(run_id: str) -> Optional[Path]:
+    if not run_id.startswith("sweep_") or not _SAFE_ID.match(run_id):
+        return None
+    return SWEEP_DIR / "runs" / f"{run_id}.json"
+
+
+def load_sweep_run(run_id: str) -> Optional[Dict[str, Any]]:
+    path = _run_path(run_id)
+    return _read_json(path) if path is not None else None
+
+
+def list_sweep_runs() -> List[Dict[str, Any]]:
+    """Summaries (no trades/equity) of stored sweep runs, newest first."""
+    runs: List[Dict[str, Any]] = []
+    for path in SWEEP_DIR.glob("sweep_*.json"):
+        doc = _read_json(path) or {}
+        runs.extend(r["run"] for r in doc.get("ranked") or [] if r.get("run"))
+    runs.sort(key=lambda r: (r.get("created_at") or "", r.get("run_id")), reverse=True)
+    return runs
+
+
+def delete_sweep_run(run_id: str) -> bool:
+    path = _run_path(run_id)
+    if path is None or not path.exists():
+        return False
+    path.unlink()
+    sweep_id = run_id.rsplit("_r", 1)[0]
+    with _lock:
+        sweep = _sweeps.get(sweep_id)
+        if sweep is not None:
+            sweep.ranked = [r for r in sweep.ranked if r["runId"] != run_id]
+            sweep.save()
+            return True
+    doc_path = SWEEP_DIR / f"{sweep_id}.json"
+    doc = _read_json(doc_path)
+    if doc is not None:
+        doc["ranked"] = [r for r in doc.get("ranked") or [] if r.get("runId") != run_id]
+        _write_json(doc_path, doc)
+    return True
+
+
+def sweep_run_response(kind: str, run_id: str) -> Optional[Dict[str, Any]]:
+    """Response for a tester run endpoint if run_id is a sweep run, else None."""
+    if kind == "delete":
+        return {"ok": True, "run_id": run_id, "deleted": True} if delete_sweep_run(run_id) else None
+    run = load_sweep_run(run_id)
+    if run is None:
+        return None
+    if kind == "trades":
+        return {"ok": True, "run_id": run_id, "trades": run["trades"], "count": len(run["trades"])}
+    if kind == "equity":
+        return {"ok": True, "run_id": run_id, "equity_curve": run["equity_curve"]}
+    return {"ok": True, "run": run}
+
+
+def _trim_store() -> None:
+    docs = sorted(SWEEP_DIR.glob("sweep_*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in docs[SWEEP_KEEP:]:
+        for r in (_read_json(path) or {}).get("ranked") or []:
+            run_path = _run_path(str(r.get("runId") or ""))
+            if run_path is not None and run_path.exists():
+                run_path.unlink()
+        path.unlink()
+
+
+# ============================================================
+# Sweeps
+# ============================================================
+
+class Sweep:
+    def __init__(self, payload: Dict[str, Any], configs: List[Dict[str, Any]], space: int):
+        self.id = f"sweep_{uuid.uuid4().hex[:12]}"
+        self.payload = payload
+        self.configs = configs
+        self.status = "queued"
+        self.stage = "queued"
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.completed_at: Optional[str] = None
+        self.error: Optional[str] = None
+        self.counts = {"space": space, "configs": len(configs), "timeframes": 0, "groups": 0,
+                       "groupsResolved": 0, "screened": 0, "pruned": 0, "evaluated": 0, "duplicates": 0}
+        self.timings_ms: Dict[str, float] = {}
+        self.ranked: List[Dict[str, Any]] = []
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+        self._t0 = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sweepId": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "symbol": str(self.payload.get("symbol") or "").upper(),
+            "objective": self.payload.get("objective") or "total_r",
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "completedAt": self.completed_at,
+            "error": self.error,
+            "counts": dict(self.counts),
+            "timingsMs": dict(self.timings_ms),
+            "ranked": list(self.ranked),
+        }
+
+    def save(self) -> None:
+        _write_json(SWEEP_DIR / f"{self.id}.json", self.to_dict())
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _options(payload: Dict[str, Any]) -> Dict[str, Any]:
+    symbol = str(payload.get("symbol") or "").upper()
+    spread = float(payload.get("spread_pips") or 0.0)
+    slippage = float(payload.get("slippage_pips") or 0.0)
+    policy = str(payload.get("intrabar_policy") or "sl_first").lower()
+    return {
+        "spread_pips": spread,
+        "slippage_pips": slippage,
+        "cost_price": (spread + slippage) * _pip_size(symbol),
+        "commission_per_trade": float(payload.get("commission_per_trade") or 0.0),
+        "initial_capital": float(payload.get("initial_capital") or 10000.0),
+        "risk_per_trade_pct": float(payload.get("risk_per_trade_pct") or 1.0),
+        # bar_magnifier / random need intrabar data: resolved as sl_first
+        "intrabar_policy": policy if policy in ("sl_first", "tp_first") else "sl_first",
+        "max_bars": int(payload.get("max_bars_in_trade") or DEFAULT_MAX_BARS),
+        "trend_tf": payload.get("trend_tf"),
+        "start_date": payload.get("start_date"),
+        "end_date": payload.get("end_date"),
+    }
+
+
+def _load_timeframe(symbol: str, tf: str, from_dt: datetime, to_dt: datetime, detectors: List[str]) -> _TfData:
+    from core.feature_store import get_features
+    from core.scan_engine_v2 import bridge_get_candle_frame
+
+    frame = bridge_get_candle_frame(symbol, from_dt, to_dt, tf)
+    if frame is None:
+        frame = CandleFrame.from_dicts([])
+    hits: Dict[str, List[Dict[str, Any]]] = {}
+    atr = np.empty(0)
+    if len(frame):
+        run, candles = get_detector_runner(), frame.to_dicts()
+        confirmed, _ = walk_forward_hits(candles, run(candles, detectors) or {}, run)
+        for det, h in confirmed.items():
+            hits.setdefault(normalize_detector(det), []).extend(h or [])
+        atr = np.asarray(get_features(symbol, tf, frame)["atr14"], dtype=float)
+    return _TfData(frame, hits, atr)
+
+
+def _run(sweep: Sweep) -> None:
+    p = sweep.payload
+    symbol = str(p.get("symbol") or "").upper()
+    objective = str(p.get("objective") or "total_r").lower()
+    top_k = max(1, int(p.get("top_k") or DEFAULT_TOP_K))
+    min_trades = max(1, int(p.get("min_trades") or DEFAULT_MIN_TRADES))
+    fraction = float(p.get("screen_fraction") or SWEEP_SCREEN_FRACTION)
+    opts = _options(p)
+    from_dt, to_dt = _range({"from": p.get("start_date") or p.get("from"),
+                             "to": p.get("end_date") or p.get("to"), "days": p.get("days") or 30})
+
+    def check_cancel() -> None:
+        if sweep.cancel_event.is_set():
+            raise _Cancelled()
+
+    def stage(name: str, t0: float) -> float:
+        check_cancel()
+        now = time.perf_counter()
+        if t0:
+            sweep.timings_ms[sweep.stage] = round((now - t0) * 1000, 1)
+        sweep.stage = name
+        return now
+
+    with ThreadPoolExecutor(max_workers=SWEEP_WORKERS, thread_name_prefix="sweep") as pool:
+        # --- Candles, features and detector hits: once per timeframe ---
+        t = stage("load", 0.0)
+        by_tf: Dict[str, List[str]] = {}
+        for cfg in sweep.configs:
+            union = by_tf.setdefault(cfg["entry_tf"], [])
+            union.extend(d for d in cfg["detectors"] if d not in union)
+        loaded = {tf: pool.submit(_load_timeframe, symbol, tf, from_dt, to_dt, dets) for tf, dets in by_tf.items()}
+        data = {tf: f.result() for tf, f in loaded.items()}
+        sweep.counts["timeframes"] = len(data)
+
+        specs = [SweepSpec(cfg["detectors"], cfg["min_rr"], cfg["min_score"]) for cfg in sweep.configs]
+        keys = [(cfg["entry_tf"], spec.triggers, spec.min_rr) for cfg, spec in zip(sweep.configs, specs)]
+        groups: Dict[tuple, _Group] = {}
+        for key in dict.fromkeys(keys):
+            check_cancel()
+            groups[key] = _Group(data[key[0]], key[1], key[2])
+        sweep.counts["groups"] = len(groups)
+
+        # Checked per task so a cancel stops the pool's queue, not just the next stage
+        def resolve(key: tuple, full: bool) -> None:
+            check_cancel()
+            d = data[key[0]]
+            bars = d.n if full else max(2, int(d.n * fraction))
+            res = groups[key].resolve(d, bars, opts)
+            if full:
+                groups[key].full = res
+            else:
+                groups[key].screen = res
+            sweep.counts["groupsResolved"] += 1
+
+        def evaluate(i: int, full: bool) -> Tuple[np.ndarray, Dict[str, Any]]:
+            check_cancel()
+            key = keys[i]
+            d, g = data[key[0]], groups[key]
+            bars = d.n if full else max(2, int(d.n * fraction))
+            return _stats(g, g.full if full else g.screen, _config_mask(d, g, specs[i], bars))
+
+        # --- Screen on the prefix, prune dominated configs ---
+        survivors = list(range(len(sweep.configs)))
+        if p.get("prune", True) and 0 < fraction < 1 and len(survivors) > top_k:
+            t = stage("screen", t)
+            list(pool.map(lambda k: resolve(k, False), list(groups)))
+            screened = list(pool.map(lambda i: evaluate(i, False)[1], survivors))
+            sweep.counts["screened"] = len(screened)
+            survivors = prune_dominated(screened, max(1, math.ceil(min_trades * fraction)), keep=max(3 * top_k, 20))
+            sweep.counts["pruned"] = len(screened) - len(survivors)
+
+        # --- Full range for the survivors' groups only ---
+        t = stage("evaluate", t)
+        list(pool.map(lambda k: resolve(k, True), list(dict.fromkeys(keys[i] for i in survivors))))
+        results = dict(zip(survivors, pool.map(lambda i: evaluate(i, True), survivors)))
+        sweep.counts["evaluated"] = len(results)
+
+    # Configs that take exactly the same trades are one result: keep the simplest
+    order = sorted(
+        (i for i in results if results[i][1]["trades"]),
+        key=lambda i: (results[i][1]["trades"] >= min_trades, _objective(results[i][1], objective),
+                       results[i][1]["totalR"], -len(sweep.configs[i]["detectors"])),
+        reverse=True,
+    )
+    ranked, seen = [], set()
+    for i in order:
+        rows = results[i][0]
+        trade_set = (keys[i][0], groups[keys[i]].sig["idx"][rows].tobytes(), groups[keys[i]].sig["is_long"][rows].tobytes())
+        if trade_set in seen:
+            sweep.counts["duplicates"] += 1
+            continue
+        seen.add(trade_set)
+        ranked.append(i)
+        if len(ranked) == top_k:
+            break
+
+    # --- Stream ranked runs into the tester run store ---
+    t = stage("persist", t)
+    for rank, i in enumerate(ranked, 1):
+        check_cancel()
+        cfg, (rows, stats) = sweep.configs[i], results[i]
+        run_id = f"{sweep.id}_r{rank:02d}"
+        created = _now()
+        run = _tester_run(run_id, symbol, cfg, data[cfg["entry_tf"]], groups[keys[i]], rows, opts)
+        run.update(created_at=created, started_at=sweep.started_at, completed_at=created,
+                   duration_seconds=round(time.perf_counter() - sweep._t0, 3),
+                   sweep={"sweep_id": sweep.id, "rank": rank, "objective": objective})
+        _write_json(SWEEP_DIR / "runs" / f"{run_id}.json", run)
+        summary = {k: v for k, v in run.items() if k not in ("trades", "equity_curve")}
+        sweep.ranked.append({"rank": rank, "runId": run_id, "config": cfg, "stats": stats, "run": summary})
+        sweep.save()
+    stage("done", t)
+
+
+def _execute(sweep: Sweep) -> None:
+    sweep.status = "running"
+    sweep.started_at = _now()
+    sweep._t0 = time.perf_counter()
+    try:
+        _run(sweep)
+        sweep.status = "completed"
+    except _Cancelled:
+        sweep.status = "cancelled"
+    except Exception as e:
+        logger.exception("[sweep] %s failed", sweep.id)
+        sweep.status, sweep.error = "failed", str(e)
+    sweep.completed_at = _now()
+    sweep.timings_ms["total"] = round((time.perf_counter() - sweep._t0) * 1000, 1)
+    try:
+        sweep.save()
+        _trim_store()
+    except OSError as e:
+        logger.warning("[sweep] %s not saved: %s", sweep.id, e)
+
+
+_sweeps: "OrderedDict[str, Sweep]" = OrderedDict()
+_lock = threading.Lock()
+# Sweeps already fan out over SWEEP_WORKERS threads; run them one at a time
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sweep-runner")
+
+
+def submit_sweep(payload: Dict[str, Any]) -> Sweep:
+    """Validate and queue a sweep. Raises ValueError on a bad payload."""
+    if not str(payload.get("symbol") or "").strip():
+        raise ValueError("symbol is required")
+    objective = str(payload.get("objective") or "total_r").lower()
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(OBJECTIVES)}")
+    configs, space = expand_space(payload)
+    sweep = Sweep(payload, configs, space)
+    with _lock:
+        _sweeps[sweep.id] = sweep
+        while len(_sweeps) > SWEEP_KEEP:
+            _sweeps.popitem(last=False)
+    sweep.future = _executor.submit(_execute, sweep)
+    logger.info("[sweep] %s queued: %s, %d configs of %d", sweep.id, payload.get("symbol"), len(configs), space)
+    return sweep
+
+
+def get_sweep(sweep_id: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        sweep = _sweeps.get(sweep_id)
+    if sweep is not None:
+        return sweep.to_dict()
+    if not sweep_id.startswith("sweep_") or not _SAFE_ID.match(sweep_id):
+        return None
+    return _read_json(SWEEP_DIR / f"{sweep_id}.json")
+
+
+def cancel_sweep(sweep_id: str) -> bool:
+    with _lock:
+        sweep = _sweeps.get(sweep_id)
+    if sweep is None or sweep.status in FINISHED:
+        return False
+    sweep.cancel_event.set()
+    if sweep.future is not None and sweep.future.cancel():
+        sweep.status, sweep.completed_at = "cancelled", _now()
+    return True
+
+
+async def wait_sweep(sweep: Sweep) -> None:
+    if sweep.future is not None:
+        try:
+            await asyncio.wrap_future(sweep.future)
+        except Exception:
+            pass
+'''
+
+# ============================================================
+# 2-3. Sweep endpoints, sweep runs through the run endpoints
+# ============================================================
+
+def find_route(txt, method, path):
+    """Match of '@obj.method("path")' + handler def: groups (decorator, obj, def, name, params)."""
+    return re.compile(
+        r'(@(\w+)\.' + method + r'\(\s*"' + re.escape(path) + r'"[^\n]*\)\n)'
+        r'((?:async\s+)?def\s+(\w+)\(([^)]*)\))'
+    ).search(txt)
+
+def detach(txt, m):
+    """Drop the route decorator (handler stays as a plain function); returns (txt, end of handler)."""
+    txt = txt[:m.start()] + m.group(3) + txt[m.end():]
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.start() + len(m.group(3)))
+    return txt, (nxt.end() if nxt else len(txt))
+
+def param_names(params):
+    return [p.split(":")[0].split("=")[0].strip() for p in params.split(",") if p.strip()]
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+
+if "param_sweep" in txt:
+    print("SKIP: strategy-tester routes already serve sweeps")
+else:
+    m = find_route(txt, "post", "/api/strategy-tester/run")
+    if m is None:
+        die("POST /api/strategy-tester/run handler not found")
+    dec = m.group(1)
+    route = lambda method, path: dec.replace(".post(", f".{method}(").replace('"/api/strategy-tester/run"', f'"{path}"')
+
+    # --- Sweep endpoints, right after the run handler ---
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.end())
+    end = nxt.end() if nxt else len(txt)
+    txt = txt[:end] + route("post", "/api/strategy-tester/sweep") + '''async def strategy_tester_sweep(payload: dict):
+    """
+    Parameter sweep over min_rr, min_score, detector subsets and entry timeframes.
+    space: {entry_tf: [...], detectors: [[...], ...] | {pool, required, min_size, max_size},
+            min_rr: [...], min_score: [...]}; mode: grid | random (samples, seed);
+    objective: total_r | win_rate | profit_factor | expectancy; top_k; min_trades.
+    The top_k configs are stored as tester runs. async=true returns {sweepId} at once.
+    """
+    from core.param_sweep import submit_sweep, wait_sweep
+    try:
+        sweep = submit_sweep(payload)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    if not payload.get("async"):
+        await wait_sweep(sweep)
+    return {"ok": sweep.status != "failed", **sweep.to_dict()}
+
+
+''' + route("get", "/api/strategy-tester/sweeps/{sweep_id}") + '''def strategy_tester_sweep_status(sweep_id: str):
+    from core.param_sweep import get_sweep
+    sweep = get_sweep(sweep_id)
+    if sweep is None:
+        return {"ok": False, "error": "Sweep not found"}
+    return {"ok": True, **sweep}
+
+
+''' + route("post", "/api/strategy-tester/sweeps/{sweep_id}/cancel") + '''def strategy_tester_sweep_cancel(sweep_id: str):
+    from core.param_sweep import cancel_sweep
+    return {"ok": cancel_sweep(sweep_id), "sweepId": sweep_id}
+
+
+''' + txt[end:]
+    print("Added /api/strategy-tester/sweep, /sweeps/{sweep_id}, /sweeps/{sweep_id}/cancel")
+
+    # --- GET /api/strategy-tester/runs: merge sweep runs into the list ---
+    m = find_route(txt, "get", "/api/strategy-tester/runs")
+    if m is not None and set(param_names(m.group(5))) <= {"limit", "offset"}:
+        ldec, list_name = m.group(1), m.group(4)
+        # Legacy page is fetched from 0 so the merged list can be re-paginated
+        call_args = ", ".join("limit=offset + limit" if n == "limit" else "offset=0" for n in param_names(m.group(5)))
+        txt, end = detach(txt, m)
+        txt = txt[:end] + ldec + f'''async def strategy_tester_runs_dispatch(limit: int = 50, offset: int = 0):
+    """Tester runs merged with stored sweep runs, newest first."""
+    import inspect
+    from core.param_sweep import list_sweep_runs
+    res = {list_name}({call_args})
+    res = await res if inspect.isawaitable(res) else res
+    sweep_runs = list_sweep_runs()
+    if not isinstance(res, dict) or not sweep_runs:
+        return res
+    runs = sorted((res.get("runs") or []) + sweep_runs, key=lambda r: str(r.get("created_at") or ""), reverse=True)
+    out = {{**res, "runs": runs[offset:offset + limit]}}
+    if isinstance(res.get("total"), int):
+        out["total"] = res["total"] + len(sweep_runs)
+    return out
+
+
+''' + txt[end:]
+        print("/api/strategy-tester/runs -> merges sweep runs")
+    else:
+        print("WARNING: GET /api/strategy-tester/runs not found or takes other parameters - sweep runs not listed")
+
+    # --- /runs/{id}, /trades, /equity, DELETE: sweep store first ---
+    rm = re.search(r'@\w+\.\w+\(\s*"/api/strategy-tester/runs/\{(\w+)\}', txt)
+    param = rm.group(1) if rm else "run_id"
+    for method, suffix, kind in [("get", "", "run"), ("get", "/trades", "trades"),
+                                 ("get", "/equity", "equity"), ("delete", "", "delete")]:
+        path = "/api/strategy-tester/runs/{" + param + "}" + suffix
+        m = find_route(txt, method, path)
+        if m is not None and param_names(m.group(5)) != [param]:
+            print(f"WARNING: {method.upper()} {path} takes other parameters - sweep runs not served there")
+            continue
+        if m is not None:
+            rdec, name = m.group(1), m.group(4)
+            txt, end = detach(txt, m)
+            txt = txt[:end] + rdec + f'''async def strategy_tester_{kind}_dispatch({param}: str):
+    """Sweep runs come from the sweep store; other ids go to the tester."""
+    import inspect
+    from core.param_sweep import sweep_run_response
+    res = sweep_run_response("{kind}", {param})
+    if res is None:
+        res = {name}({param})
+        res = await res if inspect.isawaitable(res) else res
+    return res
+
+
+''' + txt[end:]
+            print(f"{method.upper()} {path} -> sweep store first")
+        else:
+            txt = txt.rstrip("\n") + "\n\n\n" + route(method, path) + f'''def strategy_tester_sweep_{kind}({param}: str):
+    from core.param_sweep import sweep_run_response
+    return sweep_run_response("{kind}", {param}) or {{"ok": False, "error": "Run not found"}}
+'''
+            print(f"WARNING: {method.upper()} {path} not found - added a sweep-only route")
+
+    SWEEP.write_text(sweep_code, encoding="utf-8")
+    print(f"Created: {SWEEP}")
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE}")
+
+print()
+print("=" * 60)
+print("PARAM SWEEP PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {SWEEP} (new)")
+print(f"  - {ROUTE_FILE}")
+print()
+print("Next: Rebuild container; POST /api/strategy-tester/sweep with a small grid and")
+print("      open the top run_id at /tester/runs/{run_id}")
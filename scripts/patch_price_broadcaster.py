@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Backend price broadcaster for the dashboard price stream
+
+1. Create core/price_broadcaster.py: one producer takes price snapshots (once
+   per MarketFeedPoller poll, or every PRICE_STREAM_INTERVAL_SEC) and fans the
+   changed symbols out to every subscriber. Subscribers filter by symbol and
+   coalesce: a slow client gets the latest price per symbol, never a backlog.
+2. GET /api/prices/stream?symbols=EURUSD,BTCUSD (SSE) next to /api/prices:
+   a "snapshot" message first, then "delta" messages with changed symbols only.
+
+Backend work per tick is one snapshot regardless of how many tabs are open.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+BROADCASTER = ROOT / "core" / "price_broadcaster.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+
+def py_files():
+    for pattern in ("*.py", "*/*.py", "*/*/*.py"):
+        for p in sorted(ROOT.glob(pattern)):
+            if "venv" in p.parts or "site-packages" in p.parts:
+                continue
+            try:
+                yield p, p.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+
+def module_of(path):
+    return ".".join(path.relative_to(ROOT).with_suffix("").parts)
+
+# /api/prices handler: the snapshot source
+ROUTE_FILE, SOURCE = None, ""
+for path, text in py_files():
+    m = re.search(r'@\w+\.get\(\s*"/api/prices"[^\n]*\)\n(?:async\s+)?def\s+(\w+)\(', text)
+    if m:
+        ROUTE_FILE, SOURCE = path, f"{module_of(path)}:{m.group(1)}"
+        break
+if ROUTE_FILE is None:
+    die("GET /api/prices handler not found")
+print(f"Price source: {SOURCE}")
+
+# MarketFeedPoller poll method: a tick right after each poll instead of waiting the interval
+FEED_HOOK = ""
+for path, text in py_files():
+    m = re.search(r"^class MarketFeedPoller\b.*?(?=^\S|\Z)", text, re.S | re.M)
+    if not m:
+        continue
+    for name in ("poll_once", "_poll_once", "_poll", "poll", "_tick", "tick", "run_once", "_run_once"):
+        if re.search(rf"\n    (?:async\s+)?def {name}\(self", m.group(0)):
+            FEED_HOOK = f"{module_of(path)}:MarketFeedPoller.{name}"
+            break
+    break
+if FEED_HOOK:
+    print(f"MarketFeedPoller hook: {FEED_HOOK}")
+else:
+    print("WARNING: MarketFeedPoller poll method not found - interval ticks only (override PRICE_STREAM_FEED_HOOK)")
+
+# ============================================================
+# 1. Create price_broadcaster.py
+# ============================================================
+
+broadcaster_code = '''"""
+price_broadcaster.py
+--------------------
+Single producer / many subscribers price stream.
+
+The dashboard used to open one SSE proxy per tab, each polling /api/prices
+once a second, so backend load grew with the number of viewers. Here one
+producer thread builds a snapshot from the /api/prices handler, right after
+each MarketFeedPoller poll (PRICE_STREAM_FEED_HOOK) or every
+PRICE_STREAM_INTERVAL_SEC, and only while someone is subscribed.
+
+Changed symbols are pushed to each subscriber's pending map (symbol -> latest
+price): filtered to the symbols it asked for, and coalesced, so a slow client
+receives the newest value per symbol instead of a queue of stale ones and
+its memory is bounded by its symbol count. Clients get a "snapshot" message
+first and "delta" messages (changed symbols only) afterwards.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PRICE_SOURCE = os.getenv("PRICE_STREAM_SOURCE", "__SOURCE__")
+PRICE_STREAM_FEED_HOOK = os.getenv("PRICE_STREAM_FEED_HOOK", "__FEED_HOOK__")
+PRICE_STREAM_INTERVAL_SEC = float(os.getenv("PRICE_STREAM_INTERVAL_SEC", "1.0"))
+PRICE_STREAM_MIN_GAP_SEC = float(os.getenv("PRICE_STREAM_MIN_GAP_SEC", "0.25"))  # max tick rate
+PRICE_STREAM_KEEPALIVE_SEC = float(os.getenv("PRICE_STREAM_KEEPALIVE_SEC", "15"))
+PRICE_STREAM_MAX_SUBSCRIBERS = int(os.getenv("PRICE_STREAM_MAX_SUBSCRIBERS", "500"))
+
+
+def _load(target: str) -> Any:
+    module, _, attr = target.partition(":")
+    obj: Any = importlib.import_module(module)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+class PriceSubscription:
+    """One client: symbol filter plus a coalescing pending map."""
+
+    def __init__(self, symbols: Optional[Set[str]], loop: asyncio.AbstractEventLoop):
+        self.symbols = symbols
+        self.closed = False
+        self.primed = False  # has received its snapshot
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self.coalesced = 0
+
+    def wants(self, symbol: str) -> bool:
+        return self.symbols is None or symbol in self.symbols
+
+    def offer(self, prices: Dict[str, Dict[str, Any]], snapshot: bool = False) -> None:
+        """Called from the producer thread; never blocks on the client."""
+        with self._lock:
+            if self.closed:
+                return
+            picked = {s: p for s, p in prices.items() if self.wants(s)}
+            if snapshot:
+                self._snapshot, self._pending, self.primed = picked, {}, True
+            elif self._snapshot is not None:
+                self._snapshot.update(picked)
+            else:
+                self.coalesced += len(picked.keys() & self._pending.keys())
+                self._pending.update(picked)
+            if not picked and not snapshot:
+                return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            self.closed = True
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next message ({type, prices}) or None after timeout."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        with self._lock:
+            self._wakeup.clear()
+            if self._snapshot is not None:
+                msg = {"type": "snapshot", "prices": self._snapshot}
+                self._snapshot = None
+            else:
+                msg = {"type": "delta", "prices": self._pending}
+            self._pending = {}
+        return msg if msg["prices"] or msg["type"] == "snapshot" else None
+
+
+class PriceBroadcaster:
+    def __init__(self, source: str = PRICE_SOURCE):
+        self.source = source
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._subs: Set[PriceSubscription] = set()
+        self._lock = threading.Lock()
+        self._tick = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_ts: Optional[float] = None
+        self._stats = {"snapshots": 0, "deltas": 0, "errors": 0, "feedTicks": 0, "subscribersPeak": 0}
+
+    # --- subscribers ---
+
+    def subscribe(self, symbols: Optional[Iterable[str]], loop: asyncio.AbstractEventLoop) -> Optional[PriceSubscription]:
+        wanted = {s.strip().upper() for s in symbols or [] if s and s.strip()} or None
+        sub = PriceSubscription(wanted, loop)
+        with self._lock:
+            if len(self._subs) >= PRICE_STREAM_MAX_SUBSCRIBERS:
+                return None
+            self._subs.add(sub)
+            self._stats["subscribersPeak"] = max(self._stats["subscribersPeak"], len(self._subs))
+            latest = dict(self._latest)
+        if latest:
+            sub.offer(latest, snapshot=True)
+        self._ensure_producer()
+        self._tick.set()
+        return sub
+
+    def unsubscribe(self, sub: PriceSubscription) -> None:
+        sub.closed = True
+        with self._lock:
+            self._subs.discard(sub)
+
+    def notify(self) -> None:
+        """New prices are available (MarketFeedPoller just polled)."""
+        self._stats["feedTicks"] += 1
+        self._tick.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subs = list(self._subs)
+        return {
+            **self._stats,
+            "subscribers": len(subs),
+            "symbols": len(self._latest),
+            "coalesced": sum(s.coalesced for s in subs),
+            "lastSnapshotAgeSec": round(time.time() - self._last_ts, 2) if self._last_ts else None,
+            "source": self.source,
+            "feedHook": PRICE_STREAM_FEED_HOOK or None,
+        }
+
+    # --- producer ---
+
+    def _ensure_producer(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="price-broadcaster", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._tick.wait(timeout=PRICE_STREAM_INTERVAL_SEC)
+            self._tick.clear()
+            with self._lock:
+                subs = list(self._subs)
+            if not subs:
+                continue
+            try:
+                prices = self._snapshot()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"price snapshot failed: {e}")
+                time.sleep(PRICE_STREAM_INTERVAL_SEC)
+                continue
+            with self._lock:
+                changed = {s: p for s, p in prices.items() if self._latest.get(s) != p}
+                self._latest.update(prices)
+                latest = dict(self._latest)
+            self._last_ts = time.time()
+            self._stats["snapshots"] += 1
+            if changed:
+                self._stats["deltas"] += 1
+            for sub in subs:
+                if not sub.primed:
+                    sub.offer(latest, snapshot=True)
+                elif changed:
+                    sub.offer(changed)
+            time.sleep(PRICE_STREAM_MIN_GAP_SEC)
+
+    def _snapshot(self) -> Dict[str, Dict[str, Any]]:
+        res = _load(self.source)()
+        if inspect.isawaitable(res):
+            res = asyncio.run(res)
+        if not isinstance(res, dict) or not isinstance(res.get("prices"), dict):
+            raise ValueError(f"unexpected /api/prices response: {type(res).__name__}")
+        return {str(s).upper(): p for s, p in res["prices"].items()}
+
+
+def _attach_feed_hook(broadcaster: PriceBroadcaster) -> None:
+    """Wrap MarketFeedPoller's poll method so each poll triggers a tick."""
+    if not PRICE_STREAM_FEED_HOOK:
+        return
+    try:
+        module, _, attr = PRICE_STREAM_FEED_HOOK.partition(":")
+        cls_name, _, method = attr.partition(".")
+        cls = getattr(importlib.import_module(module), cls_name)
+        original = getattr(cls, method)
+        if getattr(original, "_price_broadcast", False):
+            return
+        if inspect.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def wrapped(self, *args, **kwargs):
+                try:
+                    return await original(self, *args, **kwargs)
+                finally:
+                    broadcaster.notify()
+        else:
+            @functools.wraps(original)
+            def wrapped(self, *args, **kwargs):
+                try:
+                    return original(self, *args, **kwargs)
+                finally:
+                    broadcaster.notify()
+        wrapped._price_broadcast = True
+        setattr(cls, method, wrapped)
+        logger.info(f"price broadcaster ticks on {PRICE_STREAM_FEED_HOOK}")
+    except Exception as e:
+        logger.warning(f"price broadcaster feed hook not attached ({PRICE_STREAM_FEED_HOOK}): {e}")
+
+
+async def sse_prices(broadcaster: PriceBroadcaster, sub: PriceSubscription) -> AsyncIterator[str]:
+    """text/event-stream body: {ok, type: snapshot|delta, timestamp, prices} messages."""
+    try:
+        yield "retry: 2000\\n\\n"
+        while not sub.closed:
+            msg = await sub.next(PRICE_STREAM_KEEPALIVE_SEC)
+            if msg is None:
+                yield ": keepalive\\n\\n"
+                continue
+            yield f"data: {json.dumps({'ok': True, 'timestamp': int(time.time()), **msg}, default=str)}\\n\\n"
+    finally:
+        broadcaster.unsubscribe(sub)
+
+
+_broadcaster: Optional[PriceBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_price_broadcaster() -> PriceBroadcaster:
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = PriceBroadcaster()
+                _attach_feed_hook(_broadcaster)
+    return _broadcaster
+'''.replace("__SOURCE__", SOURCE).replace("__FEED_HOOK__", FEED_HOOK)
+
+BROADCASTER.write_text(broadcaster_code, encoding="utf-8")
+print(f"Created: {BROADCASTER}")
+
+# ============================================================
+# 2. GET /api/prices/stream next to /api/prices
+# ============================================================
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+
+if "price_broadcaster" in txt:
+    print("SKIP: /api/prices/stream already present")
+else:
+    m = re.search(r'(@\w+\.get\(\s*"/api/prices"[^\n]*\)\n)(?:async\s+)?def\s+\w+\(', txt)
+    dec = m.group(1)
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.end())
+    end = nxt.end() if nxt else len(txt)
+    stream_route = dec.replace('"/api/prices"', '"/api/prices/stream"')
+    txt = txt[:end] + stream_route + '''async def prices_stream(symbols: str = ""):
+    """
+    Price push stream (SSE). symbols=EURUSD,BTCUSD filters; empty = all.
+    First message is a full snapshot, then deltas with changed symbols only.
+    """
+    import asyncio
+    from fastapi.responses import StreamingResponse
+    from core.price_broadcaster import get_price_broadcaster, sse_prices
+    broadcaster = get_price_broadcaster()
+    sub = broadcaster.subscribe(symbols.split(","), asyncio.get_running_loop())
+    if sub is None:
+        return {"ok": False, "error": "Too many price streams"}
+    return StreamingResponse(
+        sse_prices(broadcaster, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+''' + stream_route.replace('"/api/prices/stream"', '"/api/prices/stream/stats"') + '''def prices_stream_stats():
+    from core.price_broadcaster import get_price_broadcaster
+    return {"ok": True, **get_price_broadcaster().stats()}
+
+
+''' + txt[end:]
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE} (GET /api/prices/stream, /api/prices/stream/stats)")
+
+print()
+print("=" * 60)
+print("PRICE BROADCASTER PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {BROADCASTER} (new)")
+print(f"  - {ROUTE_FILE}")
+print()
+print("Next: Rebuild container; open several dashboard tabs and check")
+print("      GET /api/prices/stream/stats: snapshots grow ~1/s, independent of subscribers")
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Background resample verification for /scan/diagnostics
+
+1. Create core/resample_monitor.py (scheduled verify_resample over active symbol/tf,
+   TTL result cache, per-symbol mismatch history)
+2. scan_engine_v2.py: /scan/diagnostics reads the cached summary instead of
+   running get_resample_status("BTCUSD", "1h") inside the request
+3. scan_engine_v2.py: start the monitor from on_startup()
+
+Requires patch_mega1_marketdata.py (marketdata_verify) and patch_mega2_scanner.py.
+"""
+from pathlib import Path
+import re
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+MONITOR = ROOT / "core" / "resample_monitor.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "marketdata_verify.py").exists():
+    die("Missing core/marketdata_verify.py - run patch_mega1_marketdata.py first")
+if not SCAN.exists():
+    die(f"Missing {SCAN}")
+
+# ============================================================
+# 1. Create resample_monitor.py
+# ============================================================
+
+monitor_code = '''"""
+resample_monitor.py
+-------------------
+Background M5 -> TF resample verification.
+
+verify_resample() loads M5 + native candles and compares them field by field,
+which is far too slow for a request handler polled by the dashboard. This job
+runs it on an interval for every active symbol/tf, keeps the latest result per
+pair in a TTL cache and a short per-pair mismatch history. /scan/diagnostics
+only reads the precomputed summary.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+VERIFY_INTERVAL_SEC = int(os.getenv("RESAMPLE_VERIFY_INTERVAL_SEC", "600"))
+# Results older than this are reported as stale (missed runs, job stopped)
+VERIFY_TTL_SEC = int(os.getenv("RESAMPLE_VERIFY_TTL_SEC", str(VERIFY_INTERVAL_SEC * 3)))
+VERIFY_DAYS = int(os.getenv("RESAMPLE_VERIFY_DAYS", "1"))
+HISTORY_LEN = int(os.getenv("RESAMPLE_VERIFY_HISTORY", "48"))
+
+# Used until the scanner has an active config
+DEFAULT_TARGETS: List[Tuple[str, str]] = [("BTCUSD", "1h")]
+
+Pair = Tuple[str, str]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ResampleMonitor:
+    def __init__(self):
+        self._results: Dict[Pair, Dict[str, Any]] = {}
+        self._history: Dict[Pair, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._summary: Dict[str, Any] = {}
+        self._summary_built: float = 0.0
+        self._targets: Optional[Callable[[], Iterable[Pair]]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._scheduler = None
+        self._stop = threading.Event()
+        self._stats = {"runs": 0, "pairsChecked": 0, "errors": 0, "skippedOverlap": 0, "lastRunMs": 0.0}
+        self._last_run_at: Optional[str] = None
+
+    # --------------------------------------------------------
+    # Job
+    # --------------------------------------------------------
+    def run_once(self, pairs: Optional[Iterable[Pair]] = None) -> int:
+        """Verify every pair once. Returns the number of pairs checked."""
+        if not self._run_lock.acquire(blocking=False):
+            self._stats["skippedOverlap"] += 1
+            return 0
+        try:
+            from core.marketdata_verify import verify_resample
+
+            if pairs is None:
+                pairs = self._resolve_targets()
+            t0 = time.perf_counter()
+            checked = 0
+            for symbol, tf in pairs:
+                key = (symbol.upper(), tf.lower())
+                try:
+                    result = verify_resample(key[0], key[1], days=VERIFY_DAYS)
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.warning(f"resample_monitor: verify {key[0]}/{key[1]} failed: {e}")
+                    continue
+                self._store(key, result)
+                checked += 1
+
+            self._stats["runs"] += 1
+            self._stats["pairsChecked"] += checked
+            self._stats["lastRunMs"] = round((time.perf_counter() - t0) * 1000, 1)
+            self._last_run_at = _now_iso()
+            self._rebuild_summary()
+            return checked
+        finally:
+            self._run_lock.release()
+
+    def _resolve_targets(self) -> List[Pair]:
+        pairs: List[Pair] = []
+        if self._targets is not None:
+            try:
+                pairs = list(self._targets() or [])
+            except Exception as e:
+                logger.debug(f"resample_monitor: target resolution failed: {e}")
+        return pairs or list(DEFAULT_TARGETS)
+
+    def _store(self, key: Pair, result: Dict[str, Any]) -> None:
+        stats = result.get("stats", {})
+        entry = {
+            "ok": result.get("ok", False),
+            "rootCause": result.get("rootCause"),
+            "grid": result.get("grid"),
+            "windowCompletePolicy": result.get("windowCompletePolicy"),
+            "stats": stats,
+            "suggestion": result.get("suggestion"),
+            "checkedAt": _now_iso(),
+            "_checked": time.time(),
+        }
+        point = {
+            "checkedAt": entry["checkedAt"],
+            "rootCause": entry["rootCause"],
+            "mismatchCount": stats.get("mismatch_count", 0),
+            "maxAbsDiff": stats.get("max_abs_diff", 0.0),
+        }
+        with self._lock:
+            self._results[key] = entry
+            self._history.setdefault(key, deque(maxlen=HISTORY_LEN)).append(point)
+
+    def _rebuild_summary(self) -> None:
+        """Precompute the diagnostics view so reads never iterate history."""
+        now = time.time()
+        per_symbol: Dict[str, Dict[str, Any]] = {}
+        tf_mismatch_count = 0
+        stale = 0
+        with self._lock:
+            for (symbol, tf), entry in sorted(self._results.items()):
+                history = self._history.get((symbol, tf), ())
+                is_stale = (now - entry["_checked"]) > VERIFY_TTL_SEC
+                if is_stale:
+                    stale += 1
+                elif entry["rootCause"] == "TF_MISMATCH":
+                    tf_mismatch_count += entry["stats"].get("mismatch_count", 0)
+                per_symbol.setdefault(symbol, {})[tf] = {
+                    "ok": entry["ok"],
+                    "rootCause": entry["rootCause"],
+                    "mismatchCount": entry["stats"].get("mismatch_count", 0),
+                    "checkedAt": entry["checkedAt"],
+                    "stale": is_stale,
+                    "runsWithMismatch": sum(1 for p in history if p["mismatchCount"]),
+                    "runs": len(history),
+                }
+        self._summary = {
+            "tfMismatchCount": tf_mismatch_count,
+            "pairs": sum(len(v) for v in per_symbol.values()),
+            "stalePairs": stale,
+            "lastRunAt": self._last_run_at,
+            "symbols": per_symbol,
+        }
+        self._summary_built = now
+
+    # --------------------------------------------------------
+    # Read path
+    # --------------------------------------------------------
+    def get(self, symbol: str, tf: str) -> Optional[Dict[str, Any]]:
+        """Latest cached result for symbol/tf (None if never checked or expired)."""
+        with self._lock:
+            entry = self._results.get((symbol.upper(), tf.lower()))
+        if entry is None or (time.time() - entry["_checked"]) > VERIFY_TTL_SEC:
+            return None
+        return {k: v for k, v in entry.items() if not k.startswith("_")}
+
+    def history(self, symbol: str, tf: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        symbol = symbol.upper()
+        with self._lock:
+            return {
+                t: list(h) for (s, t), h in self._history.items()
+                if s == symbol and (tf is None or t == tf.lower())
+            }
+
+    def summary(self) -> Dict[str, Any]:
+        # Entries only expire between runs; re-evaluate staleness at most once a minute
+        if self._summary and (time.time() - self._summary_built) > 60:
+            self._rebuild_summary()
+        return self._summary or {"tfMismatchCount": 0, "pairs": 0, "stalePairs": 0, "lastRunAt": None, "symbols": {}}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "intervalSec": VERIFY_INTERVAL_SEC,
+            "ttlSec": VERIFY_TTL_SEC,
+            "running": self.running,
+            "scheduler": "apscheduler" if self._scheduler is not None else ("thread" if self._thread else None),
+        }
+
+    # --------------------------------------------------------
+    # Scheduling
+    # --------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return self._scheduler is not None or (self._thread is not None and self._thread.is_alive())
+
+    def start(self, targets: Optional[Callable[[], Iterable[Pair]]] = None, scheduler=None) -> None:
+        """
+        Run the job every VERIFY_INTERVAL_SEC.
+
+        Uses the given APScheduler instance (or a private BackgroundScheduler)
+        when APScheduler is installed, otherwise a daemon thread.
+        """
+        if targets is not None:
+            self._targets = targets
+        if self.running:
+            return
+
+        try:
+            if scheduler is None:
+                from apscheduler.schedulers.background import BackgroundScheduler
+                scheduler = BackgroundScheduler(daemon=True)
+                scheduler.start()
+            scheduler.add_job(
+                self.run_once,
+                "interval",
+                seconds=VERIFY_INTERVAL_SEC,
+                id="resample_verify",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                next_run_time=datetime.now(timezone.utc),
+            )
+            self._scheduler = scheduler
+            logger.info(f"resample_monitor: scheduled every {VERIFY_INTERVAL_SEC}s")
+            return
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"resample_monitor: scheduler unavailable ({e}), using thread")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="resample-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"resample_monitor: thread started, every {VERIFY_INTERVAL_SEC}s")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"resample_monitor: run failed: {e}")
+            self._stop.wait(VERIFY_INTERVAL_SEC)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._scheduler is not None:
+            try:
+                self._scheduler.remove_job("resample_verify")
+            except Exception:
+                pass
+            self._scheduler = None
+
+
+_monitor: Optional[ResampleMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_resample_monitor() -> ResampleMonitor:
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = ResampleMonitor()
+    return _monitor
+
+
+def start_resample_monitor(targets: Optional[Callable[[], Iterable[Pair]]] = None, scheduler=None) -> ResampleMonitor:
+    monitor = get_resample_monitor()
+    if os.getenv("RESAMPLE_MONITOR", "1") != "0":
+        monitor.start(targets=targets, scheduler=scheduler)
+    return monitor
+
+
+def get_cached_resample_status(symbol: str, tf: str) -> Optional[Dict[str, Any]]:
+    """Cached counterpart of marketdata_verify.get_resample_status (None on cache miss)."""
+    return get_resample_monitor().get(symbol, tf)
+'''
+
+MONITOR.write_text(monitor_code, encoding="utf-8")
+print(f"Created: {MONITOR}")
+
+# ============================================================
+# 2. /scan/diagnostics: read the cache
+# ============================================================
+
+scan_txt = SCAN.read_text(encoding="utf-8")
+
+old_tf_check = '''    # Check for TF mismatch via verify endpoint (best-effort)
+    tf_mismatch_count = 0
+    try:
+        from core.marketdata_verify import get_resample_status
+        # Quick check on BTCUSD
+        verify_result = get_resample_status("BTCUSD", "1h")
+        if verify_result.get("rootCause") == "TF_MISMATCH":
+            tf_mismatch_count = verify_result.get("stats", {}).get("mismatch_count", 0)
+    except Exception:
+        pass  # Module may not exist'''
+
+new_tf_check = '''    # TF mismatch from the background resample monitor (cached, no I/O here)
+    tf_mismatch_count = 0
+    resample_summary = {}
+    try:
+        from core.resample_monitor import get_resample_monitor
+        resample_summary = get_resample_monitor().summary()
+        tf_mismatch_count = resample_summary.get("tfMismatchCount", 0)
+    except Exception:
+        pass  # Module may not exist'''
+
+if "get_resample_monitor().summary()" in scan_txt:
+    print("SKIP: diagnostics already reads resample monitor")
+elif old_tf_check in scan_txt:
+    scan_txt = scan_txt.replace(old_tf_check, new_tf_check, 1)
+    old_resp = '''            "tfMismatchCount": tf_mismatch_count,'''
+    if old_resp in scan_txt:
+        scan_txt = scan_txt.replace(
+            old_resp,
+            old_resp + '''\n            "resampleMonitor": resample_summary,''',
+            1,
+        )
+    print("Diagnostics: TF mismatch now read from resample monitor cache")
+else:
+    print("WARNING: get_resample_status block not found in diagnostics - run patch_mega2_scanner.py first")
+
+# ============================================================
+# 3. Start monitor on startup
+# ============================================================
+
+targets_fn = '''
+
+def _resample_targets() -> List[tuple]:
+    """Active symbol/tf pairs for the resample monitor."""
+    scanner = get_scanner()
+    config = scanner._config
+    if config is None or not scanner.status.running:
+        return []
+    symbols = config.effectiveSymbols or config.symbols
+    return [(s, tf) for s in symbols for tf in config.timeframes if tf.lower() not in ("m5", "5m")]
+'''
+
+if "def _resample_targets(" in scan_txt:
+    print("SKIP: resample monitor startup already present")
+else:
+    m = re.search(r'async def on_startup\(\):\n(\s+"""[^\n]*"""\n)?', scan_txt)
+    if m:
+        startup_hook = '''    try:
+        from core.resample_monitor import start_resample_monitor
+        start_resample_monitor(targets=_resample_targets)
+    except Exception as e:
+        logger.warning(f"Resample monitor not started: {e}")
+'''
+        scan_txt = scan_txt[:m.end()] + startup_hook + scan_txt[m.end():]
+        hooks = re.search(r'\n# =+\n# Lifecycle Hooks', scan_txt)
+        pos = hooks.start() if hooks else m.start()
+        scan_txt = scan_txt[:pos].rstrip("\n") + "\n" + targets_fn + "\n" + scan_txt[pos:]
+        print("Resample monitor started from on_startup()")
+    else:
+        print("WARNING: on_startup() not found - call start_resample_monitor() manually")
+
+SCAN.write_text(scan_txt, encoding="utf-8")
+
+print()
+print("=" * 60)
+print("RESAMPLE MONITOR PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {MONITOR} (new)")
+print(f"  - {SCAN}")
+print()
+print("Next: Rebuild container and check diagnostics.resampleMonitor in GET /scan/diagnostics")
@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+"""
+Indexed tail reader + rotation for scan_results.jsonl
+
+1. Create core/results_log.py:
+   - reverse-seeking tail reader (reads only the last N lines)
+   - sidecar offset index (<file>.idx: every Kth record -> byte offset, ts),
+     caught up incrementally and rebuilt when it no longer matches the file
+   - page(offset, limit) / since(ts, limit) in O(page) on the live file
+   - size-based rotation into gzip archives listed in a manifest; paging and
+     since= continue into the archives, seeking to indexed gzip members
+2. scan_engine_v2.py: load_results() uses it; /scan/results gains offset= and since=;
+   append_result() rotates (the writer is the only process that moves the file)
+
+Requires fix_scan_diagnostics.py (/scan/results with diagnostics).
+"""
+from pathlib import Path
+import re
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+LOG = ROOT / "core" / "results_log.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not SCAN.exists():
+    die(f"Missing {SCAN}")
+
+# ============================================================
+# 1. Create results_log.py
+# ============================================================
+
+log_code = '''"""
+results_log.py
+--------------
+Append-only JSONL log reader with a sidecar offset index and gzip rotation.
+
+Used for state/scan_results.jsonl, which the scanner appends to forever:
+
+- tail(n): reads backwards from EOF in blocks, parses only the last n lines
+- <file>.idx: one checkpoint (record number, byte offset, ts) every
+  INDEX_EVERY records. Only bytes appended since the last read are scanned;
+  a checkpoint that no longer points at a line start (truncated, replaced
+  or hand-edited file) triggers a rebuild.
+- page(offset, limit) / since(ts, limit): seek to the nearest checkpoint and
+  read at most INDEX_EVERY + limit lines
+- rotation: above MAX_BYTES the live file is moved to <dir>/<stem>_archive/
+  as .jsonl.gz and recorded in manifest.json (records, first/last ts).
+  Only the writer rotates (attach_writer, on a background thread so the
+  append itself only pays a stat()), never a reader. Each archive is a
+  chain of gzip members of INDEX_EVERY records with a <archive>.idx sidecar
+  (record number, compressed offset, ts), so queries that reach past the live
+  file decompress only the members they need.
+"""
+
+from __future__ import annotations
+
+import functools
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+INDEX_EVERY = int(os.getenv("RESULTS_INDEX_EVERY", "256"))
+MAX_BYTES = int(float(os.getenv("SCAN_RESULTS_MAX_MB", "64")) * 1024 * 1024)
+KEEP_ARCHIVES = int(os.getenv("SCAN_RESULTS_KEEP_ARCHIVES", "30"))
+TAIL_BLOCK = 64 * 1024
+TS_KEYS = ("ts", "timestamp", "createdAt", "time", "detectedAt")
+INDEX_HEADER = "# jsonl-idx v1"
+
+
+def _parse_ts(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) / 1000.0 if value > 1e11 else float(value)
+    try:
+        s = str(value).strip()
+        if s.endswith("Z"):
+            s = s[:-1] + "+00:00"
+        dt = datetime.fromisoformat(s)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except Exception:
+        return None
+
+
+def _record_ts(rec: Dict[str, Any]) -> Optional[float]:
+    for key in TS_KEYS:
+        if key in rec:
+            ts = _parse_ts(rec[key])
+            if ts is not None:
+                return ts
+    return None
+
+
+def _loads(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        rec = json.loads(line)
+        return rec if isinstance(rec, dict) else None
+    except Exception:
+        return None
+
+
+def tail_lines(path: Path, n: int) -> List[bytes]:
+    """Last n complete lines of path (oldest first), reading backwards from EOF."""
+    if n <= 0:
+        return []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        lines: List[bytes] = []
+        # n lines + a possibly partial first piece + the empty piece after the final newline
+        while pos > 0 and len(lines) <= n + 1:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            lines = buf.split(b"\\n")
+        if lines and lines[-1] == b"":
+            lines.pop()
+        elif lines:
+            lines.pop()  # partial last line (writer mid-append)
+        if pos > 0:
+            lines = lines[1:]  # first piece may be a partial line
+        return [l for l in lines[-n:] if l.strip()]
+
+
+class ResultsLog:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.archive_dir = self.path.parent / f"{self.path.stem}_archive"
+        self._lock = threading.RLock()
+        self._checkpoints: List[Tuple[int, int, Optional[float]]] = []  # (recno, offset, ts)
+        self._cp_ts: List[float] = []
+        self._total = 0
+        self._scanned_to = 0
+        self._last_ts: Optional[float] = None
+        self._inode: Optional[int] = None
+        self._loaded = False
+        self._stats = {"rebuilds": 0, "catchupBytes": 0, "rotations": 0}
+        self._archive_idx: Dict[str, List[Tuple[int, int, Optional[float]]]] = {}
+        self._rotation_queued = False
+
+    # --------------------------------------------------------
+    # Index maintenance
+    # --------------------------------------------------------
+    def _reset(self, inode: Optional[int]) -> None:
+        self._checkpoints = []
+        self._cp_ts = []
+        self._total = 0
+        self._scanned_to = 0
+        self._last_ts = None
+        self._inode = inode
+
+    def _load_index(self, inode: int, size: int) -> None:
+        self._loaded = True
+        self._reset(inode)
+        try:
+            raw = self.index_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return
+        if not raw or raw[0] != f"{INDEX_HEADER} every={INDEX_EVERY} inode={inode}":
+            return
+        cps = []
+        for line in raw[1:]:
+            parts = line.split("\\t")
+            if len(parts) != 3:
+                return
+            ts = float(parts[2]) if parts[2] not in ("", "None") else None
+            cps.append((int(parts[0]), int(parts[1]), ts))
+        if cps and (cps[-1][1] > size or not self._is_line_start(cps[-1][1])):
+            self._stats["rebuilds"] += 1
+            logger.info(f"results_log: index for {self.path.name} out of date - rebuilding")
+            return
+        self._checkpoints = cps
+        self._cp_ts = [c[2] if c[2] is not None else float("-inf") for c in cps]
+        if cps:
+            self._total, self._scanned_to, self._last_ts = cps[-1]
+
+    def _is_line_start(self, offset: int) -> bool:
+        if offset == 0:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\\n"
+
+    def _write_index_header(self) -> None:
+        self.index_path.write_text(f"{INDEX_HEADER} every={INDEX_EVERY} inode={self._inode}\\n", encoding="utf-8")
+
+    def _refresh(self) -> None:
+        """Bring the index up to EOF (scans only bytes appended since the last call)."""
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            self._reset(None)
+            return
+        if not self._loaded or st.st_ino != self._inode or st.st_size < self._scanned_to:
+            if self._loaded:
+                self._stats["rebuilds"] += 1
+            self._load_index(st.st_ino, st.st_size)
+            if not self._checkpoints:
+                try:
+                    self._write_index_header()
+                except OSError as e:
+                    logger.debug(f"results_log: cannot write index: {e}")
+        if st.st_size == self._scanned_to:
+            return
+
+        new_cps = []
+        with open(self.path, "rb") as f:
+            f.seek(self._scanned_to)
+            offset = self._scanned_to
+            for line in f:
+                if not line.endswith(b"\\n"):
+                    break  # partial line, picked up next time
+                if line.strip():
+                    if self._total % INDEX_EVERY == 0:
+                        rec = _loads(line)
+                        ts = _record_ts(rec) if rec else None
+                        if ts is None:
+                            ts = self._last_ts
+                        new_cps.append((self._total, offset, ts))
+                    self._total += 1
+                offset += len(line)
+        self._stats["catchupBytes"] += offset - self._scanned_to
+        self._scanned_to = offset
+
+        # Resuming from a loaded index re-reads the last checkpointed record
+        last_recno = self._checkpoints[-1][0] if self._checkpoints else -1
+        new_cps = [cp for cp in new_cps if cp[0] > last_recno]
+        if new_cps:
+            for cp in new_cps:
+                self._checkpoints.append(cp)
+                self._cp_ts.append(cp[2] if cp[2] is not None else float("-inf"))
+                if cp[2] is not None:
+                    self._last_ts = cp[2]
+            try:
+                with open(self.index_path, "a", encoding="utf-8") as f:
+                    f.writelines(f"{r}\\t{o}\\t{'' if t is None else t}\\n" for r, o, t in new_cps)
+            except OSError as e:
+                logger.debug(f"results_log: cannot append index: {e}")
+
+    def _read_from(self, offset: int, skip: int, limit: int) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\\n"):
+                    break
+                if not line.strip():
+                    continue
+                if skip > 0:
+                    skip -= 1
+                    continue
+                rec = _loads(line)
+                if rec is not None:
+                    out.append(rec)
+                if len(out) >= limit:
+                    break
+        return out
+
+    # --------------------------------------------------------
+    # Queries (results are returned oldest first / newest last)
+    # --------------------------------------------------------
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        out = []
+        for line in tail_lines(self.path, n):
+            rec = _loads(line)
+            if rec is not None:
+                out.append(rec)
+        return out
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._total + sum(a.get("records", 0) for a in self._manifest())
+
+    def page(self, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """limit records ending offset records before the newest one (newest last)."""
+        if limit <= 0:
+            return []
+        if offset <= 0:
+            out = self.tail(limit)
+            if len(out) >= limit or not self._manifest():
+                return out
+        with self._lock:
+            self._refresh()
+            total = self._total
+            end = total - offset            # exclusive, live record numbers
+            start = max(0, end - limit)
+            live: List[Dict[str, Any]] = []
+            if end > 0:
+                i = bisect_right([c[0] for c in self._checkpoints], start) - 1
+                recno, byte_off, _ = self._checkpoints[i] if i >= 0 else (0, 0, None)
+                live = self._read_from(byte_off, start - recno, end - start)
+        missing = limit - len(live)
+        if missing <= 0:
+            return live
+        # Continue into archives (newest archive first)
+        older = self._archive_page(max(0, offset - total), missing)
+        return older + live
+
+    def since(self, since: Union[str, float, datetime], limit: int = 100) -> List[Dict[str, Any]]:
+        """Up to limit records with ts >= since (oldest first)."""
+        if isinstance(since, datetime):
+            since_ts = since.timestamp()
+        elif isinstance(since, (int, float)):
+            since_ts = float(since)
+        else:
+            since_ts = _parse_ts(since)
+        if since_ts is None:
+            return self.page(0, limit)
+
+        out: List[Dict[str, Any]] = []
+        for a in self._manifest():
+            if a.get("lastTs") is not None and a["lastTs"] < since_ts:
+                continue
+            members = self._archive_members(a)
+            # Last member starting strictly before since_ts (members are in time order)
+            i = bisect_right([m[2] if m[2] is not None else float("-inf") for m in members], since_ts) - 1
+            i = max(0, i - 1) if i > 0 else 0
+            start = members[i][1] if members else 0
+            for rec in self._iter_archive(a, start):
+                ts = _record_ts(rec)
+                if ts is not None and ts >= since_ts:
+                    out.append(rec)
+                    if len(out) >= limit:
+                        return out
+
+        with self._lock:
+            self._refresh()
+            # Last checkpoint strictly before since_ts; records are appended in time order
+            i = bisect_right(self._cp_ts, since_ts) - 1
+            i = max(0, i - 1) if i > 0 else 0
+            byte_off = self._checkpoints[i][1] if self._checkpoints else 0
+        if not self.path.exists():
+            return out
+        with open(self.path, "rb") as f:
+            f.seek(byte_off)
+            for line in f:
+                if not line.endswith(b"\\n"):
+                    break
+                rec = _loads(line)
+                if rec is None:
+                    continue
+                ts = _record_ts(rec)
+                if ts is not None and ts >= since_ts:
+                    out.append(rec)
+                    if len(out) >= limit:
+                        break
+        return out
+
+    # --------------------------------------------------------
+    # Rotation / archives
+    # --------------------------------------------------------
+    def _manifest_path(self) -> Path:
+        return self.archive_dir / "manifest.json"
+
+    def _manifest(self) -> List[Dict[str, Any]]:
+        try:
+            return json.loads(self._manifest_path().read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def _archive_members(self, a: Dict[str, Any]) -> List[Tuple[int, int, Optional[float]]]:
+        """(first recno, compressed offset, first ts) per gzip member; [] for unindexed archives."""
+        members = self._archive_idx.get(a["file"])
+        if members is None:
+            try:
+                raw = json.loads((self.archive_dir / (a["file"] + ".idx")).read_text(encoding="utf-8"))
+                members = [(int(r), int(o), t) for r, o, t in raw]
+            except (FileNotFoundError, ValueError):
+                members = []
+            self._archive_idx[a["file"]] = members
+        return members
+
+    def _iter_archive(self, a: Dict[str, Any], start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Records from the gzip member at compressed offset start to the end of the archive."""
+        try:
+            with open(self.archive_dir / a["file"], "rb") as raw:
+                raw.seek(start)
+                with gzip.GzipFile(fileobj=raw, mode="rb") as f:
+                    for line in f:
+                        rec = _loads(line)
+                        if rec is not None:
+                            yield rec
+        except FileNotFoundError:
+            return
+
+    def _archive_page(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """limit records ending offset records before the newest archived one."""
+        out: List[Dict[str, Any]] = []
+        for a in reversed(self._manifest()):
+            n = a.get("records", 0)
+            if offset >= n:
+                offset -= n
+                continue
+            end = n - offset
+            start = max(0, end - (limit - len(out)))
+            members = self._archive_members(a)
+            i = bisect_right([m[0] for m in members], start) - 1
+            recno, byte_off, _ = members[i] if i >= 0 else (0, 0, None)
+            take = []
+            for rec in self._iter_archive(a, byte_off):
+                if recno >= end:
+                    break
+                if recno >= start:
+                    take.append(rec)
+                recno += 1
+            out = take + out
+            offset = 0
+            if len(out) >= limit:
+                break
+        return out
+
+    def _over(self, max_bytes: Optional[int]) -> bool:
+        try:
+            return self.path.stat().st_size >= (MAX_BYTES if max_bytes is None else max_bytes)
+        except FileNotFoundError:
+            return False
+
+    def _create_archive(self):
+        """Open a new archive exclusively; rotations within one second get a -<n> suffix."""
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        for n in range(10000):
+            archive = self.archive_dir / f"{self.path.stem}-{stamp}{f'-{n}' if n else ''}.jsonl.gz"
+            try:
+                return archive, open(archive, "xb")
+            except FileExistsError:
+                continue
+        raise FileExistsError(f"no free archive name for {stamp}")
+
+    def rotate_in_background(self, max_bytes: Optional[int] = None) -> bool:
+        """Queue maybe_rotate() on the rotation thread once the live file exceeds max_bytes."""
+        if not self._over(max_bytes):
+            return False
+        with _logs_lock:
+            if self._rotation_queued:
+                return False
+            self._rotation_queued = True
+        _get_rotator().submit(self._rotate_queued, max_bytes)
+        return True
+
+    def _rotate_queued(self, max_bytes: Optional[int]) -> None:
+        try:
+            self.maybe_rotate(max_bytes)
+        except Exception as e:
+            logger.warning(f"results rotation failed: {e}")
+        finally:
+            with _logs_lock:
+                self._rotation_queued = False
+
+    def maybe_rotate(self, max_bytes: Optional[int] = None) -> Optional[str]:
+        """Move the live file into a gzip archive once it exceeds max_bytes (default MAX_BYTES)."""
+        if not self._over(max_bytes):
+            return None
+        with self._lock:
+            if not self._over(max_bytes):
+                return None  # rotated meanwhile
+            self._refresh()
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            archive, raw = self._create_archive()
+            rotating = self.path.with_name(f"{self.path.name}.rotating-{archive.name}")
+            os.replace(self.path, rotating)  # writers reopen in append mode -> new live file
+
+            first_ts = last_ts = None
+            records = 0
+            members: List[Tuple[int, int, Optional[float]]] = []
+            dst = None
+            with open(rotating, "rb") as src, raw:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    if not line.endswith(b"\\n"):
+                        line += b"\\n"
+                    rec = _loads(line)
+                    ts = _record_ts(rec) if rec else None
+                    if records % INDEX_EVERY == 0:
+                        # New gzip member: a concatenation of members is still one valid .gz
+                        if dst is not None:
+                            dst.close()
+                        members.append((records, raw.tell(), ts if ts is not None else last_ts))
+                        dst = gzip.GzipFile(fileobj=raw, mode="wb")
+                    dst.write(line)
+                    records += 1
+                    if ts is not None:
+                        first_ts = ts if first_ts is None else first_ts
+                        last_ts = ts
+                if dst is not None:
+                    dst.close()
+            (self.archive_dir / (archive.name + ".idx")).write_text(json.dumps(members), encoding="utf-8")
+            rotating.unlink()
+
+            manifest = self._manifest()
+            manifest.append({"file": archive.name, "records": records, "firstTs": first_ts, "lastTs": last_ts,
+                             "rotatedAt": time.time()})
+            while len(manifest) > KEEP_ARCHIVES:
+                old = manifest.pop(0)
+                for name in (old["file"], old["file"] + ".idx"):
+                    try:
+                        (self.archive_dir / name).unlink()
+                    except FileNotFoundError:
+                        pass
+            tmp = self._manifest_path().with_suffix(".tmp")
+            tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+            os.replace(tmp, self._manifest_path())
+
+            try:
+                self.index_path.unlink()
+            except FileNotFoundError:
+                pass
+            self._loaded = False
+            self._reset(None)
+            self._stats["rotations"] += 1
+            logger.info(f"results_log: rotated {self.path.name} -> {archive.name} ({records} records)")
+            return archive.name
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            manifest = self._manifest()
+            return {
+                **self._stats,
+                "liveRecords": self._total,
+                "liveBytes": self._scanned_to,
+                "checkpoints": len(self._checkpoints),
+                "archives": len(manifest),
+                "archivedRecords": sum(a.get("records", 0) for a in manifest),
+            }
+
+
+_logs: Dict[str, ResultsLog] = {}
+_logs_lock = threading.Lock()
+_rotator: Optional[ThreadPoolExecutor] = None
+
+
+def _get_rotator() -> ThreadPoolExecutor:
+    global _rotator
+    with _logs_lock:
+        if _rotator is None:
+            _rotator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="results-rotate")
+        return _rotator
+
+
+def get_results_log(path: Union[str, Path]) -> ResultsLog:
+    key = str(Path(path))
+    with _logs_lock:
+        log = _logs.get(key)
+        if log is None:
+            log = _logs[key] = ResultsLog(key)
+        return log
+
+
+def attach_writer(ns: Dict[str, Any], name: str, path_fn) -> None:
+    """Rotate after ns[name] appends, off the caller's thread - readers never move the file under the writer."""
+    original = ns.get(name)
+    if original is None or getattr(original, "_results_rotating", False):
+        return
+
+    @functools.wraps(original)
+    def wrapped(*args, **kwargs):
+        out = original(*args, **kwargs)
+        try:
+            get_results_log(path_fn()).rotate_in_background()
+        except Exception as e:
+            logger.warning(f"results rotation failed: {e}")
+        return out
+
+    wrapped._results_rotating = True
+    ns[name] = wrapped
+'''
+
+LOG.write_text(log_code, encoding="utf-8")
+print(f"Created: {LOG}")
+
+# ============================================================
+# 2. scan_engine_v2.py: load_results + /scan/results
+# ============================================================
+
+scan_txt = SCAN.read_text(encoding="utf-8")
+
+if "get_results_log" in scan_txt:
+    print("SKIP: load_results already uses results_log")
+else:
+    m = re.search(r"\ndef load_results\([^)]*\)[^:]*:\n", scan_txt)
+    if not m:
+        die("load_results() not found in scan_engine_v2.py")
+    body_end = re.search(r"\n(?=\S)", scan_txt[m.end():])
+    end = m.end() + body_end.start() + 1 if body_end else len(scan_txt)
+    new_load = '''
+def _results_path() -> Path:
+    for name in ("RESULTS_FILE", "RESULTS_PATH", "SCAN_RESULTS_FILE"):
+        p = globals().get(name)
+        if p:
+            return Path(p)
+    return Path(os.getenv("STATE_DIR", "/app/state")) / "scan_results.jsonl"
+
+
+def load_results(limit: int = 100, offset: int = 0, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Load recent results (newest last); offset pages back from the newest, since= filters by ts."""
+    from core.results_log import get_results_log
+    log = get_results_log(_results_path())
+    if since:
+        return log.since(since, limit)
+    return log.page(offset=offset, limit=limit)
+
+
+'''
+    scan_txt = scan_txt[:m.start()] + "\n" + new_load + scan_txt[end:]
+    print("load_results(): tail reader + offset index")
+
+    old_sig = '''async def get_scan_results(limit: int = 100):'''
+    if old_sig in scan_txt:
+        idx = scan_txt.find(old_sig)
+        scan_txt = scan_txt.replace(old_sig, '''async def get_scan_results(limit: int = 100, offset: int = 0, since: str = ""):''', 1)
+        call = "    results = load_results(limit)\n"
+        cidx = scan_txt.find(call, idx)
+        if cidx != -1:
+            scan_txt = scan_txt[:cidx] + "    results = load_results(limit, offset=offset, since=since or None)\n" + scan_txt[cidx + len(call):]
+        resp = '''        "results": results,\n'''
+        ridx = scan_txt.find(resp, idx)
+        if ridx != -1 and ridx - idx < 2000:
+            paging = '''        "paging": {"offset": offset, "limit": limit, "since": since or None},\n'''
+            scan_txt = scan_txt[:ridx + len(resp)] + paging + scan_txt[ridx + len(resp):]
+        print("/scan/results: added offset= and since=")
+    else:
+        print("WARNING: /scan/results handler signature not found")
+
+    if "def append_result(" in scan_txt:
+        scan_txt = scan_txt.rstrip("\n") + '''
+
+
+# Results log: the writer rotates scan_results.jsonl (patch_results_log.py)
+try:
+    from core.results_log import attach_writer
+    attach_writer(globals(), "append_result", _results_path)
+except Exception as e:
+    logger.warning(f"scan_results rotation disabled: {e}")
+'''
+        print("append_result(): rotates scan_results.jsonl after appends")
+    else:
+        print("WARNING: append_result() not found - scan_results.jsonl will not rotate")
+
+    SCAN.write_text(scan_txt, encoding="utf-8")
+
+print()
+print("=" * 60)
+print("RESULTS LOG PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {LOG} (new)")
+print(f"  - {SCAN}")
+print()
+print("Next: Rebuild container and check GET /scan/results?limit=50&offset=50 and ?since=<iso ts>")
@@ -0,0 +1,745 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency histograms for scan cycles
+
+1. Create core/scan_metrics.py: fixed-bucket latency histograms keyed by
+   stage/symbol/TF/detector with p50/p95/p99, a Prometheus text exposition
+   and a per-cycle stage breakdown.
+2. Instrument scan_engine_v2 at import (module globals it already calls):
+   coverage, candles (+ aggregate), features, the detector runner (batch,
+   plus each detector through its detector registry entry), gating, RR
+   filtering, persist, telegram, per symbol/TF scan and whole cycle.
+3. strategy_planner: one timer per planned strategy evaluation (min_score
+   check as gating).
+4. ScanStatus.stageLatency: process-mode workers ship their histograms back
+   through the existing status merge (drained every cycle).
+5. /api/metrics/detailed gains "scanStages"; GET /api/metrics/prometheus.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+SCAN_ENGINE = ROOT / "core" / "scan_engine_v2.py"
+PLANNER = ROOT / "core" / "strategy_planner.py"
+METRICS = ROOT / "core" / "scan_metrics.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not SCAN_ENGINE.exists():
+    die(f"Missing {SCAN_ENGINE}")
+
+def py_files(patterns=("*.py", "*/*.py")):
+    for pattern in patterns:
+        for p in sorted(ROOT.glob(pattern)):
+            if p == METRICS or any(part in ("venv", "node_modules", "__pycache__") or part.startswith(".") for part in p.parts):
+                continue
+            try:
+                yield p, p.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+
+# Telegram fan-out functions (timed as stage "telegram")
+TELEGRAM = []
+for path, text in py_files():
+    for m in re.finditer(r"^(?:async\s+)?def ((?:_?send|_?notify|_?dispatch)_\w*telegram\w*|telegram_\w*send\w*)\(", text, re.M):
+        TELEGRAM.append(".".join(path.relative_to(ROOT).with_suffix("").parts) + ":" + m.group(1))
+if TELEGRAM:
+    print(f"Telegram fan-out: {', '.join(TELEGRAM)}")
+else:
+    print("WARNING: no telegram send function found - set SCAN_METRICS_TELEGRAM=module:func to time it")
+
+def module_name(path):
+    return ".".join(path.relative_to(ROOT).with_suffix("").parts)
+
+def find_defs(pattern):
+    """module:func / module:Class.method targets for defs whose name matches pattern."""
+    found = []
+    for path, text in py_files(("*.py", "*/*.py", "*/*/*.py")):
+        for m in re.finditer(r"^([ \t]*)(?:async\s+)?def (" + pattern + r")\(", text, re.M | re.I):
+            name = m.group(2)
+            if m.group(1):
+                classes = re.findall(r"^class (\w+)", text[:m.start()], re.M)
+                if not classes:
+                    continue
+                name = f"{classes[-1]}.{name}"
+            found.append(f"{module_name(path)}:{name}")
+    return found
+
+# Gating and RR filtering (timed as stages "gate" / "rr_filter")
+GATE = find_defs(r"_?(?:apply|check|run|eval\w*)_gates?\w*|_?gates?_(?:check|filter|pass)\w*")
+RR_FILTER = find_defs(r"_?(?:apply|check)_(?:min_)?rr\w*|_?(?:filter|passes)_\w*rr\w*|_?rr_(?:filter|check|ok)\w*")
+for label, found, env in (("Gating", GATE, "SCAN_METRICS_GATE"), ("RR filter", RR_FILTER, "SCAN_METRICS_RR_FILTER")):
+    if found:
+        print(f"{label}: {', '.join(found)}")
+    else:
+        print(f"WARNING: no {label.lower()} function found - set {env}=module:func (or module:Class.method) to time it")
+
+# Detector registries (name -> detector); each entry is timed as stage "detector"
+REGISTRIES = []
+for path, text in py_files(("*.py", "*/*.py", "*/*/*.py")):
+    for m in re.finditer(r"^([A-Z_]*DETECTOR[A-Z_]*|[A-Z_]*REGISTRY)\s*(?::[^=\n]+)?=\s*(?:\{|dict\()", text, re.M):
+        REGISTRIES.append(f"{module_name(path)}:{m.group(1)}")
+if REGISTRIES:
+    print(f"Detector registries: {', '.join(REGISTRIES)}")
+else:
+    print("WARNING: no detector registry found - set SCAN_METRICS_DETECTOR_REGISTRY=module:NAME for per-detector timings")
+
+# ============================================================
+# 1. Create scan_metrics.py
+# ============================================================
+
+metrics_code = '''"""
+scan_metrics.py
+---------------
+Where a scan cycle spends its time.
+
+/scan/status has cycle wall time and counters but no breakdown, so a slow
+cycle could be candle I/O or detector CPU. Hot-path stages are timed with
+perf_counter and folded into fixed-bucket histograms (Prometheus-style) keyed
+by (stage, symbol, tf, detector):
+
+    cycle        whole cycle                 scan         one symbol/TF
+    coverage     bridge_get_coverage         candles      candle fetch (incl. aggregate)
+    aggregate    M5 -> TF resample           features     shared detector features
+    detectors    detector runner (batch)     strategy     one planned strategy's evaluation
+    detector     one detector (label), inside the batch
+    gate         gating / min_score          rr_filter    min RR filtering
+    persist      append_result               telegram     signal fan-out
+
+Per-detector timings wrap the entries of the detector registry the runner
+looks detectors up in, so the batch runs as one call and keeps whatever it
+shares across detectors.
+
+Observations need a scan context (set per symbol/TF by the engine), so chart
+or backtest calls through the same functions are not counted. Histograms are
+cumulative since start; lastCycle holds per-stage totals of the latest cycle.
+Process-mode workers export their histograms through ScanStatus.stageLatency.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import importlib
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in ms; one overflow bucket on top
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+SCAN_METRICS_ENABLED = os.getenv("SCAN_METRICS", "1") != "0"
+SCAN_METRICS_PER_DETECTOR = os.getenv("SCAN_METRICS_PER_DETECTOR", "1") != "0"
+SCAN_METRICS_TELEGRAM = [t for t in os.getenv("SCAN_METRICS_TELEGRAM", "__TELEGRAM__").split(",") if t]
+SCAN_METRICS_GATE = [t for t in os.getenv("SCAN_METRICS_GATE", "__GATE__").split(",") if t]
+SCAN_METRICS_RR_FILTER = [t for t in os.getenv("SCAN_METRICS_RR_FILTER", "__RR_FILTER__").split(",") if t]
+SCAN_METRICS_DETECTOR_REGISTRY = [t for t in os.getenv("SCAN_METRICS_DETECTOR_REGISTRY", "__REGISTRIES__").split(",") if t]
+
+_labels: contextvars.ContextVar = contextvars.ContextVar("scan_metrics_labels", default=None)
+
+Key = Tuple[str, str, str, str]  # stage, symbol, tf, detector
+
+
+class Histogram:
+    __slots__ = ("counts", "sum_ms", "count", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.sum_ms = 0.0
+        self.count = 0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum_ms += ms
+        self.count += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: "Histogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum_ms += other.sum_ms
+        self.count += other.count
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Linear interpolation inside the bucket (histogram_quantile)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = BUCKETS_MS[i - 1] if i > 0 else 0.0
+                hi = BUCKETS_MS[i] if i < len(BUCKETS_MS) else max(self.max_ms, lo)
+                est = lo + (hi - lo) * (rank - seen) / c
+                return round(min(est, self.max_ms) if self.max_ms else est, 3)
+            seen += c
+        return round(self.max_ms, 3)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "avgMs": round(self.sum_ms / self.count, 3) if self.count else None,
+            "maxMs": round(self.max_ms, 3),
+            "totalMs": round(self.sum_ms, 1),
+        }
+
+
+class ScanMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        # New lock too: a forked worker may inherit a held one
+        self._lock = threading.Lock()
+        self._hist: Dict[Key, Histogram] = {}
+        self._cycle: Dict[str, float] = {}
+        self._last_cycle: Dict[str, Any] = {}
+        self._cycles = 0
+
+    def observe(self, stage: str, ms: float, symbol: str = "", tf: str = "", detector: str = "") -> None:
+        key = (stage, symbol, tf, detector)
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = Histogram()
+            h.observe(ms)
+            self._cycle[stage] = self._cycle.get(stage, 0.0) + ms
+
+    # --- cycles ---
+
+    def begin_cycle(self) -> None:
+        with self._lock:
+            self._cycle = {}
+
+    def end_cycle(self, wall_ms: float) -> None:
+        self.observe("cycle", wall_ms)
+        with self._lock:
+            self._cycles += 1
+            stages = {k: round(v, 1) for k, v in sorted(self._cycle.items(), key=lambda kv: -kv[1]) if k != "cycle"}
+            self._last_cycle = {"wallMs": round(wall_ms, 1), "stagesMs": stages}
+
+    # --- process-mode transport (numbers only, so the status merge adds them) ---
+    # Keys carry symbol/TF and a process task scans one symbol/TF per cycle, so
+    # two tasks never add into the same entry and "max" survives the merge.
+
+    def export(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for key, h in self._hist.items():
+                entry = {f"b{i}": c for i, c in enumerate(h.counts) if c}
+                entry["sum"] = h.sum_ms
+                entry["count"] = h.count
+                entry["max"] = h.max_ms
+                out["|".join(key)] = entry
+            return out
+
+    def absorb(self, exported: Dict[str, Dict[str, float]]) -> None:
+        for skey, entry in (exported or {}).items():
+            parts = skey.split("|")
+            if len(parts) != 4 or not entry.get("count"):
+                continue
+            h = Histogram()
+            for i in range(len(h.counts)):
+                h.counts[i] = int(entry.get(f"b{i}", 0))
+            h.sum_ms = float(entry.get("sum", 0.0))
+            h.count = int(entry["count"])
+            # Older workers did not ship max; the mean is a lower bound
+            h.max_ms = float(entry.get("max", h.sum_ms / h.count))
+            key = tuple(parts)
+            with self._lock:
+                self._hist.setdefault(key, Histogram()).merge(h)
+                self._cycle[parts[0]] = self._cycle.get(parts[0], 0.0) + h.sum_ms
+
+    # --- views ---
+
+    def _grouped(self, by: Callable[[Key], Optional[str]]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            items = list(self._hist.items())
+        groups: Dict[str, Histogram] = {}
+        for key, h in items:
+            g = by(key)
+            if g is None:
+                continue
+            groups.setdefault(g, Histogram()).merge(h)
+        return {g: h.summary() for g, h in sorted(groups.items())}
+
+    def detailed(self) -> Dict[str, Any]:
+        by_stage = self._grouped(lambda k: k[0])
+        scan_ms = sum(s["totalMs"] for st, s in by_stage.items() if st == "scan")
+        io_ms = sum(s["totalMs"] for st, s in by_stage.items() if st in ("coverage", "candles", "persist", "telegram"))
+        # "detector" is a breakdown of "detectors"
+        cpu_ms = sum(s["totalMs"] for st, s in by_stage.items() if st in ("features", "detectors", "gate", "rr_filter"))
+        return {
+            "enabled": SCAN_METRICS_ENABLED,
+            "cycles": self._cycles,
+            "bucketsMs": list(BUCKETS_MS),
+            "stages": by_stage,
+            "detectors": self._grouped(lambda k: k[3] if k[0] == "detector" else None),
+            "symbolTf": self._grouped(lambda k: f"{k[1]}/{k[2]}" if k[0] == "scan" else None),
+            "stageBySymbolTf": self._grouped(lambda k: f"{k[0]}:{k[1]}/{k[2]}" if k[1] and k[0] not in ("scan", "detector") else None),
+            "ioVsCpu": {
+                "ioMs": round(io_ms, 1),
+                "cpuMs": round(cpu_ms, 1),
+                "ioShare": round(io_ms / scan_ms, 3) if scan_ms else None,
+                "cpuShare": round(cpu_ms / scan_ms, 3) if scan_ms else None,
+            },
+            "lastCycle": dict(self._last_cycle),
+        }
+
+    def prometheus(self, prefix: str = "jkm_scan_stage") -> str:
+        """Text exposition (version 0.0.4): one histogram family in seconds."""
+        with self._lock:
+            items = sorted(self._hist.items())
+        name = f"{prefix}_seconds"
+        lines = [
+            f"# HELP {name} Scan hot-path stage latency",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, symbol, tf, detector), h in items:
+            labels = f\'stage="{stage}",symbol="{symbol}",tf="{tf}",detector="{detector}"\'
+            cum = 0
+            for i, bound in enumerate(BUCKETS_MS):
+                cum += h.counts[i]
+                lines.append(f\'{name}_bucket{{{labels},le="{bound / 1000:g}"}} {cum}\')
+            lines.append(f\'{name}_bucket{{{labels},le="+Inf"}} {h.count}\')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum_ms / 1000:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+        lines.append(f"# HELP {prefix}_cycles_total Scan cycles observed")
+        lines.append(f"# TYPE {prefix}_cycles_total counter")
+        lines.append(f"{prefix}_cycles_total {self._cycles}")
+        return "\\n".join(lines) + "\\n"
+
+
+_metrics = ScanMetrics()
+
+
+def get_scan_metrics() -> ScanMetrics:
+    return _metrics
+
+
+# ============================================================
+# Timing helpers
+# ============================================================
+
+@contextmanager
+def scan_context(symbol: str, tf: str):
+    """Label observations made while scanning symbol/tf (thread and task local)."""
+    token = _labels.set((str(symbol).upper(), str(tf).upper()))
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+@contextmanager
+def stage_timer(stage: str, detector: str = ""):
+    """Time a block under the current scan context; no-op outside a scan."""
+    labels = _labels.get()
+    if labels is None or not SCAN_METRICS_ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.observe(stage, (time.perf_counter() - t0) * 1000, labels[0], labels[1], detector)
+
+
+def timed(stage: str, fn: Callable, detector: str = "") -> Callable:
+    if getattr(fn, "_scan_stage", None):
+        return fn
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with stage_timer(stage, detector):
+                return await fn(*args, **kwargs)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage, detector):
+                return fn(*args, **kwargs)
+    wrapper._scan_stage = stage
+    return wrapper
+
+
+# Registries (name -> detector function, class or instance) and entries seen
+_registries: List[Tuple[Dict[Any, Any], List[int]]] = []
+
+
+def time_detector_registry(registry: Dict[Any, Any]) -> int:
+    """Time every entry of a detector registry as stage "detector" (label = registry key)."""
+    wrapped = 0
+    for name, entry in list(registry.items()):
+        if getattr(entry, "_scan_stage", None):
+            continue
+        if callable(entry) and not isinstance(entry, type):
+            registry[name] = timed("detector", entry, str(name))
+            wrapped += 1
+            continue
+        # Detector classes / instances: time the method the runner calls
+        for method in ("detect", "run", "__call__"):
+            fn = getattr(entry, method, None)
+            if callable(fn) and not getattr(fn, "_scan_stage", None):
+                if _wrap_attr(entry, method, lambda f, n=str(name): timed("detector", f, n)):
+                    wrapped += 1
+                break
+    return wrapped
+
+
+def _refresh_registries() -> None:
+    """Wrap entries registered since the last batch (registries filled lazily)."""
+    for registry, seen in _registries:
+        if len(registry) != seen[0]:
+            time_detector_registry(registry)
+            seen[0] = len(registry)
+
+
+def per_detector(run: Callable) -> Callable:
+    """Detector runner wrapper: the batch is one "detectors" observation; registry entries time each detector inside it."""
+    if getattr(run, "_scan_stage", None):
+        return run
+
+    @functools.wraps(run)
+    def wrapper(candles, detectors, *args, **kwargs):
+        if _registries and _labels.get() is not None:
+            _refresh_registries()
+        with stage_timer("detectors"):
+            return run(candles, detectors, *args, **kwargs)
+
+    wrapper._scan_stage = "detectors"
+    return wrapper
+
+
+# ============================================================
+# Scan engine instrumentation
+# ============================================================
+
+_STAGE_FUNCS = {
+    "bridge_get_coverage": "coverage",
+    "bridge_get_candles": "candles",
+    "bridge_get_candle_frame": "candles",
+    "bridge_get_features": "features",
+    "append_result": "persist",
+}
+
+
+def _wrap_attr(owner: Any, name: str, wrap: Callable[[Callable], Callable]) -> bool:
+    raw = inspect.getattr_static(owner, name, None)
+    if isinstance(raw, (staticmethod, classmethod)):
+        setattr(owner, name, type(raw)(wrap(raw.__func__)))
+        return True
+    fn = getattr(owner, name, None)
+    if fn is None or not callable(fn):
+        return False
+    setattr(owner, name, wrap(fn))
+    return True
+
+
+def _resolve(target: str) -> Tuple[Any, str]:
+    """module:func or module:Class.method -> (owner, attribute)."""
+    module, _, path = target.partition(":")
+    owner: Any = importlib.import_module(module)
+    *parents, name = path.split(".")
+    for p in parents:
+        owner = getattr(owner, p)
+    return owner, name
+
+
+def instrument_scan_engine(ns: Dict[str, Any]) -> List[str]:
+    """Wrap the scan engine's hot-path calls (module namespace of scan_engine_v2)."""
+    if not SCAN_METRICS_ENABLED:
+        return []
+    done: List[str] = []
+    for name, stage in _STAGE_FUNCS.items():
+        if callable(ns.get(name)):
+            ns[name] = timed(stage, ns[name])
+            done.append(name)
+    if callable(ns.get("_run_detectors")):
+        ns["_run_detectors"] = per_detector(ns["_run_detectors"])
+        done.append("_run_detectors")
+    if SCAN_METRICS_PER_DETECTOR:
+        for target in SCAN_METRICS_DETECTOR_REGISTRY:
+            try:
+                owner, name = _resolve(target)
+                registry = getattr(owner, name)
+                if isinstance(registry, dict) and all(r is not registry for r, _ in _registries):
+                    time_detector_registry(registry)
+                    _registries.append((registry, [len(registry)]))
+                    done.append(target)
+            except Exception as e:
+                logger.warning(f"scan metrics: detector registry {target} not instrumented: {e}")
+
+    # Gating / RR filtering (functions or engine methods)
+    for stage, targets in (("gate", SCAN_METRICS_GATE), ("rr_filter", SCAN_METRICS_RR_FILTER)):
+        for target in targets:
+            try:
+                owner, name = _resolve(target)
+                if _wrap_attr(owner, name, lambda f, st=stage: timed(st, f)):
+                    done.append(target)
+                if "." not in target.partition(":")[2] and callable(ns.get(name)):  # imported by name into the engine
+                    ns[name] = getattr(owner, name)
+            except Exception as e:
+                logger.warning(f"scan metrics: {stage} hook {target} not attached: {e}")
+
+    # M5 -> TF resampling inside the candle path
+    for module in ("core.market_data_bridge", "core.htf_bar_cache", "core.cycle_candles"):
+        try:
+            if _wrap_attr(importlib.import_module(module), "resample_frame", lambda f: timed("aggregate", f)):
+                done.append(f"{module}.resample_frame")
+        except Exception as e:
+            logger.debug(f"scan metrics: {module} not instrumented: {e}")
+
+    for target in SCAN_METRICS_TELEGRAM:
+        module, _, func = target.partition(":")
+        try:
+            mod = importlib.import_module(module)
+            if _wrap_attr(mod, func, lambda f: timed("telegram", f)):
+                done.append(target)
+            if callable(ns.get(func)):  # imported by name into the engine
+                ns[func] = getattr(mod, func)
+        except Exception as e:
+            logger.warning(f"scan metrics: telegram hook {target} not attached: {e}")
+
+    engine = ns.get("ScanEngine")
+    if engine is not None:
+        if hasattr(engine, "_scan_symbol_tf_impl"):
+            engine._scan_symbol_tf_impl = _scan_impl_wrapper(engine._scan_symbol_tf_impl)
+            done.append("ScanEngine._scan_symbol_tf_impl")
+        if hasattr(engine, "_run_cycle_guarded"):
+            engine._run_cycle_guarded = _cycle_wrapper(engine._run_cycle_guarded)
+            done.append("ScanEngine._run_cycle_guarded")
+    if callable(ns.get("_scan_task_in_process")):
+        ns["_scan_task_in_process"] = _process_task_wrapper(ns["_scan_task_in_process"])
+        done.append("_scan_task_in_process")
+    if callable(ns.get("register_additive_status_field")):
+        ns["register_additive_status_field"]("stageLatency")
+    logger.info(f"scan metrics instrumented: {', '.join(done)}")
+    return done
+
+
+def _scan_impl_wrapper(fn: Callable) -> Callable:
+    if getattr(fn, "_scan_stage", None):
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(self, symbol, tf, *args, **kwargs):
+        with scan_context(symbol, tf), stage_timer("scan"):
+            return fn(self, symbol, tf, *args, **kwargs)
+
+    wrapper._scan_stage = "scan"
+    return wrapper
+
+
+def _cycle_wrapper(fn: Callable) -> Callable:
+    if getattr(fn, "_scan_stage", None):
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        _metrics.begin_cycle()
+        t0 = time.perf_counter()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            status = getattr(self, "_status", None)
+            shipped = getattr(status, "stageLatency", None)
+            if shipped:
+                _metrics.absorb(shipped)
+                status.stageLatency = {}
+            _metrics.end_cycle((time.perf_counter() - t0) * 1000)
+
+    wrapper._scan_stage = "cycle"
+    return wrapper
+
+
+def _process_task_wrapper(fn: Callable) -> Callable:
+    if getattr(fn, "_scan_stage", None):
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        _metrics.reset()  # worker-local: ship only this task's observations
+        out = fn(*args, **kwargs)  # (result, error, status, ...)
+        if hasattr(out[2], "stageLatency"):
+            out[2].stageLatency = _metrics.export()
+        return out
+
+    wrapper._scan_stage = "process"
+    return wrapper
+'''.replace("__TELEGRAM__", ",".join(TELEGRAM)).replace("__GATE__", ",".join(GATE)) \
+   .replace("__RR_FILTER__", ",".join(RR_FILTER)).replace("__REGISTRIES__", ",".join(REGISTRIES))
+
+# ============================================================
+# 2./4. scan_engine_v2: status transport field + instrumentation
+# ============================================================
+
+txt = SCAN_ENGINE.read_text(encoding="utf-8")
+
+if "instrument_scan_engine" in txt:
+    print("SKIP: scan_engine_v2 already instrumented")
+else:
+    anchor = "    perSymbol: Dict[str, Any] = {}"
+    idx = txt.find(anchor)
+    if idx < 0:
+        die("ScanStatus.perSymbol not found")
+    txt = txt[:idx] + "    stageLatency: Dict[str, Any] = {}  # process-mode histogram transport (drained per cycle)\n" + txt[idx:]
+
+    txt = txt.rstrip("\n") + '''
+
+
+# Per-stage latency histograms (/api/metrics/detailed, /api/metrics/prometheus)
+try:
+    from core.scan_metrics import instrument_scan_engine
+    instrument_scan_engine(globals())
+except Exception as e:
+    logger.warning(f"scan stage metrics disabled: {e}")
+'''
+    SCAN_ENGINE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {SCAN_ENGINE}")
+
+# ============================================================
+# 3. strategy_planner: per-strategy evaluation
+# ============================================================
+
+if not PLANNER.exists():
+    print("WARNING: strategy_planner.py missing - strategy stage not timed")
+else:
+    ptxt = PLANNER.read_text(encoding="utf-8")
+    if "stage_timer" in ptxt:
+        print("SKIP: strategy_planner already timed")
+    else:
+        edits = [
+            ("from typing import Any, Dict, Iterable, List, Optional, Tuple\n",
+             "from typing import Any, Dict, Iterable, List, Optional, Tuple\n"
+             "\ntry:\n    from core.scan_metrics import stage_timer\n"
+             "except ImportError:  # metrics are optional\n"
+             "    from contextlib import nullcontext as _nullcontext\n\n"
+             "    def stage_timer(stage, detector=\"\"):\n        return _nullcontext()\n"),
+            ('''                result = impl(self, symbol, tf)
+''', '''                with stage_timer("strategy"):
+                    result = impl(self, symbol, tf)
+'''),
+            ('''                    if spec.score(self._detector_pass.get("byName") or {}) < spec.min_score:
+''', '''                    with stage_timer("gate"):
+                        below = spec.score(self._detector_pass.get("byName") or {}) < spec.min_score
+                    if below:
+'''),
+        ]
+        for old, new in edits:
+            if old not in ptxt:
+                print(f"WARNING: strategy_planner anchor not found, stage not timed: {old.strip().splitlines()[0][:60]}")
+                continue
+            ptxt = ptxt.replace(old, new, 1)
+        PLANNER.write_text(ptxt, encoding="utf-8")
+        print(f"Patched: {PLANNER}")
+
+METRICS.write_text(metrics_code, encoding="utf-8")
+print(f"Created: {METRICS}")
+
+# ============================================================
+# 5. Routes
+# ============================================================
+
+def find_route(txt, method, path):
+    """Match of '@obj.method("path")' + handler def: groups (decorator, obj, def, name, params)."""
+    return re.compile(
+        r'(@(\w+)\.' + method + r'\(\s*"' + re.escape(path) + r'"[^\n]*\)\n)'
+        r'((?:async\s+)?def\s+(\w+)\(([^)]*)\))'
+    ).search(txt)
+
+def detach(txt, m):
+    """Drop the route decorator (handler stays as a plain function); returns (txt, end of handler)."""
+    txt = txt[:m.start()] + m.group(3) + txt[m.end():]
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.start() + len(m.group(3)))
+    return txt, (nxt.end() if nxt else len(txt))
+
+ROUTE_FILE = None
+for path, text in py_files():
+    if find_route(text, "get", "/api/metrics/detailed") or find_route(text, "get", "/api/metrics"):
+        ROUTE_FILE = path
+        break
+if ROUTE_FILE is None:
+    ROUTE_FILE = ROOT / "api_server.py"
+    print(f"WARNING: /api/metrics routes not found - adding them to {ROUTE_FILE.name}")
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+
+PROMETHEUS_HANDLER = '''def metrics_prometheus():
+    """Scan stage latency histograms in Prometheus text format."""
+    from fastapi.responses import PlainTextResponse
+    from core.scan_metrics import get_scan_metrics
+    return PlainTextResponse(get_scan_metrics().prometheus(), media_type="text/plain; version=0.0.4")
+'''
+
+if "scan_metrics" in txt:
+    print("SKIP: metrics routes already expose scan stages")
+else:
+    m = find_route(txt, "get", "/api/metrics/detailed")
+    if m is not None and not m.group(5).strip():
+        dec, legacy = m.group(1), m.group(4)
+        txt, end = detach(txt, m)
+        txt = txt[:end] + dec + f'''async def metrics_detailed_dispatch():
+    """Detailed metrics plus per-stage scan latency (p50/p95/p99 per stage/detector/symbol-TF)."""
+    import inspect
+    from core.scan_metrics import get_scan_metrics
+    res = {legacy}()
+    res = await res if inspect.isawaitable(res) else res
+    if isinstance(res, dict):
+        res = {{**res, "scanStages": get_scan_metrics().detailed()}}
+    return res
+
+
+''' + dec.replace('"/api/metrics/detailed"', '"/api/metrics/prometheus"') + PROMETHEUS_HANDLER + "\n\n" + txt[end:]
+        print("/api/metrics/detailed -> + scanStages; added /api/metrics/prometheus")
+    else:
+        if m is not None:
+            print("WARNING: /api/metrics/detailed takes parameters - left as is, scan stages at /api/metrics/scan-stages")
+            path = "/api/metrics/scan-stages"
+        else:
+            path = "/api/metrics/detailed"
+        ref = m or find_route(txt, "get", "/api/metrics")
+        if ref is not None:
+            dec = re.sub(r'"/api/metrics[^"]*"', '"{path}"', ref.group(1))
+        else:
+            app = re.search(r"^(\w+)\s*=\s*FastAPI\(", txt, re.M)
+            dec = f'@{app.group(1) if app else "app"}.get("{{path}}")\n'
+        txt = txt.rstrip("\n") + "\n\n\n" + dec.replace("{path}", path) + '''def metrics_scan_stages():
+    from core.scan_metrics import get_scan_metrics
+    return {"ok": True, "scanStages": get_scan_metrics().detailed()}
+
+
+''' + dec.replace("{path}", "/api/metrics/prometheus") + PROMETHEUS_HANDLER
+        print(f"Added {path} and /api/metrics/prometheus")
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE}")
+
+print()
+print("=" * 60)
+print("SCAN METRICS PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {METRICS} (new)")
+print(f"  - {SCAN_ENGINE}")
+print(f"  - {PLANNER}")
+print(f"  - {ROUTE_FILE}")
+print()
+print("Next: Rebuild container; after a few cycles check /api/metrics/detailed scanStages.lastCycle")
+print("      and scrape /api/metrics/prometheus (jkm_scan_stage_seconds)")
@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+"""
+Batched backend -> dashboard signal sync
+
+1. Create core/signal_sync.py: bounded outbound queue drained by one worker
+   thread through a pooled keep-alive HTTP session; many signals per
+   POST /api/internal/user-data/signals/batch, retry with backoff, durable
+   spill file for anything that cannot be delivered (replayed later).
+2. The function that POSTs single signals to /api/internal/user-data/signals
+   is wrapped to enqueue instead (found by URL at patch time).
+3. Outcome engine resolutions (patch_outcome_engine.py) are synced as status
+   updates through the same queue.
+
+scripts/internal_endpoints.py serves GET /api/internal/signal-sync/stats.
+
+Smoke test against a local stub dashboard: scripts/smoke_signal_sync.py
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+SYNC = ROOT / "core" / "signal_sync.py"
+STORE = ROOT / "core" / "marketdata_store.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+
+def py_files():
+    for pattern in ("*.py", "*/*.py", "*/*/*.py"):
+        for p in sorted(ROOT.glob(pattern)):
+            if "venv" in p.parts or "site-packages" in p.parts or p == SYNC:
+                continue
+            try:
+                yield p, p.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+
+# ============================================================
+# 1. Create signal_sync.py
+# ============================================================
+
+sync_code = '''"""
+signal_sync.py
+--------------
+Batched signal sync to the dashboard internal API.
+
+Signals used to be pushed one HTTPS request (and one Firestore write) at a
+time. Here producers only enqueue; one worker thread drains the queue:
+
+- pooled keep-alive session (requests + HTTPAdapter, urllib fallback)
+- up to SIGNAL_SYNC_BATCH items per POST .../signals/batch, flushed when the
+  batch is full or SIGNAL_SYNC_FLUSH_SEC after the first queued item
+- repeated updates of the same (user, signal_key) coalesce while queued
+- 429 / 5xx / network errors retry with exponential backoff + jitter
+  (Retry-After honoured); after SIGNAL_SYNC_MAX_RETRIES the batch is spilled
+- bounded queue: overflow and undeliverable batches go to an append-only
+  spill file (state/signal_sync/spill.jsonl), replayed after the next
+  successful send and on startup. Items carry their enqueue time (seq); a
+  replayed item drops the fields this process has since delivered newer
+  values for, so an old spill never overwrites a newer update
+- 404/405 from the batch route (older dashboard) falls back to the
+  single-signal route over the same session
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_SYNC_URL = (os.getenv("SIGNAL_SYNC_URL") or os.getenv("DASHBOARD_URL") or "").rstrip("/")
+SIGNAL_SYNC_API_KEY = os.getenv("DASHBOARD_INTERNAL_API_KEY", "")
+SIGNAL_SYNC_BATCH = int(os.getenv("SIGNAL_SYNC_BATCH", "200"))
+SIGNAL_SYNC_FLUSH_SEC = float(os.getenv("SIGNAL_SYNC_FLUSH_SEC", "1.0"))
+SIGNAL_SYNC_QUEUE_MAX = int(os.getenv("SIGNAL_SYNC_QUEUE_MAX", "5000"))
+SIGNAL_SYNC_MAX_RETRIES = int(os.getenv("SIGNAL_SYNC_MAX_RETRIES", "5"))
+SIGNAL_SYNC_BACKOFF_SEC = float(os.getenv("SIGNAL_SYNC_BACKOFF_SEC", "1.0"))
+SIGNAL_SYNC_BACKOFF_MAX_SEC = float(os.getenv("SIGNAL_SYNC_BACKOFF_MAX_SEC", "60"))
+SIGNAL_SYNC_TIMEOUT_SEC = float(os.getenv("SIGNAL_SYNC_TIMEOUT_SEC", "10"))
+SIGNAL_SYNC_POOL = int(os.getenv("SIGNAL_SYNC_POOL", "4"))
+# (user, signal_key) whose delivered field times are kept for spill replay
+SIGNAL_SYNC_DELIVERED_KEEP = int(os.getenv("SIGNAL_SYNC_DELIVERED_KEEP", "20000"))
+
+STATE_DIR = Path(os.getenv("STATE_DIR", "state"))
+SPILL_FILE = STATE_DIR / "signal_sync" / "spill.jsonl"
+
+BATCH_PATH = "/api/internal/user-data/signals/batch"
+SINGLE_PATH = "/api/internal/user-data/signals"
+
+Item = Dict[str, Any]  # {"user_id", "signal_key", "signal", "seq": time_ns of the latest enqueue}
+
+
+class _Session:
+    """Pooled keep-alive session: requests if installed, else urllib (one connection per call)."""
+
+    def __init__(self, api_key: str):
+        self.headers = {"Content-Type": "application/json", "x-internal-api-key": api_key}
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self._s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=SIGNAL_SYNC_POOL, pool_maxsize=SIGNAL_SYNC_POOL, max_retries=0)
+            self._s.mount("http://", adapter)
+            self._s.mount("https://", adapter)
+            self._s.headers.update(self.headers)
+            self.kind = "requests"
+        except ImportError:
+            self._s = None
+            self.kind = "urllib"
+
+    def post_json(self, url: str, body: Any) -> Tuple[int, Dict[str, str], Any]:
+        """(status, headers, json body or None); status 0 on connection errors."""
+        data = json.dumps(body, default=str)
+        if self._s is not None:
+            import requests
+            try:
+                r = self._s.post(url, data=data, timeout=SIGNAL_SYNC_TIMEOUT_SEC)
+            except requests.RequestException as e:
+                return 0, {}, {"message": str(e)}
+            try:
+                payload = r.json()
+            except ValueError:
+                payload = None
+            return r.status_code, dict(r.headers), payload
+        import urllib.error
+        import urllib.request
+        req = urllib.request.Request(url, data=data.encode(), headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=SIGNAL_SYNC_TIMEOUT_SEC) as r:
+                return r.status, dict(r.headers), json.loads(r.read() or b"null")
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read() or b"null")
+            except ValueError:
+                payload = None
+            return e.code, dict(e.headers or {}), payload
+        except (OSError, ValueError) as e:
+            return 0, {}, {"message": str(e)}
+
+    def close(self) -> None:
+        if self._s is not None:
+            self._s.close()
+
+
+class SignalSync:
+    def __init__(self, base_url: str = SIGNAL_SYNC_URL, api_key: str = SIGNAL_SYNC_API_KEY,
+                 spill_file: Path = SPILL_FILE):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.spill_file = Path(spill_file)
+        self._pending: "OrderedDict[Tuple[str, str], Item]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[_Session] = None
+        self._in_flight = 0
+        self._first_queued = 0.0
+        self._batch_route = True
+        self._draining: set = set()  # replayed keys whose .draining copy is the only durable one
+        # key -> {field: seq of the latest delivered value}; worker thread only
+        self._delivered: "OrderedDict[Tuple[str, str], Dict[str, int]]" = OrderedDict()
+        self._stats = {
+            "enqueued": 0, "coalesced": 0, "sent": 0, "requests": 0, "retries": 0,
+            "rejected": 0, "spilled": 0, "replayed": 0, "staleReplays": 0, "lastError": None, "lastSendMs": 0.0,
+        }
+
+    # --------------------------------------------------------
+    # Producer side
+    # --------------------------------------------------------
+    def enqueue(self, user_id: str, signal_key: str, signal: Dict[str, Any]) -> bool:
+        """Queue one signal upsert; False if it was spilled (queue full)."""
+        if not user_id or not signal_key or not isinstance(signal, dict):
+            return False
+        key = (str(user_id), str(signal_key))
+        with self._cond:
+            seq = time.time_ns()
+            self._stats["enqueued"] += 1
+            if key in self._pending:
+                self._pending[key]["signal"].update(signal)
+                self._pending[key]["seq"] = seq
+                self._stats["coalesced"] += 1
+                return True
+            item = {"user_id": key[0], "signal_key": key[1], "signal": dict(signal), "seq": seq}
+            if len(self._pending) >= SIGNAL_SYNC_QUEUE_MAX:
+                self._spill([item])
+                return False
+            if not self._pending:
+                self._first_queued = time.monotonic()
+            self._pending[key] = item
+            if len(self._pending) >= SIGNAL_SYNC_BATCH:
+                self._cond.notify()
+        self.start()
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if not self.base_url:
+                logger.warning("signal sync: SIGNAL_SYNC_URL / DASHBOARD_URL not set - signals go to the spill file")
+            self._stop.clear()
+            self._session = _Session(self.api_key)
+            self._thread = threading.Thread(target=self._run, name="signal-sync", daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Block until the queue is empty and nothing is in flight."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._first_queued = 0.0  # send now
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(min(left, 0.1))
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush what can be sent in `timeout`, spill the rest."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            rest = list(self._pending.values())
+            self._pending.clear()
+        if rest:
+            self._spill(rest)
+            self._settle(rest)
+        if self._session is not None:
+            self._session.close()
+
+    # --------------------------------------------------------
+    # Worker
+    # --------------------------------------------------------
+    def _run(self) -> None:
+        self._replay_spill()
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._stop.is_set():
+                    if len(self._pending) >= SIGNAL_SYNC_BATCH:
+                        break
+                    if self._pending:
+                        wait = self._first_queued + SIGNAL_SYNC_FLUSH_SEC - time.monotonic()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = SIGNAL_SYNC_FLUSH_SEC * 5
+                    self._cond.wait(wait)
+                if self._stop.is_set() and not self._pending:
+                    return
+                batch = [self._pending.popitem(last=False)[1] for _ in range(min(SIGNAL_SYNC_BATCH, len(self._pending)))]
+                self._in_flight = len(batch)
+                self._first_queued = time.monotonic() if self._pending else 0.0
+            sent = list(batch)  # the single-route fallback trims `batch` in place
+            try:
+                delivered = self._send_with_retry(batch)
+            except Exception as e:
+                logger.warning(f"signal sync: unexpected error, spilling {len(batch)}: {e}")
+                self._spill(batch)
+                delivered = False
+            # Every item is now either delivered or back in the spill file
+            self._settle(sent)
+            # Requeue before clearing _in_flight, so flush() also waits for the replayed items
+            if delivered and self.spill_file.exists() and not self._draining:
+                self._replay_spill()
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _send_with_retry(self, batch: List[Item]) -> bool:
+        attempt = 0
+        while True:
+            status, headers, body = self._send(batch)
+            if 200 <= status < 300:
+                return True
+            if status == 413 and len(batch) > 1:
+                mid = len(batch) // 2
+                return self._send_with_retry(batch[:mid]) & self._send_with_retry(batch[mid:])
+            retryable = bool(self.base_url) and (status == 0 or status == 429 or status >= 500)
+            self._stats["lastError"] = f"HTTP {status}: {(body or {}).get('message') if isinstance(body, dict) else body}"
+            if not retryable or attempt >= SIGNAL_SYNC_MAX_RETRIES or self._stop.is_set():
+                logger.warning(f"signal sync: {self._stats['lastError']} - spilling {len(batch)} signals")
+                self._spill(batch)
+                return False
+            delay = min(SIGNAL_SYNC_BACKOFF_MAX_SEC, SIGNAL_SYNC_BACKOFF_SEC * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            try:
+                delay = max(delay, float(headers.get("Retry-After") or headers.get("retry-after") or 0))
+            except ValueError:
+                pass
+            attempt += 1
+            self._stats["retries"] += 1
+            if self._stop.wait(delay):
+                self._spill(batch)
+                return False
+
+    def _send(self, batch: List[Item]) -> Tuple[int, Dict[str, str], Any]:
+        if not self.base_url:
+            return 0, {}, {"message": "dashboard URL not configured"}
+        t0 = time.perf_counter()
+        try:
+            if self._batch_route:
+                self._stats["requests"] += 1
+                status, headers, body = self._session.post_json(self.base_url + BATCH_PATH, {"items": batch})
+                if status in (404, 405):
+                    logger.warning("signal sync: batch route not available - using single-signal route")
+                    self._batch_route = False
+                else:
+                    if 200 <= status < 300:
+                        rejected = (body or {}).get("rejected") or [] if isinstance(body, dict) else []
+                        for r in rejected:
+                            logger.warning(f"signal sync: dashboard rejected item {r}")
+                        self._stats["rejected"] += len(rejected)
+                        self._stats["sent"] += len(batch) - len(rejected)
+                        bad = {r.get("index") for r in rejected if isinstance(r, dict)}
+                        self._mark_delivered([item for i, item in enumerate(batch) if i not in bad])
+                    return status, headers, body
+            # Single-signal fallback: stop at the first failure, retry the remainder
+            for i, item in enumerate(batch):
+                self._stats["requests"] += 1
+                status, headers, body = self._session.post_json(self.base_url + SINGLE_PATH, item)
+                if status == 400:
+                    self._stats["rejected"] += 1
+                elif not 200 <= status < 300:
+                    del batch[:i]
+                    return status, headers, body
+                else:
+                    self._stats["sent"] += 1
+                    self._mark_delivered([item])
+            return 200, {}, {"ok": True}
+        finally:
+            self._stats["lastSendMs"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def _mark_delivered(self, items: List[Item]) -> None:
+        """Remember when each delivered field was enqueued (bounded, oldest keys dropped)."""
+        for item in items:
+            key = (str(item.get("user_id")), str(item.get("signal_key")))
+            seq = int(item.get("seq") or 0)
+            fields = self._delivered.pop(key, {})
+            for f in item.get("signal") or {}:
+                if fields.get(f, -1) < seq:
+                    fields[f] = seq
+            self._delivered[key] = fields
+        while len(self._delivered) > SIGNAL_SYNC_DELIVERED_KEEP:
+            self._delivered.popitem(last=False)
+
+    # --------------------------------------------------------
+    # Spill file
+    # --------------------------------------------------------
+    def _spill(self, items: List[Item]) -> None:
+        if not items:
+            return
+        with self._spill_lock:
+            self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_file, "a", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps(item, default=str) + "\\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self._stats["spilled"] += len(items)
+
+    def _settle(self, items: List[Item]) -> None:
+        """Items were delivered or re-spilled: drop the .draining file once none of it is left in memory only."""
+        if not self._draining:
+            return
+        with self._spill_lock:
+            self._draining.difference_update((str(i.get("user_id")), str(i.get("signal_key"))) for i in items)
+            if not self._draining:
+                self.spill_file.with_suffix(".draining").unlink(missing_ok=True)
+
+    def _replay_spill(self) -> None:
+        """Move spilled items back into the queue (as much as fits; the rest stays spilled).
+
+        The .draining file is kept until every replayed item has been delivered or
+        spilled again, so a crash in between replays it on the next start.
+        """
+        draining = self.spill_file.with_suffix(".draining")
+        with self._spill_lock:
+            if not draining.exists():
+                if not self.spill_file.exists():
+                    return
+                os.replace(self.spill_file, draining)
+            lines = draining.read_text(encoding="utf-8").splitlines()
+        items = []
+        for line in lines:
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                logger.warning("signal sync: dropping corrupt spill line")
+        overflow: List[Item] = []
+        queued = set()
+        stale = 0
+        with self._cond:
+            for item in items:
+                key = (str(item.get("user_id")), str(item.get("signal_key")))
+                delivered = self._delivered.get(key)
+                if delivered:
+                    # Fields delivered since this item was enqueued keep their newer value
+                    seq = int(item.get("seq") or 0)
+                    signal = {f: v for f, v in (item.get("signal") or {}).items() if delivered.get(f, -1) < seq}
+                    if not signal:
+                        stale += 1
+                        continue
+                    item = dict(item, signal=signal)
+                if key in self._pending:
+                    # Queued update is newer than the spilled one
+                    self._pending[key]["signal"] = {**item.get("signal", {}), **self._pending[key]["signal"]}
+                    queued.add(key)
+                elif len(self._pending) < SIGNAL_SYNC_QUEUE_MAX:
+                    if not self._pending:
+                        self._first_queued = time.monotonic()
+                    self._pending[key] = item
+                    queued.add(key)
+                else:
+                    overflow.append(item)
+            self._cond.notify()
+        self._spill(overflow)
+        self._stats["spilled"] -= len(overflow)
+        self._stats["replayed"] += len(items) - len(overflow) - stale
+        self._stats["staleReplays"] += stale
+        with self._spill_lock:
+            self._draining = queued
+            if not queued:
+                draining.unlink(missing_ok=True)
+        if items:
+            logger.info(f"signal sync: replayed {len(items) - len(overflow) - stale} spilled signals ({stale} superseded)")
+
+    def stats(self) -> Dict[str, Any]:
+        spill_lines = 0
+        if self.spill_file.exists():
+            with open(self.spill_file, "rb") as f:
+                spill_lines = sum(1 for _ in f)
+        return {
+            **self._stats,
+            "queued": len(self._pending),
+            "inFlight": self._in_flight,
+            "spillFile": spill_lines,
+            "draining": len(self._draining),
+            "batchRoute": self._batch_route,
+            "http": self._session.kind if self._session else None,
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+_sync: Optional[SignalSync] = None
+_sync_lock = threading.Lock()
+
+
+def get_signal_sync() -> SignalSync:
+    global _sync
+    if _sync is None:
+        with _sync_lock:
+            if _sync is None:
+                _sync = SignalSync()
+                atexit.register(_sync.stop)
+    return _sync
+
+
+def enqueue_signal(user_id: str, signal_key: str, signal: Dict[str, Any]) -> bool:
+    return get_signal_sync().enqueue(user_id, signal_key, signal)
+
+
+_ARG_NAMES = {
+    "user_id": ("user_id", "uid", "userId"),
+    "signal_key": ("signal_key", "key", "signalKey", "signal_id"),
+    "signal": ("signal", "payload", "data", "signal_data"),
+}
+
+
+def attach_pusher(ns: Dict[str, Any], name: str) -> None:
+    """Wrap a single-signal push function (user_id, signal_key, signal) to enqueue instead."""
+    original = ns.get(name)
+    if original is None or getattr(original, "_signal_sync", False):
+        return
+    sig = inspect.signature(original)
+
+    @functools.wraps(original)
+    def push(*args, **kwargs):
+        if os.getenv("SIGNAL_SYNC", "1") == "0":
+            return original(*args, **kwargs)
+        try:
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            got = {k: next((bound.arguments[a] for a in names if a in bound.arguments), None)
+                   for k, names in _ARG_NAMES.items()}
+        except TypeError:
+            return original(*args, **kwargs)
+        if not got["user_id"] or not isinstance(got["signal"], dict):
+            return original(*args, **kwargs)
+        key = got["signal_key"] or got["signal"].get("signal_key")
+        if not key:
+            return original(*args, **kwargs)
+        enqueue_signal(got["user_id"], key, got["signal"])
+        return True
+
+    push._signal_sync = True
+    ns[name] = push
+
+
+def enable_outcome_sync() -> None:
+    """Sync outcome engine resolutions (status hit_tp/hit_sl/expired) as signal updates."""
+    if os.getenv("SIGNAL_SYNC_OUTCOMES", "1") == "0" or not SIGNAL_SYNC_URL:
+        return
+    from core.outcome_engine import get_outcome_engine
+
+    def on_outcomes(records: List[Dict[str, Any]]) -> None:
+        for r in records:
+            # Only signals the dashboard knows by key; a derived (hashed) id would create an orphan doc
+            if r.get("userId") and r.get("signalKey"):
+                enqueue_signal(r["userId"], r["signalKey"], {
+                    "status": r["status"],
+                    "resolved_at": r.get("resolvedAt"),
+                    "resolved_price": r.get("resolvedPrice"),
+                    # The dashboard derives createdAt from generated_at; without it a merge resets it to now
+                    "generated_at": r.get("openedAt"),
+                })
+
+    get_outcome_engine().subscribe("signal_sync", on_outcomes)
+'''
+
+SYNC.write_text(sync_code, encoding="utf-8")
+print(f"Created: {SYNC}")
+
+# ============================================================
+# 2. Single-signal pusher -> queue
+# ============================================================
+
+URL_RE = re.compile(r'/api/internal/user-data/signals["\']')
+DEF_RE = re.compile(r"^def\s+(\w+)\(", re.M)
+pusher = None
+for p, t in py_files():
+    if "attach_pusher(" in t:
+        pusher = (p, None)
+        print(f"SKIP: signal push already queued ({p.name})")
+        break
+    for u in URL_RE.finditer(t):
+        defs = list(DEF_RE.finditer(t, 0, u.start()))
+        if defs:
+            pusher = (p, defs[-1].group(1))
+            break
+    if pusher:
+        break
+
+if pusher is None:
+    print("WARNING: no function POSTing to /api/internal/user-data/signals found -")
+    print("         call core.signal_sync.enqueue_signal(user_id, signal_key, signal) from the pusher")
+elif pusher[1] is not None:
+    p, name = pusher
+    t = p.read_text(encoding="utf-8").rstrip("\n") + f'''
+
+
+# Batched dashboard sync: {name}() enqueues instead of one POST per signal (patch_signal_sync.py)
+try:
+    from core.signal_sync import attach_pusher
+    attach_pusher(globals(), "{name}")
+except Exception as _e:
+    import logging as _logging
+    _logging.getLogger(__name__).warning(f"signal sync disabled: {{_e}}")
+'''
+    p.write_text(t, encoding="utf-8")
+    print(f"{p.name}: {name}() -> signal_sync queue")
+
+# ============================================================
+# 3. Outcome resolutions -> queue
+# ============================================================
+
+if STORE.exists():
+    store_txt = STORE.read_text(encoding="utf-8")
+    if "enable_outcome_sync" in store_txt:
+        print("SKIP: outcome sync already enabled")
+    else:
+        anchor = "    enable_outcome_engine()\n"
+        if anchor in store_txt:
+            store_txt = store_txt.replace(
+                anchor,
+                anchor + "    from core.signal_sync import enable_outcome_sync\n    enable_outcome_sync()\n",
+                1,
+            )
+            STORE.write_text(store_txt, encoding="utf-8")
+            print("Outcome resolutions synced to the dashboard")
+        else:
+            print("WARNING: outcome engine hook not found - run patch_outcome_engine.py first")
+else:
+    print(f"WARNING: {STORE} not found")
+
+print()
+print("=" * 60)
+print("SIGNAL SYNC PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {SYNC} (new)")
+if pusher and pusher[1]:
+    print(f"  - {pusher[0]}")
+print(f"  - {STORE}")
+print()
+print("Next: Deploy the dashboard batch route, redeploy scripts/internal_endpoints.py (signal-sync/stats),")
+print("      set DASHBOARD_URL (or SIGNAL_SYNC_URL) + DASHBOARD_INTERNAL_API_KEY and rebuild container")
@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+"""
+Process-pool job runner for the strategy-sim queue
+
+1. Create core/sim_job_runner.py: bounded process pool fed by a dispatcher
+   with priority classes and per-user round-robin, cancellation, a memory
+   budget per worker, per-symbol sub-jobs merged at the end
+2. Re-route the strategy-sim endpoints through the runner:
+   - POST /api/strategy-sim/run          async -> {jobId, status: queued};
+                                          sync  -> awaits the job off the event loop
+   - GET  /api/strategy-sim/jobs/{id}     runner jobs (legacy jobs still answered)
+   - GET  /api/strategy-sim/queue         adds "runner" stats
+   - POST /api/strategy-sim/clear-queue   also cancels runner jobs
+   - POST /api/strategy-sim/jobs/{id}/cancel (new)
+   The original run handler becomes the per-symbol worker target (called with async=False).
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+RUNNER = ROOT / "core" / "sim_job_runner.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+
+# Locate the module that serves /api/strategy-sim/*
+ROUTE_FILE = None
+for candidate in [ROOT / "api_server.py"] + sorted(ROOT.glob("*.py")) + sorted(ROOT.glob("*/*.py")):
+    try:
+        if re.search(r'@\w+\.post\(\s*"/api/strategy-sim/run"', candidate.read_text(encoding="utf-8")):
+            ROUTE_FILE = candidate
+            break
+    except (OSError, UnicodeDecodeError):
+        continue
+if ROUTE_FILE is None:
+    die("POST /api/strategy-sim/run handler not found")
+ROUTE_MODULE = ".".join(ROUTE_FILE.relative_to(ROOT).with_suffix("").parts)
+print(f"strategy-sim routes: {ROUTE_FILE} ({ROUTE_MODULE})")
+
+# ============================================================
+# 1. Create sim_job_runner.py
+# ============================================================
+
+runner_code = '''"""
+sim_job_runner.py
+-----------------
+Process-pool runner for strategy-sim jobs.
+
+A job (one /api/strategy-sim/run request) is split into one sub-job per
+symbol. A dispatcher thread keeps at most SIM_POOL_WORKERS sub-jobs in the
+process pool and picks the next one by priority class (high < normal < low),
+then round-robin across users within the class, so one user's 15-symbol run
+cannot starve everyone else. Results are merged when the last sub-job ends.
+
+Workers are forked and get an address-space budget of SIM_WORKER_MEM_MB on
+top of what they inherit; a sub-job over budget fails with MEMORY_BUDGET
+instead of taking the API process down. When a worker crashes the pool is
+replaced and every sub-job that was in flight on it is re-run alone, without
+being charged: only a crash while running alone is the sub-job's own, and it
+gets one retry. A job with failed symbols ends "partial" (or "failed" when no
+symbol succeeded).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import inspect
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SIM_POOL_WORKERS = int(os.getenv("SIM_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+SIM_WORKER_MEM_MB = int(os.getenv("SIM_WORKER_MEM_MB", "2048"))  # 0 = no budget
+SIM_JOB_KEEP = int(os.getenv("SIM_JOB_KEEP", "200"))
+SIM_JOB_TARGET = os.getenv("SIM_JOB_TARGET", "__TARGET__")
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+FINISHED = ("completed", "partial", "failed", "cancelled")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ============================================================
+# Worker side
+# ============================================================
+
+def _worker_init(mem_mb: int) -> None:
+    """Cap the worker's address space at what it inherited plus mem_mb."""
+    if mem_mb <= 0:
+        return
+    try:
+        import resource
+        with open("/proc/self/statm") as f:
+            inherited = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limit = inherited + mem_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except Exception as e:
+        logger.debug(f"sim worker memory budget not applied: {e}")
+
+
+def _call_target(target: str, payload: Dict[str, Any]) -> Any:
+    module, _, attr = target.partition(":")
+    handler = getattr(importlib.import_module(module), attr)
+    arg: Any = payload
+    params = list(inspect.signature(handler).parameters.values())
+    if params:
+        ann = params[0].annotation
+        if isinstance(ann, type) and hasattr(ann, "__fields__"):
+            arg = ann(**payload)
+    result = handler(arg)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def _run_subjob(target: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool entry point: run one symbol synchronously."""
+    t0 = time.perf_counter()
+    try:
+        result = _call_target(target, payload)
+        if not isinstance(result, dict):
+            result = {"ok": False, "error": f"unexpected result type {type(result).__name__}"}
+    except MemoryError:
+        result = {"ok": False, "error": "MEMORY_BUDGET", "message": f"sub-job exceeded {SIM_WORKER_MEM_MB} MB"}
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    result.setdefault("elapsedMs", round((time.perf_counter() - t0) * 1000, 1))
+    return result
+
+
+# ============================================================
+# Merge
+# ============================================================
+
+_AVERAGED = ("rate", "pct", "avg", "ratio", "factor", "expectancy")
+
+
+def _merge_summaries(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum count-like fields; trade-weighted mean for rates/averages; winRate recomputed."""
+    out: Dict[str, Any] = {}
+    weights = [float(p.get("entries", p.get("trades", 0)) or 0) for p in parts]
+    keys = {k for p in parts for k, v in p.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    for k in keys:
+        vals = [(p.get(k), w) for p, w in zip(parts, weights) if isinstance(p.get(k), (int, float))]
+        if any(s in k.lower() for s in _AVERAGED):
+            total_w = sum(w for _, w in vals)
+            out[k] = round(sum(v * w for v, w in vals) / total_w, 4) if total_w else 0
+        else:
+            out[k] = sum(v for v, _ in vals)
+    if "tp" in out and "sl" in out and "winRate" in out:
+        closed = out["tp"] + out["sl"]
+        out["winRate"] = round(100.0 * out["tp"] / closed, 2) if closed else 0
+    return out
+
+
+def merge_results(payload: Dict[str, Any], per_symbol: "OrderedDict[str, Dict[str, Any]]") -> Dict[str, Any]:
+    """Combine per-symbol results into one multi-symbol response."""
+    results = list(per_symbol.values())
+    if len(results) == 1:
+        return results[0]
+    ok_results = [r for r in results if r.get("ok", True)]
+    entries = [e for r in ok_results for e in (r.get("entries") or [])]
+    trades = [t for r in ok_results for t in ((r.get("combined") or {}).get("tradesSample") or r.get("trades") or [])]
+    summary = _merge_summaries([r.get("summary") or (r.get("combined") or {}).get("summary") or {} for r in ok_results])
+    return {
+        "ok": bool(ok_results),
+        "symbols": list(per_symbol),
+        "summary": summary,
+        "entries": entries,
+        "combined": {"summary": summary, "tradesSample": trades},
+        "perSymbol": dict(per_symbol),
+        "errors": {s: r.get("error") for s, r in per_symbol.items() if not r.get("ok", True)},
+        **({"simVersion": ok_results[0]["simVersion"]} if ok_results and "simVersion" in ok_results[0] else {}),
+    }
+
+
+# ============================================================
+# Jobs
+# ============================================================
+
+class SimJob:
+    def __init__(self, payload: Dict[str, Any], uid: str, priority: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.uid = uid
+        self.priority = priority
+        self.payload = payload
+        self.symbols: List[str] = [str(s).upper() for s in payload.get("symbols") or []] or [""]
+        self.status = "queued"
+        self.sub_status: Dict[str, str] = {s: "queued" for s in self.symbols}
+        self.results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.done = threading.Event()
+
+    def progress(self) -> Dict[str, Any]:
+        total = len(self.symbols)
+        finished = sum(1 for s in self.sub_status.values() if s in ("done", "failed"))
+        stage = {"queued": "queued", "running": "running", "completed": "done", "partial": "done"}.get(self.status, "error")
+        return {
+            "stage": stage,
+            "percent": int(100 * finished / total) if total else 0,
+            "message": f"{finished}/{total} symbols",
+            "symbols": dict(self.sub_status),
+        }
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        d = {
+            "id": self.id,
+            "uid": self.uid,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress(),
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "error": self.error,
+        }
+        if include_result:
+            d["result"] = self.result
+        return d
+
+
+class _SubJob:
+    __slots__ = ("job", "symbol", "attempts", "crashes", "future", "pool")
+
+    def __init__(self, job: SimJob, symbol: str):
+        self.job = job
+        self.symbol = symbol
+        self.attempts = 0
+        self.crashes = 0  # crashes while running alone (its own)
+        self.future = None
+        self.pool = None  # pool the future belongs to
+
+
+class SimJobRunner:
+    def __init__(self, target: str = SIM_JOB_TARGET, workers: int = SIM_POOL_WORKERS,
+                 merge: Callable = merge_results):
+        self.target = target
+        self.workers = max(1, workers)
+        self.merge = merge
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, SimJob]" = OrderedDict()
+        # priority -> uid -> queued sub-jobs; users rotate round-robin per class
+        self._queues: Dict[int, Dict[str, Deque[_SubJob]]] = {p: {} for p in PRIORITIES.values()}
+        self._turns: Dict[int, Deque[str]] = {p: deque() for p in PRIORITIES.values()}
+        self._inflight: Dict[int, _SubJob] = {}
+        # sub-jobs caught in a worker crash, re-run one at a time on an idle pool
+        self._isolate: Deque[_SubJob] = deque()
+        self._solo: Optional[_SubJob] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"submitted": 0, "completed": 0, "partial": 0, "failed": 0, "cancelled": 0, "isolated": 0,
+                       "subjobs": 0, "retries": 0, "poolRestarts": 0}
+
+    # --- public API ---
+
+    def submit(self, payload: Dict[str, Any], uid: str = "", priority: str = "normal") -> SimJob:
+        priority = priority if priority in PRIORITIES else "normal"
+        job = SimJob(payload, uid or "admin", priority)
+        prio = PRIORITIES[priority]
+        with self._cond:
+            self._jobs[job.id] = job
+            queue = self._queues[prio].setdefault(job.uid, deque())
+            if job.uid not in self._turns[prio]:
+                self._turns[prio].append(job.uid)
+            for symbol in job.symbols:
+                queue.append(_SubJob(job, symbol))
+            self._stats["submitted"] += 1
+            self._stats["subjobs"] += len(job.symbols)
+            self._trim_jobs()
+            self._ensure_dispatcher()
+            self._cond.notify_all()
+        logger.info(f"sim job {job.id} queued: uid={job.uid} priority={priority} symbols={len(job.symbols)}")
+        return job
+
+    def get(self, job_id: str) -> Optional[SimJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[SimJob]:
+        """Await job completion without blocking the event loop."""
+        job = self.get(job_id)
+        if job is not None:
+            await asyncio.to_thread(job.done.wait, timeout)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return False
+            self._drop_queued(lambda sj: sj.job is job)
+            for sj in list(self._inflight.values()):
+                if sj.job is job and sj.future is not None:
+                    sj.future.cancel()  # no-op once running; its result is discarded
+            self._finish(job, "cancelled", error="cancelled")
+            return True
+
+    def clear_queue(self) -> int:
+        """Cancel every job that has not finished."""
+        with self._cond:
+            ids = [j.id for j in self._jobs.values() if j.status not in FINISHED]
+        return sum(1 for jid in ids if self.cancel(jid))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = {name: sum(len(q) for q in self._queues[p].values()) for name, p in PRIORITIES.items()}
+            return {
+                **self._stats,
+                "workers": self.workers,
+                "memBudgetMb": SIM_WORKER_MEM_MB,
+                "inflight": len(self._inflight),
+                "queuedSubjobs": queued,
+                "isolating": len(self._isolate) + (self._solo is not None),
+                "activeJobs": [j.to_dict(include_result=False) for j in self._jobs.values() if j.status not in FINISHED],
+            }
+
+    # --- dispatcher ---
+
+    def _ensure_dispatcher(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch_loop, name="sim-job-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_worker_init,
+                initargs=(SIM_WORKER_MEM_MB,),
+            )
+        return self._pool
+
+    def _next_subjob(self) -> Optional[_SubJob]:
+        for prio in sorted(self._queues):
+            turns = self._turns[prio]
+            while turns:
+                uid = turns[0]
+                queue = self._queues[prio].get(uid)
+                if not queue:
+                    turns.popleft()
+                    self._queues[prio].pop(uid, None)
+                    continue
+                turns.rotate(-1)
+                return queue.popleft()
+        return None
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                sj = None
+                while sj is None:
+                    if self._solo is not None:
+                        pass  # an isolated sub-job has the pool to itself
+                    elif self._isolate:
+                        if not self._inflight:
+                            sj = self._solo = self._isolate.popleft()
+                    elif len(self._inflight) < self.workers:
+                        sj = self._next_subjob()
+                    if sj is None:
+                        self._cond.wait(timeout=5.0)
+                job = sj.job
+                if job.status == "queued":
+                    job.status = "running"
+                    job.started_at = _now()
+                job.sub_status[sj.symbol] = "running"
+                sj.attempts += 1
+                payload = {**job.payload, "async": False}
+                if sj.symbol:
+                    payload["symbols"] = [sj.symbol]
+                try:
+                    sj.future = self._submit(payload)
+                    sj.pool = self._pool
+                except Exception as e:
+                    logger.error(f"sim job {job.id}/{sj.symbol} not started: {e}")
+                    if self._solo is sj:
+                        self._solo = None
+                    self._record(sj, {"ok": False, "error": f"POOL_UNAVAILABLE: {e}"})
+                    continue
+                self._inflight[id(sj)] = sj
+            sj.future.add_done_callback(lambda fut, sj=sj: self._on_done(sj, fut))
+
+    def _submit(self, payload: Dict[str, Any]):
+        try:
+            return self._get_pool().submit(_run_subjob, self.target, payload)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"sim pool unavailable ({e}) - restarting")
+            self._restart_pool()
+            return self._get_pool().submit(_run_subjob, self.target, payload)
+
+    def _on_done(self, sj: _SubJob, fut) -> None:
+        with self._cond:
+            self._inflight.pop(id(sj), None)
+            solo = self._solo is sj
+            if solo:
+                self._solo = None
+            self._cond.notify_all()
+            job = sj.job
+            if job.status in FINISHED:
+                return
+            try:
+                result = fut.result()
+            except BrokenProcessPool:
+                # Every future of a broken pool fails: restart once, for the current pool only
+                if sj.pool is self._pool:
+                    self._restart_pool()
+                if not solo:
+                    # Crasher or co-tenant: unknown until it runs alone, so not charged
+                    self._stats["isolated"] += 1
+                    self._isolate_subjob(sj)
+                    return
+                sj.crashes += 1
+                if sj.crashes < 2:
+                    self._stats["retries"] += 1
+                    self._isolate_subjob(sj, first=True)
+                    return
+                result = {"ok": False, "error": "WORKER_CRASHED"}
+            except Exception as e:
+                result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self._record(sj, result)
+
+    # --- internals (caller holds self._cond) ---
+
+    def _record(self, sj: _SubJob, result: Dict[str, Any]) -> None:
+        """Store a sub-job result; merge and finish the job after its last symbol."""
+        job = sj.job
+        if job.status in FINISHED:
+            return
+        job.results[sj.symbol] = result
+        job.sub_status[sj.symbol] = "done" if result.get("ok", True) else "failed"
+        if len(job.results) == len(job.symbols):
+            ordered = OrderedDict((s, job.results[s]) for s in job.symbols)
+            try:
+                merged = self.merge(job.payload, ordered)
+            except Exception as e:
+                logger.error(f"sim job {job.id} merge failed: {e}")
+                merged = {"ok": False, "error": f"merge failed: {e}", "perSymbol": dict(ordered)}
+            failed = [s for s, r in ordered.items() if not r.get("ok", True)]
+            if failed and merged.get("ok", True):
+                # Some symbols have no result: not a complete run
+                merged["ok"] = False
+                merged["partial"] = True
+                merged.setdefault("error", f"{len(failed)}/{len(ordered)} symbols failed: {', '.join(failed)}")
+            job.result = merged
+            if merged.get("ok", True):
+                self._finish(job, "completed")
+            else:
+                self._finish(job, "partial" if len(failed) < len(ordered) else "failed", error=merged.get("error"))
+
+    def _isolate_subjob(self, sj: _SubJob, first: bool = False) -> None:
+        if first:
+            self._isolate.appendleft(sj)
+        else:
+            self._isolate.append(sj)
+        sj.job.sub_status[sj.symbol] = "queued"
+
+    def _restart_pool(self) -> None:
+        if self._pool is not None:
+            try:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            except Exception:
+                pass
+            self._pool = None
+            self._stats["poolRestarts"] += 1
+
+    def _drop_queued(self, pred: Callable[[_SubJob], bool]) -> None:
+        for prio, users in self._queues.items():
+            for uid, queue in users.items():
+                kept = deque(sj for sj in queue if not pred(sj))
+                users[uid] = kept
+        self._isolate = deque(sj for sj in self._isolate if not pred(sj))
+
+    def _finish(self, job: SimJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = _now()
+        self._stats[status if status in self._stats else "cancelled"] += 1
+        job.done.set()
+        logger.info(f"sim job {job.id} {status}")
+
+    def _trim_jobs(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status in FINISHED]
+        for jid in finished[:max(0, len(self._jobs) - SIM_JOB_KEEP)]:
+            del self._jobs[jid]
+
+
+_runner: Optional[SimJobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_sim_job_runner() -> SimJobRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = SimJobRunner()
+    return _runner
+
+
+def job_priority(payload: Dict[str, Any]) -> str:
+    """Explicit payload priority, else user runs normal and admin runs (no uid) high."""
+    p = str(payload.get("priority") or "").lower()
+    if p in PRIORITIES:
+        return p
+    return "normal" if payload.get("uid") else "high"
+'''
+
+# ============================================================
+# 2. Re-route strategy-sim endpoints
+# ============================================================
+
+def find_route(txt, method, path):
+    """Match of '@obj.method("path")' + handler def: groups (decorator, obj, def, name, params)."""
+    return re.compile(
+        r'(@(\w+)\.' + method + r'\(\s*"' + re.escape(path) + r'"[^\n]*\)\n)'
+        r'((?:async\s+)?def\s+(\w+)\(([^)]*)\))'
+    ).search(txt)
+
+def detach(txt, m):
+    """Drop the route decorator (handler stays as a plain function); returns (txt, end of handler)."""
+    txt = txt[:m.start()] + m.group(3) + txt[m.end():]
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.start() + len(m.group(3)))
+    return txt, (nxt.end() if nxt else len(txt))
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+
+if "sim_job_runner" in txt:
+    print("SKIP: strategy-sim routes already use sim_job_runner")
+else:
+    # --- POST /api/strategy-sim/run ---
+    m = find_route(txt, "post", "/api/strategy-sim/run")
+    if m is None:
+        die("POST /api/strategy-sim/run handler not found")
+    dec, run_name = m.group(1), m.group(4)
+    txt, end = detach(txt, m)
+    txt = txt[:end] + dec + f'''async def strategy_sim_run_dispatch(payload: dict):
+    """
+    Strategy-sim through the process-pool runner (per-symbol sub-jobs, fair scheduling).
+    async=true returns {{jobId, status: "queued"}}; otherwise waits for the merged result
+    without blocking the event loop.
+    """
+    from core.sim_job_runner import get_sim_job_runner, job_priority
+    runner = get_sim_job_runner()
+    job = runner.submit(payload, uid=str(payload.get("uid") or ""), priority=job_priority(payload))
+    if payload.get("async"):
+        return {{"ok": True, "jobId": job.id, "status": "queued", "priority": job.priority,
+                "subjobs": len(job.symbols)}}
+    await runner.wait(job.id)
+    if job.result is not None:
+        return job.result
+    return {{"ok": False, "error": job.error or job.status, "jobId": job.id}}
+
+
+''' + txt[end:]
+    print(f"/api/strategy-sim/run -> runner (worker target {ROUTE_MODULE}:{run_name})")
+
+    # --- GET /api/strategy-sim/jobs/{id} (+ cancel) ---
+    jm = re.search(r'@\w+\.get\(\s*"/api/strategy-sim/jobs/\{(\w+)\}"', txt)
+    param = jm.group(1) if jm else "job_id"
+    cancel_route = dec.replace("/api/strategy-sim/run", "/api/strategy-sim/jobs/{" + param + "}/cancel")
+    cancel_code = cancel_route + f'''def strategy_sim_job_cancel({param}: str):
+    from core.sim_job_runner import get_sim_job_runner
+    return {{"ok": get_sim_job_runner().cancel({param}), "jobId": {param}}}
+
+
+'''
+    m = find_route(txt, "get", "/api/strategy-sim/jobs/{" + param + "}") if jm else None
+    if m is not None:
+        jdec, jobs_name = m.group(1), m.group(4)
+        txt, end = detach(txt, m)
+        txt = txt[:end] + jdec + f'''async def strategy_sim_job_dispatch({param}: str):
+    """Runner job status/progress/result; unknown ids fall through to the legacy job store."""
+    import inspect
+    from core.sim_job_runner import get_sim_job_runner
+    job = get_sim_job_runner().get({param})
+    if job is not None:
+        return {{"ok": True, "job": job.to_dict()}}
+    res = {jobs_name}({param})
+    return await res if inspect.isawaitable(res) else res
+
+
+''' + cancel_code + txt[end:]
+        print("/api/strategy-sim/jobs/{id} -> runner first, legacy fallback; added /cancel")
+    else:
+        jobs_route = dec.replace("/api/strategy-sim/run", "/api/strategy-sim/jobs/{" + param + "}").replace(".post(", ".get(")
+        txt += "\n\n" + jobs_route + f'''def strategy_sim_job_status({param}: str):
+    from core.sim_job_runner import get_sim_job_runner
+    job = get_sim_job_runner().get({param})
+    if job is None:
+        return {{"ok": False, "error": "Job not found"}}
+    return {{"ok": True, "job": job.to_dict()}}
+
+
+''' + cancel_code.rstrip("\n") + "\n"
+        print("WARNING: GET /api/strategy-sim/jobs/{id} not found - added a runner-only route")
+
+    # --- GET /api/strategy-sim/queue: add runner stats ---
+    m = find_route(txt, "get", "/api/strategy-sim/queue")
+    if m is not None and not m.group(5).strip():
+        qdec, queue_name = m.group(1), m.group(4)
+        txt, end = detach(txt, m)
+        txt = txt[:end] + qdec + f'''async def strategy_sim_queue_dispatch():
+    import inspect
+    from core.sim_job_runner import get_sim_job_runner
+    res = {queue_name}()
+    res = await res if inspect.isawaitable(res) else res
+    if isinstance(res, dict):
+        res = {{**res, "runner": get_sim_job_runner().stats()}}
+    return res
+
+
+''' + txt[end:]
+        print("/api/strategy-sim/queue -> adds runner stats")
+    else:
+        print("WARNING: /api/strategy-sim/queue not found or takes parameters - runner stats not added")
+
+    # --- POST /api/strategy-sim/clear-queue: also cancel runner jobs ---
+    m = find_route(txt, "post", "/api/strategy-sim/clear-queue")
+    if m is not None and not m.group(5).strip():
+        cdec, clear_name = m.group(1), m.group(4)
+        txt, end = detach(txt, m)
+        txt = txt[:end] + cdec + f'''async def strategy_sim_clear_queue_dispatch():
+    import inspect
+    from core.sim_job_runner import get_sim_job_runner
+    cancelled = get_sim_job_runner().clear_queue()
+    res = {clear_name}()
+    res = await res if inspect.isawaitable(res) else res
+    if isinstance(res, dict):
+        res = {{**res, "runnerCancelled": cancelled}}
+    return res
+
+
+''' + txt[end:]
+        print("/api/strategy-sim/clear-queue -> also cancels runner jobs")
+    elif m is None:
+        clear_route = dec.replace("/api/strategy-sim/run", "/api/strategy-sim/clear-queue")
+        txt += "\n\n" + clear_route + '''def strategy_sim_clear_queue():
+    from core.sim_job_runner import get_sim_job_runner
+    return {"ok": True, "runnerCancelled": get_sim_job_runner().clear_queue()}
+'''
+        print("Added /api/strategy-sim/clear-queue")
+    else:
+        print("WARNING: /api/strategy-sim/clear-queue takes parameters - runner jobs not cancelled by it")
+
+    RUNNER.write_text(runner_code.replace("__TARGET__", f"{ROUTE_MODULE}:{run_name}"), encoding="utf-8")
+    print(f"Created: {RUNNER}")
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE}")
+
+print()
+print("Next: Rebuild container; run a 15-symbol simulation and check GET /api/strategy-sim/queue")
+print("      runner.inflight <= workers while a second user's job still progresses")
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Push channel for strategy-sim jobs (SSE)
+
+1. Create core/sim_job_stream.py: bounded per-client event buffers and the
+   SSE encoder. Events: progress, symbol (per-symbol result summary), trades
+   (a resolved symbol's trades, in chunks), done (final summary).
+2. core/sim_job_runner.py: runner publishes those events as sub-jobs start,
+   resolve and the job finishes; subscribe() replays the current state first.
+3. GET /api/strategy-sim/jobs/{job_id}/events streams them as
+   text/event-stream, next to the job status route.
+
+Requires patch_sim_job_runner.py.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+STREAM = ROOT / "core" / "sim_job_stream.py"
+RUNNER = ROOT / "core" / "sim_job_runner.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not RUNNER.exists():
+    die("Missing core/sim_job_runner.py - run patch_sim_job_runner.py first")
+
+# Module that serves the runner-backed strategy-sim routes
+ROUTE_FILE = None
+for candidate in [ROOT / "api_server.py"] + sorted(ROOT.glob("*.py")) + sorted(ROOT.glob("*/*.py")):
+    try:
+        if "def strategy_sim_job_cancel(" in candidate.read_text(encoding="utf-8"):
+            ROUTE_FILE = candidate
+            break
+    except (OSError, UnicodeDecodeError):
+        continue
+if ROUTE_FILE is None:
+    die("strategy_sim_job_cancel route not found - run patch_sim_job_runner.py first")
+print(f"strategy-sim routes: {ROUTE_FILE}")
+
+# ============================================================
+# 1. Create sim_job_stream.py
+# ============================================================
+
+stream_code = '''"""
+sim_job_stream.py
+-----------------
+Push channel for strategy-sim jobs.
+
+The simulator page used to poll /api/strategy-sim/jobs/{id} every second and
+only saw trades once the whole job had finished. The job runner now publishes
+events to subscribers as the job moves:
+
+  progress  {stage, percent, message, symbols}      (coalesced: latest wins)
+  symbol    {symbol, ok, summary, error}            one per resolved symbol
+  trades    {symbol, trades: [...]}                 a symbol's trades, chunked
+  done      {status, error, summary, droppedTrades} always delivered, last
+
+Each subscriber has a bounded buffer (SIM_STREAM_BUFFER events) filled from
+the runner thread without blocking it. A client that cannot keep up loses
+trades chunks first (counted in droppedTrades, so it can fetch the full
+result from the job route), then intermediate progress; symbol and done
+events are never dropped. Memory per subscriber is therefore bounded by
+buffer size x SIM_STREAM_TRADES_CHUNK trades.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List
+
+SIM_STREAM_BUFFER = int(os.getenv("SIM_STREAM_BUFFER", "200"))
+SIM_STREAM_TRADES_CHUNK = int(os.getenv("SIM_STREAM_TRADES_CHUNK", "50"))
+SIM_STREAM_KEEPALIVE_SEC = float(os.getenv("SIM_STREAM_KEEPALIVE_SEC", "15"))
+SIM_STREAM_MAX_SUBSCRIBERS = int(os.getenv("SIM_STREAM_MAX_SUBSCRIBERS", "4"))  # per job
+
+
+class JobSubscription:
+    """Bounded event buffer of one stream client. push() is thread-safe and never blocks."""
+
+    def __init__(self, job_id: str, loop: asyncio.AbstractEventLoop, maxsize: int = SIM_STREAM_BUFFER):
+        self.job_id = job_id
+        self.maxsize = max(4, maxsize)
+        self.dropped_trades = 0
+        self.closed = False
+        self._buf: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def push(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self._seq += 1
+            event = {**event, "seq": self._seq}
+            kind = event["type"]
+            if kind == "progress" and self._buf and self._buf[-1]["type"] == "progress":
+                self._buf[-1] = event
+            else:
+                if kind == "done":
+                    event["droppedTrades"] = self.dropped_trades
+                elif len(self._buf) >= self.maxsize and not self._shed(event):
+                    return
+                self._buf.append(event)
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            self.closed = True  # event loop gone
+
+    def _shed(self, incoming: Dict[str, Any]) -> bool:
+        """Make room for incoming; False if incoming itself is dropped."""
+        for i, e in enumerate(self._buf):
+            if e["type"] == "trades":
+                self.dropped_trades += len(e["trades"])
+                del self._buf[i]
+                return True
+        if incoming["type"] == "trades":
+            self.dropped_trades += len(incoming["trades"])
+            return False
+        for i, e in enumerate(self._buf):
+            if e["type"] == "progress":
+                del self._buf[i]
+                return True
+        # Only symbol events left: bounded by the job's symbol count
+        return True
+
+    async def get(self, timeout: float) -> List[Dict[str, Any]]:
+        """Pending events (empty list after timeout)."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        with self._lock:
+            self._wakeup.clear()
+            events = list(self._buf)
+            self._buf.clear()
+        return events
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._buf.clear()
+
+
+def result_trades(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return (result.get("trades")
+            or (result.get("combined") or {}).get("tradesSample")
+            or result.get("entries")
+            or [])
+
+
+def result_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    return result.get("summary") or (result.get("combined") or {}).get("summary") or {}
+
+
+def symbol_events(symbol: str, result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """symbol event, then the symbol's trades in chunks."""
+    ok = bool(result.get("ok", True))
+    yield {"type": "symbol", "symbol": symbol, "ok": ok, "summary": result_summary(result),
+           "error": None if ok else result.get("error")}
+    if not ok:
+        return
+    trades = [t if not isinstance(t, dict) or t.get("symbol") else {**t, "symbol": symbol}
+              for t in result_trades(result)]
+    for i in range(0, len(trades), SIM_STREAM_TRADES_CHUNK):
+        yield {"type": "trades", "symbol": symbol, "trades": trades[i:i + SIM_STREAM_TRADES_CHUNK]}
+
+
+async def sse_events(runner: Any, sub: JobSubscription) -> AsyncIterator[str]:
+    """text/event-stream body for sub; ends after the done event or when the client goes away."""
+    try:
+        yield "retry: 3000\\n\\n"
+        while True:
+            events = await sub.get(SIM_STREAM_KEEPALIVE_SEC)
+            if not events:
+                if sub.closed:
+                    return
+                yield ": keepalive\\n\\n"
+                continue
+            for e in events:
+                yield f"id: {e['seq']}\\nevent: {e['type']}\\ndata: {json.dumps(e, default=str)}\\n\\n"
+                if e["type"] == "done":
+                    return
+    finally:
+        runner.unsubscribe(sub)
+'''
+
+STREAM.write_text(stream_code, encoding="utf-8")
+print(f"Created: {STREAM}")
+
+# ============================================================
+# 2. sim_job_runner.py: publish events
+# ============================================================
+
+runner_txt = RUNNER.read_text(encoding="utf-8")
+
+if "JobSubscription" in runner_txt:
+    print("SKIP: sim_job_runner already publishes stream events")
+else:
+    edits = [
+        # imports
+        ("from typing import Any, Callable, Deque, Dict, List, Optional\n",
+         "from typing import Any, Callable, Deque, Dict, List, Optional\n\n"
+         "from core.sim_job_stream import SIM_STREAM_MAX_SUBSCRIBERS, JobSubscription, result_summary, symbol_events\n"),
+        # subscriber registry
+        ('                       "subjobs": 0, "retries": 0, "poolRestarts": 0}\n',
+         '                       "subjobs": 0, "retries": 0, "poolRestarts": 0}\n'
+         '        self._subscribers: Dict[str, List[JobSubscription]] = {}\n'),
+        # subscribe / unsubscribe
+        ("    # --- dispatcher ---\n",
+         '''    def subscribe(self, job_id: str, loop: asyncio.AbstractEventLoop) -> Optional[JobSubscription]:
+        """Stream subscription for a job, primed with its current state. None if unknown or full."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            subs = self._subscribers.setdefault(job_id, [])
+            if job is None or len(subs) >= SIM_STREAM_MAX_SUBSCRIBERS:
+                if not subs:
+                    self._subscribers.pop(job_id, None)
+                return None
+            sub = JobSubscription(job_id, loop)
+            sub.push({"type": "progress", **job.progress()})
+            for symbol, result in job.results.items():
+                for event in symbol_events(symbol, result):
+                    sub.push(event)
+            if job.status in FINISHED:
+                sub.push(self._done_event(job))
+                self._subscribers.pop(job_id, None)
+            else:
+                subs.append(sub)
+            return sub
+
+    def unsubscribe(self, sub: JobSubscription) -> None:
+        sub.close()
+        with self._cond:
+            subs = self._subscribers.get(sub.job_id)
+            if subs and sub in subs:
+                subs.remove(sub)
+                if not subs:
+                    del self._subscribers[sub.job_id]
+
+    # --- dispatcher ---
+'''),
+        # progress when a sub-job starts
+        ('                job.sub_status[sj.symbol] = "running"\n',
+         '                job.sub_status[sj.symbol] = "running"\n'
+         '                self._emit(job, {"type": "progress", **job.progress()})\n'),
+        # symbol result + trades
+        ('        job.sub_status[sj.symbol] = "done" if result.get("ok", True) else "failed"\n',
+         '        job.sub_status[sj.symbol] = "done" if result.get("ok", True) else "failed"\n'
+         '        self._emit(job, {"type": "progress", **job.progress()})\n'
+         '        for event in symbol_events(sj.symbol, result):\n'
+         '            self._emit(job, event)\n'),
+        # final event
+        ("        job.done.set()\n",
+         "        job.done.set()\n"
+         "        self._emit(job, {\"type\": \"progress\", **job.progress()})\n"
+         "        self._emit(job, self._done_event(job))\n"
+         "        self._subscribers.pop(job.id, None)\n"),
+        # helpers
+        ("    def _trim_jobs(self) -> None:\n",
+         '''    def _emit(self, job: SimJob, event: Dict[str, Any]) -> None:
+        for sub in self._subscribers.get(job.id) or ():
+            sub.push(event)
+
+    @staticmethod
+    def _done_event(job: SimJob) -> Dict[str, Any]:
+        return {"type": "done", "status": job.status, "error": job.error,
+                "summary": result_summary(job.result or {})}
+
+    def _trim_jobs(self) -> None:
+'''),
+    ]
+    for anchor, replacement in edits:
+        if runner_txt.count(anchor) != 1:
+            die(f"sim_job_runner.py anchor not found (or ambiguous): {anchor.strip()[:60]}")
+        runner_txt = runner_txt.replace(anchor, replacement)
+    RUNNER.write_text(runner_txt, encoding="utf-8")
+    print(f"Patched: {RUNNER}")
+
+# ============================================================
+# 3. GET /api/strategy-sim/jobs/{job_id}/events
+# ============================================================
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+
+if "sim_job_stream" in txt:
+    print("SKIP: /api/strategy-sim/jobs/{id}/events already present")
+else:
+    m = re.search(r'(@\w+\.post\(\s*"/api/strategy-sim/jobs/\{(\w+)\}/cancel"[^\n]*\)\n)def strategy_sim_job_cancel\(', txt)
+    if m is None:
+        die("POST /api/strategy-sim/jobs/{id}/cancel route not found")
+    dec, param = m.group(1), m.group(2)
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.end())
+    end = nxt.end() if nxt else len(txt)
+    events_route = dec.replace(".post(", ".get(").replace("/cancel\"", "/events\"")
+    txt = txt[:end] + events_route + f'''async def strategy_sim_job_events({param}: str):
+    """
+    Server-sent events for a runner job: progress, symbol, trades (as each symbol
+    resolves) and done. Starts with the job's current state; ends after done.
+    """
+    import asyncio
+    from fastapi.responses import StreamingResponse
+    from core.sim_job_runner import get_sim_job_runner
+    from core.sim_job_stream import sse_events
+    runner = get_sim_job_runner()
+    sub = runner.subscribe({param}, asyncio.get_running_loop())
+    if sub is None:
+        found = runner.get({param}) is not None
+        return {{"ok": False, "error": "Too many streams for this job" if found else "Job not found"}}
+    return StreamingResponse(
+        sse_events(runner, sub),
+        media_type="text/event-stream",
+        headers={{"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}},
+    )
+
+
+''' + txt[end:]
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE} (GET /api/strategy-sim/jobs/{{{param}}}/events)")
+
+print()
+print("=" * 60)
+print("SIM JOB STREAM PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {STREAM} (new)")
+print(f"  - {RUNNER}")
+print(f"  - {ROUTE_FILE}")
+print()
+print("Next: Rebuild container; curl -N .../api/strategy-sim/jobs/<jobId>/events while an")
+print("      async multi-symbol run is in progress (nginx: proxy_buffering off for this path)")
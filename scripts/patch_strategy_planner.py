@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Multi-strategy single-pass evaluation
+
+1. Create core/strategy_planner.py: per-cycle plan of (user, symbol) -> strategy
+   and the union of detectors per symbol
+2. scan_engine_v2.py:
+   - ScanConfig/StartScanRequest: userIds (extra users scanned in the same pass)
+   - build the plan once per cycle; run the detector union once per symbol/TF
+     and hand each strategy its hits in the engine's own evaluation
+     (_scan_symbol_tf_impl runs once per strategy with that strategy's config)
+   - one result record per user (userId, strategyId)
+   - ScanStatus.strategyPlan (strategies, users, detectorRuns vs naive runs)
+3. /scan/status: strategyPlan
+
+Requires patch_per_user_strategy.py and patch_bar_close_scan.py.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+PLANNER = ROOT / "core" / "strategy_planner.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not SCAN.exists():
+    die(f"Missing {SCAN}")
+
+# ============================================================
+# 1. Create strategy_planner.py
+# ============================================================
+
+planner_code = '''\"\"\"
+strategy_planner.py
+-------------------
+Single detector pass for many user strategies.
+
+With per-user strategy maps every (user, symbol) can resolve to a different
+strategy, and scanning each user separately runs the same detectors on the
+same bars once per user. The plan groups users by the strategy they resolve
+to per symbol. Per symbol/TF the union of those strategies' detectors runs
+once; the engine's own evaluation (_scan_symbol_tf_impl: entry/SL/TP, RR,
+result record) then runs once per strategy on its slice of the shared hits,
+and every user of the strategy gets their own signal record. A strategy's
+min_score (weighted count of its non-gate detectors that fired) is checked on
+the shared hits.
+\"\"\"
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_detector(name: str) -> str:
+    return str(name).strip().upper().replace("-", "_")
+
+
+class StrategySpec:
+    \"\"\"What the engine needs to evaluate one strategy, independent of who uses it.\"\"\"
+
+    __slots__ = ("strategy_id", "name", "detectors", "min_rr", "min_score", "weights", "key")
+
+    def __init__(self, strategy: Dict[str, Any]):
+        cfg = strategy.get("config") or {}
+        detectors: List[str] = []
+        seen = set()
+        for d in strategy.get("detectors") or []:
+            n = normalize_detector(d)
+            if n and n not in seen:
+                seen.add(n)
+                detectors.append(str(d).strip())
+        min_rr = cfg.get("min_rr", strategy.get("min_rr"))
+        min_score = cfg.get("min_score", strategy.get("min_score"))
+
+        self.strategy_id = str(strategy.get("id") or strategy.get("strategy_id") or "")
+        self.name = str(strategy.get("name") or self.strategy_id)
+        self.detectors = tuple(detectors)
+        self.min_rr = float(min_rr) if min_rr is not None else None
+        self.min_score = float(min_score) if min_score is not None else None
+        self.weights = {normalize_detector(k): float(v) for k, v in (cfg.get("detector_weights") or {}).items()}
+        # Same id with different rules (per-user copies) must not share a spec
+        self.key = (self.strategy_id, self.detectors, self.min_rr, self.min_score,
+                    json.dumps(cfg, sort_keys=True, default=str))
+
+    def score(self, hits_by_name: Dict[str, List[Dict[str, Any]]]) -> float:
+        \"\"\"Weighted count of this strategy's non-gate detectors that fired (hits keyed by normalized name).\"\"\"
+        fired = [normalize_detector(d) for d in self.detectors]
+        fired = [d for d in fired if not d.startswith("GATE_") and hits_by_name.get(d)]
+        return round(sum(self.weights.get(d, 1.0) for d in fired), 4)
+
+    def apply(self, config: Any, user_id: str) -> Any:
+        \"\"\"Copy of the scan config as this user's single-strategy scan would have it.\"\"\"
+        update: Dict[str, Any] = {"detectors": list(self.detectors), "strategyId": self.strategy_id, "userId": user_id}
+        if self.min_rr is not None and hasattr(config, "minRR"):
+            update["minRR"] = self.min_rr
+        if self.min_score is not None and hasattr(config, "minScore"):
+            update["minScore"] = self.min_score
+        copier = getattr(config, "model_copy", None) or config.copy
+        return copier(update=update)
+
+
+class StrategyPlan:
+    \"\"\"Per-cycle plan: symbol -> [(StrategySpec, users)] and detector union.\"\"\"
+
+    def __init__(self):
+        self._specs: Dict[tuple, StrategySpec] = {}
+        self._by_symbol: Dict[str, Dict[tuple, List[str]]] = {}
+        self.users: List[str] = []
+        self.errors: Dict[str, str] = {}
+
+    def add(self, user_id: str, symbol: str, strategy: Dict[str, Any]) -> None:
+        spec = StrategySpec(strategy)
+        if not spec.detectors:
+            return
+        spec = self._specs.setdefault(spec.key, spec)
+        users = self._by_symbol.setdefault(symbol.upper(), {}).setdefault(spec.key, [])
+        if user_id not in users:
+            users.append(user_id)
+
+    def covers(self, symbol: str) -> bool:
+        return bool(self._by_symbol.get(symbol.upper()))
+
+    def strategies_for(self, symbol: str) -> List[Tuple[StrategySpec, List[str]]]:
+        return [(self._specs[k], users) for k, users in self._by_symbol.get(symbol.upper(), {}).items()]
+
+    def detectors_for(self, symbol: str) -> List[str]:
+        union: List[str] = []
+        seen = set()
+        for spec, _ in self.strategies_for(symbol):
+            for d in spec.detectors:
+                if normalize_detector(d) not in seen:
+                    seen.add(normalize_detector(d))
+                    union.append(d)
+        return union
+
+    def naive_runs(self, symbol: str) -> int:
+        \"\"\"Detector runs if every user were scanned separately.\"\"\"
+        return sum(len(spec.detectors) * len(users) for spec, users in self.strategies_for(symbol))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "users": len(self.users),
+            "strategies": len(self._specs),
+            "symbols": len(self._by_symbol),
+            "uniqueDetectors": len({normalize_detector(d) for s in self._specs.values() for d in s.detectors}),
+            "errors": dict(self.errors),
+        }
+
+
+def build_plan(
+    user_ids: Iterable[str],
+    symbols: Iterable[str],
+    default_strategy_id: str = "",
+) -> Optional[StrategyPlan]:
+    \"\"\"Resolve every (user, symbol) to its strategy. None if no user resolves.\"\"\"
+    from core.user_strategies_store import ensure_starter_strategies, get_strategy_id_for_symbol
+
+    plan = StrategyPlan()
+    symbols = list(symbols)
+    for uid in user_ids:
+        if not uid or uid in plan.users:
+            continue
+        try:
+            strategies, active_id = ensure_starter_strategies(uid)
+            by_id = {s.get("id"): s for s in strategies or []}
+            for symbol in symbols:
+                sid = get_strategy_id_for_symbol(uid, symbol) or active_id or default_strategy_id
+                strategy = by_id.get(sid)
+                if strategy:
+                    plan.add(uid, symbol, strategy)
+            plan.users.append(uid)
+        except Exception as e:
+            plan.errors[uid] = str(e)
+            logger.warning(f"strategy plan: user {uid} skipped: {e}")
+    return plan if plan.users and plan._specs else None
+
+
+# ============================================================
+# Scan engine hooks
+# ============================================================
+
+def _planned_impl(impl):
+    \"\"\"
+    Run the engine's evaluation once per strategy of the plan, sharing one
+    detector pass (see ScanEngine._shared_detectors). The first user's record
+    is returned; all per-user records ride along under "signals".
+    \"\"\"
+    @functools.wraps(impl)
+    def wrapper(self, symbol: str, tf: str):
+        plan = getattr(self, "_plan", None)
+        if plan is None or not plan.covers(symbol):
+            return impl(self, symbol, tf)
+
+        status = self._status
+        config = self._config
+        bars_before = status.barsScannedTotal
+        hits_before = dict(status.hitsPerDetector)
+        bars_scanned = None
+        records: List[Dict[str, Any]] = []
+        self._detector_pass = {"detectors": plan.detectors_for(symbol)}
+        try:
+            for spec, users in plan.strategies_for(symbol):
+                self._config = spec.apply(config, users[0])
+                result = impl(self, symbol, tf)
+                if bars_scanned is None:
+                    bars_scanned = status.barsScannedTotal - bars_before
+                if result and spec.min_score is not None:
+                    if spec.score(self._detector_pass.get("byName") or {}) < spec.min_score:
+                        self._increment_no_setup_reason("SCORE_BELOW_MIN")
+                        result = None
+                if result:
+                    records.extend(dict(result, userId=uid, strategyId=spec.strategy_id) for uid in users)
+            shared = self._detector_pass.get("hits")
+        finally:
+            self._config = config
+            self._detector_pass = None
+
+        # The bars were scanned and the detectors ran once, whatever the strategy count
+        status.barsScannedTotal = bars_before + (bars_scanned or 0)
+        status.hitsPerDetector = hits_before
+        sp = status.strategyPlan
+        if shared is not None:
+            for det, h in shared.items():
+                status.hitsPerDetector[det] = status.hitsPerDetector.get(det, 0) + len(h)
+            sp["detectorRuns"] = sp.get("detectorRuns", 0) + len(shared)
+            sp["naiveRuns"] = sp.get("naiveRuns", 0) + plan.naive_runs(symbol)
+        if not records:
+            return None
+        by_strategy = sp.setdefault("setupsByStrategy", {})
+        for r in records:
+            by_strategy[r["strategyId"]] = by_strategy.get(r["strategyId"], 0) + 1
+        return dict(records[0], signals=records)
+
+    wrapper._strategy_plan = True
+    return wrapper
+
+
+def _fan_out(scan, ns: Dict[str, Any]):
+    \"\"\"Persist every per-user record of a planned result; the cycle loop persists the first.\"\"\"
+    @functools.wraps(scan)
+    def wrapper(self, symbol: str, tf: str):
+        result = scan(self, symbol, tf)
+        if not result or "signals" not in result:
+            return result
+        records = result.pop("signals")
+        for record in records[1:]:
+            try:
+                ns["append_result"](record)
+                self._status.counters["setupsFound"] += 1
+            except Exception as e:
+                logger.error(f"strategy plan: result for {record.get('userId')} {symbol}/{tf} not saved: {e}")
+        return records[0]
+
+    wrapper._strategy_plan = True
+    return wrapper
+
+
+def attach_scan_engine(ns: Dict[str, Any]) -> None:
+    \"\"\"Evaluate every planned strategy in _scan_symbol_tf_impl and persist one record per user.\"\"\"
+    engine = ns.get("ScanEngine")
+    impl = getattr(engine, "_scan_symbol_tf_impl", None)
+    if impl is not None and not getattr(impl, "_strategy_plan", False):
+        engine._scan_symbol_tf_impl = _planned_impl(impl)
+    scan = getattr(engine, "_scan_symbol_tf", None)
+    if scan is not None and not getattr(scan, "_strategy_plan", False):
+        engine._scan_symbol_tf = _fan_out(scan, ns)
+'''
+
+PLANNER.write_text(planner_code, encoding="utf-8")
+print(f"Created: {PLANNER}")
+
+# ============================================================
+# 2. scan_engine_v2.py
+# ============================================================
+
+txt = SCAN.read_text(encoding="utf-8")
+
+if "strategy_planner" in txt:
+    print("SKIP: scan engine already uses strategy_planner")
+else:
+    # --- config fields ---
+    for cls in ("class ScanConfig(BaseModel):", "class StartScanRequest(BaseModel):"):
+        pat = re.compile(re.escape(cls) + r'(.*?\n)(\s+userId: str = ""\n)', re.DOTALL)
+        m = pat.search(txt)
+        if not m:
+            print(f"WARNING: userId not found in {cls} - userIds not added")
+            continue
+        field = m.group(2) + '    userIds: List[str] = []  # more users evaluated in the same pass\n'
+        txt = txt[:m.start(2)] + field + txt[m.end(2):]
+        print(f"Added userIds to {cls.split('(')[0][6:]}")
+
+    # --- status field ---
+    status_anchor = "    barCloseSkips: Dict[str, Any] = {}"
+    idx = txt.find(status_anchor)
+    if idx == -1:
+        die("ScanStatus.barCloseSkips not found - run patch_bar_close_scan.py first")
+    eol = txt.index("\n", idx) + 1
+    txt = txt[:eol] + "    strategyPlan: Dict[str, Any] = {}  # users/strategies in the pass, detectorRuns vs naiveRuns\n" + txt[eol:]
+    print("Added strategyPlan to ScanStatus")
+
+    # --- build plan once per cycle ---
+    old = "            self._run_cycle_guarded(mode)\n        finally:\n            self._gate = None\n"
+    new = ("            self._plan = self._build_strategy_plan()\n"
+           "            self._run_cycle_guarded(mode)\n        finally:\n            self._gate = None\n"
+           "            self._plan = None\n")
+    if old not in txt:
+        die("_run_cycle wrapper not found - run patch_bar_close_scan.py first")
+    txt = txt.replace(old, new, 1)
+
+    methods = '''
+    def _build_strategy_plan(self):
+        """Resolve all scanned users' strategies once per cycle (None = single-strategy path)."""
+        users = [u for u in [self._config.userId] + list(getattr(self._config, "userIds", []) or []) if u]
+        if not users:
+            return None
+        try:
+            from core.strategy_planner import build_plan
+            plan = build_plan(users, self._config.effectiveSymbols, self._config.strategyId)
+        except Exception as e:
+            logger.warning(f"strategy plan unavailable, using config detectors: {e}")
+            return None
+        if plan is not None:
+            prev = self._status.strategyPlan or {}
+            self._status.strategyPlan = {
+                **plan.summary(),
+                "detectorRuns": prev.get("detectorRuns", 0),
+                "naiveRuns": prev.get("naiveRuns", 0),
+                "setupsByStrategy": prev.get("setupsByStrategy", {}),
+            }
+        return plan
+
+    def _shared_detectors(self, run_detectors, candles, detectors):
+        """Hits for detectors; under a strategy plan the detector union runs once per symbol/TF."""
+        shared = getattr(self, "_detector_pass", None)
+        if shared is None:
+            return run_detectors(candles, detectors)
+        from core.strategy_planner import normalize_detector
+        if "hits" not in shared:
+            raw = run_detectors(candles, shared["detectors"]) or {}
+            shared["hits"] = raw
+            shared["byName"] = {normalize_detector(d): h for d, h in raw.items()}
+        return {d: list(shared["byName"].get(normalize_detector(d), [])) for d in detectors}
+'''
+    anchor = "    def _bar_close_gate(self):"
+    if anchor not in txt:
+        die("_bar_close_gate not found - run patch_bar_close_scan.py first")
+    txt = txt.replace(anchor, methods.lstrip("\n") + "\n" + anchor, 1)
+    print("Added _build_strategy_plan/_shared_detectors")
+
+    # --- single detector pass in _scan_symbol_tf_impl ---
+    det_pat = re.compile(r"\n(\s+)hits = (\w+)\(candles, self\._config\.detectors\)\n")
+    m = det_pat.search(txt)
+    if m:
+        ind, fn = m.group(1), m.group(2)
+        block = f"\n{ind}hits = self._shared_detectors({fn}, candles, self._config.detectors)\n"
+        txt = txt[:m.start()] + block + txt[m.end():]
+        print(f"Detector pass in _scan_symbol_tf_impl now shared across the plan ({fn})")
+    else:
+        print("WARNING: detector call not found in _scan_symbol_tf_impl - plan built but not used")
+
+    # --- status endpoint ---
+    old_resp = '        "barCloseSkips": status.barCloseSkips,\n'
+    if old_resp in txt:
+        txt = txt.replace(old_resp, old_resp + '        "strategyPlan": status.strategyPlan,\n', 1)
+        print("Added strategyPlan to /scan/status")
+    else:
+        print("WARNING: barCloseSkips not in /scan/status response - strategyPlan not exposed")
+
+    txt = txt.rstrip("\n") + '''
+
+
+# Strategy plan: one evaluation per planned strategy, one record per user (patch_strategy_planner.py)
+register_scan_task_shared("_plan")
+register_additive_status_field("strategyPlan")
+try:
+    from core.strategy_planner import attach_scan_engine as attach_strategy_planner
+    attach_strategy_planner(globals())
+except Exception as e:
+    logger.warning(f"strategy plan fan-out disabled: {e}")
+'''
+
+    SCAN.write_text(txt, encoding="utf-8")
+    print(f"Patched: {SCAN}")
+
+print()
+print("=" * 60)
+print("STRATEGY PLANNER PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {PLANNER} (new)")
+print(f"  - {SCAN}")
+print()
+print("Next: Start scanner with userIds=[...]; /scan/status strategyPlan.detectorRuns")
+print("      should stay at the unique-detector count while naiveRuns grows with users")
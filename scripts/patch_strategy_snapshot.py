@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Memoized per-cycle strategy resolution
+
+1. Create core/strategy_snapshot.py: per-user resolved-strategy snapshot
+   (symbol -> strategy id + compiled detectors/thresholds) with a version stamp
+2. scan_engine_v2.py: snapshot taken once per cycle; the per-symbol loop reads
+   it instead of calling get_strategy_id_for_symbol
+3. strategy_planner.py: build_plan() resolves users through snapshots
+
+scripts/internal_endpoints.py invalidates the snapshot when the active
+strategy / strategy map changes; the invalidation is a generation file under
+state/strategy_snapshot/, so scanner and ingestor processes see it on their
+next cycle. Requires patch_strategy_planner.py.
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+SNAPSHOT = ROOT / "core" / "strategy_snapshot.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+PLANNER = ROOT / "core" / "strategy_planner.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not SCAN.exists():
+    die(f"Missing {SCAN}")
+
+# ============================================================
+# 1. Create strategy_snapshot.py
+# ============================================================
+
+snapshot_code = '''"""
+strategy_snapshot.py
+--------------------
+Resolved-strategy snapshot per user.
+
+get_strategy_id_for_symbol()/get_strategy_by_id() read the user strategies
+store (JSON/Firestore) on every call. A snapshot resolves every symbol once,
+keeps the compiled detector lists and thresholds, and is reused until it is
+invalidated (active strategy / strategy map changed) or its TTL expires.
+
+Invalidation has to reach every process (API, scanner, ingestor), so it
+replaces state/strategy_snapshot/<uid>.gen (or _all.gen); get() stats those
+files and rebuilds when their inode/mtime differ from the snapshot's.
+
+version only changes when the resolved content changes, so consumers can
+compare versions to detect a strategy switch.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TTL_SEC = float(os.getenv("STRATEGY_SNAPSHOT_TTL_SEC", "300"))
+STATE_DIR = Path(os.getenv("STATE_DIR", "state"))
+GEN_DIR = STATE_DIR / "strategy_snapshot"
+ALL_USERS = "_all"
+
+
+def _gen_path(uid: str) -> Path:
+    return GEN_DIR / (re.sub(r"[^A-Za-z0-9_.-]", "_", uid) + ".gen")
+
+
+def _file_gen(path: Path) -> Tuple[int, int]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return (0, 0)
+    return st.st_ino, st.st_mtime_ns
+
+
+def current_generation(uid: str) -> Tuple[int, int, int, int]:
+    """Shared invalidation stamp for uid: (inode, mtime) of its .gen file and of _all.gen."""
+    return _file_gen(_gen_path(uid)) + _file_gen(_gen_path(ALL_USERS))
+
+
+def bump_generation(uid: Optional[str] = None) -> None:
+    """Replace the .gen file (new inode even within one mtime tick) so every process rebuilds."""
+    path = _gen_path(uid or ALL_USERS)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(str(time.time_ns()))
+    os.replace(tmp, path)
+
+
+def _compile(strategy: Dict[str, Any]) -> Dict[str, Any]:
+    from core.strategy_planner import StrategySpec
+    spec = StrategySpec(strategy)
+    return {
+        "strategyId": spec.strategy_id,
+        "name": spec.name,
+        "detectors": list(spec.detectors),
+        "minRR": spec.min_rr,
+        "minScore": spec.min_score,
+    }
+
+
+class StrategySnapshot:
+    """Immutable view of one user's strategy resolution."""
+
+    def __init__(self, uid: str, active_id: Optional[str], strategies: Dict[str, Dict[str, Any]],
+                 by_symbol: Dict[str, Optional[str]]):
+        self.uid = uid
+        self.active_id = active_id
+        self.strategies = strategies          # id -> raw strategy dict
+        self.by_symbol = by_symbol            # symbol -> strategy id (None = unresolved)
+        self.compiled = {sid: _compile(s) for sid, s in strategies.items()}
+        self.version = 0
+        self.generation: Tuple[int, int, int, int] = (0, 0, 0, 0)
+        self.built_at = datetime.now(timezone.utc).isoformat()
+        self.built_mono = time.monotonic()
+        self.fingerprint = hashlib.sha1(
+            json.dumps([active_id, sorted(by_symbol.items(), key=lambda kv: kv[0]),
+                        sorted(self.compiled.items())], sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+
+    def covers(self, symbols: Iterable[str]) -> bool:
+        return all(s in self.by_symbol for s in symbols)
+
+    def strategy_id_for(self, symbol: str) -> Optional[str]:
+        return self.by_symbol.get(symbol)
+
+    def strategy_for(self, symbol: str) -> Optional[Dict[str, Any]]:
+        sid = self.by_symbol.get(symbol)
+        return self.strategies.get(sid) if sid else None
+
+    def compiled_for(self, symbol: str) -> Optional[Dict[str, Any]]:
+        sid = self.by_symbol.get(symbol)
+        return self.compiled.get(sid) if sid else None
+
+    def meta(self) -> Dict[str, Any]:
+        return {
+            "uid": self.uid,
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "builtAt": self.built_at,
+            "symbols": len(self.by_symbol),
+            "strategies": len(self.strategies),
+        }
+
+
+class StrategySnapshotRegistry:
+    def __init__(self, ttl_sec: float = SNAPSHOT_TTL_SEC):
+        self.ttl_sec = ttl_sec
+        self._snaps: Dict[str, StrategySnapshot] = {}
+        self._versions: Dict[str, tuple] = {}  # uid -> (version, fingerprint)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "builds": 0, "invalidations": 0}
+
+    def get(self, uid: str, symbols: Iterable[str] = ()) -> StrategySnapshot:
+        """Current snapshot for uid covering symbols (rebuilt if stale or invalidated)."""
+        symbols = [s for s in symbols if s]
+        generation = current_generation(uid)
+        with self._lock:
+            snap = self._snaps.get(uid)
+            fresh = (snap is not None and snap.generation == generation
+                     and (time.monotonic() - snap.built_mono) < self.ttl_sec)
+            if fresh and snap.covers(symbols):
+                self._stats["hits"] += 1
+                return snap
+            wanted = set(symbols) | (set(snap.by_symbol) if snap is not None else set())
+            snap = self._build(uid, sorted(wanted))
+            snap.generation = generation
+            self._snaps[uid] = snap
+            return snap
+
+    def _build(self, uid: str, symbols: List[str]) -> StrategySnapshot:
+        from core.user_strategies_store import ensure_starter_strategies, get_strategy_id_for_symbol
+        strategies, active_id = ensure_starter_strategies(uid)
+        by_id = {s.get("id"): s for s in strategies or [] if s.get("id")}
+        by_symbol: Dict[str, Optional[str]] = {}
+        for symbol in symbols:
+            try:
+                by_symbol[symbol] = get_strategy_id_for_symbol(uid, symbol) or active_id
+            except Exception as e:
+                logger.debug(f"strategy snapshot: resolve {uid}/{symbol} failed: {e}")
+                by_symbol[symbol] = active_id
+        snap = StrategySnapshot(uid, active_id, by_id, by_symbol)
+        version, fingerprint = self._versions.get(uid, (0, None))
+        if snap.fingerprint != fingerprint:
+            version += 1
+            self._versions[uid] = (version, snap.fingerprint)
+        snap.version = version
+        self._stats["builds"] += 1
+        return snap
+
+    def invalidate(self, uid: Optional[str] = None) -> None:
+        """Drop cached snapshot(s) here and, via the .gen file, in every other process."""
+        try:
+            bump_generation(uid)
+        except OSError as e:
+            logger.warning(f"strategy snapshot: cannot publish invalidation ({e}) - other processes wait for the TTL")
+        with self._lock:
+            if uid is None:
+                self._snaps.clear()
+            else:
+                self._snaps.pop(uid, None)
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "users": {u: s.meta() for u, s in self._snaps.items()}}
+
+
+_registry: Optional[StrategySnapshotRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_snapshot_registry() -> StrategySnapshotRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = StrategySnapshotRegistry()
+    return _registry
+
+
+def get_strategy_snapshot(uid: str, symbols: Iterable[str] = ()) -> StrategySnapshot:
+    return get_snapshot_registry().get(uid, symbols)
+
+
+def invalidate_strategy_snapshot(uid: Optional[str] = None) -> None:
+    get_snapshot_registry().invalidate(uid)
+'''
+
+SNAPSHOT.write_text(snapshot_code, encoding="utf-8")
+print(f"Created: {SNAPSHOT}")
+
+# ============================================================
+# 2. scan_engine_v2.py
+# ============================================================
+
+txt = SCAN.read_text(encoding="utf-8")
+
+if "def _take_strategy_snapshot(" in txt:
+    print("SKIP: scan engine already uses strategy_snapshot")
+else:
+    # --- per-symbol resolution reads the snapshot ---
+    resolve_pat = re.compile(
+        r"\n(?P<ind>[ \t]+)effective_strat_id = self\._config\.strategyId  # default\n"
+        r"(?P=ind)if self\._config\.userId and get_strategy_id_for_symbol:\n"
+    )
+    m = resolve_pat.search(txt)
+    if not m:
+        die("per-symbol strategy resolution not found - run patch_per_user_strategy.py first")
+    ind = m.group("ind")
+    new = (
+        f"\n{ind}effective_strat_id = self._config.strategyId  # default\n"
+        f"{ind}snap = getattr(self, \"_strategy_snapshot\", None)\n"
+        f"{ind}if snap is not None:\n"
+        f"{ind}    effective_strat_id = snap.strategy_id_for(symbol) or effective_strat_id\n"
+        f"{ind}    self._status.perSymbol[symbol][\"strategyVersion\"] = snap.version\n"
+        f"{ind}elif self._config.userId and get_strategy_id_for_symbol:\n"
+    )
+    txt = txt[:m.start()] + new + txt[m.end():]
+    print("Per-symbol strategy resolution now reads the cycle snapshot")
+
+    # --- take the snapshot once per cycle ---
+    old = "            self._plan = self._build_strategy_plan()\n"
+    if old not in txt:
+        die("_build_strategy_plan call not found - run patch_strategy_planner.py first")
+    txt = txt.replace(old, "            self._strategy_snapshot = self._take_strategy_snapshot()\n" + old, 1)
+    txt = txt.replace(
+        "            self._plan = None\n",
+        "            self._plan = None\n            self._strategy_snapshot = None\n", 1)
+
+    method = '''    def _take_strategy_snapshot(self):
+        """Resolved strategies for config.userId, reused across cycles until invalidated."""
+        if not self._config.userId:
+            return None
+        try:
+            from core.strategy_snapshot import get_strategy_snapshot
+            snap = get_strategy_snapshot(self._config.userId, self._config.effectiveSymbols)
+        except Exception as e:
+            logger.warning(f"strategy snapshot unavailable, resolving per symbol: {e}")
+            return None
+        self._status.strategySnapshot = snap.meta()
+        return snap
+
+'''
+    anchor = "    def _build_strategy_plan(self):"
+    txt = txt.replace(anchor, method + anchor, 1)
+
+    # --- status field + response ---
+    status_anchor = "    strategyPlan: Dict[str, Any] = {}"
+    idx = txt.find(status_anchor)
+    if idx == -1:
+        die("ScanStatus.strategyPlan not found - run patch_strategy_planner.py first")
+    eol = txt.index("\n", idx) + 1
+    txt = txt[:eol] + "    strategySnapshot: Dict[str, Any] = {}  # {uid, version, fingerprint, builtAt}\n" + txt[eol:]
+
+    old_resp = '        "strategyPlan": status.strategyPlan,\n'
+    if old_resp in txt:
+        txt = txt.replace(old_resp, old_resp + '        "strategySnapshot": status.strategySnapshot,\n', 1)
+    else:
+        print("WARNING: strategyPlan not in /scan/status response - strategySnapshot not exposed")
+
+    txt = txt.rstrip("\n") + '''
+
+
+# Strategy snapshot: read-only for the cycle, shared with scan tasks (patch_strategy_snapshot.py)
+register_scan_task_shared("_strategy_snapshot")
+'''
+
+    SCAN.write_text(txt, encoding="utf-8")
+    print(f"Patched: {SCAN}")
+
+# ============================================================
+# 3. strategy_planner.py: resolve through snapshots
+# ============================================================
+
+if PLANNER.exists():
+    ptxt = PLANNER.read_text(encoding="utf-8")
+    if "get_strategy_snapshot" in ptxt:
+        print("SKIP: planner already uses snapshots")
+    else:
+        old_import = "    from core.user_strategies_store import ensure_starter_strategies, get_strategy_id_for_symbol\n"
+        old_body = '''            strategies, active_id = ensure_starter_strategies(uid)
+            by_id = {s.get("id"): s for s in strategies or []}
+            for symbol in symbols:
+                sid = get_strategy_id_for_symbol(uid, symbol) or active_id or default_strategy_id
+                strategy = by_id.get(sid)
+'''
+        new_body = '''            snap = get_strategy_snapshot(uid, symbols)
+            for symbol in symbols:
+                sid = snap.strategy_id_for(symbol) or default_strategy_id
+                strategy = snap.strategies.get(sid)
+'''
+        if old_import in ptxt and old_body in ptxt:
+            ptxt = ptxt.replace(old_import, "    from core.strategy_snapshot import get_strategy_snapshot\n", 1)
+            ptxt = ptxt.replace(old_body, new_body, 1)
+            PLANNER.write_text(ptxt, encoding="utf-8")
+            print(f"Patched: {PLANNER}")
+        else:
+            print("WARNING: build_plan body not recognized - planner still reads the store directly")
+else:
+    print(f"NOTE: {PLANNER} not found")
+
+print()
+print("=" * 60)
+print("STRATEGY SNAPSHOT PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {SNAPSHOT} (new)")
+print(f"  - {SCAN}")
+print(f"  - {PLANNER}")
+print()
+print("Next: Redeploy scripts/internal_endpoints.py (snapshot invalidation), rebuild container,")
+print("      check /scan/status strategySnapshot.version bumps after changing the strategy map")
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+In-process "symbol head" index (last ts / bar count / last close per symbol/tf)
+
+1. Create core/symbol_head_index.py (updated from M5 append events)
+2. marketdata_store.py: subscribe the index next to the binary store mirror
+3. api_server.py: /api/internal/marketdata/lag answers from the index
+
+scripts/internal_endpoints.py (strategy-map-status) reads the same index.
+Requires patch_m5_binary_store.py.
+"""
+from pathlib import Path
+import re
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+HEADS = ROOT / "core" / "symbol_head_index.py"
+STORE = ROOT / "core" / "marketdata_store.py"
+API = ROOT / "api_server.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "marketdata_events.py").exists():
+    die("Missing core/marketdata_events.py - run patch_m5_binary_store.py first")
+
+# ============================================================
+# 1. Create symbol_head_index.py
+# ============================================================
+
+heads_code = '''"""
+symbol_head_index.py
+--------------------
+In-memory head of each symbol's M5 series: last candle ts, bar count, last close.
+
+Updated on every MarketDataStore append (marketdata_events). A symbol that has
+not been appended to since startup is seeded once from m5.bin (O(1) tail read)
+or, failing that, from get_last_candle_ts_from_file(). Status endpoints read
+heads from memory instead of opening gzip files per request.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Re-seed from disk if no append was seen for this long (ingestor in another process)
+RESEED_AFTER_SEC = 60
+
+
+def _tf_seconds(tf: str) -> int:
+    tf = tf.lower().strip()
+    return {
+        "m1": 60, "1m": 60, "m5": 300, "5m": 300, "m15": 900, "15m": 900,
+        "m30": 1800, "30m": 1800, "h1": 3600, "1h": 3600, "h4": 14400, "4h": 14400,
+        "d1": 86400, "1d": 86400,
+    }.get(tf, 300)
+
+
+@dataclass
+class SymbolHead:
+    symbol: str
+    tf: str
+    last_ts: Optional[int] = None      # epoch seconds of the last bar (bucket start for HTF)
+    bar_count: Optional[int] = None    # None when unknown (seeded from CSV)
+    last_close: Optional[float] = None
+    updated_at: float = 0.0
+    source: str = "none"               # "append" | "binary" | "csv" | "none"
+
+    @property
+    def last_dt(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.last_ts, tz=timezone.utc) if self.last_ts is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["lastCandleTs"] = self.last_dt.isoformat() if self.last_ts is not None else None
+        return d
+
+
+class SymbolHeadIndex:
+    def __init__(self):
+        self._heads: Dict[str, SymbolHead] = {}
+        self._lock = threading.Lock()
+        self._stats = {"appends": 0, "seeds": 0, "reads": 0}
+
+    # --------------------------------------------------------
+    # Update path (append listener)
+    # --------------------------------------------------------
+    def on_append(self, symbol: str, tf: str, frame) -> None:
+        symbol = symbol.upper()
+        self._stats["appends"] += 1
+        if frame is None or not len(frame):
+            self._seed(symbol, force=True)
+            return
+        with self._lock:
+            head = self._heads.get(symbol)
+            if head is not None and head.last_ts is not None and int(frame.ts[0]) > head.last_ts:
+                # Pure tail append: O(1) update
+                if head.bar_count is not None:
+                    head.bar_count += len(frame)
+                head.last_ts = int(frame.ts[-1])
+                head.last_close = float(frame.close[-1])
+                head.updated_at = time.time()
+                head.source = "append"
+                return
+        # First sighting, rewrite of the live bar or backfill: recount from disk
+        self._seed(symbol, force=True)
+
+    def _seed(self, symbol: str, force: bool = False) -> SymbolHead:
+        with self._lock:
+            head = self._heads.get(symbol)
+            if head is not None and not force and (time.time() - head.updated_at) < RESEED_AFTER_SEC:
+                return head
+
+        head = SymbolHead(symbol=symbol, tf="m5", updated_at=time.time())
+        try:
+            from core.m5_binary_store import get_m5_binary_store, is_authoritative
+            if is_authoritative(symbol):
+                last = get_m5_binary_store().last_record(symbol)
+                if last:
+                    head.last_ts = int(last["ts"])
+                    head.last_close = float(last["close"])
+                    head.bar_count = int(last["count"])
+                    head.source = "binary"
+        except Exception as e:
+            logger.debug(f"symbol_head_index: binary seed failed for {symbol}: {e}")
+
+        if head.last_ts is None:
+            try:
+                from core.marketdata_store import get_last_candle_ts_from_file
+                dt = get_last_candle_ts_from_file(symbol, "m5")
+                if dt is not None:
+                    if dt.tzinfo is None:
+                        dt = dt.replace(tzinfo=timezone.utc)
+                    head.last_ts = int(dt.timestamp())
+                    head.source = "csv"
+            except Exception as e:
+                logger.debug(f"symbol_head_index: csv seed failed for {symbol}: {e}")
+
+        self._stats["seeds"] += 1
+        with self._lock:
+            self._heads[symbol] = head
+        return head
+
+    # --------------------------------------------------------
+    # Read path
+    # --------------------------------------------------------
+    def get(self, symbol: str, tf: str = "m5") -> SymbolHead:
+        """Head for symbol/tf. HTF heads are derived from the M5 head (last bucket start)."""
+        symbol = symbol.upper()
+        self._stats["reads"] += 1
+        with self._lock:
+            head = self._heads.get(symbol)
+        if head is None or (head.source != "append" and (time.time() - head.updated_at) >= RESEED_AFTER_SEC):
+            head = self._seed(symbol, force=True)
+
+        tf_sec = _tf_seconds(tf)
+        if tf_sec <= 300 or head.last_ts is None:
+            return head
+        return SymbolHead(
+            symbol=symbol,
+            tf=tf.lower(),
+            last_ts=(head.last_ts // tf_sec) * tf_sec,
+            bar_count=None,
+            last_close=head.last_close,
+            updated_at=head.updated_at,
+            source=head.source,
+        )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {s: h.to_dict() for s, h in sorted(self._heads.items())}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "symbols": len(self._heads)}
+
+
+_index: Optional[SymbolHeadIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_symbol_head_index() -> SymbolHeadIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SymbolHeadIndex()
+    return _index
+
+
+def enable_symbol_heads() -> None:
+    """Subscribe the index to M5 append events."""
+    from core.marketdata_events import subscribe_m5_append
+    subscribe_m5_append("symbol_head_index", get_symbol_head_index().on_append)
+
+
+def get_last_candle_ts_cached(symbol: str, tf: str = "m5") -> Optional[datetime]:
+    """Drop-in for marketdata_store.get_last_candle_ts_from_file answered from memory."""
+    return get_symbol_head_index().get(symbol, tf).last_dt
+'''
+
+HEADS.write_text(heads_code, encoding="utf-8")
+print(f"Created: {HEADS}")
+
+# ============================================================
+# 2. marketdata_store.py: subscribe the index
+# ============================================================
+
+if STORE.exists():
+    store_txt = STORE.read_text(encoding="utf-8")
+    if "enable_symbol_heads()" in store_txt:
+        print("SKIP: symbol head index already subscribed")
+    else:
+        # After the binary mirror, so re-seeds see the rows just appended
+        anchor = "        enable_mirror()\n"
+        if anchor in store_txt:
+            store_txt = store_txt.replace(
+                anchor,
+                anchor + "    from core.symbol_head_index import enable_symbol_heads\n    enable_symbol_heads()\n",
+                1,
+            )
+            STORE.write_text(store_txt, encoding="utf-8")
+            print("Subscribed symbol head index to M5 appends")
+        else:
+            print("WARNING: append hook block not found - run patch_m5_binary_store.py first")
+else:
+    print(f"WARNING: {STORE} not found")
+
+# ============================================================
+# 3. api_server.py: /api/internal/marketdata/lag from the index
+# ============================================================
+
+if API.exists():
+    api_txt = API.read_text(encoding="utf-8")
+    m = re.search(r'@app\.get\(["\']/api/internal/marketdata/lag["\'][^\n]*\n', api_txt)
+    if not m:
+        print("WARNING: /api/internal/marketdata/lag route not found")
+    else:
+        start = m.start()
+        nxt = api_txt.find("\n@app.", m.end())
+        end = nxt if nxt != -1 else len(api_txt)
+        body = api_txt[start:end]
+        if "get_last_candle_ts_cached" in body:
+            print("SKIP: lag endpoint already uses symbol head index")
+        else:
+            new_body = re.sub(
+                r"from core\.marketdata_store import get_last_candle_ts_from_file\b",
+                "from core.symbol_head_index import get_last_candle_ts_cached as get_last_candle_ts_from_file",
+                body,
+            )
+            if new_body == body and "get_last_candle_ts_from_file(" in body:
+                # Module-level import: rename calls inside this handler only
+                new_body = body.replace("get_last_candle_ts_from_file(", "get_last_candle_ts_cached(")
+                indent = re.search(r"\n(\s+)\S", body[body.find("def "):]).group(1)
+                def_end = body.find(":\n", body.find("def ")) + 2
+                new_body = new_body[:def_end] + f"{indent}from core.symbol_head_index import get_last_candle_ts_cached\n" + new_body[def_end:]
+            if new_body != body:
+                api_txt = api_txt[:start] + new_body + api_txt[end:]
+                API.write_text(api_txt, encoding="utf-8")
+                print("/api/internal/marketdata/lag now reads the symbol head index")
+            else:
+                print("WARNING: lag endpoint does not call get_last_candle_ts_from_file - left unchanged")
+else:
+    print(f"NOTE: {API} not found")
+
+print()
+print("=" * 60)
+print("SYMBOL HEAD INDEX PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {HEADS} (new)")
+print(f"  - {STORE}")
+print(f"  - {API}")
+print()
+print("Next: Redeploy scripts/internal_endpoints.py and rebuild container")
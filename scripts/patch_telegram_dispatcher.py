@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+"""
+Async Telegram fan-out dispatcher
+
+1. Create core/telegram_dispatcher.py: per-chat queues drained by an asyncio
+   loop in its own thread; global + per-chat token buckets, bursts coalesced
+   into one digest per chat, 429 retry_after honoured, transient failures
+   retried and persisted to an outbox file (replayed later / after restart).
+2. Telegram send functions (same discovery as patch_scan_metrics.py, plus any
+   function calling sendMessage) enqueue instead of calling the Bot API in the
+   scan path.
+3. /api/metrics gains "telegram": queue depth, send/API latency, counters.
+
+Requires patch_async_backfill.py (TokenBucket) and patch_scan_metrics.py (Histogram).
+Smoke test against a local fake Bot API: scripts/smoke_telegram_dispatcher.py
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+DISPATCHER = ROOT / "core" / "telegram_dispatcher.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "async_backfill.py").exists():
+    die("Missing core/async_backfill.py - run patch_async_backfill.py first")
+
+def py_files():
+    for pattern in ("*.py", "*/*.py", "*/*/*.py"):
+        for p in sorted(ROOT.glob(pattern)):
+            if "venv" in p.parts or "site-packages" in p.parts or p == DISPATCHER:
+                continue
+            try:
+                yield p, p.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+
+# ============================================================
+# 1. Create telegram_dispatcher.py
+# ============================================================
+
+dispatcher_code = '''"""
+telegram_dispatcher.py
+----------------------
+Signal notifications to telegram_chat_id subscribers, off the scan path.
+
+The scanner called the Bot API inline, so one slow or rate-limited request
+stalled the cycle. Here send functions only enqueue (microseconds); an asyncio
+loop in a dedicated thread delivers:
+
+- one queue per chat; a chat's messages arriving within
+  TELEGRAM_DIGEST_WINDOW_SEC (or while it waits for its rate slot) go out as
+  one digest message (up to TELEGRAM_DIGEST_MAX items / 4096 chars)
+- global token bucket (TELEGRAM_GLOBAL_RATE, Bot API ~30 msg/s) and one per
+  chat (TELEGRAM_CHAT_RATE, ~1 msg/s); 429 pauses the chat for retry_after
+- 5xx / network errors retry with backoff; after TELEGRAM_MAX_RETRIES, on
+  queue overflow and at shutdown messages go to an outbox file
+  (state/telegram/outbox.jsonl) replayed every TELEGRAM_OUTBOX_RETRY_SEC and
+  on startup; anything older than TELEGRAM_MAX_AGE_SEC is dropped
+- 400/403 (bad chat, bot blocked) are dropped, never retried
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from core.async_backfill import TokenBucket
+
+try:
+    from core.scan_metrics import Histogram
+except ImportError:  # metrics are optional
+    Histogram = None
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+# rate + burst bounds any 1 s window (Bot API: ~30 msg/s)
+TELEGRAM_GLOBAL_BURST = int(os.getenv("TELEGRAM_GLOBAL_BURST", "3"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_DIGEST_WINDOW_SEC = float(os.getenv("TELEGRAM_DIGEST_WINDOW_SEC", "1.5"))
+TELEGRAM_DIGEST_MAX = int(os.getenv("TELEGRAM_DIGEST_MAX", "20"))
+TELEGRAM_CONCURRENCY = int(os.getenv("TELEGRAM_CONCURRENCY", "8"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "5"))
+TELEGRAM_BACKOFF_SEC = float(os.getenv("TELEGRAM_BACKOFF_SEC", "2"))
+TELEGRAM_TIMEOUT_SEC = float(os.getenv("TELEGRAM_TIMEOUT_SEC", "10"))
+TELEGRAM_QUEUE_MAX = int(os.getenv("TELEGRAM_QUEUE_MAX", "10000"))
+TELEGRAM_OUTBOX_RETRY_SEC = float(os.getenv("TELEGRAM_OUTBOX_RETRY_SEC", "30"))
+TELEGRAM_MAX_AGE_SEC = float(os.getenv("TELEGRAM_MAX_AGE_SEC", "21600"))
+
+STATE_DIR = Path(os.getenv("STATE_DIR", "state"))
+OUTBOX_FILE = STATE_DIR / "telegram" / "outbox.jsonl"
+
+MAX_TEXT = 4096
+DIGEST_SEPARATOR = "\\n\\n\\u2796\\u2796\\u2796\\n\\n"
+
+Message = Dict[str, Any]  # id, chat_id, text, parse_mode, token, ts, attempts
+
+
+class _BotClient:
+    """One pooled async session: aiohttp, else httpx, else urllib in threads."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.kind = None
+        self._session = None
+
+    async def open(self) -> None:
+        try:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=TELEGRAM_TIMEOUT_SEC),
+            )
+            self.kind = "aiohttp"
+        except ImportError:
+            try:
+                import httpx
+                self._session = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.limit, max_keepalive_connections=self.limit),
+                    timeout=TELEGRAM_TIMEOUT_SEC,
+                )
+                self.kind = "httpx"
+            except ImportError:
+                self.kind = "urllib"
+
+    async def close(self) -> None:
+        if self.kind == "aiohttp":
+            await self._session.close()
+        elif self.kind == "httpx":
+            await self._session.aclose()
+
+    async def post_json(self, url: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        """(status, json body or None); status 0 on connection errors."""
+        try:
+            if self.kind == "aiohttp":
+                async with self._session.post(url, json=body) as r:
+                    return r.status, await r.json(content_type=None)
+            if self.kind == "httpx":
+                r = await self._session.post(url, json=body)
+                return r.status_code, r.json()
+        except Exception as e:  # OSError / timeouts / aiohttp.ClientError / httpx.HTTPError
+            return 0, {"description": str(e)}
+        return await asyncio.to_thread(self._urllib_post, url, body)
+
+    @staticmethod
+    def _urllib_post(url: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        import urllib.error
+        import urllib.request
+        req = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=TELEGRAM_TIMEOUT_SEC) as r:
+                return r.status, json.loads(r.read() or b"null")
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b"null")
+            except ValueError:
+                return e.code, None
+        except (OSError, ValueError) as e:
+            return 0, {"description": str(e)}
+
+
+def build_digest(messages: List[Message]) -> Tuple[str, int]:
+    """Text for the leading messages that fit one Telegram message; returns (text, count used)."""
+    first = messages[0]["text"]
+    if len(messages) == 1 or len(first) >= MAX_TEXT - 64:
+        return (first if len(first) <= MAX_TEXT else first[:MAX_TEXT - 1] + "\\u2026"), 1
+    parts = [first]
+    size = len(first)
+    for m in messages[1:]:
+        if size + len(DIGEST_SEPARATOR) + len(m["text"]) > MAX_TEXT - 64:
+            break
+        parts.append(m["text"])
+        size += len(DIGEST_SEPARATOR) + len(m["text"])
+    if len(parts) == 1:
+        return first, 1
+    return f"\\U0001F514 {len(parts)} notifications" + "\\n\\n" + DIGEST_SEPARATOR.join(parts), len(parts)
+
+
+class TelegramDispatcher:
+    def __init__(self, base_url: str = TELEGRAM_API_BASE, token: str = TELEGRAM_BOT_TOKEN,
+                 outbox_file: Path = OUTBOX_FILE):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.outbox_file = Path(outbox_file)
+        self._lock = threading.Lock()
+        self._outbox_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._chats: Dict[str, Deque[Message]] = {}
+        self._depth = 0
+        self._in_flight = 0
+        self._active: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stopping: Optional[asyncio.Event] = None
+        self._client: Optional[_BotClient] = None
+        self._global: Optional[TokenBucket] = None
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._offload: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._send_latency = Histogram() if Histogram else None  # submit -> delivered
+        self._api_latency = Histogram() if Histogram else None  # sendMessage round trip
+        self._stats = {
+            "submitted": 0, "delivered": 0, "requests": 0, "digests": 0, "coalesced": 0,
+            "retries": 0, "rateLimited": 0, "dropped": 0, "persisted": 0, "replayed": 0,
+            "expired": 0, "offloaded": 0, "lastError": None,
+        }
+
+    # --------------------------------------------------------
+    # Producer side (any thread, never blocks on I/O)
+    # --------------------------------------------------------
+    def submit(self, chat_id: Any, text: str, parse_mode: Optional[str] = None,
+               token: Optional[str] = None, disable_web_page_preview: Optional[bool] = None) -> bool:
+        """Queue one message; False if it went to the outbox (queue full)."""
+        if chat_id in (None, "") or not text:
+            return False
+        msg = {
+            "id": uuid.uuid4().hex[:12],
+            "chat_id": str(chat_id),
+            "text": str(text),
+            "parse_mode": parse_mode,
+            "token": token if token and token != self.token else None,
+            "preview": disable_web_page_preview,
+            "ts": time.time(),
+            "attempts": 0,
+        }
+        self._stats["submitted"] += 1
+        return self._accept([msg])
+
+    def _accept(self, msgs: List[Message], front: bool = False) -> bool:
+        overflow: List[Message] = []
+        chats = set()
+        with self._lock:
+            for msg in (reversed(msgs) if front else msgs):
+                if not front and self._depth >= TELEGRAM_QUEUE_MAX:
+                    overflow.append(msg)
+                    continue
+                q = self._chats.setdefault(msg["chat_id"], deque())
+                msg["queued"] = time.monotonic()
+                q.appendleft(msg) if front else q.append(msg)
+                self._depth += 1
+                chats.add(msg["chat_id"])
+        if overflow:
+            self._persist(overflow)
+        if chats:
+            self.start()
+            for chat in chats:
+                self._loop.call_soon_threadsafe(self._kick, chat)
+        return not overflow
+
+    def offload(self, fn: Callable, *args, **kwargs) -> None:
+        """Run a send function we cannot map to (chat_id, text) off the scan path."""
+        self.start()
+        self._stats["offloaded"] += 1
+        if inspect.iscoroutinefunction(fn):
+            fut = asyncio.run_coroutine_threadsafe(fn(*args, **kwargs), self._loop)
+        else:
+            fut = self._offload.submit(fn, *args, **kwargs)
+        fut.add_done_callback(functools.partial(self._offload_done, getattr(fn, "__name__", "send")))
+
+    def _offload_done(self, name: str, fut: concurrent.futures.Future) -> None:
+        if not fut.cancelled() and fut.exception() is not None:
+            self._stats["lastError"] = f"{name}: {fut.exception()}"
+            logger.warning(f"telegram: offloaded {name} failed: {fut.exception()}")
+
+    # --------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if not self.token:
+                logger.warning("telegram dispatcher: TELEGRAM_BOT_TOKEN not set - messages go to the outbox")
+            self._ready.clear()
+            self._offload = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="telegram-offload")
+            self._thread = threading.Thread(target=self._run_loop, name="telegram-dispatcher", daemon=True)
+            self._thread.start()
+            self._ready.wait(5)
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._main())
+        finally:
+            loop.close()
+
+    async def _main(self) -> None:
+        self._stopping = asyncio.Event()
+        self._client = _BotClient(TELEGRAM_CONCURRENCY)
+        await self._client.open()
+        self._global = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_BURST)
+        self._sem = asyncio.Semaphore(TELEGRAM_CONCURRENCY)
+        self._ready.set()
+        with self._lock:
+            for chat in self._chats:
+                self._kick(chat)
+        outbox = asyncio.ensure_future(self._outbox_loop())
+        await self._stopping.wait()
+        outbox.cancel()
+        await self._client.close()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Block until every queued message is delivered, dropped or persisted."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._depth and not self._in_flight:
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Deliver what can be sent in `timeout`; persist the rest to the outbox."""
+        if self._thread is None or self._loop is None:
+            return
+        self.flush(timeout)
+        with self._lock:
+            rest = [m for q in self._chats.values() for m in q]
+            self._chats.clear()
+            self._depth = 0
+        self._persist(rest)
+        if self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+        if self._offload is not None:
+            self._offload.shutdown(wait=False)
+
+    # --------------------------------------------------------
+    # Delivery
+    # --------------------------------------------------------
+    def _kick(self, chat_id: str) -> None:
+        if chat_id not in self._active:
+            self._active.add(chat_id)
+            asyncio.ensure_future(self._chat_worker(chat_id))
+
+    async def _chat_worker(self, chat_id: str) -> None:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(TELEGRAM_CHAT_RATE, 1)
+        try:
+            while True:
+                with self._lock:
+                    q = self._chats.get(chat_id)
+                    if not q:
+                        self._chats.pop(chat_id, None)
+                        return
+                    first_queued = q[0]["queued"]
+                # Let a burst accumulate into one digest
+                wait = first_queued + TELEGRAM_DIGEST_WINDOW_SEC - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await bucket.acquire()
+                with self._lock:
+                    q = self._chats.get(chat_id) or deque()
+                    head = q[0] if q else None
+                    batch: List[Message] = []
+                    while q and len(batch) < TELEGRAM_DIGEST_MAX and \\
+                            (q[0]["parse_mode"], q[0]["token"]) == (head["parse_mode"], head["token"]):
+                        batch.append(q.popleft())
+                    self._depth -= len(batch)
+                    self._in_flight += len(batch)
+                if not batch:
+                    continue
+                text, used = build_digest(batch)
+                try:
+                    await self._deliver(chat_id, bucket, batch[:used], text)
+                finally:
+                    with self._lock:
+                        self._in_flight -= len(batch)
+                if used < len(batch):
+                    self._accept(batch[used:], front=True)
+        finally:
+            self._active.discard(chat_id)
+
+    async def _deliver(self, chat_id: str, bucket: TokenBucket, batch: List[Message], text: str) -> None:
+        now = time.time()
+        live = [m for m in batch if now - m["ts"] <= TELEGRAM_MAX_AGE_SEC]
+        self._stats["expired"] += len(batch) - len(live)
+        if not live:
+            return
+        if len(live) < len(batch):
+            text, _ = build_digest(live)
+        token = live[0]["token"] or self.token
+        if not token or not self.base_url:
+            self._persist(live)
+            return
+        body: Dict[str, Any] = {"chat_id": chat_id, "text": text}
+        if live[0]["parse_mode"]:
+            body["parse_mode"] = live[0]["parse_mode"]
+        if live[0].get("preview") is not None:
+            body["disable_web_page_preview"] = live[0]["preview"]
+        await self._global.acquire()
+        async with self._sem:
+            t0 = time.perf_counter()
+            status, resp = await self._client.post_json(f"{self.base_url}/bot{token}/sendMessage", body)
+            if self._api_latency is not None:
+                self._api_latency.observe((time.perf_counter() - t0) * 1000)
+        self._stats["requests"] += 1
+        resp = resp if isinstance(resp, dict) else {}
+
+        if 200 <= status < 300 and resp.get("ok", True):
+            done = time.time()
+            self._stats["delivered"] += len(live)
+            if len(live) > 1:
+                self._stats["digests"] += 1
+                self._stats["coalesced"] += len(live) - 1
+            if self._send_latency is not None:
+                for m in live:
+                    self._send_latency.observe((done - m["ts"]) * 1000)
+            return
+
+        desc = resp.get("description") or f"HTTP {status}"
+        self._stats["lastError"] = f"{status}: {desc}"
+        if status == 429:
+            retry_after = float((resp.get("parameters") or {}).get("retry_after") or 1)
+            self._stats["rateLimited"] += 1
+            bucket.pause(retry_after)
+            self._accept(live, front=True)
+            return
+        if status == 0 or status >= 500:
+            for m in live:
+                m["attempts"] += 1
+            retry = [m for m in live if m["attempts"] <= TELEGRAM_MAX_RETRIES]
+            self._persist([m for m in live if m["attempts"] > TELEGRAM_MAX_RETRIES])
+            if retry:
+                self._stats["retries"] += 1
+                bucket.pause(TELEGRAM_BACKOFF_SEC * 2 ** (retry[0]["attempts"] - 1))
+                self._accept(retry, front=True)
+            return
+        # 400 chat not found / 403 bot blocked / 401 bad token: retrying will not help
+        self._stats["dropped"] += len(live)
+        logger.warning(f"telegram: chat {chat_id} dropped {len(live)} message(s): {desc}")
+
+    # --------------------------------------------------------
+    # Outbox (persisted retry)
+    # --------------------------------------------------------
+    def _persist(self, msgs: List[Message]) -> None:
+        if not msgs:
+            return
+        with self._outbox_lock:
+            self.outbox_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.outbox_file, "a", encoding="utf-8") as f:
+                for m in msgs:
+                    f.write(json.dumps({k: v for k, v in m.items() if k != "queued"}) + "\\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self._stats["persisted"] += len(msgs)
+
+    def replay_outbox(self) -> int:
+        """Requeue persisted messages (attempts reset); stale ones are dropped."""
+        replaying = self.outbox_file.with_suffix(".replaying")
+        with self._outbox_lock:
+            if not replaying.exists():
+                if not self.outbox_file.exists():
+                    return 0
+                os.replace(self.outbox_file, replaying)
+            lines = replaying.read_text(encoding="utf-8").splitlines()
+            replaying.unlink()
+        now = time.time()
+        msgs = []
+        for line in lines:
+            try:
+                m = json.loads(line)
+            except ValueError:
+                continue
+            if now - m.get("ts", 0) > TELEGRAM_MAX_AGE_SEC:
+                self._stats["expired"] += 1
+                continue
+            m["attempts"] = 0
+            msgs.append(m)
+        if msgs:
+            self._stats["replayed"] += len(msgs)
+            self._accept(msgs)
+            logger.info(f"telegram: replayed {len(msgs)} message(s) from the outbox")
+        return len(msgs)
+
+    async def _outbox_loop(self) -> None:
+        while True:
+            if self.token and self.base_url:
+                try:
+                    await asyncio.to_thread(self.replay_outbox)
+                except Exception as e:
+                    logger.warning(f"telegram outbox replay failed: {e}")
+            await asyncio.sleep(TELEGRAM_OUTBOX_RETRY_SEC)
+
+    # --------------------------------------------------------
+    # Metrics
+    # --------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            depths = [len(q) for q in self._chats.values()]
+            in_flight = self._in_flight
+        outbox = 0
+        if self.outbox_file.exists():
+            with open(self.outbox_file, "rb") as f:
+                outbox = sum(1 for _ in f)
+        return {
+            **self._stats,
+            "queueDepth": sum(depths),
+            "chatsQueued": len(depths),
+            "maxChatDepth": max(depths, default=0),
+            "inFlight": in_flight,
+            "outbox": outbox,
+            "sendLatencyMs": self._send_latency.summary() if self._send_latency else None,
+            "apiLatencyMs": self._api_latency.summary() if self._api_latency else None,
+            "http": self._client.kind if self._client else None,
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+_dispatcher: Optional[TelegramDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_telegram_dispatcher() -> TelegramDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = TelegramDispatcher()
+                atexit.register(_dispatcher.stop)
+    return _dispatcher
+
+
+_ARG_NAMES = {
+    "chat_id": ("chat_id", "telegram_chat_id", "chat", "chatId"),
+    "text": ("text", "message", "msg", "body", "content"),
+    "parse_mode": ("parse_mode", "parseMode"),
+    "token": ("token", "bot_token"),
+}
+
+
+def attach_sender(ns: Dict[str, Any], name: str) -> None:
+    """Make a Telegram send function enqueue (chat_id, text) or, failing that, run off-thread."""
+    original = ns.get(name)
+    if original is None or getattr(original, "_telegram_dispatch", False):
+        return
+    sig = inspect.signature(original)
+    params = set(sig.parameters)
+    mappable = any(a in params for a in _ARG_NAMES["chat_id"]) and any(a in params for a in _ARG_NAMES["text"])
+
+    def dispatch(args, kwargs) -> bool:
+        d = get_telegram_dispatcher()
+        if mappable:
+            try:
+                bound = sig.bind(*args, **kwargs)
+                bound.apply_defaults()
+                got = {k: next((bound.arguments[a] for a in names if a in bound.arguments), None)
+                       for k, names in _ARG_NAMES.items()}
+                if got["chat_id"] not in (None, "") and isinstance(got["text"], str):
+                    d.submit(got["chat_id"], got["text"], parse_mode=got["parse_mode"], token=got["token"])
+                    return True
+            except TypeError:
+                pass
+        d.offload(original, *args, **kwargs)
+        return True
+
+    if inspect.iscoroutinefunction(original):
+        @functools.wraps(original)
+        async def send(*args, **kwargs):
+            if os.getenv("TELEGRAM_DISPATCHER", "1") == "0":
+                return await original(*args, **kwargs)
+            return dispatch(args, kwargs)
+    else:
+        @functools.wraps(original)
+        def send(*args, **kwargs):
+            if os.getenv("TELEGRAM_DISPATCHER", "1") == "0":
+                return original(*args, **kwargs)
+            return dispatch(args, kwargs)
+
+    send._telegram_dispatch = True
+    ns[name] = send
+'''
+
+DISPATCHER.write_text(dispatcher_code, encoding="utf-8")
+print(f"Created: {DISPATCHER}")
+
+# ============================================================
+# 2. Telegram send functions -> dispatcher
+# ============================================================
+
+NAME_RE = re.compile(r"^(?:async\s+)?def ((?:_?send|_?notify|_?dispatch)_\w*telegram\w*|telegram_\w*send\w*)\(", re.M)
+DEF_RE = re.compile(r"^(?:async\s+)?def\s+(\w+)\(", re.M)
+senders = {}
+for path, text in py_files():
+    names = [m.group(1) for m in NAME_RE.finditer(text)]
+    for u in re.finditer(r"sendMessage", text):
+        defs = list(DEF_RE.finditer(text, 0, u.start()))
+        if defs and defs[-1].group(1) not in names:
+            names.append(defs[-1].group(1))
+    if names:
+        senders[path] = (text, names)
+
+if not senders:
+    print("WARNING: no telegram send function found - call core.telegram_dispatcher.get_telegram_dispatcher().submit()")
+for path, (text, names) in senders.items():
+    if "attach_sender(" in text:
+        print(f"SKIP: {path.name} already dispatches through the queue")
+        continue
+    hook = "\n".join(f'    attach_sender(globals(), "{n}")' for n in names)
+    text = text.rstrip("\n") + f'''
+
+
+# Telegram fan-out through the async dispatcher (patch_telegram_dispatcher.py)
+try:
+    from core.telegram_dispatcher import attach_sender
+{hook}
+except Exception as _e:
+    import logging as _logging
+    _logging.getLogger(__name__).warning(f"telegram dispatcher disabled: {{_e}}")
+'''
+    path.write_text(text, encoding="utf-8")
+    print(f"{path.name}: {', '.join(names)} -> telegram dispatcher")
+
+# ============================================================
+# 3. /api/metrics: telegram section
+# ============================================================
+
+def find_route(txt, method, path):
+    """Match of '@obj.method("path")' + handler def: groups (decorator, obj, def, name, params)."""
+    return re.compile(
+        r'(@(\w+)\.' + method + r'\(\s*"' + re.escape(path) + r'"[^\n]*\)\n)'
+        r'((?:async\s+)?def\s+(\w+)\(([^)]*)\))'
+    ).search(txt)
+
+def detach(txt, m):
+    """Drop the route decorator (handler stays as a plain function); returns (txt, end of handler)."""
+    txt = txt[:m.start()] + m.group(3) + txt[m.end():]
+    nxt = re.compile(r"\n(?=[^\s#])").search(txt, m.start() + len(m.group(3)))
+    return txt, (nxt.end() if nxt else len(txt))
+
+ROUTE_FILE = None
+for path, text in py_files():
+    if find_route(text, "get", "/api/metrics"):
+        ROUTE_FILE = path
+        break
+if ROUTE_FILE is None:
+    ROUTE_FILE = ROOT / "api_server.py"
+    print(f"WARNING: /api/metrics route not found - adding it to {ROUTE_FILE.name}")
+
+txt = ROUTE_FILE.read_text(encoding="utf-8")
+if "get_telegram_dispatcher" in txt:
+    print("SKIP: /api/metrics already reports the telegram dispatcher")
+else:
+    m = find_route(txt, "get", "/api/metrics")
+    if m is not None and not m.group(5).strip():
+        dec, legacy = m.group(1), m.group(4)
+        txt, end = detach(txt, m)
+        txt = txt[:end] + dec + f'''async def metrics_dispatch():
+    """Metrics plus the Telegram dispatcher (queue depth, send latency, counters)."""
+    import inspect
+    from core.telegram_dispatcher import get_telegram_dispatcher
+    res = {legacy}()
+    res = await res if inspect.isawaitable(res) else res
+    if isinstance(res, dict):
+        res = {{**res, "telegram": get_telegram_dispatcher().metrics()}}
+    return res
+
+
+''' + txt[end:]
+        print(f"/api/metrics -> + telegram ({legacy})")
+    else:
+        if m is not None:
+            print("WARNING: /api/metrics takes parameters - left as is, dispatcher at /api/metrics/telegram")
+            path, dec = "/api/metrics/telegram", m.group(1).replace('"/api/metrics"', '"/api/metrics/telegram"')
+        else:
+            app = re.search(r"^(\w+)\s*=\s*FastAPI\(", txt, re.M)
+            path, dec = "/api/metrics", f'@{app.group(1) if app else "app"}.get("/api/metrics")\n'
+        txt = txt.rstrip("\n") + "\n\n\n" + dec + '''def metrics_telegram():
+    from core.telegram_dispatcher import get_telegram_dispatcher
+    return {"ok": True, "telegram": get_telegram_dispatcher().metrics()}
+'''
+        print(f"Added {path}")
+    ROUTE_FILE.write_text(txt, encoding="utf-8")
+    print(f"Patched: {ROUTE_FILE}")
+
+print()
+print("=" * 60)
+print("TELEGRAM DISPATCHER PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {DISPATCHER} (new)")
+for path in senders:
+    print(f"  - {path}")
+print(f"  - {ROUTE_FILE}")
+print()
+print("Next: Rebuild container; after a cycle with setups check /api/metrics telegram")
+print("      (queueDepth, sendLatencyMs, digests) and scanStages telegram in /api/metrics/detailed")
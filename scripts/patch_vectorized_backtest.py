@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+Vectorized walk-forward backtest behind /api/backtest/simulate
+
+1. Create core/backtest_vectorized.py: detectors run once over the whole
+   candle array, each hit taken at the bar it is confirmed on (walk-forward
+   check), SL/TP outcomes resolved with a vectorized first-touch search over
+   future highs/lows (no bar-by-bar Python loop)
+2. api_server.py: /api/backtest/simulate dispatches on payload "engine":
+     legacy (default, env BACKTEST_ENGINE) | vectorized | parity
+   parity runs both engines and returns the legacy response plus a diff.
+   Response schema (tradeCount, rootCause, explain, simVersion) is unchanged.
+
+Requires patch_candle_frame.py and patch_feature_store.py (ATR for SL/TP
+when a detector hit carries no levels).
+"""
+from pathlib import Path
+from datetime import datetime
+import re
+
+ROOT = Path("/opt/JKM-AI-BOT")
+BACKTEST = ROOT / "core" / "backtest_vectorized.py"
+SCAN = ROOT / "core" / "scan_engine_v2.py"
+API = ROOT / "api_server.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not (ROOT / "core" / "feature_store.py").exists():
+    die("Missing core/feature_store.py - run patch_feature_store.py first")
+
+# Detector runner used by the scanner: hits = <fn>(candles, detectors)
+runner = "core.scan_engine_v2:_run_detectors"
+if SCAN.exists():
+    m = re.search(r"hits = (\w+)\(candles, self\._config\.detectors\)", SCAN.read_text(encoding="utf-8"))
+    if m:
+        runner = f"core.scan_engine_v2:{m.group(1)}"
+        print(f"Detector runner: {runner}")
+    else:
+        print(f"WARNING: scanner detector call not found - defaulting to {runner} (override BACKTEST_DETECTOR_RUNNER)")
+
+# ============================================================
+# 1. Create backtest_vectorized.py
+# ============================================================
+
+backtest_code = '''"""
+backtest_vectorized.py
+----------------------
+Vectorized backtest for /api/backtest/simulate.
+
+The legacy simulator walks the candles bar by bar, re-running detectors and
+checking open trades in Python. Here detectors run once over the full array;
+every hit becomes a signal at its confirmation bar and all SL/TP outcomes
+are resolved together: for each signal the first future bar whose high/low
+crosses SL or TP is found with array comparisons over chunks of future bars.
+
+A full-array run lets a detector use bars after the one it reports. A hit
+with confirm_idx is taken at that bar; any other hit at bar i is kept only if
+the detector reports it again when run on candles[:i + 1], i.e. what the
+bar-by-bar scan would have seen at i (BACKTEST_WALK_FORWARD=0 trusts idx).
+
+Signal levels come from the hit (entry/sl/tp) when present, otherwise
+entry = close, risk = ATR * SL_ATR_MULT, TP at max(min_rr, DEFAULT_RR) * risk.
+One trade at a time: signals firing while a trade is open are skipped.
+Both engines can be compared with engine="parity".
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.candle_frame import CandleFrame, ts_to_iso
+
+logger = logging.getLogger(__name__)
+
+ENGINE_VERSION = "vec-1"
+DETECTOR_RUNNER = os.getenv("BACKTEST_DETECTOR_RUNNER", "__RUNNER__")
+SL_ATR_MULT = float(os.getenv("BACKTEST_SL_ATR_MULT", "1.5"))
+DEFAULT_RR = float(os.getenv("BACKTEST_DEFAULT_RR", "2.0"))
+DEFAULT_MAX_BARS = int(os.getenv("BACKTEST_MAX_BARS_IN_TRADE", "200"))
+BACKTEST_WALK_FORWARD = os.getenv("BACKTEST_WALK_FORWARD", "1") != "0"
+TOUCH_CHUNK = 256
+
+OUTCOME_OPEN, OUTCOME_TP, OUTCOME_SL, OUTCOME_TIMEOUT = 0, 1, -1, 2
+OUTCOME_NAMES = {OUTCOME_OPEN: "OPEN", OUTCOME_TP: "TP", OUTCOME_SL: "SL", OUTCOME_TIMEOUT: "TIMEOUT"}
+
+_LONG = {"long", "buy", "bull", "bullish", "up", "1"}
+_SHORT = {"short", "sell", "bear", "bearish", "down", "-1"}
+
+
+def get_detector_runner() -> Callable[[List[Dict[str, Any]], List[str]], Dict[str, List[Dict[str, Any]]]]:
+    module, _, attr = DETECTOR_RUNNER.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+# ============================================================
+# First-touch search
+# ============================================================
+
+def first_touch(
+    high: np.ndarray,
+    low: np.ndarray,
+    entry_idx: np.ndarray,
+    sl: np.ndarray,
+    tp: np.ndarray,
+    is_long: np.ndarray,
+    max_bars: int = DEFAULT_MAX_BARS,
+    intrabar_policy: str = "sl_first",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For each signal, the first bar after entry_idx where SL or TP is touched.
+
+    Returns (exit_idx, outcome). A bar touching both levels resolves by
+    intrabar_policy. No touch within max_bars -> TIMEOUT at entry + max_bars;
+    data ends first -> OPEN at the last bar.
+    """
+    n = len(high)
+    m = len(entry_idx)
+    exit_idx = np.full(m, n - 1, dtype=np.int64)
+    outcome = np.full(m, OUTCOME_OPEN, dtype=np.int8)
+    tp_first = intrabar_policy.lower() == "tp_first"
+
+    pending = np.arange(m)
+    offset = 1
+    while pending.size and offset <= max_bars:
+        span = min(TOUCH_CHUNK, max_bars - offset + 1)
+        rows = entry_idx[pending, None] + offset + np.arange(span)[None, :]
+        valid = rows < n
+        rows = np.minimum(rows, n - 1)
+        h, l = high[rows], low[rows]
+        lng = is_long[pending, None]
+        s, t = sl[pending, None], tp[pending, None]
+        sl_hit = np.where(lng, l <= s, h >= s) & valid
+        tp_hit = np.where(lng, h >= t, l <= t) & valid
+
+        first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), span)
+        first_tp = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), span)
+        hit = (first_sl < span) | (first_tp < span)
+        sl_wins = (first_sl < first_tp) | ((first_sl == first_tp) & ~tp_first)
+
+        done = pending[hit]
+        exit_idx[done] = entry_idx[done] + offset + np.minimum(first_sl, first_tp)[hit]
+        outcome[done] = np.where(sl_wins[hit], OUTCOME_SL, OUTCOME_TP)
+
+        # Out of data: stays OPEN at the last bar
+        exhausted = ~valid[:, -1]
+        pending = pending[~hit & ~exhausted]
+        offset += span
+
+    if pending.size:
+        ends = entry_idx[pending] + max_bars
+        timed = ends < n
+        exit_idx[pending[timed]] = ends[timed]
+        outcome[pending[timed]] = OUTCOME_TIMEOUT
+    return exit_idx, outcome
+
+
+# ============================================================
+# Signals
+# ============================================================
+
+def _direction(hit: Dict[str, Any]) -> Optional[bool]:
+    for key in ("direction", "side", "dir", "bias"):
+        v = hit.get(key)
+        if v is not None:
+            v = str(v).strip().lower()
+            if v in _LONG:
+                return True
+            if v in _SHORT:
+                return False
+    return None
+
+
+def _first(hit: Dict[str, Any], keys: Tuple[str, ...]) -> Optional[float]:
+    for k in keys:
+        v = hit.get(k)
+        if v is not None:
+            try:
+                return float(v)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+_IDX_KEYS = ("idx", "index", "bar", "i")
+
+
+def walk_forward_hits(
+    candles: List[Dict[str, Any]],
+    hits: Dict[str, List[Dict[str, Any]]],
+    run_detectors: Callable,
+) -> Tuple[Dict[str, List[Dict[str, Any]]], int]:
+    """
+    Hits as the bar-by-bar scan would have seen them, each with confirm_idx.
+    Hits without confirm_idx are re-checked on the candles up to their bar
+    (one runner call per distinct bar); those not reported there are dropped.
+    Returns (hits, dropped).
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    pending: Dict[int, List[Tuple[str, Dict[str, Any]]]] = {}
+    for det, det_hits in hits.items():
+        kept = out.setdefault(det, [])
+        for h in det_hits or []:
+            idx = _first(h, _IDX_KEYS)
+            confirm = _first(h, ("confirm_idx",))
+            if confirm is not None:
+                kept.append(dict(h, confirm_idx=int(max(confirm, idx if idx is not None else confirm))))
+            elif idx is None or not BACKTEST_WALK_FORWARD:
+                kept.append(h)
+            else:
+                pending.setdefault(int(idx), []).append((det, h))
+    dropped = 0
+    for i, items in sorted(pending.items()):
+        seen = run_detectors(candles[:i + 1], list(dict.fromkeys(d for d, _ in items))) or {}
+        for det, h in items:
+            is_long = _direction(h)
+            if any(_first(p, _IDX_KEYS) == i and _direction(p) == is_long for p in seen.get(det) or []):
+                out[det].append(dict(h, confirm_idx=i))
+            else:
+                dropped += 1
+    return out, dropped
+
+
+def build_signals(
+    frame: CandleFrame,
+    hits: Dict[str, List[Dict[str, Any]]],
+    min_rr: float,
+    atr: np.ndarray,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+    """Detector hits -> signal arrays (one per bar and direction). Also returns skip counts."""
+    n = len(frame)
+    skipped = {"noDirection": 0, "noLevels": 0, "rrFiltered": 0, "duplicate": 0, "lastBar": 0}
+    rows: Dict[Tuple[int, bool], tuple] = {}
+    for det, det_hits in hits.items():
+        for h in det_hits or []:
+            idx = _first(h, ("confirm_idx", "idx", "index", "bar", "i"))
+            if idx is None:
+                continue
+            idx = int(idx)
+            if idx < 0 or idx >= n - 1:
+                skipped["lastBar"] += 1
+                continue
+            is_long = _direction(h)
+            if is_long is None:
+                skipped["noDirection"] += 1
+                continue
+            entry = _first(h, ("entry", "entry_price", "price"))
+            entry = float(frame.close[idx]) if entry is None else entry
+            sl = _first(h, ("sl", "stop", "stop_loss"))
+            tp = _first(h, ("tp", "take_profit", "target"))
+            sign = 1.0 if is_long else -1.0
+            if sl is None:
+                if not np.isfinite(atr[idx]) or atr[idx] <= 0:
+                    skipped["noLevels"] += 1
+                    continue
+                sl = entry - sign * atr[idx] * SL_ATR_MULT
+            risk = abs(entry - sl)
+            if risk <= 0:
+                skipped["noLevels"] += 1
+                continue
+            if tp is None:
+                tp = entry + sign * risk * max(min_rr, DEFAULT_RR)
+            rr = abs(tp - entry) / risk
+            if min_rr and rr < min_rr:
+                skipped["rrFiltered"] += 1
+                continue
+            key = (idx, is_long)
+            if key in rows:
+                skipped["duplicate"] += 1
+                continue
+            rows[key] = (idx, is_long, entry, sl, tp, rr, det)
+
+    ordered = [rows[k] for k in sorted(rows)]
+    sig = {
+        "idx": np.array([r[0] for r in ordered], dtype=np.int64),
+        "is_long": np.array([r[1] for r in ordered], dtype=bool),
+        "entry": np.array([r[2] for r in ordered], dtype=float),
+        "sl": np.array([r[3] for r in ordered], dtype=float),
+        "tp": np.array([r[4] for r in ordered], dtype=float),
+        "rr": np.array([r[5] for r in ordered], dtype=float),
+        "detector": np.array([r[6] for r in ordered], dtype=object),
+    }
+    return sig, skipped
+
+
+def _one_at_a_time(entry_idx: np.ndarray, exit_idx: np.ndarray) -> np.ndarray:
+    """Keep a signal only if no earlier taken trade is still open at its bar."""
+    keep = np.zeros(len(entry_idx), dtype=bool)
+    busy_until = -1
+    for i in range(len(entry_idx)):
+        if entry_idx[i] > busy_until:
+            keep[i] = True
+            busy_until = exit_idx[i]
+    return keep
+
+
+# ============================================================
+# Backtest
+# ============================================================
+
+def run_backtest(
+    frame: CandleFrame,
+    detectors: List[str],
+    run_detectors: Optional[Callable] = None,
+    min_rr: float = 0.0,
+    max_bars: int = DEFAULT_MAX_BARS,
+    intrabar_policy: str = "sl_first",
+) -> Dict[str, Any]:
+    """Backtest detectors over frame. Returns trades, summary, rootCause and explain."""
+    from core.feature_store import compute_features
+
+    t0 = time.perf_counter()
+    explain: Dict[str, Any] = {"engine": ENGINE_VERSION, "barsScanned": len(frame), "detectors": list(detectors)}
+    if not len(frame):
+        explain.update(rootCause="MARKETDATA_NO_CANDLES", explanation="No candles in range")
+        return {"trades": [], "summary": _summary([]), "rootCause": "MARKETDATA_NO_CANDLES", "explain": explain}
+
+    run_detectors = run_detectors or get_detector_runner()
+    candles = frame.to_dicts()
+    hits, unconfirmed = walk_forward_hits(candles, run_detectors(candles, list(detectors)) or {}, run_detectors)
+    t_detect = time.perf_counter()
+    explain["hitsPerDetector"] = {d: len(h or []) for d, h in hits.items()}
+
+    feats = compute_features(frame.ts, frame.open, frame.high, frame.low, frame.close)
+    sig, skipped = build_signals(frame, hits, min_rr, feats["atr14"])
+    skipped["unconfirmed"] = unconfirmed
+    explain["signals"] = int(len(sig["idx"]))
+    explain["skipped"] = skipped
+
+    if not len(sig["idx"]):
+        if skipped["rrFiltered"]:
+            cause, text = "RR_FILTERED_ALL", "All setups filtered by RR requirement"
+        else:
+            cause, text = "NO_TRIGGER_HITS", "No trigger detectors fired on the tested range"
+        explain.update(rootCause=cause, explanation=text, timingsMs={"detect": round((t_detect - t0) * 1000, 1)})
+        return {"trades": [], "summary": _summary([]), "rootCause": cause, "explain": explain}
+
+    exit_idx, outcome = first_touch(
+        frame.high, frame.low, sig["idx"], sig["sl"], sig["tp"], sig["is_long"], max_bars, intrabar_policy,
+    )
+    keep = _one_at_a_time(sig["idx"], exit_idx)
+    explain["skipped"]["overlapping"] = int((~keep).sum())
+    t_resolve = time.perf_counter()
+
+    sign = np.where(sig["is_long"], 1.0, -1.0)
+    risk = np.abs(sig["entry"] - sig["sl"])
+    exit_price = np.where(outcome == OUTCOME_TP, sig["tp"],
+                          np.where(outcome == OUTCOME_SL, sig["sl"], frame.close[exit_idx]))
+    r_mult = sign * (exit_price - sig["entry"]) / risk
+
+    trades = []
+    for i in np.flatnonzero(keep):
+        trades.append({
+            "detector": str(sig["detector"][i]),
+            "direction": "BUY" if sig["is_long"][i] else "SELL",
+            "entry_ts": ts_to_iso(frame.ts[sig["idx"][i]]),
+            "exit_ts": ts_to_iso(frame.ts[exit_idx[i]]),
+            "entry": round(float(sig["entry"][i]), 6),
+            "sl": round(float(sig["sl"][i]), 6),
+            "tp": round(float(sig["tp"][i]), 6),
+            "rr": round(float(sig["rr"][i]), 3),
+            "outcome": OUTCOME_NAMES[int(outcome[i])],
+            "r_multiple": round(float(r_mult[i]), 3),
+            "bars_held": int(exit_idx[i] - sig["idx"][i]),
+        })
+
+    explain.update(
+        rootCause="OK",
+        explanation=f"{len(trades)} trades from {explain['signals']} signals",
+        timingsMs={
+            "detect": round((t_detect - t0) * 1000, 1),
+            "resolve": round((t_resolve - t_detect) * 1000, 1),
+            "total": round((time.perf_counter() - t0) * 1000, 1),
+        },
+    )
+    return {"trades": trades, "summary": _summary(trades), "rootCause": "OK", "explain": explain}
+
+
+def _summary(trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+    closed = [t for t in trades if t["outcome"] in ("TP", "SL", "TIMEOUT")]
+    wins = [t for t in closed if t["r_multiple"] > 0]
+    gross_win = sum(t["r_multiple"] for t in wins)
+    gross_loss = -sum(t["r_multiple"] for t in closed if t["r_multiple"] < 0)
+    return {
+        "trades": len(trades),
+        "closed": len(closed),
+        "wins": len(wins),
+        "losses": len(closed) - len(wins),
+        "winRate": round(100.0 * len(wins) / len(closed), 2) if closed else 0.0,
+        "totalR": round(sum(t["r_multiple"] for t in closed), 3),
+        "profitFactor": round(gross_win / gross_loss, 3) if gross_loss else None,
+    }
+
+
+# ============================================================
+# Endpoint helpers
+# ============================================================
+
+def _range(payload: Dict[str, Any]) -> Tuple[datetime, datetime]:
+    def parse(v):
+        dt = datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+    to_dt = parse(payload["to"]) if payload.get("to") else datetime.now(timezone.utc)
+    if payload.get("from"):
+        from_dt = parse(payload["from"])
+    else:
+        from_dt = to_dt - timedelta(days=int(payload.get("days") or 7))
+    return from_dt, to_dt
+
+
+def simulate(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """/api/backtest/simulate response computed by the vectorized engine."""
+    from core.scan_engine_v2 import bridge_get_candle_frame
+    try:
+        from core.version import SIM_VERSION
+    except Exception:
+        SIM_VERSION = "unknown"
+
+    symbol = str(payload.get("symbol", "")).upper()
+    tf = str(payload.get("timeframe") or payload.get("tf") or "1h").lower()
+    detectors = [str(d) for d in payload.get("detectors") or []]
+    from_dt, to_dt = _range(payload)
+    frame = bridge_get_candle_frame(symbol, from_dt, to_dt, tf)
+    if frame is None:
+        frame = CandleFrame.from_dicts([])
+
+    res = run_backtest(
+        frame,
+        detectors,
+        min_rr=float(payload.get("min_rr") or 0.0),
+        max_bars=int(payload.get("max_bars_in_trade") or DEFAULT_MAX_BARS),
+        intrabar_policy=str(payload.get("intrabar_policy") or "sl_first"),
+    )
+    return {
+        "ok": True,
+        "simVersion": SIM_VERSION,
+        "engine": "vectorized",
+        "symbol": symbol,
+        "timeframe": tf,
+        "from": from_dt.isoformat(),
+        "to": to_dt.isoformat(),
+        "tradeCount": len(res["trades"]),
+        "rootCause": res["rootCause"],
+        "explain": res["explain"],
+        "summary": res["summary"],
+        "trades": res["trades"],
+    }
+
+
+def _trade_key(t: Dict[str, Any]) -> Tuple[str, str]:
+    ts = t.get("entry_ts") or t.get("entryTime") or t.get("entry_time") or t.get("ts") or ""
+    side = str(t.get("direction") or t.get("side") or "").upper()
+    side = "BUY" if side.lower() in _LONG else "SELL" if side.lower() in _SHORT else side
+    return str(ts)[:19], side
+
+
+def parity_diff(legacy: Dict[str, Any], vectorized: Dict[str, Any], max_items: int = 20) -> Dict[str, Any]:
+    """Compare legacy and vectorized responses (trade count, root cause, per-trade outcome)."""
+    lt = {_trade_key(t): t for t in legacy.get("trades") or []}
+    vt = {_trade_key(t): t for t in vectorized.get("trades") or []}
+    outcome_mismatch = []
+    for key in sorted(set(lt) & set(vt)):
+        lo = str(lt[key].get("outcome") or lt[key].get("result") or "").upper()
+        vo = vt[key]["outcome"]
+        if lo and lo != vo:
+            outcome_mismatch.append({"entry_ts": key[0], "direction": key[1], "legacy": lo, "vectorized": vo})
+    only_legacy = sorted(set(lt) - set(vt))
+    only_vec = sorted(set(vt) - set(lt))
+    return {
+        "match": (legacy.get("tradeCount") == vectorized.get("tradeCount")
+                  and legacy.get("rootCause") == vectorized.get("rootCause")
+                  and not only_legacy and not only_vec and not outcome_mismatch),
+        "tradeCount": {"legacy": legacy.get("tradeCount"), "vectorized": vectorized.get("tradeCount")},
+        "rootCause": {"legacy": legacy.get("rootCause"), "vectorized": vectorized.get("rootCause")},
+        "onlyLegacy": [{"entry_ts": k[0], "direction": k[1]} for k in only_legacy[:max_items]],
+        "onlyVectorized": [{"entry_ts": k[0], "direction": k[1]} for k in only_vec[:max_items]],
+        "outcomeMismatch": outcome_mismatch[:max_items],
+    }
+'''.replace("__RUNNER__", runner)
+
+BACKTEST.write_text(backtest_code, encoding="utf-8")
+print(f"Created: {BACKTEST}")
+
+# ============================================================
+# 2. api_server.py: engine dispatch on /api/backtest/simulate
+# ============================================================
+
+def def_params(txt, open_at):
+    """[(name, annotation, text)] of the def whose "(" is at open_at (nested parens/defaults ok)."""
+    depth, buf, out, quote = 0, "", [], None
+    for i in range(open_at, len(txt)):
+        c = txt[i]
+        if quote:
+            quote = None if c == quote and txt[i - 1] != "\\" else quote
+        elif c in "\"'":
+            quote = c
+        elif c in "([{":
+            depth += 1
+            if depth == 1:
+                continue
+        elif c in ")]}":
+            depth -= 1
+            if depth == 0:
+                break
+        elif c == "," and depth == 1:
+            out.append(buf)
+            buf = ""
+            continue
+        buf += c
+    out.append(buf)
+    texts = [" ".join(t.split()) for t in out if t.strip()]
+    return [(t.split(":")[0].split("=")[0].strip(), t.split(":", 1)[1].split("=")[0].strip() if ":" in t else "", t)
+            for t in texts]
+
+
+if not API.exists():
+    die(f"Missing {API}")
+
+api_txt = API.read_text(encoding="utf-8")
+
+if "backtest_simulate_dispatch" in api_txt:
+    print("SKIP: /api/backtest/simulate dispatch already present")
+else:
+    route = re.compile(r'(@app\.post\(\s*"/api/backtest/simulate"[^\n]*\)\n)((?:async\s+)?def\s+(\w+)\()')
+    m = route.search(api_txt)
+    if not m:
+        die("@app.post(\"/api/backtest/simulate\") handler not found in api_server.py")
+    decorator, legacy_name = m.group(1), m.group(3)
+    params = def_params(api_txt, m.end() - 1)
+    # The dispatcher declares the legacy parameters verbatim, so FastAPI still
+    # validates the request model and runs the dependencies before dispatching
+    sig = ", ".join(text for _, _, text in params)
+    names = [n for n, _, _ in params if not n.startswith("*")]
+    req_name = next((n for n, ann, _ in params if ann == "Request"), None)
+    if req_name is None:
+        req_name = "request"
+        sig = "request: Request" + (", " + sig if sig else "")
+    first = names[0] if names else "None"
+
+    dispatch = decorator + f'''async def backtest_simulate_dispatch({sig}):
+    """
+    Backtest simulate; "engine" (body or ?engine=): legacy (default) | vectorized | parity.
+    parity returns the legacy response with a "parity" diff against the vectorized
+    engine - check parity.match before setting BACKTEST_ENGINE=vectorized.
+    """
+    import asyncio
+    payload = await _backtest_payload({req_name}, {first})
+    engine = str({req_name}.query_params.get("engine") or payload.get("engine")
+                 or os.getenv("BACKTEST_ENGINE", "legacy")).lower()
+    # Strategy-only requests need the legacy strategy lookup
+    if engine == "vectorized" and not payload.get("detectors"):
+        engine = "legacy"
+    if engine == "vectorized":
+        from core.backtest_vectorized import simulate
+        return await asyncio.to_thread(simulate, payload)
+
+    legacy = await _call_legacy_backtest({legacy_name}, {{{", ".join(f'"{n}": {n}' for n in names)}}})
+    if engine == "parity" and isinstance(legacy, dict):
+        from core.backtest_vectorized import simulate, parity_diff
+        vec = await asyncio.to_thread(simulate, payload)
+        legacy = {{**legacy, "parity": parity_diff(legacy, vec), "vectorizedTimingsMs": vec["explain"].get("timingsMs")}}
+    return legacy
+
+
+async def _backtest_payload(request, model) -> dict:
+    """Raw JSON body (keeps engine/detectors the request model may not declare)."""
+    try:
+        body = await request.json()
+    except Exception:
+        body = None
+    if isinstance(body, dict):
+        return body
+    for dump in ("model_dump", "dict"):
+        if hasattr(model, dump):
+            return getattr(model, dump)()
+    return dict(model) if isinstance(model, dict) else {{}}
+
+
+async def _call_legacy_backtest(handler, kwargs: dict):
+    """Call the original handler with the arguments FastAPI resolved for it."""
+    import asyncio
+    import inspect
+    if inspect.iscoroutinefunction(handler):
+        return await handler(**kwargs)
+    return await asyncio.to_thread(handler, **kwargs)
+
+
+'''
+    # Legacy handler stays as a plain function (no route)
+    api_txt = api_txt[:m.start()] + m.group(2) + api_txt[m.end():]
+    # Dispatcher goes right after the legacy function body (next top-level line)
+    nxt = re.compile(r"\n(?=[^\s#])")
+    mm = nxt.search(api_txt, m.start() + len(m.group(2)))
+    insert_at = mm.end() if mm else len(api_txt)
+    api_txt = api_txt[:insert_at] + dispatch + api_txt[insert_at:]
+    imports = []
+    if "\nimport os\n" not in api_txt:
+        imports.append("import os")
+    if not re.search(r"^from fastapi import[^\n]*\bRequest\b", api_txt, re.M):
+        imports.append("from fastapi import Request")
+    if imports:
+        first = re.search(r"^(?:from \S+ import [^\n(]+|import [^\n]+)\n", api_txt, re.M)
+        at = first.end() if first else 0
+        api_txt = api_txt[:at] + "\n".join(imports) + "\n" + api_txt[at:]
+    API.write_text(api_txt, encoding="utf-8")
+    print(f"/api/backtest/simulate now dispatches vectorized|legacy|parity ({legacy_name} kept as legacy engine)")
+
+print()
+print("=" * 60)
+print("VECTORIZED BACKTEST PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {BACKTEST} (new)")
+print(f"  - {API}")
+print()
+print("Next: python3 scripts/test_backtest_sim.py; then POST with \"engine\": \"parity\"")
+print("      and check parity.match before switching BACKTEST_ENGINE defaults")
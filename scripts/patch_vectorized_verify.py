@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Vectorized resample verifier for marketdata_verify.py
+
+1. verify_resample() compares CandleFrames: native and resampled bars are
+   aligned by epoch with np.searchsorted and all OHLC diffs computed at once
+   (legacy dict loop kept as _verify_resample_dicts fallback)
+2. Per-field diff percentiles in stats.fieldDiffPct
+3. verify_resample_many(): many symbols x timeframes in one call, M5 loaded
+   once per symbol (CLI: python -m core.marketdata_verify)
+4. Add /api/marketdata/verify-all endpoint
+
+Requires patch_mega1_marketdata.py and patch_candle_frame.py.
+"""
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path("/opt/JKM-AI-BOT")
+VERIFY = ROOT / "core" / "marketdata_verify.py"
+API = ROOT / "api_server.py"
+
+def die(msg):
+    raise SystemExit(f"FATAL: {msg}")
+
+if not ROOT.exists():
+    die("Missing /opt/JKM-AI-BOT")
+if not VERIFY.exists():
+    die("Missing core/marketdata_verify.py - run patch_mega1_marketdata.py first")
+if not (ROOT / "core" / "candle_frame.py").exists():
+    die("Missing core/candle_frame.py - run patch_candle_frame.py first")
+
+# ============================================================
+# 1. marketdata_verify.py: vectorized path
+# ============================================================
+
+verify_txt = VERIFY.read_text(encoding="utf-8")
+
+vectorized_code = '''
+
+# ============================================================
+# Vectorized verifier (CandleFrame / numpy)
+# ============================================================
+
+try:
+    import numpy as np
+    from core.candle_frame import CandleFrame, resample_frame, ts_to_iso
+except ImportError:
+    np = None
+    CandleFrame = None
+
+VERIFY_FIELDS = ("open", "high", "low", "close")
+DIFF_PERCENTILES = (50, 90, 99)
+MAX_REPORTED_MISMATCHES = 20
+CRYPTO_SYMBOLS = ("BTCUSD", "ETHUSD", "XRPUSD")
+
+
+def verify_resample(
+    symbol: str,
+    tf: str,
+    days: int = 7,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> Dict[str, Any]:
+    """
+    Verify M5 -> TF resample accuracy.
+
+    Same report as the original dict-based verifier (_verify_resample_dicts),
+    plus stats.fieldDiffPct (per-field relative diff percentiles, in %).
+    """
+    if CandleFrame is None:
+        return _verify_resample_dicts(symbol, tf, days, tolerance)
+    return verify_resample_many([symbol], [tf], days=days, tolerance=tolerance)["results"][symbol][tf]
+
+
+def _base_result(symbol: str, tf: str, days: int, tolerance: float) -> Dict[str, Any]:
+    from core.market_data_bridge import RESAMPLE_GRID, STRICT_WINDOW_POLICY
+
+    return {
+        "ok": True,
+        "grid": RESAMPLE_GRID,
+        "windowCompletePolicy": "strict" if STRICT_WINDOW_POLICY else "lenient",
+        "symbol": symbol,
+        "timeframe": tf,
+        "days": days,
+        "tolerance": tolerance,
+        "mismatches": [],
+        "stats": {
+            "total_candles": 0,
+            "complete_candles": 0,
+            "incomplete_candles": 0,
+            "mismatch_count": 0,
+            "max_abs_diff": 0.0,
+            "first_mismatch_ts": None,
+        },
+        "suggestion": None,
+        "rootCause": "OK",
+    }
+
+
+def compare_frames(
+    resampled: "CandleFrame",
+    native: "CandleFrame",
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> Dict[str, Any]:
+    """
+    Compare two frames bar by bar on OHLC.
+
+    Bars are matched on integer epoch (np.searchsorted into native.ts); bars
+    missing from either side are not compared. diff = |resampled - native| / native,
+    fields where native == 0 are skipped.
+    """
+    n_ts = native.ts
+    if not len(resampled) or not len(n_ts):
+        return {"compared": 0, "mismatches": [], "mismatch_count": 0, "max_diff": 0.0,
+                "first_mismatch_ts": None, "fieldDiffPct": {}}
+    if len(n_ts) > 1 and not bool(np.all(n_ts[1:] >= n_ts[:-1])):
+        native = native.sorted()
+        n_ts = native.ts
+
+    pos = np.searchsorted(n_ts, resampled.ts)
+    pos_c = np.minimum(pos, len(n_ts) - 1)
+    matched = (pos < len(n_ts)) & (n_ts[pos_c] == resampled.ts)
+    r_rows = np.nonzero(matched)[0]
+    n_rows = pos_c[matched]
+
+    r_vals = np.column_stack([getattr(resampled, f)[r_rows] for f in VERIFY_FIELDS])
+    n_vals = np.column_stack([getattr(native, f)[n_rows] for f in VERIFY_FIELDS])
+    valid = n_vals != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        diff = np.where(valid, np.abs(r_vals - n_vals) / np.where(valid, n_vals, 1.0), 0.0)
+    bad = valid & (diff > tolerance)
+    bad_rows, bad_cols = np.nonzero(bad)  # row-major: time order, then field order
+
+    mismatches = []
+    for row, col in zip(bad_rows[:MAX_REPORTED_MISMATCHES].tolist(), bad_cols[:MAX_REPORTED_MISMATCHES].tolist()):
+        mismatches.append({
+            "ts": ts_to_iso(int(resampled.ts[r_rows[row]])),
+            "field": VERIFY_FIELDS[col],
+            "resampled": float(r_vals[row, col]),
+            "native": float(n_vals[row, col]),
+            "diff_pct": round(float(diff[row, col]) * 100, 4),
+        })
+
+    field_stats = {}
+    for col, field in enumerate(VERIFY_FIELDS):
+        d = diff[valid[:, col], col] * 100
+        if not len(d):
+            continue
+        pct = np.percentile(d, DIFF_PERCENTILES)
+        field_stats[field] = {
+            **{f"p{p}": round(float(v), 6) for p, v in zip(DIFF_PERCENTILES, pct)},
+            "max": round(float(d.max()), 6),
+            "mismatches": int(bad[:, col].sum()),
+        }
+
+    return {
+        "compared": int(len(r_rows)),
+        "mismatches": mismatches,
+        "mismatch_count": int(len(bad_rows)),
+        "max_diff": float(diff[bad].max()) if len(bad_rows) else 0.0,
+        "first_mismatch_ts": ts_to_iso(int(resampled.ts[r_rows[bad_rows[0]]])) if len(bad_rows) else None,
+        "fieldDiffPct": field_stats,
+    }
+
+
+def _verify_frames(
+    symbol: str,
+    tf: str,
+    m5: "CandleFrame",
+    load_native,
+    days: int,
+    tolerance: float,
+    now: datetime,
+) -> Dict[str, Any]:
+    """verify_resample() report for one symbol/tf from an already loaded M5 frame."""
+    from core.market_data_bridge import tf_to_seconds
+
+    result = _base_result(symbol, tf, days, tolerance)
+    try:
+        if m5 is None or not len(m5):
+            result["ok"] = False
+            result["rootCause"] = "NO_M5_DATA"
+            result["suggestion"] = f"No M5 data for {symbol}. Run backfill or check if market is closed."
+            return result
+
+        is_forex = symbol.upper() not in CRYPTO_SYMBOLS
+        if is_forex and now.weekday() >= 5:
+            result["rootCause"] = "MARKET_CLOSED"
+            result["suggestion"] = f"{symbol} is a Forex pair. Market closed on weekends."
+
+        resampled = resample_frame(m5, tf_to_seconds("m5"), tf_to_seconds(tf), strict=True, now_ts=int(now.timestamp()))
+        complete = int(resampled.complete.sum()) if resampled.complete is not None else len(resampled)
+        incomplete = len(resampled) - complete
+        result["stats"]["total_candles"] = len(resampled)
+        result["stats"]["complete_candles"] = complete
+        result["stats"]["incomplete_candles"] = incomplete
+
+        native = None
+        try:
+            native = load_native()
+        except Exception as e:
+            logger.debug(f"No native {tf} candles available for comparison: {e}")
+
+        if native is not None and len(native):
+            cmp = compare_frames(resampled, native, tolerance)
+            result["mismatches"] = cmp["mismatches"]
+            result["stats"]["mismatch_count"] = cmp["mismatch_count"]
+            result["stats"]["max_abs_diff"] = round(cmp["max_diff"] * 100, 4)
+            result["stats"]["first_mismatch_ts"] = cmp["first_mismatch_ts"]
+            result["stats"]["compared_candles"] = cmp["compared"]
+            result["stats"]["fieldDiffPct"] = cmp["fieldDiffPct"]
+
+            if cmp["mismatch_count"]:
+                result["ok"] = False
+                result["rootCause"] = "TF_MISMATCH"
+                result["suggestion"] = f"Found {cmp['mismatch_count']} price mismatches. Max diff: {cmp['max_diff']*100:.2f}%"
+        else:
+            result["suggestion"] = f"No native {tf} data for comparison. Resample stats: {complete} complete, {incomplete} incomplete candles."
+
+        if incomplete > complete * 0.1:
+            result["ok"] = False
+            result["rootCause"] = "PROVIDER_LAG"
+            result["suggestion"] = f"High incomplete candle ratio ({incomplete}/{len(resampled)}). Provider may be lagging."
+
+    except Exception as e:
+        logger.exception("verify_resample failed")
+        result["ok"] = False
+        result["rootCause"] = "ERROR"
+        result["suggestion"] = f"Verification error: {str(e)}"
+
+    return result
+
+
+def verify_resample_many(
+    symbols: List[str],
+    tfs: List[str],
+    days: int = 7,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_workers: int = 4,
+) -> Dict[str, Any]:
+    """
+    Verify every symbol x tf. M5 is loaded once per symbol and shared by its
+    timeframes; symbols run on a small thread pool (I/O bound loads).
+
+    Returns:
+        {ok, results: {symbol: {tf: verify_resample report}}, summary: {...}}
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from core.market_data_bridge import get_candle_frame
+
+    t0 = time.perf_counter()
+    to_dt = datetime.now(timezone.utc)
+    from_dt = to_dt - timedelta(days=days)
+
+    def _one_symbol(symbol: str) -> Tuple[str, Dict[str, Any]]:
+        try:
+            m5 = get_candle_frame(symbol, from_dt, to_dt, "m5")
+        except Exception as e:
+            logger.warning(f"verify_resample_many: M5 load failed for {symbol}: {e}")
+            m5 = None
+        out = {}
+        for tf in tfs:
+            out[tf] = _verify_frames(
+                symbol, tf, m5,
+                lambda tf=tf: get_candle_frame(symbol, from_dt, to_dt, tf),
+                days, tolerance, to_dt,
+            )
+        return symbol, out
+
+    if len(symbols) <= 1 or max_workers <= 1:
+        results = dict(_one_symbol(s) for s in symbols)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+            results = dict(pool.map(_one_symbol, symbols))
+
+    root_causes: Dict[str, int] = {}
+    mismatched = []
+    for symbol, by_tf in results.items():
+        for tf, r in by_tf.items():
+            root_causes[r["rootCause"]] = root_causes.get(r["rootCause"], 0) + 1
+            if r["stats"]["mismatch_count"]:
+                mismatched.append(f"{symbol}/{tf}")
+
+    return {
+        "ok": all(r["ok"] for by_tf in results.values() for r in by_tf.values()),
+        "results": results,
+        "summary": {
+            "symbols": len(symbols),
+            "timeframes": list(tfs),
+            "pairs": len(symbols) * len(tfs),
+            "rootCauses": root_causes,
+            "mismatchedPairs": mismatched,
+            "elapsedMs": round((time.perf_counter() - t0) * 1000, 1),
+        },
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Verify M5 -> TF resample for many symbols")
+    parser.add_argument("symbols", nargs="*", help="default: scanner DEFAULT_15_SYMBOLS")
+    parser.add_argument("--tfs", default="15m,1h,4h")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--full", action="store_true", help="print per-pair reports")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols]
+    if not symbols:
+        try:
+            from core.scan_engine_v2 import DEFAULT_15_SYMBOLS
+            symbols = list(DEFAULT_15_SYMBOLS)
+        except Exception:
+            symbols = ["BTCUSD"]
+    report = verify_resample_many(symbols, [t.strip() for t in args.tfs.split(",") if t.strip()], args.days, args.tolerance)
+    print(json.dumps(report if args.full else {"ok": report["ok"], "summary": report["summary"]}, indent=2, default=str))
+'''
+
+if "def verify_resample_many(" in verify_txt:
+    print("SKIP: vectorized verifier already installed")
+elif "def verify_resample(" not in verify_txt:
+    print("WARNING: verify_resample() not found in marketdata_verify.py")
+else:
+    verify_txt = verify_txt.replace("def verify_resample(", "def _verify_resample_dicts(", 1)
+    verify_txt = verify_txt.rstrip("\n") + "\n" + vectorized_code
+    VERIFY.write_text(verify_txt, encoding="utf-8")
+    print("Installed vectorized verify_resample() + verify_resample_many()")
+
+# ============================================================
+# 2. api_server.py: /api/marketdata/verify-all
+# ============================================================
+
+if API.exists():
+    api_txt = API.read_text(encoding="utf-8")
+    if "/api/marketdata/verify-all" in api_txt:
+        print("SKIP: /api/marketdata/verify-all already exists")
+    else:
+        marker = '@app.get("/api/marketdata/verify")'
+        idx = api_txt.find(marker)
+        if idx == -1:
+            print("WARNING: /api/marketdata/verify not found - skipping verify-all endpoint")
+        else:
+            next_route_idx = api_txt.find("@app.", idx + len(marker))
+            if next_route_idx == -1:
+                next_route_idx = len(api_txt)
+            endpoint_code = '''@app.get("/api/marketdata/verify-all")
+def marketdata_verify_all(
+    symbols: str = "",
+    tfs: str = "15m,1h,4h",
+    days: int = 7,
+    tolerance: float = 0.0001,
+    full: bool = False,
+):
+    """
+    Verify M5 -> TF resample for many symbols x timeframes in one pass.
+
+    Args:
+        symbols: Comma-separated symbols (default: scanner DEFAULT_15_SYMBOLS)
+        tfs: Comma-separated timeframes
+        full: Include per-pair reports (summary only by default)
+    """
+    try:
+        from core.marketdata_verify import verify_resample_many
+        sym_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+        if not sym_list:
+            from core.scan_engine_v2 import DEFAULT_15_SYMBOLS
+            sym_list = list(DEFAULT_15_SYMBOLS)
+        tf_list = [t.strip() for t in tfs.split(",") if t.strip()]
+        report = verify_resample_many(sym_list, tf_list, days=days, tolerance=tolerance)
+        if not full:
+            report["results"] = {
+                s: {tf: {"ok": r["ok"], "rootCause": r["rootCause"], "stats": r["stats"]} for tf, r in by_tf.items()}
+                for s, by_tf in report["results"].items()
+            }
+        return report
+    except Exception as e:
+        return {
+            "ok": False,
+            "error": str(e),
+            "suggestion": "Check backend logs for details"
+        }
+
+
+'''
+            api_txt = api_txt[:next_route_idx] + endpoint_code + api_txt[next_route_idx:]
+            API.write_text(api_txt, encoding="utf-8")
+            print("Added /api/marketdata/verify-all endpoint")
+else:
+    print(f"NOTE: {API} not found")
+
+print()
+print("=" * 60)
+print("VECTORIZED VERIFY PATCH COMPLETE")
+print("=" * 60)
+print(f"timestamp_utc: {datetime.utcnow().isoformat()}Z")
+print()
+print("Files modified:")
+print(f"  - {VERIFY}")
+print(f"  - {API}")
+print()
+print("Next: Rebuild container and run: python -m core.marketdata_verify --days 7")
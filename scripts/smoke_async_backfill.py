@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Async backfill against a local fake aggregates provider (run inside the container).
+
+Serves /v2/aggs/... from a thread with per-request latency and a 429 rate limit,
+backfills 15 symbols x 30 days into an in-memory store, then cancels and
+resumes a second job to check the checkpoints. Real market data is not touched.
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+SYMBOLS = ["XAUUSD", "EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "USDCAD", "USDCHF", "NZDUSD",
+           "EURJPY", "GBPJPY", "EURGBP", "AUDJPY", "EURAUD", "BTCUSD", "ETHUSD"]
+DAYS = 30
+LATENCY_SEC = 0.15
+PROVIDER_RATE = 20  # req/s the fake provider accepts before answering 429
+
+
+class FakeAggs(BaseHTTPRequestHandler):
+    hits = []
+    lock = threading.Lock()
+    served = 0
+    limited = 0
+
+    def do_GET(self):
+        now = time.monotonic()
+        with FakeAggs.lock:
+            FakeAggs.hits = [t for t in FakeAggs.hits if now - t < 1.0] + [now]
+            over = len(FakeAggs.hits) > PROVIDER_RATE
+            FakeAggs.limited += over
+        if over:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+            return
+        time.sleep(LATENCY_SEC)
+        parts = urlparse(self.path).path.split("/")
+        from_ms, to_ms = int(parts[-2]), int(parts[-1])
+        results = []
+        t = -(-from_ms // 300_000) * 300_000
+        price = 100.0
+        while t <= to_ms:
+            if time.gmtime(t // 1000).tm_wday < 5 or "X:" in parts[4]:
+                price += random.uniform(-0.5, 0.5)
+                results.append({"t": t, "o": price, "h": price + 0.3, "l": price - 0.3, "c": price, "v": 10})
+            t += 300_000
+        body = json.dumps({"status": "OK", "results": results}).encode()
+        with FakeAggs.lock:
+            FakeAggs.served += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MemoryStore:
+    def __init__(self):
+        self.rows = {}
+        self.writes = 0
+
+    def append_candles(self, symbol, candles, tf="m5"):
+        self.writes += 1
+        self.rows.setdefault(symbol, {}).update((c["ts"], c) for c in candles)
+        return len(candles)
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeAggs)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ["BACKFILL_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+os.environ["BACKFILL_API_KEY"] = "fake"
+os.environ.setdefault("BACKFILL_RATE_PER_SEC", "25")  # deliberately above the fake limit
+os.environ.setdefault("BACKFILL_BURST", "10")
+
+sys.path.insert(0, os.getcwd())
+from core import async_backfill as ab  # noqa: E402
+
+now = int(time.time())
+start = now - DAYS * 86400
+checkpoints = ab.Checkpoints(Path(tempfile.mkdtemp()) / "checkpoints.json")
+
+store = MemoryStore()
+job = ab.BackfillJob(SYMBOLS, from_ts=start, to_ts=now, resume=False, source="http")
+t0 = time.time()
+asyncio.run(job.run(store=store, checkpoints=checkpoints))
+elapsed = time.time() - t0
+info = job.to_dict()
+print(f"status={info['status']} elapsed={elapsed:.1f}s stats={info['stats']}")
+print(f"provider served={FakeAggs.served} answered429={FakeAggs.limited} store writes={store.writes}")
+print(f"bars/symbol: {sorted({len(v) for v in store.rows.values()})}")
+assert info["status"] == "done", info["error"]
+assert len(store.rows) == len(SYMBOLS)
+unique = sum(len(v) for v in store.rows.values())
+print(f"fetched={info['stats']['bars']} unique={unique}")
+assert info["stats"]["bars"] == unique, "chunk boundaries must not refetch a bar"
+
+# Resume: cancel a second run part-way (1-day chunks), then rerun - must start at the checkpoint
+ab.BACKFILL_CHUNK_DAYS = 1
+checkpoints = ab.Checkpoints(Path(tempfile.mkdtemp()) / "checkpoints.json")
+store = MemoryStore()
+first = ab.BackfillJob(SYMBOLS[:3], from_ts=start, to_ts=now, source="http")
+threading.Timer(1.5, lambda: setattr(first, "cancelled", True)).start()
+asyncio.run(first.run(store=store, checkpoints=checkpoints))
+done = {s: checkpoints.get(s)["doneUntil"] for s in SYMBOLS[:3]}
+second = ab.BackfillJob(SYMBOLS[:3], from_ts=start, to_ts=now, source="http")
+asyncio.run(second.run(store=store, checkpoints=checkpoints))
+for s in SYMBOLS[:3]:
+    resumed_from = second.per_symbol[s]["from"]
+    print(f"{s}: first={first.per_symbol[s]['status']} chunks={first.per_symbol[s]['chunks']} "
+          f"resumed_from={resumed_from} total_chunks={first.per_symbol[s]['chunks'] + second.per_symbol[s]['chunks']}")
+    assert first.per_symbol[s]["status"] == "cancelled"
+    assert resumed_from == ab._iso(done[s] + ab.M5_SEC)
+    assert checkpoints.get(s)["doneUntil"] == now
+print("OK")
+server.shutdown()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Batched signal sync against a local stub dashboard (run inside the container).
+
+The stub serves /api/internal/user-data/signals and .../signals/batch with
+per-request latency and can fail on demand (503 / 404 / down). Checks batching
+vs one-request-per-signal, retry with backoff, spill + replay after an outage,
+queue overflow, crash during replay, the single-route fallback and a late
+replay not overwriting newer fields. No real dashboard is touched.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+USERS = 50
+SIGNALS_PER_USER = 20
+LATENCY_SEC = 0.02
+
+
+class StubDashboard(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled sessions reuse connections
+    docs = {}
+    requests = 0
+    connections = set()
+    fail_next = 0  # answer 503 to this many requests
+    batch_route = True
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with StubDashboard.lock:
+            StubDashboard.requests += 1
+            StubDashboard.connections.add(self.client_address)
+            fail = StubDashboard.fail_next > 0
+            StubDashboard.fail_next -= fail
+        time.sleep(LATENCY_SEC)
+        if self.headers.get("x-internal-api-key") != "test":
+            return self._reply(403, {"ok": False, "message": "Invalid internal API key"})
+        if fail:
+            return self._reply(503, {"ok": False, "message": "unavailable"}, {"Retry-After": "0"})
+        if self.path.endswith("/signals/batch"):
+            if not StubDashboard.batch_route:
+                return self._reply(404, {"ok": False})
+            items = body.get("items", [])
+        else:
+            items = [body]
+        rejected = []
+        with StubDashboard.lock:
+            for i, it in enumerate(items):
+                if not it.get("user_id") or not it.get("signal_key") or not isinstance(it.get("signal"), dict):
+                    rejected.append({"index": i, "message": "user_id, signal_key, signal required"})
+                    continue
+                StubDashboard.docs.setdefault((it["user_id"], it["signal_key"]), {}).update(it["signal"])
+        self._reply(200, {"ok": True, "written": len(items) - len(rejected), "rejected": rejected})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def reset():
+    StubDashboard.docs, StubDashboard.requests, StubDashboard.connections = {}, 0, set()
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StubDashboard)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f"http://127.0.0.1:{server.server_port}"
+os.environ.setdefault("SIGNAL_SYNC_BACKOFF_SEC", "0.05")
+
+sys.path.insert(0, os.getcwd())
+from core import signal_sync as ss  # noqa: E402
+
+ss.SIGNAL_SYNC_BACKOFF_SEC = float(os.environ["SIGNAL_SYNC_BACKOFF_SEC"])
+tmp = Path(tempfile.mkdtemp())
+signals = [(f"user{u}", f"sig{u}-{i}", {"symbol": "EURUSD", "direction": "BUY", "entry": 1.1, "sl": 1.09, "tp": 1.12})
+           for u in range(USERS) for i in range(SIGNALS_PER_USER)]
+N = len(signals)
+
+# Baseline: one POST per signal on a fresh connection each time
+sess = ss._Session("test")
+t0 = time.time()
+for u, k, s in signals[:100]:
+    sess.post_json(url + ss.SINGLE_PATH, {"user_id": u, "signal_key": k, "signal": s})
+single = (time.time() - t0) / 100 * N
+print(f"single-signal POSTs (extrapolated): {single:.1f}s for {N}")
+
+# 1. Batched
+reset()
+sync = ss.SignalSync(url, "test", tmp / "a.jsonl")
+t0 = time.time()
+for u, k, s in signals:
+    sync.enqueue(u, k, s)
+sync.enqueue("user0", "sig0-0", {"status": "hit_tp"})  # coalesces with the queued upsert
+assert sync.flush(30)
+elapsed = time.time() - t0
+print(f"batched: {elapsed:.2f}s requests={StubDashboard.requests} connections={len(StubDashboard.connections)} "
+      f"http={sync.stats()['http']}")
+assert len(StubDashboard.docs) == N
+assert StubDashboard.docs[("user0", "sig0-0")]["status"] == "hit_tp"
+assert StubDashboard.requests <= N // ss.SIGNAL_SYNC_BATCH + 2
+
+# 2. Transient 503s: retried with backoff, nothing lost
+reset()
+StubDashboard.fail_next = 3
+for u, k, s in signals[:300]:
+    sync.enqueue(u, k, s)
+assert sync.flush(30)
+st = sync.stats()
+print(f"503 x3: delivered={len(StubDashboard.docs)} retries={st['retries']} spilled={st['spilled']}")
+assert len(StubDashboard.docs) == 300 and st["spilled"] == 0
+
+# 3. Outage past the retry budget: batch spilled, replayed after the next successful send
+reset()
+ss.SIGNAL_SYNC_MAX_RETRIES = 2
+StubDashboard.fail_next = 10
+for u, k, s in signals[:150]:
+    sync.enqueue(u, k, s)
+assert sync.flush(30)
+spilled = sync.stats()["spillFile"]
+StubDashboard.fail_next = 0
+sync.enqueue("user1", "after-outage", {"symbol": "XAUUSD"})
+assert sync.flush(30) and sync.flush(30)
+st = sync.stats()
+print(f"outage: spilled={spilled} replayed={st['replayed']} delivered={len(StubDashboard.docs)} spillFile={st['spillFile']}")
+assert spilled == 150 and len(StubDashboard.docs) == 151 and st["spillFile"] == 0
+sync.stop()
+
+# 4. Queue overflow spills (durable), a new process replays on start
+reset()
+ss.SIGNAL_SYNC_QUEUE_MAX = 100
+down = ss.SignalSync("", "test", tmp / "b.jsonl")  # dashboard URL not configured: everything spills
+for u, k, s in signals[:250]:
+    down.enqueue(u, k, s)
+down.stop(5)
+print(f"no URL: spillFile={down.stats()['spillFile']}")
+assert down.stats()["spillFile"] == 250
+ss.SIGNAL_SYNC_QUEUE_MAX = 5000
+# Crash after the replay moved the items into memory: the .draining file still holds them
+crashed = ss.SignalSync(url, "test", tmp / "b.jsonl")
+crashed._replay_spill()
+assert crashed.stats()["queued"] == 250 and (tmp / "b.draining").exists()
+del crashed
+up = ss.SignalSync(url, "test", tmp / "b.jsonl")
+up.start()
+time.sleep(0.2)
+assert up.flush(30)
+print(f"restart: delivered={len(StubDashboard.docs)} replayed={up.stats()['replayed']}")
+assert len(StubDashboard.docs) == 250 and not (tmp / "b.draining").exists()
+up.stop()
+
+# 5. Older dashboard without the batch route: single-signal fallback
+reset()
+StubDashboard.batch_route = False
+old = ss.SignalSync(url, "test", tmp / "c.jsonl")
+for u, k, s in signals[:40]:
+    old.enqueue(u, k, s)
+old.enqueue("", "bad", {})
+assert old.flush(30)
+print(f"no batch route: delivered={len(StubDashboard.docs)} batchRoute={old.stats()['batchRoute']}")
+assert len(StubDashboard.docs) == 40 and not old.stats()["batchRoute"]
+old.stop()
+
+# 6. Spill replayed after newer updates were delivered: newer fields are kept
+reset()
+StubDashboard.batch_route = True
+late = ss.SignalSync(url, "test", tmp / "d.jsonl")
+StubDashboard.fail_next = 10
+late.enqueue("user2", "k1", {"status": "pending", "entry": 1.1})
+late.enqueue("user2", "k2", {"status": "pending"})
+assert late.flush(30) and late.stats()["spillFile"] == 2
+StubDashboard.fail_next = 0
+late.enqueue("user2", "k1", {"status": "hit_tp"})
+late.enqueue("user2", "k2", {"status": "hit_sl"})
+assert late.flush(30) and late.flush(30)
+st = late.stats()
+print(f"stale replay: docs={StubDashboard.docs} staleReplays={st['staleReplays']}")
+assert StubDashboard.docs[("user2", "k1")] == {"status": "hit_tp", "entry": 1.1}
+assert StubDashboard.docs[("user2", "k2")] == {"status": "hit_sl"} and st["staleReplays"] == 1
+late.stop()
+print("OK")
+server.shutdown()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Telegram dispatcher against a local fake Bot API (run inside the container).
+
+The fake serves /bot<token>/sendMessage with per-request latency, answers 429
+(retry_after) above 1 msg/s per chat or 30 msg/s overall, 403 for a blocked
+chat and 500 on demand. Checks that submitting never blocks, bursts become one
+digest per chat, rate limits are respected and failed messages are persisted
+to the outbox and delivered after the API recovers. No real chat is messaged.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+CHATS = 60
+PER_CHAT = 5
+LATENCY_SEC = 0.05
+
+
+class FakeBotAPI(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    chat_hits = {}
+    global_hits = []
+    messages = {}
+    limited = 0
+    fail = False
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        chat, now = str(body.get("chat_id")), time.monotonic()
+        time.sleep(LATENCY_SEC)
+        with FakeBotAPI.lock:
+            if FakeBotAPI.fail:
+                return self._reply(500, {"ok": False, "error_code": 500, "description": "Internal Server Error"})
+            if chat == "blocked":
+                return self._reply(403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"})
+            FakeBotAPI.global_hits = [t for t in FakeBotAPI.global_hits if now - t < 1.0]
+            last = FakeBotAPI.chat_hits.get(chat, -10.0)
+            if now - last < 0.95 or len(FakeBotAPI.global_hits) >= 30:
+                FakeBotAPI.limited += 1
+                return self._reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                         "parameters": {"retry_after": 1}})
+            FakeBotAPI.chat_hits[chat] = now
+            FakeBotAPI.global_hits.append(now)
+            FakeBotAPI.messages.setdefault(chat, []).append(body["text"])
+        self._reply(200, {"ok": True, "result": {"message_id": 1}})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBotAPI)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ.setdefault("TELEGRAM_DIGEST_WINDOW_SEC", "0.5")
+os.environ.setdefault("TELEGRAM_BACKOFF_SEC", "0.2")
+
+sys.path.insert(0, os.getcwd())
+from core import telegram_dispatcher as td  # noqa: E402
+
+url = f"http://127.0.0.1:{server.server_port}"
+tmp = Path(tempfile.mkdtemp())
+
+# 1. A scan cycle's burst: 60 chats x 5 signals, submitted from the "scanner" thread
+d = td.TelegramDispatcher(url, "TEST", tmp / "outbox.jsonl")
+d.start()
+t0 = time.perf_counter()
+for i in range(PER_CHAT):
+    for c in range(CHATS):
+        d.submit(c, f"<b>EURUSD</b> BUY setup #{i}", parse_mode="HTML")
+submit_ms = (time.perf_counter() - t0) * 1000
+inline_sec = CHATS * PER_CHAT * LATENCY_SEC
+assert d.flush(60)
+m = d.metrics()
+print(f"submit {CHATS * PER_CHAT} msgs: {submit_ms:.1f} ms (inline sends would take ~{inline_sec:.0f}s)")
+print(f"delivered={m['delivered']} requests={m['requests']} digests={m['digests']} 429s={FakeBotAPI.limited} "
+      f"sendLatency p95={m['sendLatencyMs'] and m['sendLatencyMs']['p95']}ms http={m['http']}")
+assert submit_ms < 200
+assert FakeBotAPI.limited == 0, "global bucket keeps under the API limit"
+assert m["delivered"] == CHATS * PER_CHAT
+assert all(len(v) == 1 and "5 notifications" in v[0] for v in FakeBotAPI.messages.values()), "one digest per chat"
+
+# 2. Follow-up inside the chat's rate window: waits for its slot (no 429 storm), still delivered
+FakeBotAPI.messages.clear()
+limited = FakeBotAPI.limited
+for i in range(3):
+    d.submit(7, f"update {i}")
+    time.sleep(0.6)
+assert d.flush(30)
+print(f"follow-ups: chat 7 got {len(FakeBotAPI.messages['7'])} message(s), new 429s={FakeBotAPI.limited - limited}")
+assert sum(t.count("update") for t in FakeBotAPI.messages["7"]) == 3
+
+# 3. Blocked chat: dropped, not retried
+d.submit("blocked", "hello")
+assert d.flush(10)
+assert d.metrics()["dropped"] == 1
+
+# 4. API down past the retry budget: persisted to the outbox, delivered after recovery
+td.TELEGRAM_MAX_RETRIES = 1
+FakeBotAPI.messages.clear()
+FakeBotAPI.fail = True
+for c in range(5):
+    d.submit(f"down{c}", "signal during outage")
+assert d.flush(30)
+m = d.metrics()
+print(f"outage: persisted={m['persisted']} outbox={m['outbox']} retries={m['retries']}")
+assert m["outbox"] == 5
+FakeBotAPI.fail = False
+d.stop()
+
+# Restart (new process): the outbox is replayed on startup
+d2 = td.TelegramDispatcher(url, "TEST", tmp / "outbox.jsonl")
+d2.start()
+time.sleep(0.3)
+assert d2.flush(30)
+print(f"restart: replayed={d2.metrics()['replayed']} delivered={d2.metrics()['delivered']}")
+assert d2.metrics()["delivered"] == 5 and d2.metrics()["outbox"] == 0
+d2.stop()
+
+# 5. attach_sender: a legacy inline sender becomes an enqueue
+CALLS = []
+
+
+def send_telegram_message(chat_id, text, parse_mode="HTML"):
+    CALLS.append(chat_id)
+    time.sleep(1)
+
+
+ns = {"send_telegram_message": send_telegram_message}
+td.attach_sender(ns, "send_telegram_message")
+td._dispatcher = td.TelegramDispatcher(url, "TEST", tmp / "outbox2.jsonl")
+td._dispatcher.start()
+t0 = time.perf_counter()
+assert ns["send_telegram_message"](123, "wrapped")
+print(f"wrapped sender returned in {(time.perf_counter() - t0) * 1000:.2f} ms; original called {len(CALLS)}x")
+assert not CALLS and td._dispatcher.flush(10) and td._dispatcher.metrics()["delivered"] == 1
+td._dispatcher.stop()
+print("OK")
+server.shutdown()